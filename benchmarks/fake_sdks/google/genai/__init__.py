@@ -0,0 +1,6 @@
+"""Fake google.genai package for offline startup benchmarks."""
+
+from . import models
+from .client import Client
+
+__all__ = ["Client", "models"]
@@ -0,0 +1,20 @@
+"""Fake google.genai.Client."""
+
+from .models import AsyncModels, Models
+
+
+class ApiClient:
+    vertexai = False
+    _vertexai = False
+
+
+class _Aio:
+    def __init__(self, api_client):
+        self.models = AsyncModels(api_client)
+
+
+class Client:
+    def __init__(self, api_key=None, **kwargs):
+        self._api_client = ApiClient()
+        self.models = Models(self._api_client)
+        self.aio = _Aio(self._api_client)
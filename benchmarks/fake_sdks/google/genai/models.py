@@ -0,0 +1,63 @@
+"""Fake google.genai.models with the methods the middleware patches."""
+
+
+# Chunks yielded per streaming call (benchmarks raise this)
+STREAM_CHUNKS = 1
+
+
+class UsageMetadata:
+    prompt_token_count = 12
+    candidates_token_count = 34
+    total_token_count = 46
+    cached_content_token_count = 0
+
+
+class Candidate:
+    finish_reason = "STOP"
+
+
+class GenerateContentResponse:
+    def __init__(self, model):
+        self.model_version = model
+        self.usage_metadata = UsageMetadata()
+        self.candidates = [Candidate()]
+
+
+class EmbedContentResponse:
+    def __init__(self, model):
+        self.model_version = model
+        self.embeddings = []
+        self.metadata = None
+
+
+class Models:
+    def __init__(self, api_client):
+        self._api_client = api_client
+
+    def generate_content(self, model, contents, config=None):
+        return GenerateContentResponse(model)
+
+    def generate_content_stream(self, model, contents, config=None):
+        for _ in range(STREAM_CHUNKS):
+            yield GenerateContentResponse(model)
+
+    def embed_content(self, model, contents, config=None):
+        return EmbedContentResponse(model)
+
+
+class AsyncModels:
+    def __init__(self, api_client):
+        self._api_client = api_client
+
+    async def generate_content(self, model, contents, config=None):
+        return GenerateContentResponse(model)
+
+    async def generate_content_stream(self, model, contents, config=None):
+        async def chunks():
+            for _ in range(STREAM_CHUNKS):
+                yield GenerateContentResponse(model)
+
+        return chunks()
+
+    async def embed_content(self, model, contents, config=None):
+        return EmbedContentResponse(model)
@@ -0,0 +1,5 @@
+"""Fake vertexai package for offline startup benchmarks."""
+
+
+def init(project=None, location=None, **kwargs):
+    pass
@@ -0,0 +1,36 @@
+"""Fake vertexai.generative_models with the methods the middleware patches."""
+
+
+# Chunks yielded per streaming call (benchmarks raise this)
+STREAM_CHUNKS = 1
+
+
+class UsageMetadata:
+    prompt_token_count = 12
+    candidates_token_count = 34
+    total_token_count = 46
+    cached_content_token_count = 0
+
+
+class Candidate:
+    finish_reason = "STOP"
+
+
+class GenerationResponse:
+    def __init__(self):
+        self._raw_response = None
+        self.usage_metadata = UsageMetadata()
+        self.candidates = [Candidate()]
+
+
+class GenerativeModel:
+    def __init__(self, model_name):
+        self._model_name = f"publishers/google/models/{model_name}"
+
+    def generate_content(self, contents, stream=False):
+        if stream:
+            return iter([GenerationResponse() for _ in range(STREAM_CHUNKS)])
+        return GenerationResponse()
+
+    async def generate_content_async(self, contents, stream=False):
+        return GenerationResponse()
@@ -0,0 +1,26 @@
+"""Fake vertexai.language_models with the methods the middleware patches."""
+
+
+class Statistics:
+    token_count = 8
+
+
+class TextEmbedding:
+    def __init__(self):
+        self.values = [0.0]
+        self.statistics = Statistics()
+
+
+class TextEmbeddingModel:
+    def __init__(self, model_id):
+        self._model_id = model_id
+
+    @classmethod
+    def from_pretrained(cls, model_name):
+        return cls(model_name)
+
+    def get_embeddings(self, texts):
+        return [TextEmbedding() for _ in texts]
+
+    async def get_embeddings_async(self, texts):
+        return [TextEmbedding() for _ in texts]
@@ -0,0 +1,5 @@
+"""Fake vertexai.preview.generative_models."""
+
+from vertexai.generative_models import GenerationResponse, GenerativeModel
+
+__all__ = ["GenerationResponse", "GenerativeModel"]
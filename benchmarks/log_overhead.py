@@ -0,0 +1,99 @@
+"""
+Logging overhead of the wrappers with large multimodal prompts.
+
+Compares the old eager f-string debug logs of args/kwargs against lazy
+LogPreview arguments, at INFO (debug disabled) and DEBUG (debug enabled,
+written to a null stream), for a prompt with long text and inline image
+bytes.
+
+Usage:
+    python benchmarks/log_overhead.py [--prompt-kb 200] [--calls 2000]
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from revenium_middleware_google.common.log_preview import LogPreview  # noqa: E402
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+
+def make_kwargs(prompt_kb):
+    """generate_content kwargs with half text and half inline image bytes."""
+    half = prompt_kb * 512
+    return {
+        "model": "gemini-2.0-flash",
+        "contents": [
+            {"role": "user", "parts": [{"text": "Describe this image. " + "x" * half}]},
+            {
+                "role": "user",
+                "parts": [
+                    {"inline_data": {"mime_type": "image/png", "data": os.urandom(half)}}
+                ],
+            },
+        ],
+        "config": {"temperature": 0.2, "api_key": "AIza-not-a-real-key"},
+    }
+
+
+def us_per_call(fn, calls, repeat=3):
+    """Best-of-``repeat`` microseconds per call."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prompt-kb", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    call_args = ()
+    kwargs = make_kwargs(args.prompt_kb)
+    sink = io.StringIO()
+    handler = logging.StreamHandler(sink)
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    def eager():
+        logger.debug(
+            f"Calling wrapped generate_content function with args: {call_args}, kwargs: {kwargs}"
+        )
+
+    def lazy():
+        logger.debug(
+            "Calling wrapped generate_content function with args: %s, kwargs: %s",
+            LogPreview(call_args),
+            LogPreview(kwargs),
+        )
+
+    print(f"prompt: {args.prompt_kb} KB (text + image bytes)")
+    for level in (logging.INFO, logging.DEBUG):
+        logger.setLevel(level)
+        for name, fn in (("eager f-string", eager), ("lazy LogPreview", lazy)):
+            sink.seek(0)
+            sink.truncate()
+            fn()
+            line_len = len(sink.getvalue())
+            calls = args.calls if level == logging.INFO or fn is lazy else max(1, args.calls // 50)
+            cost = us_per_call(fn, calls)
+            print(
+                f"{logging.getLevelName(level):<6} {name:<16} {cost:10.2f} us/call"
+                f"  log line: {line_len} chars"
+            )
+
+
+if __name__ == "__main__":
+    main()
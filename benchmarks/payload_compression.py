@@ -0,0 +1,141 @@
+"""
+Compression ratio and cost of metering request bodies.
+
+Builds metering records the way the middleware does (create_usage_data, the
+usage metadata normalizer and the SDK's JSON body) with varying token counts
+and timings and shared provider, environment and subscriber fields, then
+compresses groups of them as the grouped batch path would send them. For
+each codec and group size it reports raw and compressed bytes per record,
+the compression ratio and the compression time per record. zstd is measured
+only when the zstandard package is installed.
+
+Usage:
+    python benchmarks/payload_compression.py [--groups 1 10 50 200]
+        [--repeat 20] [--json]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["REVENIUM_LOG_LEVEL"] = "WARNING"
+
+from revenium_middleware_google.common import utils  # noqa: E402
+from revenium_middleware_google.common.compression import (  # noqa: E402
+    Codec,
+    compress,
+    is_zstd_available,
+)
+from revenium_middleware_google.common.types import (  # noqa: E402
+    OperationType,
+    ProviderMetadata,
+    UsageData,
+)
+
+USAGE_METADATA = {
+    "trace_id": "checkout-flow",
+    "task_type": "summarize",
+    "environment": "production",
+    "region": "us-east1",
+    "organization_id": "acme-corp",
+    "product_id": "assistant",
+    "subscriber": {"id": "user-1234", "email": "user@example.com"},
+}
+
+
+def records(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    """Request bodies for ``count`` varied chat calls."""
+    rng = random.Random(seed)
+    start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    bodies = []
+    for i in range(count):
+        request_time = start + datetime.timedelta(seconds=i * 0.37)
+        tokens = rng.randint(20, 4000)
+        output = rng.randint(10, 800)
+        usage = UsageData.create(
+            operation_type=OperationType.CHAT,
+            input_tokens=tokens,
+            output_tokens=output,
+            total_tokens=tokens + output,
+            model=rng.choice(("gemini-2.0-flash", "gemini-1.5-pro")),
+            provider_metadata=ProviderMetadata.for_google_ai_sdk(),
+            stop_reason="END",
+            request_time=request_time,
+            response_time=request_time
+            + datetime.timedelta(milliseconds=rng.randint(200, 4000)),
+        )
+        args = utils.build_completion_args(
+            transaction_id=usage.transaction_id,
+            model=usage.model,
+            prompt_tokens=usage.input_token_count,
+            completion_tokens=usage.output_token_count,
+            total_tokens=usage.total_token_count,
+            cached_tokens=0,
+            stop_reason=usage.stop_reason,
+            request_time=usage.request_time,
+            response_time=usage.response_time,
+            request_duration=usage.request_duration,
+            usage_metadata=dict(USAGE_METADATA),
+            provider=usage.provider,
+            model_source=usage.model_source,
+            operation_type=OperationType.CHAT,
+        )
+        bodies.append(utils._completion_body(args))
+    return bodies
+
+
+def measure(groups: List[int], repeat: int) -> Dict:
+    codecs = [Codec.GZIP] + ([Codec.ZSTD] if is_zstd_available() else [])
+    results: Dict = {"codecs": {}}
+    for codec in codecs:
+        per_group = results["codecs"][codec.value] = {}
+        for size in groups:
+            group = records(size)
+            body = (json.dumps(group[0]) if size == 1 else json.dumps(group)).encode()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                compressed = compress(body, codec)
+            elapsed = (time.perf_counter() - start) / repeat
+            per_group[str(size)] = {
+                "raw_bytes_per_record": round(len(body) / size, 1),
+                "compressed_bytes_per_record": round(len(compressed) / size, 1),
+                "ratio": round(len(body) / len(compressed), 1),
+                "us_per_record": round(elapsed / size * 1e6, 2),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--groups", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = measure(args.groups, args.repeat)
+    if args.json:
+        print(json.dumps(results))
+        return
+    header = (
+        f"{'codec':<6}{'records':>8}{'raw B/rec':>11}{'sent B/rec':>12}"
+        f"{'ratio':>8}{'us/rec':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for codec, sizes in results["codecs"].items():
+        for size, e in sizes.items():
+            print(
+                f"{codec:<6}{size:>8}{e['raw_bytes_per_record']:>11.0f}"
+                f"{e['compressed_bytes_per_record']:>12.0f}{e['ratio']:>8.1f}"
+                f"{e['us_per_record']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
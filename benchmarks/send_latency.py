@@ -0,0 +1,234 @@
+"""
+Metering send latency against a local fake Revenium server.
+
+Starts the fake Revenium server (revenium_middleware_google.testing) in its
+own process, so it does not compete with the clients for the GIL, with a
+fixed response latency. For each client configuration and concurrency level,
+that many threads send completion records through one shared metering
+client. A warm-up round fills the connection pool before timing starts. It
+reports the p50/p90/p99/max send latency, throughput, failed sends and how
+many TCP connections the server accepted, for:
+
+- sdk_default: ReveniumMetering with the SDK's own httpx settings
+- no_keepalive: a new connection per send, the cost keep-alive avoids
+- tuned: the middleware's client (HttpClientConfig, REVENIUM_METERING_* env)
+
+Concurrency above the tuned pool size queues for a connection; the default
+pool (16) covers the default 8 metering workers.
+
+Usage:
+    python benchmarks/send_latency.py [--concurrency 1 8 32 64] [--sends 2000]
+        [--server-latency 0.002] [--pool-size 16] [--json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+os.environ["REVENIUM_LOG_LEVEL"] = "WARNING"
+
+import httpx  # noqa: E402
+from revenium_metering import ReveniumMetering  # noqa: E402
+
+from revenium_middleware_google.common import utils  # noqa: E402
+from revenium_middleware_google.common.http_client import (  # noqa: E402
+    HttpClientConfig,
+    create_metering_client,
+)
+from revenium_middleware_google.common.types import OperationType  # noqa: E402
+
+API_KEY = "hak_benchmark"
+
+COMPLETION_ARGS = utils.build_completion_args(
+    transaction_id="bench",
+    model="gemini-2.0-flash",
+    prompt_tokens=10,
+    completion_tokens=5,
+    total_tokens=15,
+    cached_tokens=0,
+    stop_reason="END",
+    request_time="2025-01-01T00:00:00.000Z",
+    response_time="2025-01-01T00:00:00.100Z",
+    request_duration=100,
+    usage_metadata={"trace_id": "bench"},
+    operation_type=OperationType.CHAT,
+)
+
+
+def clients(base_url: str, pool_size: int) -> Dict[str, Callable[[], object]]:
+    """Client factories by name; each measurement gets a fresh client."""
+    no_keepalive = httpx.Limits(max_connections=100, max_keepalive_connections=0)
+    config = HttpClientConfig.from_env()
+    config.pool_size = pool_size
+    config.__post_init__()
+    return {
+        "sdk_default": lambda: ReveniumMetering(
+            api_key=API_KEY, base_url=base_url, max_retries=0
+        ),
+        "no_keepalive": lambda: ReveniumMetering(
+            api_key=API_KEY,
+            base_url=base_url,
+            max_retries=0,
+            http_client=httpx.Client(limits=no_keepalive),
+        ),
+        "tuned": lambda: create_metering_client(API_KEY, base_url, config),
+    }
+
+
+class _ServerProcess:
+    """The fake server's command-line entry point, run as a subprocess."""
+
+    def __init__(self, latency: float):
+        self._proc = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "revenium_middleware_google.testing",
+                "--port",
+                "0",
+                "--latency",
+                str(latency),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+            cwd=os.path.dirname(BENCH_DIR),
+        )
+        banner = self._proc.stdout.readline()
+        self.base_url = banner.strip().rpartition("=")[2]
+        self._stats_url = self.base_url.rpartition("/meter")[0] + "/_fake/stats"
+
+    def stats(self) -> Dict[str, int]:
+        with urllib.request.urlopen(self._stats_url) as response:
+            return json.loads(response.read())
+
+    def __enter__(self) -> "_ServerProcess":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._proc.terminate()
+        self._proc.wait()
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    last = len(sorted_values) - 1
+    index = min(last, int(round(pct / 100 * last)))
+    return sorted_values[index]
+
+
+def send_latencies(metering, concurrency: int, sends: int) -> Dict[str, float]:
+    """
+    Time ``sends`` sends spread over ``concurrency`` threads.
+
+    Returns:
+        Latency percentiles in milliseconds and sends per second
+    """
+    per_thread = max(1, sends // concurrency)
+    latencies: List[List[float]] = [[] for _ in range(concurrency)]
+    errors = [0]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(out: List[float]) -> None:
+        create = metering.ai.create_completion
+        barrier.wait()
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            try:
+                create(**COMPLETION_ARGS)
+            except Exception:
+                errors[0] += 1  # latency still counts: the sender waited
+            out.append(time.perf_counter() - start)
+
+    threads = [
+        threading.Thread(target=worker, args=(out,), daemon=True) for out in latencies
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    values = sorted(v * 1000 for out in latencies for v in out)
+    return {
+        "p50_ms": round(_percentile(values, 50), 3),
+        "p90_ms": round(_percentile(values, 90), 3),
+        "p99_ms": round(_percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3),
+        "sends_per_s": round(len(values) / elapsed, 1),
+        "errors": errors[0],
+    }
+
+
+def measure(
+    concurrency: List[int], sends: int, server_latency: float, pool_size: int
+) -> Dict:
+    results: Dict = {
+        "server_latency_ms": server_latency * 1000,
+        "pool_size": pool_size,
+        "clients": {},
+    }
+    with _ServerProcess(server_latency) as server:
+        for name, factory in clients(server.base_url, pool_size).items():
+            per_level = results["clients"][name] = {}
+            for level in concurrency:
+                metering = factory()
+                send_latencies(metering, level, level)  # warm-up
+                before = server.stats()["connections"]
+                entry = send_latencies(metering, level, sends)
+                entry["connections"] = server.stats()["connections"] - before - 1
+                per_level[str(level)] = entry
+                metering.close()
+    return results
+
+
+def _print_report(results: Dict) -> None:
+    print(
+        f"Server latency {results['server_latency_ms']:g} ms, "
+        f"tuned pool size {results['pool_size']}"
+    )
+    header = (
+        f"{'client':<14}{'threads':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"
+        f"{'max ms':>9}{'sends/s':>10}{'errors':>8}{'conns':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, levels in results["clients"].items():
+        for level, e in levels.items():
+            print(
+                f"{name:<14}{level:>8}{e['p50_ms']:>9.2f}{e['p90_ms']:>9.2f}"
+                f"{e['p99_ms']:>9.2f}{e['max_ms']:>9.2f}{e['sends_per_s']:>10.0f}"
+                f"{e['errors']:>8}{e['connections']:>7}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument(
+        "--sends", type=int, default=2000, help="timed sends per concurrency level"
+    )
+    parser.add_argument(
+        "--server-latency", type=float, default=0.002, help="seconds per response"
+    )
+    parser.add_argument("--pool-size", type=int, default=16)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = measure(args.concurrency, args.sends, args.server_latency, args.pool_size)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        _print_report(results)
+
+
+if __name__ == "__main__":
+    main()
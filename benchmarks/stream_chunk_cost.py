@@ -0,0 +1,88 @@
+"""
+Per-chunk and per-stream CPU cost of the stream wrappers.
+
+Reports nanoseconds per chunk for plain iteration (baseline), the shared
+StreamAccumulator alone, and a full StreamWrapper, plus the cost of setting
+up one wrapped stream.
+
+Usage:
+    python benchmarks/stream_chunk_cost.py [--chunks 200000]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from revenium_middleware_google.common.streaming import StreamAccumulator  # noqa: E402
+from revenium_middleware_google.google_ai import middleware  # noqa: E402
+
+
+class FakeCandidate:
+    __slots__ = ("finish_reason",)
+
+    def __init__(self, finish_reason):
+        self.finish_reason = finish_reason
+
+
+class FakeChunk:
+    __slots__ = ("model_version", "candidates", "usage_metadata")
+
+    def __init__(self):
+        self.model_version = "gemini-2.0-flash"
+        self.candidates = [FakeCandidate(None)]
+        self.usage_metadata = None
+
+
+def ns_per_item(fn, count, repeat=5):
+    """Best-of-``repeat`` nanoseconds per item for ``fn(count)``."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn(count)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=200_000)
+    args = parser.parse_args()
+
+    chunks = [FakeChunk() for _ in range(args.chunks)]
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    def baseline(n):
+        for _ in iter(chunks[:n]):
+            pass
+
+    def accumulate(n):
+        acc = StreamAccumulator(middleware.GOOGLE_AI_STREAM_EXTRACTORS)
+        add = acc.add
+        for chunk in chunks[:n]:
+            add(chunk)
+
+    def wrapped(n):
+        for _ in middleware.StreamWrapper(iter(chunks[:n]), now, {}):
+            pass
+
+    def setup(n):
+        for _ in range(n):
+            middleware.StreamWrapper(iter(()), now, {})
+
+    with patch.object(middleware, "create_google_ai_metering_call"):
+        base = ns_per_item(baseline, args.chunks)
+        print(f"{'plain iteration':<28} {base:8.1f} ns/chunk")
+        print(f"{'StreamAccumulator.add':<28} {ns_per_item(accumulate, args.chunks):8.1f} ns/chunk")
+        full = ns_per_item(wrapped, args.chunks)
+        print(f"{'StreamWrapper iteration':<28} {full:8.1f} ns/chunk ({full - base:.1f} overhead)")
+        print(f"{'StreamWrapper setup':<28} {ns_per_item(setup, 100_000):8.1f} ns/stream")
+
+
+if __name__ == "__main__":
+    main()
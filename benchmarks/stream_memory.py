@@ -0,0 +1,88 @@
+"""
+Memory benchmark for stream wrappers.
+
+Measures how much memory a live stream wrapper retains after consuming N
+chunks. Per-stream overhead should stay flat as the chunk count grows,
+because the wrappers keep counters and a few scalar fields, never chunks.
+
+Usage:
+    python benchmarks/stream_memory.py [--streams 100]
+"""
+
+import argparse
+import datetime
+import gc
+import os
+import sys
+import tracemalloc
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from revenium_middleware_google.google_ai import middleware  # noqa: E402
+
+CHUNK_COUNTS = (1, 10, 100, 1000, 10000)
+PAYLOAD_BYTES = 1024
+
+
+class FakeUsage:
+    def __init__(self, n):
+        self.prompt_token_count = 10
+        self.candidates_token_count = n
+        self.total_token_count = 10 + n
+
+
+class FakeCandidate:
+    def __init__(self, finish_reason):
+        self.finish_reason = finish_reason
+
+
+class FakeChunk:
+    """Stands in for an SDK chunk, with a payload the size of a typical text part."""
+
+    def __init__(self, i, last):
+        self.model_version = "gemini-2.0-flash"
+        self.text = "x" * PAYLOAD_BYTES
+        self.candidates = [FakeCandidate("STOP" if last else None)]
+        self.usage_metadata = FakeUsage(i) if last else None
+
+
+def fake_stream(n):
+    for i in range(n):
+        yield FakeChunk(i, i == n - 1)
+
+
+def retained_bytes(chunk_count, streams=1):
+    """Bytes still allocated while ``streams`` wrappers are open after consuming their chunks."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    wrappers = []
+    for _ in range(streams):
+        wrapper = middleware.StreamWrapper(fake_stream(chunk_count + 1), now, {})
+        # Consume all but the final chunk so the stream stays open
+        for _ in range(chunk_count):
+            next(wrapper)
+        wrappers.append(wrapper)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del wrappers
+    return total // streams
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=100)
+    args = parser.parse_args()
+
+    with patch.object(middleware, "create_google_ai_metering_call"):
+        print(f"{'chunks/stream':>14} {'bytes/stream':>14}  ({args.streams} open streams)")
+        for count in CHUNK_COUNTS:
+            print(f"{count:>14} {retained_bytes(count, args.streams):>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Per-call overhead of the SDK wrappers.
+
+The real wrappers are applied to the fake ``google.genai.models.Models`` and
+``vertexai`` classes from benchmarks/fake_sdks, which return synthetic
+responses, and metering goes through the real transport to an in-process
+fake client. For non-streaming chat, embeddings and streaming, at each
+thread count, a scenario is timed twice: once through the wrapper and once
+calling the unwrapped SDK method. It reports:
+
+- ns/call: wall time divided by the calls made across all threads, including
+  draining the metering queue, so it is the cost per call the process pays
+- overhead: wrapped minus unwrapped ns/call (per chunk for streams)
+- peak B/call and blocks/call: bytes allocated while one call runs, and
+  memory blocks still held after calls and a metering flush (single thread,
+  under tracemalloc)
+
+``--check`` compares the overheads with
+benchmarks/wrapper_overhead_baseline.json and ``--update-baseline`` records
+the current numbers.
+
+Usage:
+    python benchmarks/wrapper_overhead.py [--calls 20000] [--threads 1 8 64]
+        [--chunks 20] [--repeat 3] [--alloc-calls 500] [--json] [--check]
+        [--update-baseline]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, "wrapper_overhead_baseline.json")
+
+# The fake SDKs must shadow any installed SDK before the package hooks them
+sys.path[:0] = [os.path.join(BENCH_DIR, "fake_sdks"), REPO_ROOT]
+os.environ.setdefault("REVENIUM_METERING_API_KEY", "hak_benchmark")
+os.environ["REVENIUM_LOG_LEVEL"] = "WARNING"
+# Large enough that no record is dropped while a measurement runs
+os.environ.setdefault("REVENIUM_METERING_QUEUE_SIZE", "10000000")
+
+import revenium_middleware_google  # noqa: E402, F401
+import google.genai  # noqa: E402
+from google.genai import models as genai_models  # noqa: E402
+from vertexai import generative_models, language_models  # noqa: E402
+
+from revenium_middleware_google.common import utils  # noqa: E402
+
+MODEL = "gemini-2.0-flash"
+Scenario = Tuple[Callable[[], None], Callable[[], None], int]
+
+
+class _Result:
+    id = "bench"
+
+
+class _Ai:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create_completion(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return _Result()
+
+
+class _Client:
+    def __init__(self):
+        self.ai = _Ai()
+
+
+def _unwrapped(cls, name):
+    """The SDK method as it was before the middleware wrapped it."""
+    return vars(cls)[name].__wrapped__
+
+
+def scenarios(chunks: int) -> Dict[str, Scenario]:
+    """
+    Build the benchmark scenarios.
+
+    Returns:
+        name -> (wrapped call, unwrapped call, chunks per call)
+    """
+    genai_models.STREAM_CHUNKS = chunks
+    generative_models.STREAM_CHUNKS = chunks
+
+    models = google.genai.Client(api_key="bench").models
+    generate = _unwrapped(genai_models.Models, "generate_content")
+    embed = _unwrapped(genai_models.Models, "embed_content")
+    stream = _unwrapped(genai_models.Models, "generate_content_stream")
+
+    model = generative_models.GenerativeModel(MODEL)
+    vertex_generate = _unwrapped(generative_models.GenerativeModel, "generate_content")
+    embedding_model = language_models.TextEmbeddingModel("text-embedding-004")
+    get_embeddings = _unwrapped(language_models.TextEmbeddingModel, "get_embeddings")
+
+    def consume(iterable):
+        for _ in iterable:
+            pass
+
+    return {
+        "google_ai.chat": (
+            lambda: models.generate_content(model=MODEL, contents="hi"),
+            lambda: generate(models, model=MODEL, contents="hi"),
+            1,
+        ),
+        "google_ai.embed": (
+            lambda: models.embed_content(model="text-embedding-004", contents="hi"),
+            lambda: embed(models, model="text-embedding-004", contents="hi"),
+            1,
+        ),
+        "google_ai.stream": (
+            lambda: consume(
+                models.generate_content_stream(model=MODEL, contents="hi")
+            ),
+            lambda: consume(stream(models, model=MODEL, contents="hi")),
+            chunks,
+        ),
+        "vertex_ai.chat": (
+            lambda: model.generate_content("hi"),
+            lambda: vertex_generate(model, "hi"),
+            1,
+        ),
+        "vertex_ai.embed": (
+            lambda: embedding_model.get_embeddings(["hi"]),
+            lambda: get_embeddings(embedding_model, ["hi"]),
+            1,
+        ),
+        "vertex_ai.stream": (
+            lambda: consume(model.generate_content("hi", stream=True)),
+            lambda: consume(vertex_generate(model, "hi", stream=True)),
+            chunks,
+        ),
+    }
+
+
+def ns_per_call(
+    fn: Callable[[], None], threads: int, calls: int, repeat: int
+) -> float:
+    """
+    Best-of-``repeat`` wall ns per call, with ``calls`` split over threads.
+
+    The metering queue is drained inside the timed region, so the background
+    sends a wrapped call causes are part of its cost.
+    """
+    per_thread = max(1, calls // threads)
+    best = None
+    for _ in range(repeat):
+        barrier = threading.Barrier(threads + 1)
+
+        def worker():
+            barrier.wait()
+            for _ in range(per_thread):
+                fn()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for worker_thread in workers:
+            worker_thread.start()
+        barrier.wait()
+        start = time.perf_counter_ns()
+        for worker_thread in workers:
+            worker_thread.join()
+        utils.flush_metering(timeout=60)
+        elapsed = (time.perf_counter_ns() - start) / (per_thread * threads)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def allocations(fn: Callable[[], None], calls: int = 500) -> Dict[str, float]:
+    """Peak bytes allocated during one call and blocks retained per call."""
+    fn()  # warm caches
+    utils.flush_metering(timeout=60)
+    gc.collect()
+    tracemalloc.start()
+    peak = 0
+    for _ in range(calls):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        peak += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    utils.flush_metering(timeout=60)
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    for _ in range(calls):
+        fn()
+    utils.flush_metering(timeout=60)
+    gc.collect()
+    return {
+        "peak_bytes_per_call": peak / calls,
+        "blocks_per_call": (sys.getallocatedblocks() - blocks) / calls,
+    }
+
+
+def measure(
+    calls: int,
+    thread_counts: List[int],
+    chunks: int,
+    repeat: int,
+    alloc_calls: int = 500,
+) -> Dict:
+    """
+    Run every scenario at every thread count, wrapped and unwrapped.
+
+    Returns:
+        Per-scenario timings and allocations, the flattened overhead metrics,
+        and the number of metering records the wrapped calls produced
+    """
+    fake_client = _Client()
+    utils.client = fake_client
+    results = {}
+    metrics = {}
+    wrapped_calls = 0
+    for name, (wrapped, unwrapped, per_call_chunks) in scenarios(chunks).items():
+        entry = {"chunks_per_call": per_call_chunks, "threads": {}}
+        for threads in thread_counts:
+            base = ns_per_call(unwrapped, threads, calls, repeat)
+            full = ns_per_call(wrapped, threads, calls, repeat)
+            wrapped_calls += max(1, calls // threads) * threads * repeat
+            overhead = (full - base) / per_call_chunks
+            entry["threads"][threads] = {
+                "baseline_ns": round(base, 1),
+                "wrapped_ns": round(full, 1),
+                "overhead_ns": round(overhead, 1),
+            }
+            metrics[f"{name}.t{threads}.overhead_ns"] = round(overhead, 1)
+        base_alloc = allocations(unwrapped, alloc_calls)
+        full_alloc = allocations(wrapped, alloc_calls)
+        wrapped_calls += 1 + 2 * alloc_calls
+        entry["allocations"] = {
+            "baseline": {k: round(v, 1) for k, v in base_alloc.items()},
+            "wrapped": {k: round(v, 1) for k, v in full_alloc.items()},
+        }
+        metrics[f"{name}.peak_bytes_overhead"] = round(
+            full_alloc["peak_bytes_per_call"] - base_alloc["peak_bytes_per_call"], 1
+        )
+        results[name] = entry
+
+    stats = utils.get_metering_stats()
+    return {
+        "scenarios": results,
+        "metrics": metrics,
+        "wrapped_calls": wrapped_calls,
+        "metering_records_sent": fake_client.ai.calls,
+        "metering_records_dropped": sum(
+            value for key, value in stats.items() if key.startswith("dropped")
+        ),
+    }
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def check(results: Dict, baseline: Dict) -> List[str]:
+    """
+    Compare overhead metrics with the baseline budget.
+
+    A metric regresses when it exceeds both ``baseline * factor`` and
+    ``baseline + slack`` (slack_ns for timings, slack_bytes for allocations).
+    Metrics missing from either side are skipped.
+
+    Returns:
+        A description of each regression (empty if within budget)
+    """
+    budget = baseline["budget"]
+    failures = []
+    for name, reference in baseline["metrics"].items():
+        if name not in results["metrics"]:
+            continue
+        if name.endswith("_bytes_overhead"):
+            slack = budget["slack_bytes"]
+        else:
+            slack = budget["slack_ns"]
+        limit = max(reference * budget["factor"], reference + slack)
+        value = results["metrics"][name]
+        if value > limit:
+            failures.append(
+                f"{name}: {value:.0f} exceeds budget {limit:.0f} "
+                f"(baseline {reference:.0f})"
+            )
+    return failures
+
+
+def _print_report(results: Dict) -> None:
+    print(
+        f"{'scenario':<18} {'threads':>7} {'unwrapped':>11} {'wrapped':>11} "
+        f"{'overhead':>16}"
+    )
+    for name, entry in results["scenarios"].items():
+        unit = "ns/chunk" if entry["chunks_per_call"] > 1 else "ns/call"
+        for threads, row in entry["threads"].items():
+            print(
+                f"{name:<18} {threads:>7} {row['baseline_ns']:>8.0f} ns "
+                f"{row['wrapped_ns']:>8.0f} ns {row['overhead_ns']:>7.0f} {unit}"
+            )
+    print()
+    print(f"{'scenario':<18} {'peak B/call':>24} {'blocks kept/call':>22}")
+    for name, entry in results["scenarios"].items():
+        base = entry["allocations"]["baseline"]
+        full = entry["allocations"]["wrapped"]
+        print(
+            f"{name:<18} {base['peak_bytes_per_call']:>9.0f} -> "
+            f"{full['peak_bytes_per_call']:>9.0f} {base['blocks_per_call']:>9.2f} -> "
+            f"{full['blocks_per_call']:>7.2f}"
+        )
+    print()
+    print(
+        f"metering records: {results['metering_records_sent']} sent for "
+        f"{results['wrapped_calls']} wrapped calls, "
+        f"{results['metering_records_dropped']} dropped"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--calls", type=int, default=20_000, help="calls per measurement"
+    )
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per stream")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--alloc-calls", type=int, default=500, help="calls sampled for allocations"
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--check", action="store_true", help="exit 1 on regression")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="record these results"
+    )
+    args = parser.parse_args()
+
+    results = measure(
+        args.calls, args.threads, args.chunks, args.repeat, args.alloc_calls
+    )
+    if args.json:
+        print(json.dumps(results))
+    else:
+        _print_report(results)
+
+    if args.update_baseline:
+        budget = {"factor": 2.0, "slack_ns": 2000.0, "slack_bytes": 1024.0}
+        if os.path.exists(BASELINE_PATH):
+            budget = load_baseline()["budget"]
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"budget": budget, "metrics": results["metrics"]}, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {os.path.relpath(BASELINE_PATH, REPO_ROOT)}")
+
+    if args.check:
+        failures = check(results, load_baseline())
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,7 @@ load_dotenv()
 
 # Import the middleware (this automatically enables the patching)
 import revenium_middleware_google  # noqa: F401
+from revenium_middleware_google.common import reload_config
 
 # Import Google AI SDK
 from google import genai
@@ -45,6 +46,7 @@ def example_1_basic_trace_visualization():
     os.environ['REVENIUM_CREDENTIAL_ALIAS'] = 'google-prod-key'
     os.environ['REVENIUM_TRACE_TYPE'] = 'customer-support'
     os.environ['REVENIUM_TRACE_NAME'] = 'Customer Support Chat Session'
+    reload_config()  # trace env vars are read once; apply the changes
 
     response = client.models.generate_content(
         model='gemini-2.0-flash-001',
@@ -76,6 +78,7 @@ def example_2_distributed_tracing():
     os.environ['REVENIUM_TRACE_TYPE'] = 'workflow'
     os.environ['REVENIUM_TRACE_NAME'] = 'Document Analysis Workflow'
     os.environ['REVENIUM_TRANSACTION_NAME'] = 'Extract Key Points'
+    reload_config()
 
     # Parent call
     print("\n🔵 Parent Transaction: Extract Key Points")
@@ -95,6 +98,7 @@ def example_2_distributed_tracing():
     print("\n🟢 Child Transaction 1: Summarize Points")
     os.environ['REVENIUM_PARENT_TRANSACTION_ID'] = parent_txn_id
     os.environ['REVENIUM_TRANSACTION_NAME'] = 'Summarize Points'
+    reload_config()
 
     client.models.generate_content(
         model='gemini-2.0-flash-001',
@@ -111,6 +115,7 @@ def example_2_distributed_tracing():
     # Child transaction 2
     print("\n🟢 Child Transaction 2: Generate Tags")
     os.environ['REVENIUM_TRANSACTION_NAME'] = 'Generate Tags'
+    reload_config()
 
     client.models.generate_content(
         model='gemini-2.0-flash-001',
@@ -135,10 +140,12 @@ def example_3_retry_tracking():
     os.environ['REVENIUM_TRACE_TYPE'] = 'api-integration'
     os.environ['REVENIUM_TRACE_NAME'] = 'External API Call with Retries'
     os.environ['REVENIUM_TRANSACTION_NAME'] = 'Fetch User Data'
+    reload_config()
 
     # Simulate retries
     for retry_num in range(3):
         os.environ['REVENIUM_RETRY_NUMBER'] = str(retry_num)
+        reload_config()
         print(f"\n🔄 Attempt {retry_num + 1}/3 (retry_number={retry_num})")
 
         client.models.generate_content(
@@ -165,12 +172,14 @@ def example_4_multi_region():
 
     os.environ['REVENIUM_TRACE_TYPE'] = 'content-generation'
     os.environ['REVENIUM_TRACE_NAME'] = 'Multi-Region Content Generation'
+    reload_config()
 
     # Simulate requests from different regions
     regions = ['us-east-1', 'eu-west-1', 'ap-southeast-1']
 
     for region in regions:
         os.environ['REVENIUM_REGION'] = region
+        reload_config()
         print(f"\n🌍 Processing in region: {region}")
 
         client.models.generate_content(
@@ -199,6 +208,7 @@ def example_5_parameter_based_fields():
                 'REVENIUM_TRACE_TYPE', 'REVENIUM_TRACE_NAME',
                 'REVENIUM_CREDENTIAL_ALIAS']:
         os.environ.pop(key, None)
+    reload_config()
 
     # Pass all trace fields via usage_metadata
     response = client.models.generate_content(
@@ -81,44 +81,37 @@ except Exception as e:
 # Import common utilities (always available)
 from .common import utils
 
-# Import and activate middleware for available SDKs
-try:
-    # Try to import Google AI SDK and activate middleware
-    if _verbose_startup:
-        logger.debug("Attempting to import google.genai")
-    import google.genai
+# Optionally reload the configuration snapshot on SIGHUP
+from .common import config as _config
 
-    if _verbose_startup:
-        logger.debug("google.genai imported successfully, importing middleware")
-    from .google_ai import middleware as google_ai_middleware
+if _config.is_sighup_reload_enabled_in_env():
+    _config.install_sighup_handler()
 
-    logger.info("Google AI SDK middleware activated")
-except ImportError as e:
-    logger.debug("Google AI SDK (google-genai) not available: %s", e)
+# Register the middleware for both SDKs. Neither SDK is imported here: each
+# wrapper is applied by a post-import hook when the application imports the
+# SDK module, or right away if it already has.
+from .common.patching import when_imported as _when_imported
+from .google_ai import middleware as google_ai_middleware
+from .vertex_ai import middleware as vertex_ai_middleware
 
-try:
-    # Try to import Vertex AI SDK and activate middleware
-    if _verbose_startup:
-        logger.debug("Attempting to import vertexai")
-    import vertexai
+active_sdks = []
 
-    if _verbose_startup:
-        logger.debug("vertexai imported successfully, importing middleware")
-    from .vertex_ai import middleware as vertex_ai_middleware
 
-    logger.info("Vertex AI SDK middleware activated")
-except ImportError as e:
-    logger.debug("Vertex AI SDK (vertexai) not available: %s", e)
+def _activated(sdk: str, label: str):
+    def _hook(module):
+        active_sdks.append(sdk)
+        logger.info("%s middleware activated", label)
 
-active_sdks = []
-if "google.genai" in globals():
-    active_sdks.append("google_ai")
-if "vertexai" in globals():
-    active_sdks.append("vertex_ai")
-
-logger.info(
-    "Revenium middleware activated for: %s",
-    ", ".join(active_sdks) if active_sdks else "none",
-)
+    return _hook
+
+
+_when_imported("google.genai", _activated("google_ai", "Google AI SDK"))
+_when_imported("vertexai", _activated("vertex_ai", "Vertex AI SDK"))
+
+if _verbose_startup:
+    logger.info(
+        "Revenium middleware registered for: google_ai, vertex_ai (active: %s)",
+        ", ".join(active_sdks) if active_sdks else "none",
+    )
 
 __all__ = ["utils"]
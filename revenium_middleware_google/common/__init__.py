@@ -5,6 +5,8 @@ This module contains shared functionality used by both Google AI SDK
 and Vertex AI SDK middleware implementations.
 """
 
+import importlib
+
 from .types import (
     OperationType,
     Provider,
@@ -21,6 +23,19 @@ from .utils import (
     format_timestamp,
     calculate_duration_ms,
     log_token_usage,
+    build_completion_args,
+    send_completion,
+    send_completion_async,
+    send_metering_batch,
+    configure_batching,
+    configure_aggregation,
+    configure_http_client,
+    configure_circuit_breaker,
+    configure_retries,
+    get_metering_client,
+    get_metering_transport,
+    get_metering_stats,
+    flush_metering,
     create_metering_call,
     extract_model_name,
     extract_token_counts,
@@ -29,9 +44,77 @@ from .utils import (
     ensure_meter_in_url,
 )
 
+from .timing import elapsed_ms, response_time_from
+
+from .metadata import (
+    NormalizedMetadata,
+    clear_metadata_cache,
+    normalize_usage_metadata,
+)
+
+from .config import (
+    ReveniumConfig,
+    get_config,
+    install_sighup_handler,
+    reload_config,
+)
+
+from .log_preview import LogPreview, format_preview, set_log_preview_chars
+
+from .model_names import (
+    clear_model_name_cache,
+    normalize_model_name,
+    resolve_instance_model_name,
+)
+
+from .async_metering import (
+    drain_metering_tasks,
+    get_async_client,
+    is_async_metering_enabled,
+    set_async_metering_enabled,
+)
+
+from .streaming import (
+    StreamAccumulator,
+    StreamExtractors,
+    StreamedResponse,
+    MeteredStream,
+    AsyncMeteredStreamMixin,
+)
+
+from .latency import (
+    StreamLatencyProfile,
+    get_stream_latency_stats,
+    reset_stream_latency_stats,
+)
+
+from .aggregation import AggregationConfig, MeteringAggregator, get_active_aggregator
+
+# Loaded on first access: importing the package does not import the
+# send-path modules (transport, spool, HTTP client, circuit breaker, ...);
+# see benchmarks/startup.py
+_LAZY_EXPORTS = {
+    "BatchingConfig": "transport",
+    "BatchingTransport": "transport",
+    "get_active_transport": "transport",
+    "MeteringQueue": "metering_queue",
+    "OverflowPolicy": "metering_queue",
+    "MeteringSpool": "spool",
+    "FsyncPolicy": "spool",
+    "HttpClientConfig": "http_client",
+    "get_http_client_config": "http_client",
+    "Codec": "compression",
+    "BreakerState": "circuit_breaker",
+    "CircuitBreakerConfig": "circuit_breaker",
+    "get_circuit_breaker": "circuit_breaker",
+    "RetryConfig": "retry",
+    "get_retry_policy": "retry",
+}
+
 from .exceptions import (
     ReveniumMiddlewareError,
     MeteringError,
+    CircuitOpenError,
     TokenExtractionError,
     ProviderDetectionError,
     ConfigurationError,
@@ -55,9 +138,14 @@ from .protocols import (
     has_usage_metadata,
     has_token_counts,
     safe_getattr,
+    first_attr,
+    read_attr,
+    get_finish_reason,
     get_token_count,
 )
 
+from .accessors import read_attrs, clear_accessor_cache
+
 __all__ = [
     # Types
     "OperationType",
@@ -72,16 +160,79 @@ __all__ = [
     "generate_transaction_id",
     "format_timestamp",
     "calculate_duration_ms",
+    "elapsed_ms",
+    "response_time_from",
     "log_token_usage",
+    "build_completion_args",
+    "send_completion",
+    "send_completion_async",
+    "send_metering_batch",
+    "configure_batching",
+    "configure_aggregation",
+    "configure_http_client",
+    "configure_circuit_breaker",
+    "configure_retries",
+    "get_metering_client",
+    "get_metering_transport",
+    "get_metering_stats",
+    "flush_metering",
     "create_metering_call",
     "extract_model_name",
+    "normalize_model_name",
+    "resolve_instance_model_name",
+    "clear_model_name_cache",
     "extract_token_counts",
     "create_usage_data",
     "is_debug_logging_enabled",
     "ensure_meter_in_url",
+    # Configuration
+    "ReveniumConfig",
+    "get_config",
+    "reload_config",
+    "install_sighup_handler",
+    "NormalizedMetadata",
+    "normalize_usage_metadata",
+    "clear_metadata_cache",
+    "LogPreview",
+    "format_preview",
+    "set_log_preview_chars",
+    # Transport
+    "BatchingConfig",
+    "BatchingTransport",
+    "get_active_transport",
+    "MeteringQueue",
+    "OverflowPolicy",
+    "MeteringSpool",
+    "FsyncPolicy",
+    "AggregationConfig",
+    "MeteringAggregator",
+    "get_active_aggregator",
+    "HttpClientConfig",
+    "get_http_client_config",
+    "Codec",
+    "BreakerState",
+    "CircuitBreakerConfig",
+    "get_circuit_breaker",
+    "RetryConfig",
+    "get_retry_policy",
+    # Async metering
+    "drain_metering_tasks",
+    "get_async_client",
+    "is_async_metering_enabled",
+    "set_async_metering_enabled",
+    # Streaming
+    "StreamAccumulator",
+    "StreamExtractors",
+    "StreamedResponse",
+    "MeteredStream",
+    "AsyncMeteredStreamMixin",
+    "StreamLatencyProfile",
+    "get_stream_latency_stats",
+    "reset_stream_latency_stats",
     # Exceptions
     "ReveniumMiddlewareError",
     "MeteringError",
+    "CircuitOpenError",
     "TokenExtractionError",
     "ProviderDetectionError",
     "ConfigurationError",
@@ -103,5 +254,19 @@ __all__ = [
     "has_usage_metadata",
     "has_token_counts",
     "safe_getattr",
+    "first_attr",
+    "read_attr",
+    "get_finish_reason",
     "get_token_count",
+    "read_attrs",
+    "clear_accessor_cache",
 ]
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,113 @@
+"""
+Per-class attribute accessors for response and chunk extraction.
+
+Extraction tries several candidate attribute names per field because the
+SDKs (and their versions) name things differently. For classes whose
+attribute set is fixed by the class itself (pydantic models such as the
+google-genai responses, and ``__slots__`` classes), which candidates can
+exist is known from the class alone. ``read_attrs`` compiles those names
+into one ``operator.attrgetter`` the first time a class is seen, so steady
+state extraction is a single C-level call instead of a ``getattr`` probe
+(and, for pydantic, a raised AttributeError) per missing name.
+
+Classes whose instances can carry arbitrary attributes (plain objects,
+mocks, namespaces) are not compiled; ``read_attrs`` returns None for them
+and callers fall back to probing each name.
+"""
+
+import threading
+from operator import attrgetter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Compiled (class, names) pairs kept before the cache is reset
+ACCESSOR_CACHE_SIZE = 512
+
+# (getter, returns_tuple) or None when the class is not fixed-shape
+_Accessor = Optional[Tuple[Callable[[Any], Any], bool]]
+
+_accessors: Dict[Tuple[type, Tuple[str, ...]], _Accessor] = {}
+_accessors_lock = threading.Lock()
+
+
+def _has_fixed_attributes(cls: type) -> bool:
+    """Check whether instances of cls can only have attributes declared on the class."""
+    model_fields = getattr(cls, "model_fields", None)
+    if isinstance(model_fields, dict):
+        model_config = getattr(cls, "model_config", None) or {}
+        return model_config.get("extra") != "allow"
+    if getattr(cls, "__getattr__", None) is not None:
+        return False
+    return getattr(cls, "__dictoffset__", 1) == 0
+
+
+def _class_has(cls: type, name: str) -> bool:
+    model_fields = getattr(cls, "model_fields", None)
+    if isinstance(model_fields, dict):
+        if name in model_fields or name in (
+            getattr(cls, "__private_attributes__", None) or {}
+        ):
+            return True
+    try:
+        return hasattr(cls, name)
+    except Exception:
+        return False
+
+
+def compile_accessor(cls: type, names: Tuple[str, ...]) -> _Accessor:
+    """
+    Build the accessor for names on instances of cls.
+
+    Args:
+        cls: Response, chunk or usage class
+        names: Candidate attribute names, in priority order
+
+    Returns:
+        A (getter, returns_tuple) pair reading the names cls can have, or
+        None if instances of cls may have attributes the class doesn't declare
+    """
+    if not _has_fixed_attributes(cls):
+        return None
+    present = tuple(name for name in names if _class_has(cls, name))
+    if not present:
+        return (lambda obj: (), True)
+    return (attrgetter(*present), len(present) > 1)
+
+
+def read_attrs(obj: Any, names: Tuple[str, ...]) -> Optional[Tuple[Any, ...]]:
+    """
+    Read the candidate attributes obj's class can have, in priority order.
+
+    Args:
+        obj: Response, chunk or usage object
+        names: Candidate attribute names, in priority order (a tuple, so the
+            compiled accessor can be cached)
+
+    Returns:
+        The values of the names present on obj's class (names it cannot have
+        are skipped), or None if obj's shape isn't known and the caller
+        should probe each name itself
+    """
+    key = (type(obj), names)
+    try:
+        accessor = _accessors[key]
+    except KeyError:
+        accessor = compile_accessor(key[0], names)
+        with _accessors_lock:
+            if len(_accessors) >= ACCESSOR_CACHE_SIZE:
+                _accessors.clear()
+            _accessors[key] = accessor
+    if accessor is None:
+        return None
+    getter, returns_tuple = accessor
+    try:
+        values = getter(obj)
+    except (AttributeError, TypeError):
+        # An unset slot or a failing property: let the caller probe
+        return None
+    return values if returns_tuple else (values,)
+
+
+def clear_accessor_cache() -> None:
+    """Drop all compiled accessors."""
+    with _accessors_lock:
+        _accessors.clear()
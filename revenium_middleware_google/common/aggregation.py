@@ -0,0 +1,410 @@
+"""
+Client-side pre-aggregation of metering records.
+
+High-volume workloads (batch embedding jobs in particular) produce one
+record per call. With aggregation enabled, records for the configured
+operation types are rolled up in memory by a key (by default model,
+subscriber, trace_type and operation_type): token counts are summed and the
+call count and request latency statistics are kept. Once per interval each
+key emits a single aggregate record, so metering traffic scales with key
+cardinality instead of call volume.
+
+Aggregate records carry only the usage_metadata fields that are part of the
+key, so tokens are never attributed to a subscriber or trace that was not
+grouped on. The call count and latency statistics travel as an
+``aggregate`` object in the request body.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metadata import NormalizedMetadata, normalize_usage_metadata
+from .types import OperationType
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+# Environment variable names
+ENV_AGGREGATE_ENABLED = "REVENIUM_METERING_AGGREGATE_ENABLED"
+ENV_AGGREGATE_INTERVAL = "REVENIUM_METERING_AGGREGATE_INTERVAL"
+ENV_AGGREGATE_KEY = "REVENIUM_METERING_AGGREGATE_KEY"
+ENV_AGGREGATE_OPERATIONS = "REVENIUM_METERING_AGGREGATE_OPERATIONS"
+ENV_AGGREGATE_MAX_KEYS = "REVENIUM_METERING_AGGREGATE_MAX_KEYS"
+
+# Defaults
+DEFAULT_INTERVAL = 60.0  # seconds
+DEFAULT_KEY = ("model", "subscriber", "trace_type", "operation_type")
+DEFAULT_OPERATIONS = (OperationType.EMBED,)
+DEFAULT_MAX_KEYS = 10000
+
+# Record fields that can be part of the key; anything else is looked up in
+# the record's normalized usage_metadata
+RECORD_KEY_FIELDS = frozenset(
+    {
+        "model",
+        "operation_type",
+        "provider",
+        "model_source",
+        "is_streamed",
+        "stop_reason",
+    }
+)
+
+Record = Dict[str, Any]
+Emitter = Callable[[Record], None]
+
+
+def _env_list(name: str, default: Tuple[str, ...]) -> Tuple[str, ...]:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+@dataclass
+class AggregationConfig:
+    """Which records are aggregated, by what key, and how often they are sent."""
+
+    interval: float = DEFAULT_INTERVAL
+    key: Tuple[str, ...] = DEFAULT_KEY
+    operations: Tuple[OperationType, ...] = DEFAULT_OPERATIONS
+    max_keys: int = DEFAULT_MAX_KEYS
+    # Key fields resolved from usage_metadata (derived)
+    metadata_fields: Tuple[str, ...] = field(init=False, default=())
+
+    def __post_init__(self):
+        self.interval = max(0.01, float(self.interval))
+        self.key = tuple(self.key)
+        self.operations = tuple(OperationType(op) for op in self.operations)
+        self.max_keys = max(1, int(self.max_keys))
+        self.metadata_fields = tuple(
+            name for name in self.key if name not in RECORD_KEY_FIELDS
+        )
+
+    @classmethod
+    def from_env(cls) -> "AggregationConfig":
+        """Create a config from REVENIUM_METERING_AGGREGATE_* environment variables."""
+        try:
+            interval = float(os.getenv(ENV_AGGREGATE_INTERVAL, str(DEFAULT_INTERVAL)))
+        except ValueError:
+            logger.warning(
+                "Invalid %s value, defaulting to %s",
+                ENV_AGGREGATE_INTERVAL,
+                DEFAULT_INTERVAL,
+            )
+            interval = DEFAULT_INTERVAL
+        try:
+            max_keys = int(os.getenv(ENV_AGGREGATE_MAX_KEYS, str(DEFAULT_MAX_KEYS)))
+        except ValueError:
+            logger.warning(
+                "Invalid %s value, defaulting to %d",
+                ENV_AGGREGATE_MAX_KEYS,
+                DEFAULT_MAX_KEYS,
+            )
+            max_keys = DEFAULT_MAX_KEYS
+        return cls(
+            interval=interval,
+            key=_env_list(ENV_AGGREGATE_KEY, DEFAULT_KEY),
+            operations=_env_list(
+                ENV_AGGREGATE_OPERATIONS, tuple(op.value for op in DEFAULT_OPERATIONS)
+            ),
+            max_keys=max_keys,
+        )
+
+
+def is_aggregation_enabled_in_env() -> bool:
+    """Check if aggregation was requested via REVENIUM_METERING_AGGREGATE_ENABLED."""
+    return os.getenv(ENV_AGGREGATE_ENABLED, "").lower() in ("true", "1", "yes")
+
+
+def _key_value(value: Any) -> Any:
+    """Hashable form of a key value (subscribers group by id, then email)."""
+    if isinstance(value, dict):
+        return (
+            value.get("id")
+            or value.get("email")
+            or tuple(sorted(value.items(), key=str))
+        )
+    return value
+
+
+class _Bucket:
+    """Running totals for one key within the current interval."""
+
+    __slots__ = (
+        "template",
+        "count",
+        "prompt_tokens",
+        "completion_tokens",
+        "total_tokens",
+        "cached_tokens",
+        "duration_sum",
+        "duration_min",
+        "duration_max",
+        "ttft_sum",
+        "ttft_count",
+        "request_time",
+        "response_time",
+    )
+
+    def __init__(self, template: Record):
+        self.template = template
+        self.count = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        self.cached_tokens = 0
+        self.duration_sum = 0
+        self.duration_min = None
+        self.duration_max = 0
+        self.ttft_sum = 0
+        self.ttft_count = 0
+        self.request_time = template["request_time"]
+        self.response_time = template["response_time"]
+
+    def add(self, record: Record) -> None:
+        self.count += 1
+        self.prompt_tokens += record["prompt_tokens"] or 0
+        self.completion_tokens += record["completion_tokens"] or 0
+        self.total_tokens += record["total_tokens"] or 0
+        self.cached_tokens += record["cached_tokens"] or 0
+        duration = record["request_duration"] or 0
+        self.duration_sum += duration
+        if self.duration_min is None or duration < self.duration_min:
+            self.duration_min = duration
+        if duration > self.duration_max:
+            self.duration_max = duration
+        if record.get("time_to_first_token"):
+            self.ttft_sum += record["time_to_first_token"]
+            self.ttft_count += 1
+        # Timestamps share one fixed-width UTC format, so they order as strings
+        if record["request_time"] < self.request_time:
+            self.request_time = record["request_time"]
+        if record["response_time"] > self.response_time:
+            self.response_time = record["response_time"]
+
+
+class MeteringAggregator:
+    """
+    Roll up metering records by key and emit one aggregate record per key per interval.
+
+    ``add`` is called on the request path and only updates counters under a
+    lock; a daemon thread (started on first use) hands the aggregates to
+    ``emit`` every interval.
+    """
+
+    def __init__(self, emit: Emitter, config: Optional[AggregationConfig] = None):
+        self.config = config or AggregationConfig()
+        self._emit = emit
+        self._buckets: Dict[Tuple[Any, ...], _Bucket] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Counters
+        self.records_aggregated = 0
+        self.aggregates_emitted = 0
+        self.early_flushes = 0
+
+    def _key(self, record: Record, metadata: NormalizedMetadata) -> Tuple[Any, ...]:
+        values = tuple(
+            record[name] if name in RECORD_KEY_FIELDS else metadata.get(name)
+            for name in self.config.key
+        )
+        return tuple(map(_key_value, values)) + (
+            record["provider"],
+            record["model_source"],
+        )
+
+    def add(self, record: Record) -> bool:
+        """
+        Fold a record into its key's bucket.
+
+        Args:
+            record: Metering record (build_completion_args keyword arguments)
+
+        Returns:
+            True if the record was aggregated, False if its operation type is
+            not aggregated and it should be sent as-is
+        """
+        if self._closed or record["operation_type"] not in self.config.operations:
+            return False
+        metadata = normalize_usage_metadata(record["usage_metadata"])
+        key = self._key(record, metadata)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(record)
+            bucket.add(record)
+            self.records_aggregated += 1
+            full = len(self._buckets) >= self.config.max_keys
+            if self._thread is None:
+                self._start_locked()
+        if full:
+            # Bound memory: send everything now rather than wait for the interval
+            self.early_flushes += 1
+            self.flush()
+        return True
+
+    def _aggregate_record(self, bucket: _Bucket) -> Record:
+        template = bucket.template
+        metadata = normalize_usage_metadata(template["usage_metadata"])
+        fields = self.config.metadata_fields
+        key_metadata = NormalizedMetadata(
+            {name: metadata[name] for name in fields if name in metadata},
+            frozenset(metadata.env_overrides.intersection(fields)),
+        )
+        aggregate = {
+            "count": bucket.count,
+            "request_duration_ms": {
+                "min": bucket.duration_min or 0,
+                "max": bucket.duration_max,
+                "mean": round(bucket.duration_sum / bucket.count, 3),
+                "sum": bucket.duration_sum,
+            },
+            "window_seconds": self.config.interval,
+        }
+        if bucket.ttft_count:
+            aggregate["time_to_first_token_ms_mean"] = round(
+                bucket.ttft_sum / bucket.ttft_count, 3
+            )
+        record = {
+            "transaction_id": str(uuid.uuid4()),
+            "model": template["model"],
+            "prompt_tokens": bucket.prompt_tokens,
+            "completion_tokens": bucket.completion_tokens,
+            "total_tokens": bucket.total_tokens,
+            "cached_tokens": bucket.cached_tokens,
+            "stop_reason": template["stop_reason"],
+            "request_time": bucket.request_time,
+            "response_time": bucket.response_time,
+            "request_duration": bucket.duration_sum // bucket.count,
+            "usage_metadata": key_metadata,
+            "provider": template["provider"],
+            "model_source": template["model_source"],
+            "is_streamed": template["is_streamed"],
+            "time_to_first_token": int(aggregate.get("time_to_first_token_ms_mean", 0)),
+            "operation_type": template["operation_type"],
+            "aggregate": aggregate,
+        }
+        if key_metadata.env_overrides:
+            record["usage_metadata_overrides"] = sorted(key_metadata.env_overrides)
+        return record
+
+    def flush(self) -> int:
+        """
+        Emit an aggregate record for every open key now.
+
+        Returns:
+            The number of aggregate records emitted
+        """
+        with self._lock:
+            buckets, self._buckets = self._buckets, {}
+        records: List[Record] = [self._aggregate_record(b) for b in buckets.values()]
+        for record in records:
+            try:
+                self._emit(record)
+            except Exception as e:
+                logger.warning("Failed to emit aggregate metering record: %s", e)
+        with self._lock:
+            self.aggregates_emitted += len(records)
+        if records:
+            logger.debug("Emitted %d aggregate metering records", len(records))
+        return len(records)
+
+    def shutdown(self) -> None:
+        """Emit what is left and stop the background thread."""
+        self._closed = True
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(5.0)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return aggregation counters."""
+        with self._lock:
+            return {
+                "aggregation_open_keys": len(self._buckets),
+                "aggregation_records_aggregated": self.records_aggregated,
+                "aggregation_records_emitted": self.aggregates_emitted,
+                "aggregation_early_flushes": self.early_flushes,
+            }
+
+    def _start_locked(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="revenium-metering-aggregator", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self.config.interval
+        while not self._closed:
+            self._wake.wait(max(0.0, next_flush - time.monotonic()))
+            if self._closed:
+                break
+            now = time.monotonic()
+            if now >= next_flush:
+                next_flush = now + self.config.interval
+                self.flush()
+
+
+# Process-wide aggregator
+_aggregator: Optional[MeteringAggregator] = None
+_aggregator_lock = threading.Lock()
+
+
+def install_aggregator(
+    emit: Emitter, config: Optional[AggregationConfig] = None
+) -> MeteringAggregator:
+    """Install the process-wide aggregator, flushing any previous one."""
+    global _aggregator
+    _register_exit_hook()
+    with _aggregator_lock:
+        previous, _aggregator = _aggregator, MeteringAggregator(emit, config)
+        current = _aggregator
+    if previous is not None:
+        previous.shutdown()
+    return current
+
+
+def uninstall_aggregator() -> None:
+    """Flush and remove the process-wide aggregator."""
+    global _aggregator
+    with _aggregator_lock:
+        previous, _aggregator = _aggregator, None
+    if previous is not None:
+        previous.shutdown()
+
+
+def get_active_aggregator() -> Optional[MeteringAggregator]:
+    """Return the process-wide aggregator, or None if aggregation is off."""
+    return _aggregator
+
+
+def _flush_at_exit() -> None:
+    aggregator = _aggregator
+    if aggregator is not None:
+        aggregator.shutdown()
+
+
+_exit_hook_registered = False
+
+
+def _register_exit_hook() -> None:
+    global _exit_hook_registered
+    if _exit_hook_registered:
+        return
+    _exit_hook_registered = True
+    # The transport is imported first so this hook is registered after its
+    # exit hook and runs first (atexit is LIFO); the transport then still
+    # sends the final aggregates
+    from . import transport  # noqa: F401
+
+    atexit.register(_flush_at_exit)
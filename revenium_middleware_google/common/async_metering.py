@@ -0,0 +1,280 @@
+"""
+Native asyncio metering path.
+
+When a metered call is made from inside a running event loop (FastAPI,
+aiohttp, ...), the metering send is scheduled as a task on that loop using
+an ``AsyncReveniumMetering`` client, instead of hopping to a sender thread.
+
+Tasks are tracked so they can be drained before the loop stops. A task
+cancelled with its loop (``asyncio.run`` cancels whatever is left when the
+main coroutine returns), or still pending when the process exits, hands its
+record to the metering transport so the record is not lost.
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+ENV_ASYNC_ENABLED = "REVENIUM_METERING_ASYNC_ENABLED"
+
+Record = Dict[str, Any]
+
+# One client per event loop: httpx async connections cannot be shared across loops
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+# Pending metering tasks and the record each one is sending
+_pending: Dict["asyncio.Task[Any]", Record] = {}
+_pending_lock = threading.Lock()
+
+_enabled: Optional[bool] = None
+
+# Counters
+_stats = {
+    "async_scheduled": 0,
+    "async_sent": 0,
+    "async_failed": 0,
+    "async_handed_off": 0,
+    "async_dropped_at_exit": 0,
+}
+
+
+def is_async_metering_enabled() -> bool:
+    """Whether metering may run on the caller's event loop (default: True)."""
+    global _enabled
+    if _enabled is None:
+        _enabled = os.getenv(ENV_ASYNC_ENABLED, "true").lower() in ("true", "1", "yes")
+    return _enabled
+
+
+def set_async_metering_enabled(enabled: bool) -> None:
+    """Enable or disable the native asyncio metering path for this process."""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def get_running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Return the event loop running in this thread, or None."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_async_client(loop: Optional[asyncio.AbstractEventLoop] = None) -> Any:
+    """
+    Return the AsyncReveniumMetering client for an event loop.
+
+    The client is created on first use with the same API key and base URL as
+    the active sync client (``utils.client``, which the application may
+    replace), on a connection pool with the configured HTTP client settings,
+    and is released together with its loop. It is rebuilt if the sync
+    client's API key or base URL changes.
+
+    Args:
+        loop: Event loop the client will be used on (default: running loop)
+
+    Returns:
+        An AsyncReveniumMetering instance
+    """
+    from . import utils
+
+    loop = loop or asyncio.get_running_loop()
+    sync_client = utils.client
+    api_key, base_url = sync_client.api_key, str(sync_client.base_url)
+    with _clients_lock:
+        async_client = _clients.get(loop)
+        if (
+            async_client is None
+            or async_client.api_key != api_key
+            or str(async_client.base_url) != base_url
+        ):
+            from .http_client import (
+                create_async_metering_client,
+                get_http_client_config,
+            )
+
+            async_client = create_async_metering_client(
+                api_key, base_url, get_http_client_config()
+            )
+            _clients[loop] = async_client
+            logger.debug("Created async Revenium client for event loop %s", id(loop))
+        return async_client
+
+
+def schedule_metering_task(
+    loop: asyncio.AbstractEventLoop,
+    coro: Awaitable[Any],
+    record: Record,
+    max_pending: int,
+) -> bool:
+    """
+    Schedule a metering coroutine on ``loop`` and track it.
+
+    Args:
+        loop: The running event loop
+        coro: Coroutine that sends ``record``; it returns False if it handed
+              the record to the transport instead of sending it
+        record: The record being sent, kept for hand-off if the task is
+                cancelled or never runs
+        max_pending: Upper bound on tracked tasks
+
+    Returns:
+        True if scheduled; False if too many tasks are pending, in which case
+        the coroutine is closed and the caller should use the transport
+    """
+    _register_exit_hook()
+    with _pending_lock:
+        if len(_pending) >= max_pending:
+            coro.close()
+            return False
+        task = loop.create_task(coro)
+        _pending[task] = record
+        _stats["async_scheduled"] += 1
+    task.add_done_callback(_on_task_done)
+    return True
+
+
+def _on_task_done(task: "asyncio.Task[Any]") -> None:
+    with _pending_lock:
+        record = _pending.pop(task, None)
+        if not task.cancelled():
+            if task.exception() is not None:
+                _stats["async_failed"] += 1
+                logger.debug("Async metering task failed: %s", task.exception())
+            elif task.result() is False:
+                # The send gave up on an unhealthy endpoint and queued the record
+                _stats["async_handed_off"] += 1
+            else:
+                _stats["async_sent"] += 1
+            return
+
+    # Cancelled, usually by the loop shutting down (asyncio.run cancels the
+    # tasks left when the main coroutine returns): the transport sends it
+    if record is not None:
+        handed_off, transport = _hand_off([record])
+        if not handed_off:
+            with _pending_lock:
+                _stats["async_failed"] += 1
+            logger.warning(
+                "Dropping cancelled async metering record (%s)",
+                "no metering transport" if transport is None else "metering queue full",
+            )
+
+
+def pending_task_count() -> int:
+    """Number of metering tasks that have not finished yet."""
+    with _pending_lock:
+        return len(_pending)
+
+
+async def drain_metering_tasks(timeout: Optional[float] = 5.0) -> bool:
+    """
+    Wait for metering tasks scheduled on the running loop to finish.
+
+    Call this from an application's shutdown hook (e.g. a FastAPI lifespan)
+    before the event loop stops.
+
+    Args:
+        timeout: Maximum seconds to wait, or None to wait indefinitely
+
+    Returns:
+        True if every task finished before the timeout
+    """
+    loop = asyncio.get_running_loop()
+    with _pending_lock:
+        tasks = [task for task in _pending if task.get_loop() is loop]
+    if not tasks:
+        return True
+    _, not_done = await asyncio.wait(tasks, timeout=timeout)
+    if not_done:
+        logger.warning(
+            "%d metering tasks still pending after %ss", len(not_done), timeout
+        )
+    return not not_done
+
+
+def get_async_stats() -> Dict[str, int]:
+    """Return async metering counters."""
+    with _pending_lock:
+        stats = dict(_stats)
+        stats["async_pending"] = len(_pending)
+    return stats
+
+
+def _hand_off_pending_at_exit() -> None:
+    """Move records from tasks whose loop can no longer run them to the transport."""
+    stranded = []
+    with _pending_lock:
+        for task, record in list(_pending.items()):
+            loop = task.get_loop()
+            if loop.is_running() and not loop.is_closed():
+                continue
+            # Done callbacks never run once the loop has stopped
+            del _pending[task]
+            if not task.done():
+                # The send never runs; close its coroutine so it is not
+                # reported as never awaited
+                task.get_coro().close()
+                stranded.append(record)
+    if not stranded:
+        return
+
+    handed_off, transport = _hand_off(stranded)
+    dropped = len(stranded) - handed_off
+    with _pending_lock:
+        _stats["async_dropped_at_exit"] += dropped
+    if handed_off:
+        logger.debug(
+            "Handed %d pending async metering records to the transport", handed_off
+        )
+    if dropped:
+        logger.warning(
+            "Dropping %d pending async metering records at exit (%s)",
+            dropped,
+            "no metering transport" if transport is None else "metering queue full",
+        )
+
+
+def _hand_off(records: List[Record]) -> Tuple[int, Any]:
+    """
+    Submit records whose task will not send them to the metering transport.
+
+    Returns:
+        How many records the transport accepted, and the transport (None if
+        none is installed)
+    """
+    from .transport import get_active_transport
+
+    transport = get_active_transport()
+    handed_off = 0
+    if transport is not None:
+        for record in records:
+            if transport.submit(record, block=False):
+                handed_off += 1
+    with _pending_lock:
+        _stats["async_handed_off"] += handed_off
+    return handed_off, transport
+
+
+_exit_hook_registered = False
+
+
+def _register_exit_hook() -> None:
+    global _exit_hook_registered
+    if _exit_hook_registered:
+        return
+    _exit_hook_registered = True
+    # The transport is imported first so this hook is registered after its
+    # exit hook and runs first (atexit is LIFO)
+    from . import transport  # noqa: F401
+
+    atexit.register(_hand_off_pending_at_exit)
@@ -0,0 +1,236 @@
+"""
+Circuit breaker for the Revenium metering endpoint.
+
+After ``failure_threshold`` consecutive outage failures (connection errors,
+timeouts, HTTP 429 and 5xx) the breaker opens: the metering workers stop
+sending and records wait in the bounded metering queue (spilling or being
+counted as dropped by its overflow policy, and kept in the spool when one is
+configured). After ``reset_timeout`` seconds one probe send is let through;
+success closes the breaker and the queue drains, failure keeps it open for
+another ``reset_timeout``.
+
+Opening logs one WARNING and closing one INFO line; failures while the
+breaker is open or probing are logged at debug level only.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+ENV_BREAKER_ENABLED = "REVENIUM_METERING_BREAKER_ENABLED"
+ENV_BREAKER_FAILURE_THRESHOLD = "REVENIUM_METERING_BREAKER_FAILURE_THRESHOLD"
+ENV_BREAKER_RESET_TIMEOUT = "REVENIUM_METERING_BREAKER_RESET_TIMEOUT"
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0  # seconds
+
+
+class BreakerState(str, Enum):
+    """State of the metering circuit breaker."""
+
+    CLOSED = "closed"  # Sending normally
+    OPEN = "open"  # Not sending until the reset timeout passes
+    HALF_OPEN = "half_open"  # One probe send in flight
+
+
+def is_outage_error(error: BaseException) -> bool:
+    """Whether a send failure says the endpoint is unhealthy (vs. a bad record)."""
+    from revenium_metering import APIConnectionError, APIStatusError
+
+    if isinstance(error, (APIConnectionError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+@dataclass
+class CircuitBreakerConfig:
+    """Settings for the metering circuit breaker."""
+
+    enabled: bool = True
+    failure_threshold: int = DEFAULT_FAILURE_THRESHOLD
+    reset_timeout: float = DEFAULT_RESET_TIMEOUT
+
+    def __post_init__(self):
+        self.enabled = bool(self.enabled)
+        self.failure_threshold = max(1, int(self.failure_threshold))
+        self.reset_timeout = max(0.001, float(self.reset_timeout))
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreakerConfig":
+        """Create a config from REVENIUM_METERING_BREAKER_* environment variables."""
+        try:
+            threshold = int(
+                os.getenv(ENV_BREAKER_FAILURE_THRESHOLD, DEFAULT_FAILURE_THRESHOLD)
+            )
+        except ValueError:
+            logger.warning(
+                "Invalid %s value, defaulting to %d",
+                ENV_BREAKER_FAILURE_THRESHOLD,
+                DEFAULT_FAILURE_THRESHOLD,
+            )
+            threshold = DEFAULT_FAILURE_THRESHOLD
+        try:
+            reset_timeout = float(
+                os.getenv(ENV_BREAKER_RESET_TIMEOUT, DEFAULT_RESET_TIMEOUT)
+            )
+        except ValueError:
+            logger.warning(
+                "Invalid %s value, defaulting to %s",
+                ENV_BREAKER_RESET_TIMEOUT,
+                DEFAULT_RESET_TIMEOUT,
+            )
+            reset_timeout = DEFAULT_RESET_TIMEOUT
+        return cls(
+            enabled=os.getenv(ENV_BREAKER_ENABLED, "true").lower()
+            in ("true", "1", "yes"),
+            failure_threshold=threshold,
+            reset_timeout=reset_timeout,
+        )
+
+
+class CircuitBreaker:
+    """
+    Thread-safe consecutive-failure circuit breaker.
+
+    Senders call ``allow_request`` before a send and ``record_result`` after
+    it; the metering workers call ``hold_for`` to pause while it is open.
+    """
+
+    def __init__(self, config: Optional[CircuitBreakerConfig] = None):
+        self.config = config or CircuitBreakerConfig()
+        self._lock = threading.Lock()
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._retry_at = 0.0
+
+        # Counters
+        self.opens = 0
+        self.probes = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> BreakerState:
+        return self._state
+
+    @property
+    def is_closed(self) -> bool:
+        return self._state is BreakerState.CLOSED
+
+    def allow_request(self) -> bool:
+        """
+        Whether a send may go out now.
+
+        When the reset timeout has passed, the first caller is let through
+        as the probe and the breaker turns half-open. A probe that has not
+        reported back within another reset timeout is replaced.
+        """
+        if self._state is BreakerState.CLOSED or not self.config.enabled:
+            return True
+        with self._lock:
+            if self._state is BreakerState.CLOSED:
+                return True
+            now = time.monotonic()
+            if now >= self._retry_at:
+                self._state = BreakerState.HALF_OPEN
+                self._retry_at = now + self.config.reset_timeout
+                self.probes += 1
+                logger.debug("Metering circuit half-open; sending a probe")
+                return True
+            self.short_circuited += 1
+            return False
+
+    def hold_for(self) -> Optional[float]:
+        """
+        Seconds the metering workers should wait before sending, or None.
+
+        While a probe is in flight the workers wait for it; its result wakes
+        them through the transport.
+        """
+        if self._state is BreakerState.CLOSED or not self.config.enabled:
+            return None
+        with self._lock:
+            if self._state is BreakerState.CLOSED:
+                return None
+            remaining = self._retry_at - time.monotonic()
+            return remaining if remaining > 0 else None
+
+    def record_result(self, error: Optional[BaseException] = None) -> None:
+        """Record a send: success, or the error it failed with."""
+        if error is not None and is_outage_error(error):
+            self.record_failure()
+        else:
+            # Any answer other than an outage means the endpoint is reachable
+            self.record_success()
+
+    def record_success(self) -> None:
+        if self._state is BreakerState.CLOSED and not self._failures:
+            return
+        with self._lock:
+            self._failures = 0
+            if self._state is not BreakerState.CLOSED:
+                self._state = BreakerState.CLOSED
+                logger.info("Revenium metering endpoint recovered; resuming sends")
+
+    def record_failure(self) -> None:
+        if not self.config.enabled:
+            return
+        with self._lock:
+            self._failures += 1
+            if self._state is BreakerState.HALF_OPEN:
+                self._state = BreakerState.OPEN
+                self._retry_at = time.monotonic() + self.config.reset_timeout
+                logger.debug("Metering probe failed; circuit stays open")
+            elif (
+                self._state is BreakerState.CLOSED
+                and self._failures >= self.config.failure_threshold
+            ):
+                self._state = BreakerState.OPEN
+                self._retry_at = time.monotonic() + self.config.reset_timeout
+                self.opens += 1
+                logger.warning(
+                    "Revenium metering endpoint unhealthy after %d consecutive "
+                    "failures; holding metering records and probing every %gs",
+                    self._failures,
+                    self.config.reset_timeout,
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the breaker state and counters."""
+        with self._lock:
+            return {
+                "breaker_state": self._state.value,
+                "breaker_opens": self.opens,
+                "breaker_probes": self.probes,
+                "breaker_short_circuited": self.short_circuited,
+            }
+
+
+# Process-wide breaker shared by every metering send path
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide breaker, configured from the environment on first use."""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(CircuitBreakerConfig.from_env())
+    return _breaker
+
+
+def install_circuit_breaker(config: CircuitBreakerConfig) -> CircuitBreaker:
+    """Replace the process-wide breaker (its state starts closed)."""
+    global _breaker
+    with _breaker_lock:
+        _breaker = CircuitBreaker(config)
+    return _breaker
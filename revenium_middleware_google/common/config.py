@@ -0,0 +1,135 @@
+"""
+Immutable configuration snapshot.
+
+Environment-derived settings used on every metering record (trace fields and
+the log level) are resolved and validated once, at import, into a frozen
+``ReveniumConfig``. The hot path reads the current snapshot with a single
+module attribute lookup and no locking; ``reload_config()`` builds a new
+snapshot and swaps it in atomically. Set REVENIUM_CONFIG_RELOAD_ON_SIGHUP to
+reload on SIGHUP, or call ``install_sighup_handler()`` directly.
+"""
+
+import logging
+import os
+import signal
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict, Optional
+
+from . import trace_fields
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+ENV_LOG_LEVEL = "REVENIUM_LOG_LEVEL"
+ENV_RELOAD_ON_SIGHUP = "REVENIUM_CONFIG_RELOAD_ON_SIGHUP"
+
+
+@dataclass(frozen=True)
+class ReveniumConfig:
+    """Settings resolved from the environment, validated once."""
+
+    environment: Optional[str] = None
+    region: Optional[str] = None
+    credential_alias: Optional[str] = None
+    trace_type: Optional[str] = None
+    trace_name: Optional[str] = None
+    parent_transaction_id: Optional[str] = None
+    transaction_name: Optional[str] = None
+    retry_number: int = 0
+    log_level: str = "INFO"
+
+    @classmethod
+    def from_env(cls) -> "ReveniumConfig":
+        """Resolve and validate a snapshot from the current environment."""
+        return cls(
+            environment=trace_fields.get_environment(),
+            region=trace_fields.get_region(),
+            credential_alias=trace_fields.get_credential_alias(),
+            trace_type=trace_fields.get_trace_type(),
+            trace_name=trace_fields.get_trace_name(),
+            parent_transaction_id=trace_fields.get_parent_transaction_id(),
+            transaction_name=os.getenv(trace_fields.ENV_REVENIUM_TRANSACTION_NAME)
+            or None,
+            retry_number=trace_fields.get_retry_number(),
+            log_level=os.getenv(ENV_LOG_LEVEL, "INFO").upper(),
+        )
+
+    @cached_property
+    def completion_defaults(self) -> Dict[str, Any]:
+        """Completion fields set from the environment (usage_metadata overrides them)."""
+        defaults = {
+            "environment": self.environment,
+            "region": self.region,
+            "credential_alias": self.credential_alias,
+            "trace_type": self.trace_type,
+            "trace_name": self.trace_name,
+            "parent_transaction_id": self.parent_transaction_id,
+        }
+        defaults = {key: value for key, value in defaults.items() if value}
+        if self.retry_number > 0:
+            defaults["retry_number"] = self.retry_number
+        return defaults
+
+
+_config = ReveniumConfig.from_env()
+_sighup_installed = False
+
+
+def get_config() -> ReveniumConfig:
+    """Return the current configuration snapshot."""
+    return _config
+
+
+def reload_config() -> ReveniumConfig:
+    """
+    Re-read the environment and swap in a new configuration snapshot.
+
+    Takes no lock: rebinding the snapshot is atomic, and the SIGHUP handler
+    may run this while the same thread is already inside it.
+
+    Returns:
+        The new snapshot
+    """
+    global _config
+    config = ReveniumConfig.from_env()
+    _config = config
+    logger.debug("Revenium configuration reloaded: %s", config)
+    return config
+
+
+def install_sighup_handler() -> bool:
+    """
+    Reload the configuration when the process receives SIGHUP.
+
+    Any previously installed Python-level SIGHUP handler is still called.
+    Signal handlers can only be installed from the main thread.
+
+    Returns:
+        True if the handler is installed, False if unsupported here
+    """
+    global _sighup_installed
+    if _sighup_installed:
+        return True
+    if not hasattr(signal, "SIGHUP"):
+        logger.debug("SIGHUP is not available on this platform")
+        return False
+    if threading.current_thread() is not threading.main_thread():
+        logger.warning("SIGHUP config reload can only be installed from the main thread")
+        return False
+
+    previous = signal.getsignal(signal.SIGHUP)
+
+    def _on_sighup(signum, frame):
+        reload_config()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGHUP, _on_sighup)
+    _sighup_installed = True
+    return True
+
+
+def is_sighup_reload_enabled_in_env() -> bool:
+    """Check if SIGHUP reload was requested via REVENIUM_CONFIG_RELOAD_ON_SIGHUP."""
+    return os.getenv(ENV_RELOAD_ON_SIGHUP, "").lower() in ("true", "1", "yes")
@@ -5,6 +5,7 @@ This module defines a hierarchy of exceptions for different error scenarios
 that can occur during middleware operation.
 """
 
+import inspect
 from typing import Optional, Any
 
 
@@ -37,6 +38,10 @@ class MeteringError(ReveniumMiddlewareError):
         self.api_response = api_response
 
 
+class CircuitOpenError(MeteringError):
+    """Raised instead of sending while the metering circuit breaker is open."""
+
+
 class TokenExtractionError(ReveniumMiddlewareError):
     """Raised when token count extraction fails."""
 
@@ -100,7 +105,24 @@ class APIResponseError(ReveniumMiddlewareError):
 
 # Utility functions for error handling
 def handle_metering_error(func):
-    """Decorator to handle metering errors gracefully."""
+    """Decorator to handle metering errors gracefully (sync or async functions)."""
+
+    if inspect.iscoroutinefunction(func):
+
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except MeteringError:
+                # Re-raise metering errors as-is
+                raise
+            except Exception as e:
+                # Convert other exceptions to MeteringError
+                raise MeteringError(
+                    f"Unexpected error in {func.__name__}: {str(e)}",
+                    details={"original_error": type(e).__name__},
+                ) from e
+
+        return async_wrapper
 
     def wrapper(*args, **kwargs):
         try:
@@ -0,0 +1,241 @@
+"""
+Tuned HTTP transport for the Revenium metering client.
+
+The metering workers (and each event loop on the async path) send through an
+httpx connection pool owned by the middleware instead of the SDK's generic
+defaults: the pool is sized to the number of concurrent senders, idle
+connections are kept alive long enough to be reused between flushes, and
+connect and read timeouts are bounded so a slow metering API cannot pin a
+worker for a minute.
+
+HTTP/2 multiplexing is optional and needs the ``h2`` package
+(``pip install revenium-middleware-google[http2]``); without it the client
+falls back to HTTP/1.1 keep-alive and logs a warning. Request bodies can be
+gzip or zstd compressed (see compression.py).
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import httpx
+
+from .compression import (
+    DEFAULT_COMPRESSION_MIN_BYTES,
+    ENV_COMPRESSION,
+    ENV_COMPRESSION_MIN_BYTES,
+    AsyncCompressingTransport,
+    Codec,
+    CompressingTransport,
+    is_zstd_available,
+)
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+ENV_POOL_SIZE = "REVENIUM_METERING_POOL_SIZE"
+ENV_KEEPALIVE_EXPIRY = "REVENIUM_METERING_KEEPALIVE_EXPIRY"
+ENV_HTTP2 = "REVENIUM_METERING_HTTP2"
+ENV_CONNECT_TIMEOUT = "REVENIUM_METERING_CONNECT_TIMEOUT"
+ENV_TIMEOUT = "REVENIUM_METERING_TIMEOUT"
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_TIMEOUT = 10.0
+
+# Whether the missing-h2 and missing-zstandard warnings have been logged
+_http2_warned = False
+_zstd_warned = False
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Invalid %s value, defaulting to %d", name, default)
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Invalid %s value, defaulting to %s", name, default)
+        return default
+
+
+@dataclass
+class HttpClientConfig:
+    """Connection pool and timeout settings for the metering HTTP client."""
+
+    pool_size: int = DEFAULT_POOL_SIZE
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY
+    http2: bool = False
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    timeout: float = DEFAULT_TIMEOUT  # read, write and pool wait
+    compression: Codec = Codec.NONE
+    compression_min_bytes: int = DEFAULT_COMPRESSION_MIN_BYTES
+
+    def __post_init__(self):
+        self.pool_size = max(1, int(self.pool_size))
+        self.keepalive_expiry = max(0.0, float(self.keepalive_expiry))
+        self.http2 = bool(self.http2)
+        self.connect_timeout = max(0.001, float(self.connect_timeout))
+        self.timeout = max(0.001, float(self.timeout))
+        self.compression = Codec.parse(self.compression)
+        self.compression_min_bytes = max(0, int(self.compression_min_bytes))
+
+    @classmethod
+    def from_env(cls) -> "HttpClientConfig":
+        """Create a config from REVENIUM_METERING_* environment variables."""
+        return cls(
+            pool_size=_env_int(ENV_POOL_SIZE, DEFAULT_POOL_SIZE),
+            keepalive_expiry=_env_float(
+                ENV_KEEPALIVE_EXPIRY, DEFAULT_KEEPALIVE_EXPIRY
+            ),
+            http2=os.getenv(ENV_HTTP2, "").lower() in ("true", "1", "yes"),
+            connect_timeout=_env_float(ENV_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+            timeout=_env_float(ENV_TIMEOUT, DEFAULT_TIMEOUT),
+            compression=os.getenv(ENV_COMPRESSION, Codec.NONE.value),
+            compression_min_bytes=_env_int(
+                ENV_COMPRESSION_MIN_BYTES, DEFAULT_COMPRESSION_MIN_BYTES
+            ),
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        # Every pooled connection may stay alive; the pool is the only bound
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+
+def is_http2_available() -> bool:
+    """Whether the h2 package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _http2_enabled(config: HttpClientConfig) -> bool:
+    global _http2_warned
+    http2 = config.http2
+    if http2 and not is_http2_available():
+        if not _http2_warned:
+            _http2_warned = True
+            logger.warning(
+                "%s is set but the h2 package is not installed; metering uses "
+                "HTTP/1.1. Install revenium-middleware-google[http2] to enable it.",
+                ENV_HTTP2,
+            )
+        http2 = False
+    return http2
+
+
+def _codec(config: HttpClientConfig) -> Codec:
+    global _zstd_warned
+    codec = config.compression
+    if codec is Codec.ZSTD and not is_zstd_available():
+        if not _zstd_warned:
+            _zstd_warned = True
+            logger.warning(
+                "%s=zstd but the zstandard package is not installed; metering "
+                "uses gzip. Install revenium-middleware-google[zstd] to enable it.",
+                ENV_COMPRESSION,
+            )
+        codec = Codec.GZIP
+    return codec
+
+
+def create_http_client(config: HttpClientConfig) -> httpx.Client:
+    """Build a pooled httpx.Client for the sync metering client."""
+    transport: httpx.BaseTransport = httpx.HTTPTransport(
+        limits=config.limits, http2=_http2_enabled(config)
+    )
+    codec = _codec(config)
+    if codec is not Codec.NONE:
+        transport = CompressingTransport(
+            transport, codec, config.compression_min_bytes
+        )
+    return httpx.Client(transport=transport, timeout=config.timeouts)
+
+
+def create_async_http_client(config: HttpClientConfig) -> httpx.AsyncClient:
+    """Build a pooled httpx.AsyncClient for one event loop's metering client."""
+    transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+        limits=config.limits, http2=_http2_enabled(config)
+    )
+    codec = _codec(config)
+    if codec is not Codec.NONE:
+        transport = AsyncCompressingTransport(
+            transport, codec, config.compression_min_bytes
+        )
+    return httpx.AsyncClient(transport=transport, timeout=config.timeouts)
+
+
+def create_metering_client(
+    api_key: str, base_url: str, config: HttpClientConfig
+) -> Any:
+    """
+    Build a ReveniumMetering client on a tuned connection pool.
+
+    Args:
+        api_key: Revenium API key
+        base_url: Metering API base URL
+        config: Pool and timeout settings
+
+    Returns:
+        A ReveniumMetering instance owning its httpx.Client
+    """
+    from revenium_metering import ReveniumMetering
+
+    return ReveniumMetering(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=config.timeouts,
+        # Retries are done by the middleware's budgeted policy (retry.py)
+        max_retries=0,
+        http_client=create_http_client(config),
+    )
+
+
+def create_async_metering_client(
+    api_key: str, base_url: str, config: HttpClientConfig
+) -> Any:
+    """Async counterpart of create_metering_client (AsyncReveniumMetering)."""
+    from revenium_metering import AsyncReveniumMetering
+
+    return AsyncReveniumMetering(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=config.timeouts,
+        max_retries=0,
+        http_client=create_async_http_client(config),
+    )
+
+
+# Settings used by metering clients created from now on
+_config: Optional[HttpClientConfig] = None
+
+
+def get_http_client_config() -> HttpClientConfig:
+    """Return the active settings, read from the environment on first use."""
+    global _config
+    if _config is None:
+        _config = HttpClientConfig.from_env()
+    return _config
+
+
+def set_http_client_config(config: HttpClientConfig) -> None:
+    """Replace the settings used for metering clients created from now on."""
+    global _config
+    _config = config
@@ -0,0 +1,230 @@
+"""
+Per-stream latency profiling.
+
+Each stream keeps a ``StreamLatencyProfile``: a few timestamps plus a
+fixed-size log-scale histogram of the gaps between chunks, updated
+incrementally as chunks arrive. When a stream finishes, its profile is
+folded into per-model aggregates that ``get_stream_latency_stats`` (and
+``get_metering_stats``) expose, so models that stall under load stand out.
+
+Histogram buckets have four sub-buckets per power of two of microseconds,
+so percentiles are accurate to within about 12%; the maximum gap is exact.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+# Gaps below 4us get one bucket per microsecond, then 4 buckets per doubling
+# up to 2**30us (~18 minutes); longer gaps land in the last bucket.
+_SUB_BUCKETS = 4
+_MAX_OCTAVE = 30
+NUM_BUCKETS = _SUB_BUCKETS + (_MAX_OCTAVE - 2) * _SUB_BUCKETS
+
+# Bound on distinct models tracked in the aggregate stats
+MAX_TRACKED_MODELS = 256
+
+
+def gap_bucket(gap_us: int) -> int:
+    """Histogram bucket index for a gap in microseconds."""
+    if gap_us < _SUB_BUCKETS:
+        return max(gap_us, 0)
+    octave = gap_us.bit_length() - 1
+    sub = (gap_us >> (octave - 2)) & 3
+    return min(_SUB_BUCKETS + (octave - 2) * _SUB_BUCKETS + sub, NUM_BUCKETS - 1)
+
+
+def bucket_bounds(index: int) -> "tuple[int, int]":
+    """Lower and upper bound (microseconds) of a histogram bucket."""
+    if index < _SUB_BUCKETS:
+        return index, index + 1
+    shift, sub = divmod(index - _SUB_BUCKETS, _SUB_BUCKETS)
+    return (_SUB_BUCKETS + sub) << shift, (_SUB_BUCKETS + sub + 1) << shift
+
+
+def histogram_percentile(counts: List[int], total: int, quantile: float) -> float:
+    """Approximate a percentile (in milliseconds) from histogram counts."""
+    if not total:
+        return 0.0
+    rank = quantile * total
+    seen = 0
+    for index, count in enumerate(counts):
+        seen += count
+        if count and seen >= rank:
+            lower, upper = bucket_bounds(index)
+            return (lower + upper) / 2 / 1000.0
+    return 0.0
+
+
+class StreamLatencyProfile:
+    """Incremental, fixed-size latency state for one stream."""
+
+    __slots__ = ("start_ns", "first_ns", "last_ns", "max_gap_ns", "gap_count", "gaps")
+
+    def __init__(self, start_ns: Optional[int] = None):
+        self.start_ns = time.perf_counter_ns() if start_ns is None else start_ns
+        self.first_ns: Optional[int] = None
+        self.last_ns: Optional[int] = None
+        self.max_gap_ns = 0
+        self.gap_count = 0
+        # Allocated on the second chunk, so single-chunk streams stay tiny
+        self.gaps: Optional[List[int]] = None
+
+    def record(self, now_ns: int) -> None:
+        """Record the arrival of a chunk at ``now_ns`` (perf_counter_ns)."""
+        last = self.last_ns
+        self.last_ns = now_ns
+        if last is None:
+            self.first_ns = now_ns
+            return
+        gap = now_ns - last
+        if gap > self.max_gap_ns:
+            self.max_gap_ns = gap
+        gaps = self.gaps
+        if gaps is None:
+            gaps = self.gaps = [0] * NUM_BUCKETS
+        # gap_bucket() inlined: this runs once per chunk
+        gap_us = gap // 1000
+        if gap_us < _SUB_BUCKETS:
+            index = gap_us
+        else:
+            shift = gap_us.bit_length() - 3
+            index = (shift << 2) + (gap_us >> shift)
+            if index >= NUM_BUCKETS:
+                index = NUM_BUCKETS - 1
+        gaps[index] += 1
+        self.gap_count += 1
+
+    def summary(self, chunk_count: int, output_tokens: int = 0) -> Dict[str, Any]:
+        """
+        Summarize the stream.
+
+        Args:
+            chunk_count: Number of chunks received
+            output_tokens: Output tokens reported for the stream
+
+        Returns:
+            chunk_count, gap_p50_ms, gap_p95_ms, gap_max_ms, stream_time_ms
+            (request start to last chunk), generation_time_ms (first to last
+            chunk) and tokens_per_second
+        """
+        counts = self.gaps or []
+        stream_ns = (self.last_ns - self.start_ns) if self.last_ns is not None else 0
+        generation_ns = (
+            (self.last_ns - self.first_ns) if self.first_ns is not None else 0
+        )
+        # A single-chunk stream has no generation window; fall back to the whole stream
+        rate_ns = generation_ns or stream_ns
+        return {
+            "chunk_count": chunk_count,
+            "gap_p50_ms": histogram_percentile(counts, self.gap_count, 0.50),
+            "gap_p95_ms": histogram_percentile(counts, self.gap_count, 0.95),
+            "gap_max_ms": self.max_gap_ns / 1e6,
+            "stream_time_ms": stream_ns / 1e6,
+            "generation_time_ms": generation_ns / 1e6,
+            "tokens_per_second": (output_tokens * 1e9 / rate_ns) if rate_ns else 0.0,
+        }
+
+
+class _ModelLatency:
+    """Aggregated latency for one model."""
+
+    __slots__ = (
+        "streams",
+        "chunks",
+        "gap_count",
+        "gaps",
+        "max_gap_ns",
+        "stream_ns_total",
+        "stream_ns_max",
+        "output_tokens",
+        "generation_ns_total",
+    )
+
+    def __init__(self):
+        self.streams = 0
+        self.chunks = 0
+        self.gap_count = 0
+        self.gaps = [0] * NUM_BUCKETS
+        self.max_gap_ns = 0
+        self.stream_ns_total = 0
+        self.stream_ns_max = 0
+        self.output_tokens = 0
+        self.generation_ns_total = 0
+
+
+_models: Dict[str, _ModelLatency] = {}
+_models_lock = threading.Lock()
+
+
+def record_stream_latency(
+    model: Optional[str],
+    profile: StreamLatencyProfile,
+    chunk_count: int,
+    output_tokens: int = 0,
+) -> None:
+    """Fold a finished stream's profile into the per-model aggregates."""
+    model = model or "unknown-model"
+    stream_ns = (profile.last_ns - profile.start_ns) if profile.last_ns is not None else 0
+    generation_ns = (
+        (profile.last_ns - profile.first_ns) if profile.first_ns is not None else 0
+    )
+    with _models_lock:
+        stats = _models.get(model)
+        if stats is None:
+            if len(_models) >= MAX_TRACKED_MODELS:
+                return
+            stats = _models[model] = _ModelLatency()
+        stats.streams += 1
+        stats.chunks += chunk_count
+        if profile.gaps is not None:
+            totals = stats.gaps
+            for index, count in enumerate(profile.gaps):
+                if count:
+                    totals[index] += count
+            stats.gap_count += profile.gap_count
+        if profile.max_gap_ns > stats.max_gap_ns:
+            stats.max_gap_ns = profile.max_gap_ns
+        stats.stream_ns_total += stream_ns
+        if stream_ns > stats.stream_ns_max:
+            stats.stream_ns_max = stream_ns
+        stats.output_tokens += output_tokens
+        stats.generation_ns_total += generation_ns or stream_ns
+
+
+def get_stream_latency_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Return streaming latency aggregates per model.
+
+    Returns:
+        A dict keyed by model name with streams, chunks, gap_p50_ms,
+        gap_p95_ms, gap_max_ms, stream_time_avg_ms, stream_time_max_ms and
+        tokens_per_second (output tokens over total generation time)
+    """
+    with _models_lock:
+        result = {}
+        for model, stats in _models.items():
+            result[model] = {
+                "streams": stats.streams,
+                "chunks": stats.chunks,
+                "gap_p50_ms": histogram_percentile(stats.gaps, stats.gap_count, 0.50),
+                "gap_p95_ms": histogram_percentile(stats.gaps, stats.gap_count, 0.95),
+                "gap_max_ms": stats.max_gap_ns / 1e6,
+                "stream_time_avg_ms": stats.stream_ns_total / stats.streams / 1e6,
+                "stream_time_max_ms": stats.stream_ns_max / 1e6,
+                "tokens_per_second": (
+                    stats.output_tokens * 1e9 / stats.generation_ns_total
+                    if stats.generation_ns_total
+                    else 0.0
+                ),
+            }
+        return result
+
+
+def reset_stream_latency_stats() -> None:
+    """Clear the per-model streaming latency aggregates."""
+    with _models_lock:
+        _models.clear()
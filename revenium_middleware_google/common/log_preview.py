@@ -0,0 +1,156 @@
+"""
+Lazy, bounded log previews of request payloads.
+
+Wrappers log arguments, metadata and responses at debug level. Passing them
+as ``logger.debug("... %s", LogPreview(kwargs))`` defers all formatting to
+the logging module, which only calls ``str()`` when the record is emitted,
+so a disabled level costs one small object. When formatted, the preview is
+built from a truncated walk of the value (long strings and bytes are cut
+before ``repr``), credential fields are redacted, and the result is capped
+at REVENIUM_LOG_PREVIEW_CHARS characters.
+"""
+
+import logging
+import os
+from typing import Any, Optional
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+ENV_LOG_PREVIEW_CHARS = "REVENIUM_LOG_PREVIEW_CHARS"
+DEFAULT_PREVIEW_CHARS = 500
+
+REDACTED = "***REDACTED***"
+
+# Lower-cased keys whose values are never logged
+SENSITIVE_KEYS = frozenset(
+    {
+        "api_key",
+        "apikey",
+        "x-api-key",
+        "x-goog-api-key",
+        "authorization",
+        "password",
+        "secret",
+        "client_secret",
+        "access_token",
+        "refresh_token",
+        "id_token",
+        "credential",
+        "credentials",
+        "subscriber_credential",
+    }
+)
+
+# Containers deeper than this are shown as "..."
+_MAX_DEPTH = 4
+# Items shown per container before eliding the rest
+_MAX_ITEMS = 20
+
+
+def _preview_chars_from_env() -> int:
+    try:
+        return max(0, int(os.getenv(ENV_LOG_PREVIEW_CHARS, str(DEFAULT_PREVIEW_CHARS))))
+    except ValueError:
+        logger.warning(
+            "Invalid %s value, defaulting to %s",
+            ENV_LOG_PREVIEW_CHARS,
+            DEFAULT_PREVIEW_CHARS,
+        )
+        return DEFAULT_PREVIEW_CHARS
+
+
+_preview_chars = _preview_chars_from_env()
+
+
+def set_log_preview_chars(limit: int) -> None:
+    """Set the maximum length of payload previews in log messages (0 = no limit)."""
+    global _preview_chars
+    _preview_chars = max(0, int(limit))
+
+
+def get_log_preview_chars() -> int:
+    """Return the maximum length of payload previews in log messages."""
+    return _preview_chars
+
+
+def _is_sensitive(key: Any) -> bool:
+    return isinstance(key, str) and key.lower() in SENSITIVE_KEYS
+
+
+def _shorten(text: str, limit: int) -> str:
+    if limit and len(text) > limit:
+        return f"{text[:limit]}...[{len(text) - limit} more chars]"
+    return text
+
+
+def _render(value: Any, limit: int, depth: int) -> str:
+    """Render value for a log line without formatting more than about limit chars."""
+    if isinstance(value, str):
+        return repr(_shorten(value, limit))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    if value is None or isinstance(value, (bool, int, float)):
+        return repr(value)
+
+    if isinstance(value, dict):
+        if depth >= _MAX_DEPTH:
+            return "{...}"
+        parts = []
+        for index, (key, item) in enumerate(value.items()):
+            if index >= _MAX_ITEMS:
+                parts.append(f"...{len(value) - _MAX_ITEMS} more")
+                break
+            rendered = REDACTED if _is_sensitive(key) else _render(item, limit, depth + 1)
+            parts.append(f"{key!r}: {rendered}")
+        return "{" + ", ".join(parts) + "}"
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        if depth >= _MAX_DEPTH:
+            return "[...]"
+        parts = []
+        for index, item in enumerate(value):
+            if index >= _MAX_ITEMS:
+                parts.append(f"...{len(value) - _MAX_ITEMS} more")
+                break
+            parts.append(_render(item, limit, depth + 1))
+        if isinstance(value, tuple):
+            return "(" + ", ".join(parts) + ("," if len(parts) == 1 else "") + ")"
+        return "[" + ", ".join(parts) + "]"
+
+    # SDK objects (responses, Parts with inline image data, ...) format their own repr
+    try:
+        text = repr(value)
+    except Exception as e:
+        return f"<{type(value).__name__} (repr failed: {e})>"
+    return _shorten(text, limit)
+
+
+def format_preview(value: Any, limit: Optional[int] = None) -> str:
+    """
+    Format a truncated, redacted preview of value.
+
+    Args:
+        value: Value to preview
+        limit: Maximum length of the preview (defaults to the configured size)
+
+    Returns:
+        The preview string
+    """
+    if limit is None:
+        limit = _preview_chars
+    return _shorten(_render(value, limit, 0), limit)
+
+
+class LogPreview:
+    """Log argument that formats a bounded, redacted preview only if emitted."""
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: Optional[int] = None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        return format_preview(self.value, self.limit)
+
+    __repr__ = __str__
@@ -0,0 +1,265 @@
+"""
+usage_metadata normalization.
+
+``normalize_usage_metadata`` compiles a caller's usage_metadata dict into a
+read-only ``NormalizedMetadata`` payload fragment: snake_case/camelCase
+fallbacks resolved, trace fields validated and the subscriber object built.
+``build_completion_args`` merges the fragment into the record with a single
+update.
+
+Most traffic reuses a few metadata dicts, so fragments are cached by dict
+identity with LRU eviction. The fragment is taken when the metering call is
+created, so a caller mutating its dict after the background send has been
+scheduled no longer changes (or races with) the record.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+from . import trace_fields
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+# Distinct metadata dicts kept in the normalization cache
+METADATA_CACHE_SIZE = 1024
+
+# Fields copied as-is when truthy
+_PLAIN_FIELDS = (
+    "trace_id",
+    "task_type",
+    "subscription_id",
+    "product_id",
+    "agent",
+    "response_quality_score",
+    "environment",
+    "region",
+)
+
+# Completion field -> usage_metadata keys, in priority order
+_ALIASED_FIELDS = (
+    ("organization_id", ("organization_id", "organizationId")),
+    ("credential_alias", ("credential_alias", "credentialAlias")),
+    ("parent_transaction_id", ("parent_transaction_id", "parentTransactionId")),
+)
+
+# Trace fields that usage_metadata overrides even when its value is invalid
+_TRACE_TYPE_KEYS = ("trace_type", "traceType")
+_TRACE_NAME_KEYS = ("trace_name", "traceName")
+
+
+class NormalizedMetadata(dict):
+    """
+    Read-only payload fragment compiled from a usage_metadata dict.
+
+    It is a dict so records holding it stay JSON-serializable for the spool.
+    ``env_overrides`` lists the environment-backed fields usage_metadata set,
+    including ones dropped by validation, so environment defaults never
+    replace them. It is not part of the dict, so records also carry it as
+    ``usage_metadata_overrides`` for when they are reloaded from disk.
+    """
+
+    __slots__ = ("env_overrides",)
+
+    def __init__(self, fields: Dict[str, Any], env_overrides: FrozenSet[str] = frozenset()):
+        super().__init__(fields)
+        self.env_overrides = env_overrides
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("NormalizedMetadata is read-only")
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (NormalizedMetadata, (dict(self), self.env_overrides))
+
+
+EMPTY_METADATA = NormalizedMetadata({})
+
+
+def _first(usage_metadata: Mapping[str, Any], keys) -> Any:
+    for key in keys:
+        value = usage_metadata.get(key)
+        if value:
+            return value
+    return None
+
+
+def _build_subscriber(usage_metadata: Mapping[str, Any]) -> Dict[str, Any]:
+    """Build the subscriber object from the nested or the deprecated flat keys."""
+    # Prefer nested format if present (recommended structure)
+    if "subscriber" in usage_metadata:
+        nested_subscriber = usage_metadata["subscriber"]
+        if isinstance(nested_subscriber, dict):
+            logger.debug("Using nested subscriber format (recommended)")
+            return _deep_copy(nested_subscriber)
+        return {}
+
+    # Fall back to flat keys for backward compatibility
+    subscriber_data = {}
+    flat_keys_used = []
+
+    subscriber_id = usage_metadata.get("subscriber_id")
+    subscriber_email = usage_metadata.get("subscriber_email")
+    credential_name = usage_metadata.get("subscriber_credential_name")
+    credential_value = usage_metadata.get("subscriber_credential")
+
+    if subscriber_id:
+        subscriber_data["id"] = subscriber_id
+        flat_keys_used.append("subscriber_id")
+    if subscriber_email:
+        subscriber_data["email"] = subscriber_email
+        flat_keys_used.append("subscriber_email")
+
+    # Add credential sub-object if credential data is provided
+    credential_data = {}
+    if credential_name:
+        credential_data["name"] = credential_name
+        flat_keys_used.append("subscriber_credential_name")
+    if credential_value:
+        credential_data["value"] = credential_value
+        flat_keys_used.append("subscriber_credential")
+
+    if credential_data:
+        subscriber_data["credential"] = credential_data
+
+    # Log deprecation warning if flat keys were used (once per distinct dict,
+    # since compiled fragments are cached)
+    if flat_keys_used:
+        logger.warning(
+            f"Flat subscriber keys are deprecated: {flat_keys_used}. "
+            "Please use nested 'subscriber' object format: "
+            "{'subscriber': {'id': '...', 'email': '...', 'credential': {'name': '...', 'value': '...'}}}"
+        )
+    return subscriber_data
+
+
+def _deep_copy(value: Any) -> Any:
+    """Copy nested dicts and lists so the fragment shares nothing with the caller."""
+    if isinstance(value, dict):
+        return {key: _deep_copy(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_deep_copy(item) for item in value]
+    return value
+
+
+def compile_usage_metadata(usage_metadata: Optional[Mapping[str, Any]]) -> NormalizedMetadata:
+    """
+    Compile usage_metadata into a payload fragment, without caching.
+
+    Args:
+        usage_metadata: Caller-supplied metadata
+
+    Returns:
+        Completion fields derived from usage_metadata
+    """
+    if not usage_metadata:
+        return EMPTY_METADATA
+
+    fields: Dict[str, Any] = {}
+    overrides = set()
+
+    for field in _PLAIN_FIELDS:
+        value = usage_metadata.get(field)
+        if value:
+            fields[field] = _deep_copy(value)
+    for field, keys in _ALIASED_FIELDS:
+        value = _first(usage_metadata, keys)
+        if value:
+            fields[field] = value
+
+    # Trace type and name from usage_metadata are validated; an invalid value
+    # still overrides the environment default
+    trace_type = _first(usage_metadata, _TRACE_TYPE_KEYS)
+    if trace_type:
+        overrides.add("trace_type")
+        trace_type = trace_fields.validate_trace_type(trace_type)
+        if trace_type:
+            fields["trace_type"] = trace_type
+    trace_name = _first(usage_metadata, _TRACE_NAME_KEYS)
+    if trace_name:
+        overrides.add("trace_name")
+        trace_name = trace_fields.validate_trace_name(trace_name)
+        if trace_name:
+            fields["trace_name"] = trace_name
+
+    # Transaction name (with fallback to task_type); the environment value,
+    # if set, takes priority and is applied by build_completion_args
+    transaction_name = trace_fields.get_transaction_name_from_metadata(usage_metadata)
+    if transaction_name:
+        fields["transaction_name"] = transaction_name
+
+    subscriber = _build_subscriber(usage_metadata)
+    if subscriber:
+        fields["subscriber"] = subscriber
+
+    return NormalizedMetadata(fields, frozenset(overrides))
+
+
+# id(usage_metadata) -> (deep copy of the dict when compiled, fragment)
+_cache: "OrderedDict[int, Tuple[Dict[str, Any], NormalizedMetadata]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_usage_metadata(usage_metadata: Optional[Mapping[str, Any]]) -> NormalizedMetadata:
+    """
+    Return the cached payload fragment for usage_metadata, compiling it on a miss.
+
+    Fragments are keyed by the dict's identity and only reused while the dict
+    still equals the copy taken when it was compiled, so a mutated (or
+    recycled) dict is simply compiled again.
+
+    Args:
+        usage_metadata: Caller-supplied metadata, or an already normalized fragment
+
+    Returns:
+        A read-only NormalizedMetadata fragment
+    """
+    if isinstance(usage_metadata, NormalizedMetadata):
+        return usage_metadata
+    if not usage_metadata:
+        return EMPTY_METADATA
+
+    key = id(usage_metadata)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            try:
+                unchanged = entry[0] == usage_metadata
+            except Exception:
+                unchanged = False
+            if unchanged:
+                _cache.move_to_end(key)
+                _cache_stats["hits"] += 1
+                return entry[1]
+
+    compiled = compile_usage_metadata(usage_metadata)
+    snapshot = _deep_copy(usage_metadata)
+    with _cache_lock:
+        _cache_stats["misses"] += 1
+        _cache[key] = (snapshot, compiled)
+        _cache.move_to_end(key)
+        if len(_cache) > METADATA_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def get_metadata_cache_stats() -> Dict[str, int]:
+    """Return normalization cache hits, misses and current size."""
+    with _cache_lock:
+        return {
+            "metadata_cache_hits": _cache_stats["hits"],
+            "metadata_cache_misses": _cache_stats["misses"],
+            "metadata_cache_size": len(_cache),
+        }
+
+
+def clear_metadata_cache() -> None:
+    """Drop all cached fragments and reset the counters."""
+    with _cache_lock:
+        _cache.clear()
+        _cache_stats["hits"] = 0
+        _cache_stats["misses"] = 0
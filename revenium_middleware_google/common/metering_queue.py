@@ -0,0 +1,381 @@
+"""
+Bounded queue for pending metering records.
+
+Sits between the SDK wrappers and the metering sender so that a slow or
+unavailable Revenium endpoint can never grow memory without limit. When the
+queue is full, the configured overflow policy decides what happens to the
+new record, and every dropped record is counted.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, BinaryIO, Deque, Dict, List, Optional
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+Record = Dict[str, Any]
+
+
+class OverflowPolicy(str, Enum):
+    """What to do with a new record when the metering queue is full."""
+
+    DROP_OLDEST = "drop_oldest"  # Evict the oldest queued record
+    DROP_NEWEST = "drop_newest"  # Reject the new record
+    BLOCK = "block"  # Wait up to block_timeout for space, then reject
+    SPILL = "spill"  # Append the new record to a file on disk
+
+    @classmethod
+    def parse(cls, value: Any) -> "OverflowPolicy":
+        """Parse a policy from an enum member or a string like 'drop-oldest'."""
+        if isinstance(value, cls):
+            return value
+        try:
+            return cls(str(value).strip().lower().replace("-", "_"))
+        except ValueError:
+            logger.warning(
+                "Invalid metering overflow policy %r, defaulting to %s",
+                value,
+                cls.DROP_NEWEST.value,
+            )
+            return cls.DROP_NEWEST
+
+
+class MeteringQueue:
+    """
+    Thread-safe bounded FIFO of metering records.
+
+    The queue's condition variable is exposed as ``cond`` so a consumer can
+    wait for records and call the ``*_locked`` helpers while holding it.
+    ``not_empty`` shares its lock and wakes a single waiting consumer per
+    record, so a pool of consumers is not woken all at once.
+
+    Spill file I/O never happens under ``cond``: the file is append-only,
+    read back from a stored offset by ``reload_spill`` and truncated once
+    everything in it has been read. Without a ``spill_path`` it is an
+    anonymous temporary file that goes away with the process.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        policy: OverflowPolicy = OverflowPolicy.DROP_NEWEST,
+        block_timeout: float = 0.1,
+        spill_path: Optional[str] = None,
+    ):
+        self.capacity = max(1, int(capacity))
+        self.policy = OverflowPolicy.parse(policy)
+        self.block_timeout = max(0.0, float(block_timeout))
+        self.spill_path = spill_path
+        # Guards the spill file and read offset; never held together with
+        # cond while doing I/O
+        self._spill_lock = threading.Lock()
+        self._spill_file: Optional[BinaryIO] = None
+        self._spill_offset = 0
+        lock = threading.RLock()
+        self.cond = threading.Condition(lock)
+        self.not_empty = threading.Condition(lock)
+        self._items: Deque[Record] = deque()
+        self._oldest: Optional[float] = None
+        self._closed = False
+
+        # Counters
+        self.accepted = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.dropped_timeout = 0
+        self.dropped_closed = 0
+        self.spilled = 0
+        self.spill_errors = 0
+        self.spill_pending = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def dropped(self) -> int:
+        """Total number of records dropped for any reason."""
+        return (
+            self.dropped_oldest
+            + self.dropped_newest
+            + self.dropped_timeout
+            + self.dropped_closed
+            + self.spill_errors
+        )
+
+    @property
+    def oldest_enqueued_at(self) -> Optional[float]:
+        """Monotonic time at which the oldest queued record was added."""
+        return self._oldest
+
+    def put(self, record: Record, block: bool = True) -> bool:
+        """
+        Add a record, applying the overflow policy if the queue is full.
+
+        Args:
+            record: The metering record
+            block: If False, the ``block`` policy does not wait for space
+                   (used from event loop threads, which must never block)
+
+        Returns:
+            True if the record was queued (or spilled to disk), False if dropped
+        """
+        with self.cond:
+            if self._closed:
+                self.dropped_closed += 1
+                return False
+
+            full = len(self._items) >= self.capacity
+            if full and self.policy != OverflowPolicy.SPILL:
+                if not self._make_room_locked(block):
+                    return False
+                full = False
+
+            if not full:
+                if not self._items:
+                    self._oldest = time.monotonic()
+                self._items.append(record)
+                self.accepted += 1
+                self.cond.notify_all()
+                self.not_empty.notify()
+                return True
+
+        # Written outside cond so producers and workers never wait on the disk
+        return self._spill(record)
+
+    def take_locked(self, max_items: int) -> List[Record]:
+        """
+        Remove up to ``max_items`` records. Caller must hold ``cond``.
+
+        Spilled records are not read here: when this returns nothing while
+        ``has_items_locked`` is true, call ``reload_spill`` without ``cond``.
+        """
+        count = min(len(self._items), max_items)
+        batch = [self._items.popleft() for _ in range(count)]
+        self._oldest = time.monotonic() if self._items else None
+        if count:
+            # Wake producers blocked on a full queue
+            self.cond.notify_all()
+        return batch
+
+    def requeue_locked(self, records: List[Record]) -> int:
+        """
+        Put records that failed to send back at the head, in their order.
+
+        They were taken before anything queued since, so they are sent first
+        again. Requeues only use free capacity and never evict newer records;
+        when not all fit, the oldest are kept. Caller must hold ``cond``.
+
+        Returns:
+            How many of the records were requeued
+        """
+        if self._closed:
+            return 0
+        count = max(0, min(len(records), self.capacity - len(self._items)))
+        if count:
+            self._items.extendleft(reversed(records[:count]))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self.cond.notify_all()
+            self.not_empty.notify()
+        return count
+
+    def has_items_locked(self) -> bool:
+        """Whether records are waiting in memory or on disk. Caller must hold ``cond``."""
+        return bool(self._items) or self.spill_pending > 0
+
+    def close(self) -> None:
+        """Reject further records and wake any blocked producers."""
+        with self.cond:
+            self._closed = True
+            self.cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of queue size and drop counters."""
+        with self.cond:
+            return {
+                "queued": len(self._items),
+                "capacity": self.capacity,
+                "overflow_policy": self.policy.value,
+                "accepted": self.accepted,
+                "dropped": self.dropped,
+                "dropped_oldest": self.dropped_oldest,
+                "dropped_newest": self.dropped_newest,
+                "dropped_timeout": self.dropped_timeout,
+                "dropped_closed": self.dropped_closed,
+                "spilled": self.spilled,
+                "spill_errors": self.spill_errors,
+                "spill_pending": self.spill_pending,
+            }
+
+    def _make_room_locked(self, block: bool = True) -> bool:
+        """Apply a drop/block overflow policy. Returns False if the new record is dropped."""
+        if self.policy == OverflowPolicy.DROP_OLDEST:
+            self._items.popleft()
+            self.dropped_oldest += 1
+            self._log_drop("oldest")
+            return True
+
+        if self.policy == OverflowPolicy.BLOCK:
+            deadline = time.monotonic() + (self.block_timeout if block else 0.0)
+            while len(self._items) >= self.capacity and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            if self._closed:
+                self.dropped_closed += 1
+                return False
+            if len(self._items) >= self.capacity:
+                self.dropped_timeout += 1
+                self._log_drop("timeout")
+                return False
+            return True
+
+        self.dropped_newest += 1
+        self._log_drop("newest")
+        return False
+
+    def reload_spill(self) -> int:
+        """
+        Move up to ``capacity`` spilled records back into memory.
+
+        Reads from the stored offset, so each spilled record is read once.
+        Must be called without holding ``cond``.
+
+        Returns:
+            How many records were reloaded
+        """
+        with self._spill_lock:
+            with self.cond:
+                wanted = min(self.spill_pending, self.capacity - len(self._items))
+            if wanted <= 0:
+                return 0
+            lines: List[bytes] = []
+            error: Optional[OSError] = None
+            try:
+                spill_file = self._open_spill_locked()
+                spill_file.seek(self._spill_offset)
+                for _ in range(wanted):
+                    line = spill_file.readline()
+                    if not line:
+                        break
+                    lines.append(line)
+                self._spill_offset = spill_file.tell()
+                if self._spill_offset >= spill_file.seek(0, os.SEEK_END):
+                    # Everything written has been read: start the file over
+                    spill_file.truncate(0)
+                    self._spill_offset = 0
+            except OSError as e:
+                error = e
+
+        records = []
+        corrupt = 0
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                corrupt += 1
+
+        with self.cond:
+            if error is not None or not lines:
+                logger.warning(
+                    "Could not read metering spill file %s: %s",
+                    self._spill_name(),
+                    error or "spilled records missing",
+                )
+                self.spill_errors += self.spill_pending
+                self.spill_pending = 0
+                return 0
+            self.spill_pending -= len(lines)
+            self.spill_errors += corrupt
+            if records:
+                if not self._items:
+                    self._oldest = time.monotonic()
+                self._items.extend(records)
+                self.cond.notify_all()
+                self.not_empty.notify()
+        logger.debug("Reloaded %d spilled metering records", len(records))
+        return len(records)
+
+    def close_spill(self) -> None:
+        """
+        Close the spill file once consumers have stopped.
+
+        A ``spill_path`` file is removed if nothing is left in it; the
+        default temporary file is always gone with its handle.
+        """
+        with self._spill_lock:
+            if self._spill_file is None:
+                return
+            try:
+                self._spill_file.close()
+            except OSError:
+                pass
+            self._spill_file = None
+            with self.cond:
+                pending = self.spill_pending
+            if self.spill_path is not None and not pending:
+                try:
+                    os.remove(self.spill_path)
+                except OSError:
+                    pass
+
+    def _spill(self, record: Record) -> bool:
+        """Append a record to the spill file. Returns False if writing failed."""
+        error: Optional[Exception] = None
+        try:
+            line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+            with self._spill_lock:
+                spill_file = self._open_spill_locked()
+                spill_file.seek(0, os.SEEK_END)
+                spill_file.write(line)
+                spill_file.flush()
+        except (OSError, TypeError, ValueError) as e:
+            error = e
+
+        with self.cond:
+            if error is not None:
+                self.spill_errors += 1
+                logger.warning(
+                    "Could not spill metering record to %s: %s", self._spill_name(), error
+                )
+                return False
+            self.spilled += 1
+            self.spill_pending += 1
+            self.accepted += 1
+            self.not_empty.notify()
+        return True
+
+    def _open_spill_locked(self) -> BinaryIO:
+        """Open the spill file on first use. Caller must hold ``_spill_lock``."""
+        if self._spill_file is None:
+            if self.spill_path is None:
+                # Unlinked right away where the OS allows it, so the file
+                # cannot outlive the process even if it is killed
+                self._spill_file = tempfile.TemporaryFile(
+                    prefix="revenium-metering-spill-", suffix=".jsonl"
+                )
+            else:
+                # Private to this process: earlier contents are discarded
+                self._spill_file = open(self.spill_path, "w+b")
+            self._spill_offset = 0
+        return self._spill_file
+
+    def _spill_name(self) -> str:
+        return self.spill_path or "temporary file"
+
+    def _log_drop(self, kind: str) -> None:
+        total = self.dropped
+        if total == 1 or total % 1000 == 0:
+            logger.warning(
+                "Metering queue full (%d records), dropped %s record; %d dropped so far",
+                self.capacity,
+                kind,
+                total,
+            )
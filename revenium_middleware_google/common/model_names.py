@@ -0,0 +1,157 @@
+"""
+Model name resolution.
+
+Vertex AI reports model names in several forms: bare ids
+("gemini-1.5-pro"), short paths ("models/...", "publishers/google/models/...")
+and full resource names
+("projects/p/locations/us-central1/publishers/google/models/gemini-1.5-pro").
+``normalize_model_name`` parses all of them down to the model id and is
+memoized per string with a bounded LRU.
+
+``resolve_instance_model_name`` finds the model name on a model instance
+(GenerativeModel, TextEmbeddingModel) and remembers the result per instance,
+keyed weakly so the cache never keeps a model alive. A repeated call on the
+same instance is one attribute read and an identity check.
+"""
+
+import functools
+import logging
+import re
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+# Distinct raw model name strings kept in the LRU
+MODEL_NAME_CACHE_SIZE = 1024
+
+# Instance attributes that may hold the model name, in priority order
+INSTANCE_MODEL_ATTRS = (
+    "_model_name",
+    "model_name",
+    "_model_id",
+    "model_id",
+    "_model",
+    "model",
+)
+
+# Extract from string like "GenerativeModel(model_name='gemini-2.0-flash-lite-001')"
+_REPR_MODEL_NAME = re.compile(r"model_name='([^']+)'")
+# Extract from string like "models/gemini-2.0-flash-lite-001"
+_REPR_MODELS_PATH = re.compile(r"models/([^'\s)]+)")
+
+
+@functools.lru_cache(maxsize=MODEL_NAME_CACHE_SIZE)
+def normalize_model_name(model_name: str) -> str:
+    """
+    Reduce a model name or resource path to the model id.
+
+    "models/x", "publishers/google/models/x", "google/models/x" and
+    "projects/p/locations/l/[publishers/google/]models/x" all give "x".
+    Other resource paths ("projects/p/locations/l/endpoints/123") give their
+    last "collection/id" pair.
+
+    Args:
+        model_name: Model name as reported by the SDK
+
+    Returns:
+        The model id
+    """
+    if "/" not in model_name:
+        return model_name
+
+    segments = model_name.strip("/").split("/")
+    # The id follows the last "models" collection segment
+    for index in range(len(segments) - 2, -1, -1):
+        if segments[index] == "models":
+            return "/".join(segments[index + 1 :])
+
+    if segments[0] == "projects" and len(segments) >= 2:
+        return "/".join(segments[-2:])
+    return model_name
+
+
+# id(instance) -> (weak reference, attribute name or None, raw value, resolved names)
+_instances: Dict[int, Tuple[Any, Optional[str], Any, Tuple[Any, Any]]] = {}
+_instances_lock = threading.Lock()
+
+
+def _forget(key: int):
+    def _callback(_ref):
+        with _instances_lock:
+            _instances.pop(key, None)
+
+    return _callback
+
+
+def _find_on_instance(instance: Any) -> Tuple[Optional[str], Any]:
+    """Return the first model attribute present on instance and its value."""
+    for attr in INSTANCE_MODEL_ATTRS:
+        if hasattr(instance, attr):
+            value = getattr(instance, attr)
+            logger.debug("Found model name in instance.%s: %s", attr, value)
+            return attr, value
+    return None, None
+
+
+def _from_repr(instance: Any) -> Optional[str]:
+    """Parse the model name out of the instance's string representation."""
+    instance_str = str(instance)
+    match = _REPR_MODEL_NAME.search(instance_str)
+    if match is None:
+        match = _REPR_MODELS_PATH.search(instance_str)
+    if match is None:
+        return None
+    logger.debug("Extracted model name from instance string: %s", match.group(1))
+    return match.group(1)
+
+
+def _resolve(instance: Any) -> Tuple[Optional[str], Any, Tuple[Any, Any]]:
+    attr, raw = _find_on_instance(instance)
+    if raw:
+        name = raw
+    else:
+        logger.debug("Could not find model name in instance, parsing its repr")
+        name = _from_repr(instance)
+    if isinstance(name, str):
+        return attr, raw, (name, normalize_model_name(name))
+    return attr, raw, (name, name)
+
+
+def resolve_instance_model_name(instance: Any, strip_prefix: bool = True) -> Optional[Any]:
+    """
+    Find the model name on a Vertex AI model instance.
+
+    Args:
+        instance: GenerativeModel or TextEmbeddingModel instance
+        strip_prefix: Reduce resource paths such as
+            "publishers/google/models/x" to the model id
+
+    Returns:
+        The model name, or None if it could not be found
+    """
+    key = id(instance)
+    entry = _instances.get(key)
+    if entry is not None:
+        ref, attr, raw, names = entry
+        # Reuse while the instance is alive and its model attribute is unchanged
+        if ref() is instance and (attr is None or getattr(instance, attr, None) is raw):
+            return names[1] if strip_prefix else names[0]
+
+    attr, raw, names = _resolve(instance)
+    try:
+        ref = weakref.ref(instance, _forget(key))
+    except TypeError:
+        # Not weak-referenceable: resolve every time
+        return names[1] if strip_prefix else names[0]
+    with _instances_lock:
+        _instances[key] = (ref, attr, raw, names)
+    return names[1] if strip_prefix else names[0]
+
+
+def clear_model_name_cache() -> None:
+    """Drop all memoized instance and string model names."""
+    with _instances_lock:
+        _instances.clear()
+    normalize_model_name.cache_clear()
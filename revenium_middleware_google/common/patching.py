@@ -0,0 +1,99 @@
+"""
+Deferred SDK patching.
+
+The middleware never imports google.genai or vertexai itself. Wrappers are
+registered as wrapt post-import hooks and applied the moment the application
+imports the SDK module (or immediately, if it already has), so importing
+revenium_middleware_google costs nothing for SDKs that are never used.
+"""
+
+import logging
+import threading
+from types import ModuleType
+from typing import Callable, List
+
+import wrapt
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+# "module.Attribute.path" of every wrapper applied so far
+_applied: List[str] = []
+_applied_lock = threading.Lock()
+
+
+def wrap_function(module: ModuleType, name: str, wrapper: Callable) -> None:
+    """
+    Wrap ``module.name`` with a wrapt wrapper now and record it as applied.
+
+    Args:
+        module: Imported module holding the target
+        name: Dotted attribute path, e.g. "GenerativeModel.generate_content"
+        wrapper: wrapt wrapper function (wrapped, instance, args, kwargs)
+    """
+    wrapt.wrap_function_wrapper(module, name, wrapper)
+    with _applied_lock:
+        _applied.append(f"{module.__name__}.{name}")
+
+
+def patch_when_imported(
+    module_name: str, name: str, optional: bool = False
+) -> Callable[[Callable], Callable]:
+    """
+    Decorator that wraps ``module_name.name`` once the application imports module_name.
+
+    Like ``wrapt.patch_function_wrapper``, the decorator returns the wrapper
+    function unchanged, but never imports the module itself. Errors while
+    patching are logged instead of raised, since they surface inside the
+    application's own import statement.
+
+    Args:
+        module_name: Module holding the target, e.g. "google.genai.models"
+        name: Dotted attribute path, e.g. "Models.generate_content"
+        optional: Only log at debug level if the attribute doesn't exist
+            (for methods missing from older SDK versions)
+
+    Returns:
+        A decorator for a wrapt wrapper function
+    """
+
+    def decorator(wrapper: Callable) -> Callable:
+        def apply(module):
+            try:
+                wrap_function(module, name, wrapper)
+            except AttributeError:
+                log = logger.debug if optional else logger.warning
+                log("%s.%s not available to wrap", module_name, name)
+                return
+            except Exception as e:
+                logger.warning("Could not wrap %s.%s: %s", module_name, name, e)
+                return
+            logger.debug("Applied wrapper to %s.%s", module_name, name)
+
+        wrapt.register_post_import_hook(apply, module_name)
+        return wrapper
+
+    return decorator
+
+
+def when_imported(module_name: str, hook: Callable) -> None:
+    """
+    Call hook(module) once the application imports module_name.
+
+    Args:
+        module_name: Module to wait for
+        hook: Called with the module; exceptions are logged, not raised
+    """
+
+    def guarded(module):
+        try:
+            hook(module)
+        except Exception as e:
+            logger.warning("Post-import hook for %s failed: %s", module_name, e)
+
+    wrapt.register_post_import_hook(guarded, module_name)
+
+
+def get_applied_patches() -> List[str]:
+    """Return the targets wrapped so far, in the order they were patched."""
+    with _applied_lock:
+        return list(_applied)
@@ -6,9 +6,11 @@ of API responses from Google AI and Vertex AI SDKs, improving type safety
 and enabling better static analysis.
 """
 
-from typing import Protocol, Optional, List, Any, Union
+from typing import Protocol, Optional, List, Any, Sequence, Union
 from typing_extensions import runtime_checkable
 
+from .accessors import read_attrs
+
 
 @runtime_checkable
 class UsageMetadataProtocol(Protocol):
@@ -148,25 +150,36 @@ def has_usage_metadata(response: Any) -> bool:
     ) or (hasattr(response, "usage") and response.usage is not None)
 
 
+# Token count attribute names, by field, in priority order
+TOKEN_COUNT_ATTRS = (
+    "total_token_count",
+    "total_tokens",
+    "prompt_token_count",
+    "prompt_tokens",
+    "input_tokens",
+    "candidates_token_count",
+    "completion_tokens",
+    "output_tokens",
+)
+INPUT_TOKEN_ATTRS = ("prompt_token_count", "prompt_tokens", "input_tokens")
+OUTPUT_TOKEN_ATTRS = ("candidates_token_count", "completion_tokens", "output_tokens")
+TOTAL_TOKEN_ATTRS = ("total_token_count", "total_tokens")
+CACHED_TOKEN_ATTRS = ("cached_content_token_count", "cached_tokens")
+
+
 def has_token_counts(usage: Any) -> bool:
     """Check if usage object has token count information."""
     if not usage:
         return False
 
-    # Check for any token count attributes
-    token_attrs = [
-        "total_token_count",
-        "total_tokens",
-        "prompt_token_count",
-        "prompt_tokens",
-        "input_tokens",
-        "candidates_token_count",
-        "completion_tokens",
-        "output_tokens",
-    ]
+    values = read_attrs(usage, TOKEN_COUNT_ATTRS)
+    if values is not None:
+        return any(isinstance(value, int) and value > 0 for value in values)
 
+    # Unknown shape: check for any token count attributes
     return any(
-        hasattr(usage, attr) and getattr(usage, attr, 0) > 0 for attr in token_attrs
+        hasattr(usage, attr) and getattr(usage, attr, 0) > 0
+        for attr in TOKEN_COUNT_ATTRS
     )
 
 
@@ -179,13 +192,44 @@ def safe_getattr(obj: Any, attr: str, default: Any = None) -> Any:
         return default
 
 
-def get_token_count(usage: Any, attr_names: List[str]) -> int:
+def first_attr(obj: Any, attr_names: Sequence[str], default: Any = None) -> Any:
+    """Return the first truthy attribute of obj among attr_names."""
+    names = attr_names if type(attr_names) is tuple else tuple(attr_names)
+    values = read_attrs(obj, names)
+    if values is None:
+        values = (safe_getattr(obj, name) for name in names)
+    for value in values:
+        if value:
+            return value
+    return default
+
+
+def read_attr(obj: Any, name: str, default: Any = None) -> Any:
+    """Return obj's attribute name, or default if obj doesn't have it."""
+    values = read_attrs(obj, (name,))
+    if values is None:
+        return safe_getattr(obj, name, default)
+    return values[0] if values else default
+
+
+def get_finish_reason(response: Any) -> Any:
+    """Return the finish reason of response's first candidate, or None."""
+    candidates = read_attr(response, "candidates")
+    if not candidates:
+        return None
+    return read_attr(candidates[0], "finish_reason")
+
+
+def get_token_count(usage: Any, attr_names: Sequence[str]) -> int:
     """Get token count from usage object, trying multiple attribute names."""
     if not usage:
         return 0
 
-    for attr_name in attr_names:
-        value = safe_getattr(usage, attr_name, 0)
+    names = attr_names if type(attr_names) is tuple else tuple(attr_names)
+    values = read_attrs(usage, names)
+    if values is None:
+        values = (safe_getattr(usage, name, 0) for name in names)
+    for value in values:
         if isinstance(value, int) and value > 0:
             return value
 
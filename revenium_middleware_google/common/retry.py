@@ -0,0 +1,288 @@
+"""
+Retries of failed metering sends.
+
+A send that fails with an outage error (connection error, timeout, HTTP 429
+or 5xx) is retried up to ``max_retries`` times with the same record, so the
+retry carries the same ``transaction_id`` and Revenium can recognise it as
+the same usage event. Errors that say the record itself is bad (other 4xx)
+are not retried.
+
+Delays use exponential backoff with full jitter: before retry ``n`` the
+sender sleeps a random time between 0 and ``min(max_delay, base_delay *
+2**n)``, raised to the server's ``Retry-After`` when it sends one (still
+capped by ``max_delay``).
+
+Retries also draw on a process-wide budget, so they cannot multiply load on
+Revenium during an incident: every send adds ``budget_ratio`` tokens (up to
+``budget_reserve``), every retry spends one, and a failure with no token
+left is not retried. With the defaults, retries stay within 10% of sends
+once the initial reserve of 10 is spent. Retries also stop once the circuit
+breaker has opened; its probe takes over from there.
+
+The metering clients the middleware creates have the SDK's own retries
+turned off so this policy is the only one in effect.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from .circuit_breaker import get_circuit_breaker, is_outage_error
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+T = TypeVar("T")
+
+ENV_MAX_RETRIES = "REVENIUM_METERING_MAX_RETRIES"
+ENV_RETRY_BASE_DELAY = "REVENIUM_METERING_RETRY_BASE_DELAY"
+ENV_RETRY_MAX_DELAY = "REVENIUM_METERING_RETRY_MAX_DELAY"
+ENV_RETRY_BUDGET_RATIO = "REVENIUM_METERING_RETRY_BUDGET_RATIO"
+ENV_RETRY_BUDGET_RESERVE = "REVENIUM_METERING_RETRY_BUDGET_RESERVE"
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 0.2  # seconds
+DEFAULT_MAX_DELAY = 10.0  # seconds
+DEFAULT_BUDGET_RATIO = 0.1
+DEFAULT_BUDGET_RESERVE = 10.0
+
+
+def _env_number(name: str, default: float, cast: Callable[[str], Any]) -> Any:
+    try:
+        return cast(os.getenv(name, default))
+    except ValueError:
+        logger.warning("Invalid %s value, defaulting to %s", name, default)
+        return default
+
+
+@dataclass
+class RetryConfig:
+    """Settings for retrying failed metering sends."""
+
+    max_retries: int = DEFAULT_MAX_RETRIES
+    base_delay: float = DEFAULT_BASE_DELAY
+    max_delay: float = DEFAULT_MAX_DELAY
+    budget_ratio: float = DEFAULT_BUDGET_RATIO
+    budget_reserve: float = DEFAULT_BUDGET_RESERVE
+
+    def __post_init__(self):
+        self.max_retries = max(0, int(self.max_retries))
+        self.base_delay = max(0.0, float(self.base_delay))
+        self.max_delay = max(self.base_delay, float(self.max_delay))
+        self.budget_ratio = max(0.0, float(self.budget_ratio))
+        self.budget_reserve = max(0.0, float(self.budget_reserve))
+
+    @classmethod
+    def from_env(cls) -> "RetryConfig":
+        """Create a config from REVENIUM_METERING_*RETR* environment variables."""
+        return cls(
+            max_retries=_env_number(ENV_MAX_RETRIES, DEFAULT_MAX_RETRIES, int),
+            base_delay=_env_number(ENV_RETRY_BASE_DELAY, DEFAULT_BASE_DELAY, float),
+            max_delay=_env_number(ENV_RETRY_MAX_DELAY, DEFAULT_MAX_DELAY, float),
+            budget_ratio=_env_number(
+                ENV_RETRY_BUDGET_RATIO, DEFAULT_BUDGET_RATIO, float
+            ),
+            budget_reserve=_env_number(
+                ENV_RETRY_BUDGET_RESERVE, DEFAULT_BUDGET_RESERVE, float
+            ),
+        )
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked to wait in a Retry-After header, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP-date form; the backoff delay is used instead
+        return None
+
+
+class RetryPolicy:
+    """
+    Thread-safe retry policy shared by every metering send path.
+
+    Senders call ``call`` (or ``call_async``) with a function making one
+    attempt; the policy decides whether and when to try again.
+    """
+
+    def __init__(
+        self, config: Optional[RetryConfig] = None, rng: Optional[random.Random] = None
+    ):
+        self.config = config or RetryConfig()
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._tokens = self.config.budget_reserve
+
+        # Counters
+        self.retries = 0
+        self.recovered = 0
+        self.gave_up = 0
+        self.budget_exhausted = 0
+
+    def record_send(self) -> None:
+        """Credit the budget for a first attempt."""
+        with self._lock:
+            self._tokens = min(
+                self.config.budget_reserve, self._tokens + self.config.budget_ratio
+            )
+
+    def backoff(self, retry: int, error: Optional[BaseException] = None) -> float:
+        """
+        Seconds to wait before retry number ``retry`` (0-based).
+
+        Full jitter over the exponential ceiling, raised to the server's
+        Retry-After when given; never more than max_delay.
+        """
+        ceiling = min(self.config.max_delay, self.config.base_delay * 2**retry)
+        delay = self._rng.uniform(0, ceiling)
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            delay = max(delay, requested)
+        return min(delay, self.config.max_delay)
+
+    def retry_delay(self, error: BaseException, retry: int) -> Optional[float]:
+        """
+        Decide whether to retry after a failed attempt.
+
+        Args:
+            error: The error the attempt failed with
+            retry: Retries already made for this record
+
+        Returns:
+            Seconds to wait before retrying, or None to give up
+        """
+        if not is_outage_error(error):
+            return None
+        if retry >= self.config.max_retries:
+            if self.config.max_retries:
+                with self._lock:
+                    self.gave_up += 1
+            return None
+        if not get_circuit_breaker().is_closed:
+            # The breaker now holds records and probes the endpoint itself
+            return None
+        with self._lock:
+            if self._tokens < 1:
+                self.budget_exhausted += 1
+                logger.debug("Metering retry budget exhausted; not retrying")
+                return None
+            self._tokens -= 1
+            self.retries += 1
+        return self.backoff(retry, error)
+
+    def _log_retry(self, error: BaseException, retry: int, delay: float) -> None:
+        logger.debug(
+            "Metering send failed (%s); retry %d/%d in %.2fs",
+            error,
+            retry + 1,
+            self.config.max_retries,
+            delay,
+        )
+
+    def _record_recovered(self, retries: int) -> None:
+        if retries:
+            with self._lock:
+                self.recovered += 1
+
+    def call(
+        self, attempt: Callable[[], T], interrupt: Optional[threading.Event] = None
+    ) -> T:
+        """
+        Run ``attempt`` until it succeeds or the policy gives up.
+
+        Args:
+            attempt: Makes one send and raises on failure
+            interrupt: Event that cuts a backoff wait short (shutdown); the
+                       last error is raised when it is set
+
+        Returns:
+            The result of the successful attempt
+        """
+        self.record_send()
+        retries = 0
+        while True:
+            try:
+                result = attempt()
+            except Exception as e:
+                delay = self.retry_delay(e, retries)
+                if delay is None:
+                    raise
+                self._log_retry(e, retries, delay)
+                if interrupt is not None:
+                    if interrupt.wait(delay):
+                        raise
+                else:
+                    time.sleep(delay)
+                retries += 1
+                continue
+            self._record_recovered(retries)
+            return result
+
+    async def call_async(
+        self,
+        attempt: Callable[[], Awaitable[T]],
+        interrupt: Optional[threading.Event] = None,
+    ) -> T:
+        """Async counterpart of ``call``; waits with asyncio.sleep."""
+        self.record_send()
+        retries = 0
+        while True:
+            try:
+                result = await attempt()
+            except Exception as e:
+                delay = self.retry_delay(e, retries)
+                if delay is None:
+                    raise
+                self._log_retry(e, retries, delay)
+                await asyncio.sleep(delay)
+                if interrupt is not None and interrupt.is_set():
+                    raise
+                retries += 1
+                continue
+            self._record_recovered(retries)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return retry counters and the budget left."""
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "retries_recovered": self.recovered,
+                "retries_gave_up": self.gave_up,
+                "retry_budget_exhausted": self.budget_exhausted,
+                "retry_budget_tokens": round(self._tokens, 2),
+            }
+
+
+# Process-wide policy shared by every metering send path
+_policy: Optional[RetryPolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Return the process-wide retry policy, configured from the environment on first use."""
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                _policy = RetryPolicy(RetryConfig.from_env())
+    return _policy
+
+
+def install_retry_policy(config: RetryConfig) -> RetryPolicy:
+    """Replace the process-wide retry policy (its budget starts full)."""
+    global _policy
+    with _policy_lock:
+        _policy = RetryPolicy(config)
+    return _policy
@@ -0,0 +1,283 @@
+"""
+Durable write-ahead spool for metering records.
+
+Records are appended to segment files before they are queued for sending,
+and acknowledged once Revenium accepts them. Fully acknowledged segments are
+removed; anything left over (a failed send, a crash, or a shutdown before the
+queue drained) is replayed the next time the spool is opened.
+
+On-disk layout, one pair of files per segment::
+
+    <spool_dir>/<segment>.seg   one JSON record per line
+    <spool_dir>/<segment>.ack   indexes of acknowledged lines, one per line
+
+Appends are plain sequential writes. By default they are not fsynced, so
+records survive a process crash but not necessarily a host crash; use the
+``interval`` or ``always`` fsync policy for stronger guarantees.
+
+Each process needs its own spool directory.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+Record = Dict[str, Any]
+# (segment name, line index within the segment)
+SpoolRef = Tuple[str, int]
+
+SEGMENT_SUFFIX = ".seg"
+ACK_SUFFIX = ".ack"
+DEFAULT_SEGMENT_BYTES = 8 * 1024 * 1024
+DEFAULT_FSYNC_INTERVAL = 1.0  # seconds
+
+
+class FsyncPolicy(str, Enum):
+    """When spool appends are forced to stable storage."""
+
+    NEVER = "never"  # Leave flushing to the OS (default)
+    INTERVAL = "interval"  # fsync at most once per fsync_interval
+    ALWAYS = "always"  # fsync after every append
+
+    @classmethod
+    def parse(cls, value: Any) -> "FsyncPolicy":
+        """Parse a policy from an enum member or a string."""
+        if isinstance(value, cls):
+            return value
+        try:
+            return cls(str(value).strip().lower())
+        except ValueError:
+            logger.warning(
+                "Invalid spool fsync policy %r, defaulting to %s", value, cls.NEVER.value
+            )
+            return cls.NEVER
+
+
+class _Segment:
+    """Bookkeeping for one segment file."""
+
+    __slots__ = ("name", "written", "acked", "closed")
+
+    def __init__(self, name: str, written: int = 0, acked: int = 0, closed: bool = False):
+        self.name = name
+        self.written = written
+        self.acked = acked
+        self.closed = closed
+
+
+class MeteringSpool:
+    """Append-only segment files holding metering records until they are acked."""
+
+    def __init__(
+        self,
+        directory: str,
+        fsync_policy: FsyncPolicy = FsyncPolicy.NEVER,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+    ):
+        self.directory = directory
+        self.fsync_policy = FsyncPolicy.parse(fsync_policy)
+        self.fsync_interval = max(0.0, float(fsync_interval))
+        self.segment_bytes = max(1024, int(segment_bytes))
+        self._lock = threading.Lock()
+        self._segments: Dict[str, _Segment] = {}
+        self._active: Optional[_Segment] = None
+        self._file = None
+        self._last_fsync = time.monotonic()
+        self._counter = 0
+
+        # Counters
+        self.appended = 0
+        self.acked = 0
+        self.replayed = 0
+        self.errors = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.directory, name + suffix)
+
+    def append(self, record: Record) -> Optional[SpoolRef]:
+        """
+        Persist a record before it is sent.
+
+        Returns:
+            A reference to pass to ack(), or None if the write failed
+        """
+        line = json.dumps(record, default=str, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                if self._file is None or self._file.tell() >= self.segment_bytes:
+                    self._rotate_locked()
+                self._file.write(line)
+                self._file.flush()
+                if self.fsync_policy == FsyncPolicy.ALWAYS:
+                    os.fsync(self._file.fileno())
+                elif self.fsync_policy == FsyncPolicy.INTERVAL:
+                    now = time.monotonic()
+                    if now - self._last_fsync >= self.fsync_interval:
+                        os.fsync(self._file.fileno())
+                        self._last_fsync = now
+            except (OSError, ValueError) as e:
+                self.errors += 1
+                logger.warning("Could not append metering record to spool: %s", e)
+                return None
+
+            segment = self._active
+            index = segment.written
+            segment.written += 1
+            self.appended += 1
+            return (segment.name, index)
+
+    def ack(self, refs: Iterable[Optional[SpoolRef]]) -> None:
+        """Mark records as delivered and drop segments that are fully acked."""
+        by_segment: Dict[str, List[int]] = {}
+        for ref in refs:
+            if ref:
+                by_segment.setdefault(ref[0], []).append(int(ref[1]))
+        if not by_segment:
+            return
+
+        with self._lock:
+            for name, indexes in by_segment.items():
+                segment = self._segments.get(name)
+                if segment is None:
+                    continue
+                try:
+                    with open(self._path(name, ACK_SUFFIX), "a", encoding="utf-8") as f:
+                        f.write("".join(f"{i}\n" for i in indexes))
+                except OSError as e:
+                    self.errors += 1
+                    logger.warning("Could not record metering acks in spool: %s", e)
+                    continue
+                segment.acked += len(indexes)
+                self.acked += len(indexes)
+                if segment.acked >= segment.written:
+                    self._release_locked(segment)
+
+    def replay(self) -> List[Tuple[Record, SpoolRef]]:
+        """
+        Load unacknowledged records left by a previous process.
+
+        Returns:
+            (record, ref) pairs; ack each ref once the record is delivered
+        """
+        pending: List[Tuple[Record, SpoolRef]] = []
+        with self._lock:
+            names = sorted(
+                entry[: -len(SEGMENT_SUFFIX)]
+                for entry in os.listdir(self.directory)
+                if entry.endswith(SEGMENT_SUFFIX)
+            )
+            for name in names:
+                if self._active is not None and name == self._active.name:
+                    continue
+                acked = self._read_acks(name)
+                try:
+                    with open(self._path(name, SEGMENT_SUFFIX), "r", encoding="utf-8") as f:
+                        lines = f.readlines()
+                except OSError as e:
+                    self.errors += 1
+                    logger.warning("Could not read metering spool segment %s: %s", name, e)
+                    continue
+
+                segment = _Segment(name, written=len(lines), acked=0, closed=True)
+                self._segments[name] = segment
+                for index, line in enumerate(lines):
+                    if index in acked:
+                        segment.acked += 1
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final write from a crash; nothing to resend
+                        segment.acked += 1
+                        continue
+                    pending.append((record, (name, index)))
+                if segment.acked >= segment.written:
+                    self._release_locked(segment)
+
+            self.replayed += len(pending)
+        if pending:
+            logger.info("Replaying %d metering records from spool", len(pending))
+        return pending
+
+    def close(self) -> None:
+        """Flush and close the active segment."""
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._file.flush()
+                    if self.fsync_policy != FsyncPolicy.NEVER:
+                        os.fsync(self._file.fileno())
+                    self._file.close()
+                except (OSError, ValueError):
+                    pass
+                self._file = None
+            if self._active is not None:
+                self._active.closed = True
+                self._active = None
+
+    def stats(self) -> Dict[str, int]:
+        """Return spool counters."""
+        with self._lock:
+            return {
+                "spool_appended": self.appended,
+                "spool_acked": self.acked,
+                "spool_replayed": self.replayed,
+                "spool_errors": self.errors,
+                "spool_segments": len(self._segments),
+            }
+
+    def _rotate_locked(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._active.closed = True
+            if self._active.acked >= self._active.written:
+                self._release_locked(self._active)
+        self._counter += 1
+        name = f"{time.time_ns():020d}-{os.getpid()}-{self._counter:06d}"
+        self._file = open(self._path(name, SEGMENT_SUFFIX), "a", encoding="utf-8")
+        self._active = _Segment(name)
+        self._segments[name] = self._active
+
+    def _release_locked(self, segment: _Segment) -> None:
+        """Delete a closed, fully acked segment, or truncate the active one."""
+        try:
+            if segment is self._active:
+                self._file.seek(0)
+                self._file.truncate()
+                with open(self._path(segment.name, ACK_SUFFIX), "w"):
+                    pass
+                segment.written = 0
+                segment.acked = 0
+                return
+            for suffix in (SEGMENT_SUFFIX, ACK_SUFFIX):
+                try:
+                    os.remove(self._path(segment.name, suffix))
+                except FileNotFoundError:
+                    pass
+            self._segments.pop(segment.name, None)
+        except OSError as e:
+            self.errors += 1
+            logger.debug("Could not release metering spool segment %s: %s", segment.name, e)
+
+    def _read_acks(self, name: str) -> set:
+        acked = set()
+        try:
+            with open(self._path(name, ACK_SUFFIX), "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.isdigit():
+                        acked.add(int(line))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug("Could not read metering spool acks for %s: %s", name, e)
+        return acked
@@ -0,0 +1,374 @@
+"""
+Shared streaming support for the Google AI and Vertex AI stream wrappers.
+
+``StreamAccumulator`` folds stream chunks into the handful of fields
+metering needs, using SDK-specific ``StreamExtractors``. ``MeteredStream``
+and ``AsyncMeteredStreamMixin`` implement iteration, close and error
+handling once for both SDKs; subclasses only provide ``_meter``.
+
+Everything here is defined at module level with ``__slots__``, so starting a
+stream creates no classes and per-chunk work is a few attribute reads.
+"""
+
+import abc
+import datetime
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .exceptions import StreamingError
+from .latency import StreamLatencyProfile, record_stream_latency
+from .protocols import get_token_count
+from .timing import elapsed_ms
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+Extractor = Callable[[Any], Any]
+
+_OUTPUT_TOKEN_ATTRS = ("candidates_token_count",)
+
+
+def chunk_finish_reason(chunk: Any) -> Any:
+    """Finish reason of the first candidate in a chunk, if any."""
+    try:
+        candidates = chunk.candidates
+        if candidates:
+            return candidates[0].finish_reason
+    except (AttributeError, TypeError, IndexError):
+        pass
+    return None
+
+
+def chunk_usage_metadata(chunk: Any) -> Any:
+    """Usage metadata of a chunk (typically only set on the final chunk)."""
+    try:
+        return chunk.usage_metadata
+    except AttributeError:
+        return None
+
+
+def chunk_model_version(chunk: Any) -> Optional[str]:
+    """Model version reported on a chunk."""
+    try:
+        return chunk.model_version
+    except AttributeError:
+        return None
+
+
+class StreamExtractors:
+    """SDK-specific functions that read metering fields from a stream chunk."""
+
+    __slots__ = ("model", "finish_reason", "usage_metadata")
+
+    def __init__(
+        self,
+        model: Extractor = chunk_model_version,
+        finish_reason: Extractor = chunk_finish_reason,
+        usage_metadata: Extractor = chunk_usage_metadata,
+    ):
+        self.model = model
+        self.finish_reason = finish_reason
+        self.usage_metadata = usage_metadata
+
+
+class StreamedCandidate:
+    """Candidate stand-in carrying the final finish reason of a stream."""
+
+    __slots__ = ("finish_reason",)
+
+    def __init__(self, finish_reason: Any):
+        self.finish_reason = finish_reason
+
+
+class StreamedResponse:
+    """Response stand-in built from an accumulated stream, for usage extraction."""
+
+    __slots__ = ("model_name", "model_version", "usage_metadata", "candidates")
+
+    def __init__(
+        self, model: Optional[str], usage_metadata: Any, candidates: List[StreamedCandidate]
+    ):
+        self.model_name = model
+        self.model_version = model
+        self.usage_metadata = usage_metadata
+        self.candidates = candidates
+
+
+class StreamAccumulator:
+    """
+    Constant-size state for one stream.
+
+    Keeps a chunk counter, the latest model, finish reason and usage
+    metadata, and a latency profile; chunks themselves are never retained.
+    """
+
+    __slots__ = (
+        "extractors",
+        "chunk_count",
+        "model",
+        "finish_reason",
+        "usage_metadata",
+        "latency",
+    )
+
+    def __init__(
+        self,
+        extractors: StreamExtractors,
+        model: Optional[str] = None,
+        start_ns: Optional[int] = None,
+    ):
+        self.extractors = extractors
+        self.chunk_count = 0
+        self.model = model
+        self.finish_reason = None
+        self.usage_metadata = None
+        # start_ns is the request's perf_counter_ns(); chunk times are relative to it
+        self.latency = StreamLatencyProfile(start_ns)
+
+    def add(self, chunk: Any) -> None:
+        """Fold one chunk into the accumulated state."""
+        self.latency.record(time.perf_counter_ns())
+        self.chunk_count += 1
+
+        extractors = self.extractors
+        if self.model is None:
+            self.model = extractors.model(chunk)
+        finish_reason = extractors.finish_reason(chunk)
+        if finish_reason:
+            self.finish_reason = finish_reason
+        usage_metadata = extractors.usage_metadata(chunk)
+        if usage_metadata:
+            self.usage_metadata = usage_metadata
+
+    @property
+    def start_ns(self) -> int:
+        """perf_counter_ns() at the start of the request."""
+        return self.latency.start_ns
+
+    def time_to_first_token(self) -> int:
+        """Milliseconds from the request to the first chunk (0 if none arrived)."""
+        first_ns = self.latency.first_ns
+        if first_ns is None:
+            return 0
+        return elapsed_ms(self.latency.start_ns, first_ns)
+
+    def output_tokens(self) -> int:
+        """Output tokens reported in the latest usage metadata."""
+        return get_token_count(self.usage_metadata, _OUTPUT_TOKEN_ATTRS)
+
+    def latency_profile(self) -> Dict[str, Any]:
+        """Chunk count, inter-chunk gap percentiles, stream time and tokens/sec."""
+        return self.latency.summary(self.chunk_count, self.output_tokens())
+
+    def to_response(self) -> StreamedResponse:
+        """Build a response stand-in for the SDK usage extractors."""
+        return StreamedResponse(
+            model=self.model,
+            usage_metadata=self.usage_metadata,
+            candidates=(
+                [StreamedCandidate(self.finish_reason)] if self.finish_reason else []
+            ),
+        )
+
+
+class MeteredStream(abc.ABC):
+    """
+    Base class for stream wrappers that meter usage once the stream ends.
+
+    Usage is metered exactly once: when the stream is exhausted, when it
+    raises, or when it is closed early. Subclasses implement ``_meter``;
+    one that doesn't fails when it is instantiated.
+    """
+
+    __slots__ = (
+        "stream",
+        "accumulator",
+        "request_time_dt",
+        "metering_metadata",
+        "_closed",
+        "_usage_logged",
+    )
+
+    # SDK name used in log messages
+    sdk_label = "Google AI"
+
+    def __init__(
+        self,
+        stream: Any,
+        extractors: StreamExtractors,
+        request_time_dt: datetime.datetime,
+        metering_metadata: Dict[str, Any],
+        model: Optional[str] = None,
+        request_start_ns: Optional[int] = None,
+    ):
+        self.stream = stream
+        self.accumulator = StreamAccumulator(extractors, model, request_start_ns)
+        self.request_time_dt = request_time_dt
+        self.metering_metadata = metering_metadata
+        self._closed = False
+        self._usage_logged = False
+
+    @property
+    def chunk_count(self) -> int:
+        """Number of chunks received so far."""
+        return self.accumulator.chunk_count
+
+    def latency_profile(self) -> Dict[str, Any]:
+        """Latency profile of the stream so far (see StreamLatencyProfile.summary)."""
+        return self.accumulator.latency_profile()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration("Stream has been closed")
+
+        try:
+            chunk = next(self.stream)
+        except StopIteration:
+            self._finalize()
+            raise
+        except Exception as e:
+            self._handle_error(e)
+            raise
+        self.accumulator.add(chunk)
+        return chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False  # Don't suppress exceptions
+
+    def close(self):
+        """Properly close the stream and clean up resources."""
+        if not self._closed:
+            self._closed = True
+            self._log_usage_on_close()
+
+            # Close underlying stream if it has a close method
+            if hasattr(self.stream, "close"):
+                try:
+                    self.stream.close()
+                except Exception as e:
+                    logger.debug("Error closing underlying %s stream: %s", self.sdk_label, e)
+
+    @abc.abstractmethod
+    def _meter(self, time_to_first_token: int) -> None:
+        """Send the metering record for the accumulated stream."""
+
+    def _log_usage_on_close(self):
+        if not self._usage_logged:
+            try:
+                self._log_usage()
+            except Exception as e:
+                logger.error(
+                    "Error logging usage during %s stream cleanup: %s", self.sdk_label, e
+                )
+
+    def _finalize(self):
+        """Finalize the stream and log usage."""
+        if not self._usage_logged:
+            self._log_usage()
+            self._usage_logged = True
+
+    def _handle_error(self, error: Exception):
+        """Handle errors during streaming."""
+        logger.error("Error in %s streaming response: %s", self.sdk_label, error)
+        if not self._usage_logged:
+            # Try to log partial usage data
+            try:
+                self._log_usage()
+                self._usage_logged = True
+            except Exception as log_error:
+                logger.error(
+                    "Failed to log %s usage after stream error: %s",
+                    self.sdk_label,
+                    log_error,
+                )
+
+    def _log_usage(self):
+        """Log usage after stream completion"""
+        accumulator = self.accumulator
+        try:
+            if not accumulator.chunk_count:
+                logger.warning("No chunks received in %s streaming response", self.sdk_label)
+                return
+
+            time_to_first_token = accumulator.time_to_first_token()
+            self._meter(time_to_first_token)
+            record_stream_latency(
+                accumulator.model,
+                accumulator.latency,
+                accumulator.chunk_count,
+                accumulator.output_tokens(),
+            )
+
+            logger.debug(
+                "%s streaming usage logged: model=%s, chunks=%d, time_to_first_token=%dms",
+                self.sdk_label,
+                accumulator.model,
+                accumulator.chunk_count,
+                time_to_first_token,
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s stream latency profile: %s",
+                    self.sdk_label,
+                    accumulator.latency_profile(),
+                )
+
+        except Exception as e:
+            # Don't let logging errors break the stream
+            logger.error("Error logging %s streaming usage: %s", self.sdk_label, e)
+            raise StreamingError(
+                f"Failed to log {self.sdk_label} streaming usage: {str(e)}",
+                chunk_count=accumulator.chunk_count,
+                stream_state="completed",
+            ) from e
+
+
+class AsyncMeteredStreamMixin:
+    """``async for`` / ``async with`` support for a MeteredStream subclass."""
+
+    __slots__ = ()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+
+        try:
+            chunk = await self.stream.__anext__()
+        except StopAsyncIteration:
+            self._finalize()
+            raise
+        except Exception as e:
+            self._handle_error(e)
+            raise
+        self.accumulator.add(chunk)
+        return chunk
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+        return False  # Don't suppress exceptions
+
+    async def aclose(self):
+        """Properly close the stream and clean up resources."""
+        if not self._closed:
+            self._closed = True
+            self._log_usage_on_close()
+
+            # Close underlying async generator if it has an aclose method
+            if hasattr(self.stream, "aclose"):
+                try:
+                    await self.stream.aclose()
+                except Exception as e:
+                    logger.debug("Error closing underlying %s stream: %s", self.sdk_label, e)
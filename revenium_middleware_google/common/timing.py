@@ -0,0 +1,52 @@
+"""
+Request timing.
+
+Wrappers read the wall clock once per request, as the anchor for reported
+timestamps, together with ``time.perf_counter_ns()``. Durations and time to
+first token come from the monotonic counter, so NTP steps cannot make them
+negative or skewed, and the response time is the anchor plus the monotonic
+elapsed time. Timestamps are formatted with millisecond precision.
+"""
+
+import datetime
+import time
+from typing import Optional
+
+
+def elapsed_ms(start_ns: int, end_ns: Optional[int] = None) -> int:
+    """Whole milliseconds between two perf_counter_ns readings (end defaults to now)."""
+    if end_ns is None:
+        end_ns = time.perf_counter_ns()
+    return max(end_ns - start_ns, 0) // 1_000_000
+
+
+def response_time_from(
+    request_time: datetime.datetime,
+    request_start_ns: Optional[int],
+    end_ns: Optional[int] = None,
+) -> datetime.datetime:
+    """
+    Wall-clock response time derived from the monotonic clock.
+
+    Args:
+        request_time: Wall-clock time captured when the request started
+        request_start_ns: perf_counter_ns() captured alongside request_time;
+            if None, the current wall clock is returned instead
+        end_ns: perf_counter_ns() at the response (defaults to now)
+
+    Returns:
+        request_time plus the monotonic elapsed time
+    """
+    if request_start_ns is None:
+        return datetime.datetime.now(datetime.timezone.utc)
+    if end_ns is None:
+        end_ns = time.perf_counter_ns()
+    elapsed_us = max(end_ns - request_start_ns, 0) // 1000
+    return request_time + datetime.timedelta(microseconds=elapsed_us)
+
+
+def format_timestamp(dt: datetime.datetime) -> str:
+    """Format datetime as an ISO string with millisecond precision for API calls."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
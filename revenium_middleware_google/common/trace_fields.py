@@ -158,7 +158,21 @@ def get_transaction_name(usage_metadata: Optional[Dict[str, Any]] = None) -> Opt
     if transaction_name:
         return transaction_name
 
-    # Second priority: usage_metadata
+    return get_transaction_name_from_metadata(usage_metadata)
+
+
+def get_transaction_name_from_metadata(
+    usage_metadata: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """
+    Get transaction name from usage_metadata, falling back to task_type.
+
+    Args:
+        usage_metadata: Optional metadata dictionary
+
+    Returns:
+        Transaction name or None
+    """
     if usage_metadata:
         transaction_name = (
             usage_metadata.get('transactionName') or
@@ -0,0 +1,530 @@
+"""
+Batching transport for Revenium metering records.
+
+Instead of starting a background thread and event loop for every metered
+call, finished records are put on a bounded MeteringQueue and sent in
+batches by a fixed pool of ``max_in_flight`` long-lived worker threads,
+started on first use. Each worker takes a batch straight from the queue
+once either the batch size or the flush interval is reached and sends it
+itself, so at most ``max_in_flight`` batches are outstanding and a record
+costs one queue put and one worker wake-up.
+
+With batching disabled the same transport runs with a batch size of one, so
+every record still passes through the bounded queue.
+
+While the metering circuit breaker is open the workers send nothing: records
+wait in the queue, and those that failed because the endpoint is down are
+put back on it, until a probe send succeeds.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .circuit_breaker import get_circuit_breaker
+from .metering_queue import MeteringQueue, OverflowPolicy
+from .spool import (
+    DEFAULT_FSYNC_INTERVAL,
+    DEFAULT_SEGMENT_BYTES,
+    FsyncPolicy,
+    MeteringSpool,
+)
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+# Environment variable names
+ENV_BATCH_ENABLED = "REVENIUM_METERING_BATCH_ENABLED"
+ENV_BATCH_SIZE = "REVENIUM_METERING_BATCH_SIZE"
+ENV_BATCH_INTERVAL = "REVENIUM_METERING_BATCH_INTERVAL"
+ENV_MAX_IN_FLIGHT = "REVENIUM_METERING_MAX_IN_FLIGHT"
+ENV_QUEUE_SIZE = "REVENIUM_METERING_QUEUE_SIZE"
+ENV_QUEUE_POLICY = "REVENIUM_METERING_QUEUE_POLICY"
+ENV_QUEUE_BLOCK_TIMEOUT = "REVENIUM_METERING_QUEUE_BLOCK_TIMEOUT"
+ENV_SPILL_PATH = "REVENIUM_METERING_SPILL_PATH"
+ENV_SPOOL_DIR = "REVENIUM_METERING_SPOOL_DIR"
+ENV_SPOOL_FSYNC = "REVENIUM_METERING_SPOOL_FSYNC"
+ENV_SPOOL_FSYNC_INTERVAL = "REVENIUM_METERING_SPOOL_FSYNC_INTERVAL"
+ENV_SPOOL_SEGMENT_BYTES = "REVENIUM_METERING_SPOOL_SEGMENT_BYTES"
+ENV_BATCH_GROUP_PATH = "REVENIUM_METERING_BATCH_GROUP_PATH"
+
+# Defaults
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_QUEUE_POLICY = OverflowPolicy.DROP_NEWEST
+DEFAULT_QUEUE_BLOCK_TIMEOUT = 0.1  # seconds
+
+Record = Dict[str, Any]
+# A batch sender receives a list of records and returns the records that
+# failed to send (or None if all succeeded).
+BatchSender = Callable[[List[Record]], Optional[List[Record]]]
+
+# Key under which a record's spool reference travels through the queue
+SPOOL_REF_KEY = "_spool_ref"
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("true", "1", "yes")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Invalid %s value, defaulting to %d", name, default)
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Invalid %s value, defaulting to %s", name, default)
+        return default
+
+
+@dataclass
+class BatchingConfig:
+    """Tuning knobs for the batching transport and its bounded queue."""
+
+    batch_size: int = DEFAULT_BATCH_SIZE
+    flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    queue_size: int = DEFAULT_QUEUE_SIZE
+    overflow_policy: OverflowPolicy = DEFAULT_QUEUE_POLICY
+    block_timeout: float = DEFAULT_QUEUE_BLOCK_TIMEOUT
+    spill_path: Optional[str] = None
+    spool_dir: Optional[str] = None
+    spool_fsync: FsyncPolicy = FsyncPolicy.NEVER
+    spool_fsync_interval: float = DEFAULT_FSYNC_INTERVAL
+    spool_segment_bytes: int = DEFAULT_SEGMENT_BYTES
+    # Opt-in path on a server that accepts a JSON array of records (the
+    # Revenium API does not document one); batches are sent as one request
+    group_path: Optional[str] = None
+
+    def __post_init__(self):
+        self.batch_size = max(1, int(self.batch_size))
+        self.flush_interval = max(0.001, float(self.flush_interval))
+        self.max_in_flight = max(1, int(self.max_in_flight))
+        self.queue_size = max(self.batch_size, int(self.queue_size))
+        self.overflow_policy = OverflowPolicy.parse(self.overflow_policy)
+        self.block_timeout = max(0.0, float(self.block_timeout))
+        self.spool_fsync = FsyncPolicy.parse(self.spool_fsync)
+
+    @classmethod
+    def from_env(cls) -> "BatchingConfig":
+        """Create a config from REVENIUM_METERING_* environment variables."""
+        return cls(
+            batch_size=_env_int(ENV_BATCH_SIZE, DEFAULT_BATCH_SIZE),
+            flush_interval=_env_float(ENV_BATCH_INTERVAL, DEFAULT_FLUSH_INTERVAL),
+            max_in_flight=_env_int(ENV_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT),
+            queue_size=_env_int(ENV_QUEUE_SIZE, DEFAULT_QUEUE_SIZE),
+            overflow_policy=os.getenv(ENV_QUEUE_POLICY, DEFAULT_QUEUE_POLICY.value),
+            block_timeout=_env_float(
+                ENV_QUEUE_BLOCK_TIMEOUT, DEFAULT_QUEUE_BLOCK_TIMEOUT
+            ),
+            spill_path=os.getenv(ENV_SPILL_PATH) or None,
+            spool_dir=os.getenv(ENV_SPOOL_DIR) or None,
+            spool_fsync=os.getenv(ENV_SPOOL_FSYNC, FsyncPolicy.NEVER.value),
+            spool_fsync_interval=_env_float(
+                ENV_SPOOL_FSYNC_INTERVAL, DEFAULT_FSYNC_INTERVAL
+            ),
+            spool_segment_bytes=_env_int(
+                ENV_SPOOL_SEGMENT_BYTES, DEFAULT_SEGMENT_BYTES
+            ),
+            group_path=os.getenv(ENV_BATCH_GROUP_PATH) or None,
+        )
+
+
+def is_batching_enabled_in_env() -> bool:
+    """Check if batching was requested via REVENIUM_METERING_BATCH_ENABLED."""
+    return _env_flag(ENV_BATCH_ENABLED)
+
+
+class BatchingTransport:
+    """
+    Buffer metering records and send them in batches from a fixed worker pool.
+
+    The per-call cost of ``submit`` is a bounded-queue put (plus one spool
+    append when a spool directory is configured); the worker threads
+    (named ``revenium-metering-worker-N``) are started lazily on first use.
+    """
+
+    def __init__(self, sender: BatchSender, config: Optional[BatchingConfig] = None):
+        self.config = config or BatchingConfig()
+        self._sender = sender
+        self.queue = MeteringQueue(
+            capacity=self.config.queue_size,
+            policy=self.config.overflow_policy,
+            block_timeout=self.config.block_timeout,
+            spill_path=self.config.spill_path,
+        )
+        self._cond = self.queue.cond
+        # Workers wait here; a put wakes exactly one of them
+        self._work = self.queue.not_empty
+        self._pending_batches = 0
+        self._flush_requested = False
+        self._closed = False
+        self._workers: List[threading.Thread] = []
+        # Set while being replaced: submits are held for (then forwarded to)
+        # the successor instead of reaching this transport's closing queue
+        self._held: Optional[List[Record]] = None
+        self._successor: Optional["BatchingTransport"] = None
+
+        # Counters
+        self.records_sent = 0
+        self.records_failed = 0
+        self.records_requeued = 0
+        self.records_requeue_rejected = 0
+        self.batches_sent = 0
+
+        self.spool: Optional[MeteringSpool] = None
+        if self.config.spool_dir:
+            self.spool = MeteringSpool(
+                self.config.spool_dir,
+                fsync_policy=self.config.spool_fsync,
+                fsync_interval=self.config.spool_fsync_interval,
+                segment_bytes=self.config.spool_segment_bytes,
+            )
+            self._replay_spool()
+
+    def submit(self, record: Record, block: bool = True) -> bool:
+        """
+        Add a record to the queue, writing it to the spool first if enabled.
+
+        Args:
+            record: The metering record
+            block: Whether the ``block`` overflow policy may wait for space
+
+        Returns:
+            True if the record was accepted, False if it was dropped. A record
+            dropped from the queue is still replayed from the spool later.
+        """
+        if self._held is not None or self._successor is not None:
+            return self._hand_over(record, block)
+        if not self._workers:
+            with self._cond:
+                if not self._workers and not self._closed:
+                    self._start_locked()
+        if self.spool is not None:
+            ref = self.spool.append(record)
+            if ref is not None:
+                record[SPOOL_REF_KEY] = ref
+        return self.queue.put(record, block=block)
+
+    def may_write_to_disk(self) -> bool:
+        """
+        Whether ``submit`` may write to disk now.
+
+        With a spool every record is appended to it; with the ``spill``
+        policy a full queue writes the record to the spill file. Event loop
+        threads submit such records from an executor instead.
+        """
+        if self.spool is not None:
+            return True
+        return (
+            self.queue.policy is OverflowPolicy.SPILL
+            and len(self.queue) >= self.queue.capacity
+        )
+
+    def persist(self, record: Record) -> bool:
+        """
+        Write a record to the spool without sending it now.
+
+        Used during shutdown so the record is replayed on the next start.
+
+        Returns:
+            True if the record was persisted
+        """
+        if self.spool is None:
+            return False
+        return self.spool.append(record) is not None
+
+    def _hold_submits(self) -> None:
+        """Start holding submitted records for a successor (see install_transport)."""
+        with self._cond:
+            self._held = []
+
+    def _forward_to(self, successor: "BatchingTransport") -> None:
+        """Submit the held records to ``successor`` and forward any made later."""
+        with self._cond:
+            held, self._held = self._held or [], None
+            self._successor = successor
+        for record in held:
+            successor.submit(record, block=False)
+
+    def _hand_over(self, record: Record, block: bool) -> bool:
+        with self._cond:
+            successor = self._successor
+            if successor is None:
+                if len(self._held) >= self.queue.capacity:
+                    self.queue.dropped_newest += 1
+                    return False
+                self._held.append(record)
+                return True
+        return successor.submit(record, block)
+
+    def _replay_spool(self) -> None:
+        for record, ref in self.spool.replay():
+            record[SPOOL_REF_KEY] = ref
+            if not self.queue.put(record):
+                # Still unacked on disk; it will be replayed again next start
+                logger.debug("Metering queue full while replaying spool")
+        with self._cond:
+            if self.queue.has_items_locked() and not self._workers:
+                self._start_locked()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Send everything currently queued and wait for in-flight batches.
+
+        Returns:
+            True if the queue drained before the timeout, False otherwise
+            (at once while the circuit breaker holds sends)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        breaker = get_circuit_breaker()
+        with self._cond:
+            if not self._workers and self.queue.has_items_locked():
+                self._start_locked()
+            self._flush_requested = True
+            self._work.notify_all()
+            try:
+                while self.queue.has_items_locked() or self._pending_batches:
+                    if breaker.hold_for() is not None and not self._pending_batches:
+                        return False
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_requested = False
+        return True
+
+    def shutdown(self, timeout: Optional[float] = 5.0) -> bool:
+        """Flush remaining records and stop the worker threads."""
+        drained = self.flush(timeout)
+        if not drained and not get_circuit_breaker().is_closed:
+            logger.warning(
+                "%d metering records not sent: the Revenium endpoint is unhealthy%s",
+                len(self.queue),
+                " (kept in the spool for the next start)" if self.spool else "",
+            )
+        self.queue.close()
+        with self._cond:
+            self._closed = True
+            self._work.notify_all()
+            workers = list(self._workers)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in workers:
+            if worker is threading.current_thread():
+                continue
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            worker.join(remaining)
+        self.queue.close_spill()
+        if self.spool is not None:
+            self.spool.close()
+        return drained
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the transport and queue counters."""
+        stats = self.queue.stats()
+        with self._cond:
+            stats.update(
+                {
+                    "workers": len(self._workers),
+                    "in_flight_batches": self._pending_batches,
+                    "records_sent": self.records_sent,
+                    "records_failed": self.records_failed,
+                    "records_requeued": self.records_requeued,
+                    "records_requeue_rejected": self.records_requeue_rejected,
+                    "batches_sent": self.batches_sent,
+                }
+            )
+        if self.spool is not None:
+            stats.update(self.spool.stats())
+        return stats
+
+    def wake(self) -> None:
+        """Wake the workers to re-check for due work, e.g. after the breaker closes."""
+        with self._cond:
+            self._work.notify_all()
+            self._cond.notify_all()
+
+    def _start_locked(self) -> None:
+        for index in range(self.config.max_in_flight):
+            worker = threading.Thread(
+                target=self._run,
+                name=f"revenium-metering-worker-{index}",
+                daemon=True,
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _is_due_locked(self) -> bool:
+        if not self.queue.has_items_locked():
+            return False
+        if self._flush_requested or self._closed:
+            return True
+        if len(self.queue) >= self.config.batch_size:
+            return True
+        oldest = self.queue.oldest_enqueued_at
+        return oldest is None or time.monotonic() - oldest >= self.config.flush_interval
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    hold = get_circuit_breaker().hold_for()
+                    if hold is None and self._is_due_locked():
+                        break
+                    if self._closed:
+                        # Held records stay in the spool, if any, for the next start
+                        return
+                    timeout = None
+                    oldest = self.queue.oldest_enqueued_at
+                    if hold is not None:
+                        timeout = hold
+                    elif oldest is not None:
+                        timeout = max(
+                            0.0, oldest + self.config.flush_interval - time.monotonic()
+                        )
+                    self._work.wait(timeout)
+                batch = self.queue.take_locked(self.config.batch_size)
+                if batch:
+                    self._pending_batches += 1
+                    if self._is_due_locked():
+                        # More is ready to send; hand it to another idle worker
+                        self._work.notify()
+
+            if not batch:
+                # Only spilled records are left; read them back without the lock
+                self.queue.reload_spill()
+                continue
+            self._send_batch(batch)
+
+    def _send_batch(self, batch: List[Record]) -> None:
+        refs = [record.pop(SPOOL_REF_KEY, None) for record in batch]
+        breaker = get_circuit_breaker()
+        was_closed = breaker.is_closed
+        failed_ids = set()
+        requeued = rejected = 0
+        try:
+            failed_ids = {id(record) for record in (self._sender(batch) or ())}
+        except Exception as e:
+            failed_ids = {id(record) for record in batch}
+            logger.error(
+                "Error sending metering batch of %d records: %s", len(batch), e
+            )
+        finally:
+            if failed_ids and not breaker.is_closed:
+                # The endpoint is down: keep the records for after it recovers
+                requeued = self._requeue(
+                    [
+                        (record, ref)
+                        for record, ref in zip(batch, refs)
+                        if id(record) in failed_ids
+                    ]
+                )
+                rejected = len(failed_ids) - requeued
+            if self.spool is not None:
+                # Failed records stay unacked in the spool and are replayed later
+                self.spool.ack(
+                    ref
+                    for record, ref in zip(batch, refs)
+                    if id(record) not in failed_ids
+                )
+            with self._cond:
+                self._pending_batches -= 1
+                self.batches_sent += 1
+                self.records_failed += len(failed_ids) - requeued - rejected
+                self.records_requeued += requeued
+                self.records_requeue_rejected += rejected
+                self.records_sent += len(batch) - len(failed_ids)
+                self._cond.notify_all()
+                if breaker.is_closed != was_closed:
+                    self._work.notify_all()
+
+    def _requeue(self, failed: List[Tuple[Record, Any]]) -> int:
+        """Put failed records back at the head of the queue; returns how many fit."""
+        for record, ref in failed:
+            if ref is not None:
+                # Stays unacked in the spool until it is delivered
+                record[SPOOL_REF_KEY] = ref
+        with self._cond:
+            count = self.queue.requeue_locked([record for record, _ in failed])
+        if count < len(failed):
+            logger.warning(
+                "Metering queue full; %d failed records could not be requeued",
+                len(failed) - count,
+            )
+        return count
+
+
+# Process-wide transport used by create_metering_call
+_active_transport: Optional[BatchingTransport] = None
+_active_lock = threading.Lock()
+
+
+def install_transport(
+    sender: BatchSender, config: Optional[BatchingConfig] = None
+) -> BatchingTransport:
+    """
+    Install a process-wide transport, flushing and replacing any existing one.
+
+    The previous transport is shut down (and its spool closed) before the
+    new one is built, so a spool directory they share is replayed only
+    after the old transport has sent or kept its records. Records submitted
+    to the previous transport meanwhile are held in memory and then passed
+    on to the new one, so reconfiguring at runtime does not drop them.
+    """
+    global _active_transport
+    with _active_lock:
+        previous = _active_transport
+        if previous is not None:
+            previous._hold_submits()
+            previous.shutdown()
+        transport = BatchingTransport(sender, config)
+        _active_transport = transport
+        if previous is not None:
+            previous._forward_to(transport)
+    logger.debug("Metering transport installed: %s", transport.config)
+    return transport
+
+
+def uninstall_transport(timeout: Optional[float] = 5.0) -> None:
+    """Flush and remove the process-wide transport."""
+    global _active_transport
+    with _active_lock:
+        transport = _active_transport
+        _active_transport = None
+    if transport is not None:
+        transport.shutdown(timeout)
+
+
+def get_active_transport() -> Optional[BatchingTransport]:
+    """Return the process-wide transport, if one has been installed."""
+    return _active_transport
+
+
+def _flush_at_exit() -> None:
+    transport = _active_transport
+    if transport is not None:
+        try:
+            transport.shutdown(timeout=5.0)
+        except Exception as e:
+            logger.debug("Error flushing metering queue at exit: %s", e)
+
+
+# Registered after revenium_middleware's own atexit handler, so it runs first
+# (atexit is LIFO) while the shutdown event is still clear.
+atexit.register(_flush_at_exit)
@@ -10,6 +10,8 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Dict, Any, Optional
 
+from .timing import format_timestamp
+
 
 class OperationType(str, Enum):
     """Operation types for AI API calls."""
@@ -137,9 +139,13 @@ class UsageData:
         if transaction_id is None:
             transaction_id = str(uuid.uuid4())
 
-        request_time_str = request_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-        response_time_str = response_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-        request_duration = int((response_time - request_time).total_seconds() * 1000)
+        request_time_str = format_timestamp(request_time)
+        response_time_str = format_timestamp(response_time)
+        # The wrappers derive response_time from the monotonic clock (see
+        # timing.py); the clamp covers callers passing two wall-clock reads
+        request_duration = max(
+            int((response_time - request_time).total_seconds() * 1000), 0
+        )
 
         return cls(
             input_token_count=input_tokens,
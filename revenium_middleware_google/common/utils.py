@@ -5,19 +5,58 @@ This module contains shared functionality used by both Google AI SDK
 and Vertex AI SDK middleware implementations.
 """
 
+import asyncio
 import datetime
 import logging
 import os
+import threading
 import uuid
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Optional
 from urllib.parse import urlparse
 
-from revenium_middleware import client, run_async_in_thread, shutdown_event
+from revenium_middleware import client, shutdown_event
 
 from .types import UsageData, OperationType, ProviderMetadata, TokenCounts
-from .exceptions import MeteringError, APIResponseError, safe_extract
-from .protocols import has_token_counts, safe_getattr, get_token_count
-from . import trace_fields
+from .exceptions import (
+    CircuitOpenError,
+    MeteringError,
+    APIResponseError,
+    ConfigurationError,
+    safe_extract,
+)
+from .protocols import (
+    CACHED_TOKEN_ATTRS,
+    INPUT_TOKEN_ATTRS,
+    OUTPUT_TOKEN_ATTRS,
+    TOTAL_TOKEN_ATTRS,
+    first_attr,
+    get_finish_reason,
+    get_token_count,
+    has_token_counts,
+    read_attr,
+)
+from .config import get_config
+from .metadata import get_metadata_cache_stats, normalize_usage_metadata
+from . import async_metering
+from .latency import get_stream_latency_stats
+from .timing import format_timestamp  # noqa: F401 - re-exported
+from .log_preview import LogPreview
+from .aggregation import (
+    AggregationConfig,
+    MeteringAggregator,
+    get_active_aggregator,
+    install_aggregator,
+    is_aggregation_enabled_in_env,
+    uninstall_aggregator,
+)
+
+# The send-path modules (transport, spool, HTTP client, circuit breaker, ...)
+# are imported on first use so importing the package stays cheap (see
+# benchmarks/startup.py)
+if TYPE_CHECKING:
+    from .circuit_breaker import CircuitBreaker
+    from .retry import RetryPolicy
+    from .transport import BatchingTransport
 
 logger = logging.getLogger("revenium_middleware.extension")
 
@@ -78,9 +117,8 @@ def is_debug_logging_enabled() -> bool:
     Returns:
         bool: True if debug logging is enabled, False otherwise
     """
-    # Check environment variable first
-    log_level_str = os.getenv("REVENIUM_LOG_LEVEL", "INFO").upper()
-    if log_level_str == "DEBUG":
+    # Check the configured level first
+    if get_config().log_level == "DEBUG":
         return True
 
     # Check actual logger level as fallback
@@ -93,11 +131,6 @@ def generate_transaction_id() -> str:
     return str(uuid.uuid4())
 
 
-def format_timestamp(dt: datetime.datetime) -> str:
-    """Format datetime as ISO string for API calls."""
-    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-
 def calculate_duration_ms(
     start_time: datetime.datetime, end_time: datetime.datetime
 ) -> int:
@@ -105,7 +138,7 @@ def calculate_duration_ms(
     return int((end_time - start_time).total_seconds() * 1000)
 
 
-async def log_token_usage(
+def build_completion_args(
     transaction_id: str,
     model: str,
     prompt_tokens: int,
@@ -122,9 +155,11 @@ async def log_token_usage(
     is_streamed: bool = False,
     time_to_first_token: int = 0,
     operation_type: OperationType = OperationType.CHAT,
-) -> None:
+    aggregate: Optional[Dict[str, Any]] = None,
+    usage_metadata_overrides: Iterable[str] = (),
+) -> Dict[str, Any]:
     """
-    Log token usage to Revenium.
+    Build the keyword arguments for ``client.ai.create_completion``.
 
     Args:
         transaction_id: Unique identifier for this API call
@@ -143,17 +178,15 @@ async def log_token_usage(
         is_streamed: Whether this was a streaming response
         time_to_first_token: Time to first token in milliseconds
         operation_type: Type of operation (CHAT or EMBED)
-    """
-    if shutdown_event.is_set():
-        logger.warning("Skipping metering call during shutdown")
-        return
-
-    logger.debug(
-        "Metering call to Revenium for %s operation %s",
-        operation_type.lower(),
-        transaction_id,
-    )
+        aggregate: Call count and latency statistics when this record rolls
+                   up several calls (see common.aggregation)
+        usage_metadata_overrides: Environment-backed fields usage_metadata set
+                                  (NormalizedMetadata.env_overrides), kept as a
+                                  record key for records reloaded from disk
 
+    Returns:
+        Dictionary of completion arguments (snake_case for the Python client)
+    """
     # Prepare arguments for create_completion (using snake_case for Python client library)
     completion_args = {
         "cache_creation_token_count": cached_tokens,
@@ -176,193 +209,688 @@ async def log_token_usage(
         "total_token_count": total_tokens,
         "transaction_id": transaction_id,
         "is_streamed": is_streamed,
-        "operation_type": operation_type.value,  # Convert enum to string
+        "operation_type": OperationType(operation_type).value,  # str once spooled
         "time_to_first_token": time_to_first_token,
         "middleware_source": "python",  # Required parameter for Google Python middleware
     }
 
-    # Add optional metadata fields if they exist (using snake_case for Python client)
-    if usage_metadata.get("trace_id"):
-        completion_args["trace_id"] = usage_metadata.get("trace_id")
-    if usage_metadata.get("task_type"):
-        completion_args["task_type"] = usage_metadata.get("task_type")
-    if usage_metadata.get("organization_id") or usage_metadata.get("organizationId"):
-        completion_args["organization_id"] = usage_metadata.get(
-            "organization_id"
-        ) or usage_metadata.get("organizationId")
-    if usage_metadata.get("subscription_id"):
-        completion_args["subscription_id"] = usage_metadata.get("subscription_id")
-    if usage_metadata.get("product_id"):
-        completion_args["product_id"] = usage_metadata.get("product_id")
-    if usage_metadata.get("agent"):
-        completion_args["agent"] = usage_metadata.get("agent")
-    if usage_metadata.get("response_quality_score"):
-        completion_args["response_quality_score"] = usage_metadata.get(
-            "response_quality_score"
-        )
+    # Add trace visualization fields (v0.2.0+) and the optional metadata fields.
+    # Priority: usage_metadata > environment variable, except transaction_name
+    # where the environment variable wins. Environment values come from the
+    # config snapshot; usage_metadata is compiled once per distinct dict.
+    config = get_config()
+    fragment = normalize_usage_metadata(usage_metadata)
+    env_overrides = fragment.env_overrides.union(usage_metadata_overrides)
+    defaults = config.completion_defaults
+    if env_overrides:
+        for key, value in defaults.items():
+            if key not in env_overrides:
+                completion_args[key] = value
+    else:
+        completion_args.update(defaults)
+    completion_args.update(fragment)
+    if config.transaction_name:
+        completion_args["transaction_name"] = config.transaction_name
+    if aggregate is not None:
+        completion_args["extra_body"] = {"aggregate": aggregate}
+
+    return completion_args
+
+
+# revenium_middleware's import-time client; replaced by a tuned one on first send
+_library_client = client
+_client_lock = threading.Lock()
+
+
+def get_metering_client() -> Any:
+    """
+    Return the sync metering client.
+
+    On first use the library's default client is swapped for one on the
+    middleware's tuned connection pool (see configure_http_client). A client
+    assigned to ``utils.client`` by the application is used as is.
+    """
+    global client
+    if client is _library_client:
+        from .http_client import create_metering_client, get_http_client_config
+
+        with _client_lock:
+            if client is _library_client:
+                client = create_metering_client(
+                    _library_client.api_key,
+                    str(_library_client.base_url),
+                    get_http_client_config(),
+                )
+                logger.debug("Created tuned Revenium metering client")
+    return client
+
+
+def configure_http_client(**config) -> Any:
+    """
+    Configure the HTTP connection pool used to send metering records.
 
-    # Add trace visualization fields (v0.2.0+)
-    # These fields support both environment variables and usage_metadata parameters
-    # Priority: usage_metadata > environment variable
+    Replaces the sync metering client and applies to async clients created
+    for new event loops.
 
-    # Environment field
-    environment = (
-        usage_metadata.get("environment") or
-        trace_fields.get_environment()
+    Args:
+        **config: HttpClientConfig overrides (pool_size, keepalive_expiry,
+                  http2, connect_timeout, timeout, compression,
+                  compression_min_bytes); unset values come from the
+                  REVENIUM_METERING_* environment variables
+
+    Returns:
+        The new sync ReveniumMetering client
+    """
+    from .http_client import (
+        HttpClientConfig,
+        create_metering_client,
+        set_http_client_config,
     )
-    if environment:
-        completion_args["environment"] = environment
 
-    # Region field
-    region = (
-        usage_metadata.get("region") or
-        trace_fields.get_region()
+    global client
+    http_config = HttpClientConfig.from_env()
+    for key, value in config.items():
+        if not hasattr(http_config, key) or key in ("limits", "timeouts"):
+            raise ConfigurationError(f"Unknown HTTP client option: {key}")
+        setattr(http_config, key, value)
+    http_config.__post_init__()
+    set_http_client_config(http_config)
+
+    with _client_lock:
+        # The replaced client is not closed: sends may still be in flight on
+        # it, and the SDK closes its pool when the client is collected
+        client = create_metering_client(
+            client.api_key, str(client.base_url), http_config
+        )
+    return client
+
+
+def send_completion(completion_args: Dict[str, Any]) -> None:
+    """
+    Send one completion record to Revenium.
+
+    Outage failures are retried with the same record (and transaction_id)
+    under the retry policy; see configure_retries.
+
+    Args:
+        completion_args: Arguments produced by build_completion_args
+
+    Raises:
+        MeteringError: If the Revenium call fails outside of shutdown
+        CircuitOpenError: If the circuit breaker is open; nothing was sent
+    """
+    from .circuit_breaker import get_circuit_breaker
+    from .retry import get_retry_policy
+
+    breaker = get_circuit_breaker()
+    if not breaker.allow_request():
+        raise _circuit_open_error(completion_args)
+    _log_completion_args(completion_args)
+
+    def attempt():
+        # The client.ai.create_completion method is not async, so don't use await
+        try:
+            result = get_metering_client().ai.create_completion(**completion_args)
+        except Exception as e:
+            breaker.record_result(e)
+            raise
+        breaker.record_success()
+        return result
+
+    try:
+        result = get_retry_policy().call(attempt, shutdown_event)
+        logger.debug("Metering call result: %s", result)
+        logger.info(" REVENIUM SUCCESS: Metering call successful: %s", result.id)
+    except Exception as e:
+        _handle_send_failure(e, completion_args, quiet=not breaker.is_closed)
+
+
+async def send_completion_async(completion_args: Dict[str, Any]) -> None:
+    """
+    Send one completion record to Revenium from the running event loop.
+
+    Uses the loop's AsyncReveniumMetering client, so the send (and any
+    retry backoff) never leaves the loop.
+
+    Args:
+        completion_args: Arguments produced by build_completion_args
+
+    Raises:
+        MeteringError: If the Revenium call fails outside of shutdown
+        CircuitOpenError: If the circuit breaker is open; nothing was sent
+    """
+    from .circuit_breaker import get_circuit_breaker
+    from .retry import get_retry_policy
+
+    breaker = get_circuit_breaker()
+    if not breaker.allow_request():
+        raise _circuit_open_error(completion_args)
+    _log_completion_args(completion_args)
+
+    async def attempt():
+        try:
+            result = await async_metering.get_async_client().ai.create_completion(
+                **completion_args
+            )
+        except Exception as e:
+            breaker.record_result(e)
+            raise
+        breaker.record_success()
+        return result
+
+    try:
+        result = await get_retry_policy().call_async(attempt, shutdown_event)
+        logger.debug("Metering call result: %s", result)
+        logger.info(" REVENIUM SUCCESS: Metering call successful: %s", result.id)
+    except Exception as e:
+        _handle_send_failure(e, completion_args, quiet=not breaker.is_closed)
+
+
+def _circuit_open_error(completion_args: Dict[str, Any]) -> CircuitOpenError:
+    return CircuitOpenError(
+        "Metering endpoint unhealthy; record not sent",
+        transaction_id=completion_args.get("transaction_id"),
     )
-    if region:
-        completion_args["region"] = region
-
-    # Credential alias field
-    credential_alias = (
-        usage_metadata.get("credential_alias") or
-        usage_metadata.get("credentialAlias") or
-        trace_fields.get_credential_alias()
+
+
+def _log_completion_args(completion_args: Dict[str, Any]) -> None:
+    # Log the arguments at debug level
+    logger.debug(
+        "Calling client.ai.create_completion with args: %s", LogPreview(completion_args)
     )
-    if credential_alias:
-        completion_args["credential_alias"] = credential_alias
-
-    # Trace type field
-    trace_type = (
-        usage_metadata.get("trace_type") or
-        usage_metadata.get("traceType") or
-        trace_fields.get_trace_type()
+
+    # Debug logging for metering call
+    logger.debug(
+        "Metering call for %s: %s, tokens: %s+%s=%s",
+        completion_args.get("operation_type"),
+        completion_args.get("transaction_id"),
+        completion_args.get("input_token_count"),
+        completion_args.get("output_token_count"),
+        completion_args.get("total_token_count"),
     )
-    if trace_type:
-        # Validate if coming from usage_metadata
-        if usage_metadata.get("trace_type") or usage_metadata.get("traceType"):
-            trace_type = trace_fields.validate_trace_type(trace_type)
-        if trace_type:
-            completion_args["trace_type"] = trace_type
-
-    # Trace name field
-    trace_name = (
-        usage_metadata.get("trace_name") or
-        usage_metadata.get("traceName") or
-        trace_fields.get_trace_name()
+
+
+def _handle_send_failure(
+    e: Exception, completion_args: Dict[str, Any], quiet: bool = False
+) -> None:
+    """
+    Log a failed metering call and raise MeteringError unless shutting down.
+
+    With ``quiet`` (the circuit breaker has opened) the failure is logged at
+    debug level instead of as two ERROR lines.
+    """
+    if shutdown_event.is_set():
+        logger.debug("Metering call failed during shutdown - this is expected")
+        return
+
+    transaction_id = completion_args.get("transaction_id")
+    if quiet:
+        logger.debug("Metering call failed while the endpoint is unhealthy: %s", e)
+        raise MeteringError(
+            f"Failed to send metering data: {str(e)}", transaction_id=transaction_id
+        ) from e
+
+    # Create a structured error for better handling
+    error_details = {
+        "transaction_id": transaction_id,
+        "model": completion_args.get("model"),
+        "error_type": type(e).__name__,
+        "completion_args_keys": list(completion_args.keys()),
+    }
+
+    # Log error with structured information
+    logger.error(" REVENIUM FAILURE: Error in metering call: %s", str(e))
+    logger.error(" REVENIUM FAILURE: Error details: %s", error_details)
+
+    # Log traceback at debug level to avoid spam
+    logger.debug("Metering call traceback:", exc_info=True)
+
+    # Raise a specific MeteringError for better error handling upstream
+    raise MeteringError(
+        f"Failed to send metering data: {str(e)}",
+        transaction_id=transaction_id,
+        api_response=None,
+        error_details=error_details,
+    ) from e
+
+
+async def log_token_usage(
+    transaction_id: str,
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    total_tokens: int,
+    cached_tokens: int,
+    stop_reason: str,
+    request_time: str,
+    response_time: str,
+    request_duration: int,
+    usage_metadata: Dict[str, Any],
+    provider: str = "Google",
+    model_source: str = "GOOGLE",
+    is_streamed: bool = False,
+    time_to_first_token: int = 0,
+    operation_type: OperationType = OperationType.CHAT,
+) -> None:
+    """
+    Log token usage to Revenium.
+
+    Takes the same arguments as build_completion_args and sends the
+    resulting record with send_completion_async on the running loop.
+    """
+    if shutdown_event.is_set():
+        logger.warning("Skipping metering call during shutdown")
+        return
+
+    logger.debug(
+        "Metering call to Revenium for %s operation %s",
+        operation_type.lower(),
+        transaction_id,
     )
-    if trace_name:
-        # Validate if coming from usage_metadata
-        if usage_metadata.get("trace_name") or usage_metadata.get("traceName"):
-            trace_name = trace_fields.validate_trace_name(trace_name)
-        if trace_name:
-            completion_args["trace_name"] = trace_name
-
-    # Parent transaction ID field
-    parent_transaction_id = (
-        usage_metadata.get("parent_transaction_id") or
-        usage_metadata.get("parentTransactionId") or
-        trace_fields.get_parent_transaction_id()
+
+    completion_args = build_completion_args(
+        transaction_id=transaction_id,
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=total_tokens,
+        cached_tokens=cached_tokens,
+        stop_reason=stop_reason,
+        request_time=request_time,
+        response_time=response_time,
+        request_duration=request_duration,
+        usage_metadata=usage_metadata,
+        provider=provider,
+        model_source=model_source,
+        is_streamed=is_streamed,
+        time_to_first_token=time_to_first_token,
+        operation_type=operation_type,
     )
-    if parent_transaction_id:
-        completion_args["parent_transaction_id"] = parent_transaction_id
-
-    # Transaction name field (with fallback to task_type)
-    transaction_name = trace_fields.get_transaction_name(usage_metadata)
-    if transaction_name:
-        completion_args["transaction_name"] = transaction_name
-
-    # Retry number field
-    retry_number = trace_fields.get_retry_number()
-    if retry_number > 0:
-        completion_args["retry_number"] = retry_number
-
-    # Build subscriber object - support both nested and flat formats
-    subscriber_data = {}
-    flat_keys_used = []
-
-    # Prefer nested format if present (recommended structure)
-    if "subscriber" in usage_metadata:
-        nested_subscriber = usage_metadata["subscriber"]
-        if isinstance(nested_subscriber, dict):
-            # Use nested structure directly
-            subscriber_data = nested_subscriber.copy()
-            logger.debug("Using nested subscriber format (recommended)")
-    else:
-        # Fall back to flat keys for backward compatibility
-        subscriber_id = usage_metadata.get("subscriber_id")
-        subscriber_email = usage_metadata.get("subscriber_email")
-        credential_name = usage_metadata.get("subscriber_credential_name")
-        credential_value = usage_metadata.get("subscriber_credential")
-
-        if subscriber_id:
-            subscriber_data["id"] = subscriber_id
-            flat_keys_used.append("subscriber_id")
-        if subscriber_email:
-            subscriber_data["email"] = subscriber_email
-            flat_keys_used.append("subscriber_email")
-
-        # Add credential sub-object if credential data is provided
-        credential_data = {}
-        if credential_name:
-            credential_data["name"] = credential_name
-            flat_keys_used.append("subscriber_credential_name")
-        if credential_value:
-            credential_data["value"] = credential_value
-            flat_keys_used.append("subscriber_credential")
-
-        if credential_data:
-            subscriber_data["credential"] = credential_data
-
-        # Log deprecation warning if flat keys were used
-        if flat_keys_used:
-            logger.warning(
-                f"Flat subscriber keys are deprecated: {flat_keys_used}. "
-                "Please use nested 'subscriber' object format: "
-                "{'subscriber': {'id': '...', 'email': '...', 'credential': {'name': '...', 'value': '...'}}}"
+    await send_completion_async(completion_args)
+
+
+async def _send_record_async(record: Dict[str, Any]) -> bool:
+    """
+    Send a queued-style record on the running loop.
+
+    If the circuit breaker opens before or during the send, the record is
+    handed to the transport, which holds it until the endpoint recovers.
+
+    Returns:
+        True if the record was sent, False if it was handed to the transport
+    """
+    from .circuit_breaker import get_circuit_breaker
+
+    try:
+        await send_completion_async(build_completion_args(**record))
+    except MeteringError:
+        # CircuitOpenError, or retries stopped because the breaker opened
+        if get_circuit_breaker().is_closed:
+            raise
+        transport = get_metering_transport()
+        if transport.may_write_to_disk():
+            accepted = await asyncio.get_running_loop().run_in_executor(
+                None, transport.submit, record, False
             )
+        else:
+            accepted = transport.submit(record, block=False)
+        if not accepted:
+            raise
+        logger.debug("Metering record handed to the transport while unhealthy")
+        return False
+    return True
 
-    # Only add subscriber to completion_args if we have subscriber data
-    if subscriber_data:
-        completion_args["subscriber"] = subscriber_data
 
-    # Log the arguments at debug level
-    logger.debug("Calling client.ai.create_completion with args: %s", completion_args)
+def send_metering_batch(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Send a batch of buffered metering records.
 
-    # Debug logging for metering call
-    logger.debug(
-        f"Metering call for {operation_type.value}: {transaction_id}, tokens: {prompt_tokens}+{completion_tokens}={total_tokens}"
-    )
+    Each record holds the keyword arguments for build_completion_args. When
+    the transport has a group_path (an opt-in for servers that accept a JSON
+    array of records; the Revenium API does not document one), the batch is
+    posted there as one request, which compresses far better than the
+    records do one by one. Otherwise, or if the server rejects the grouped
+    path, records are sent back to back over the shared client and a failure
+    does not stop the rest of the batch.
+
+    Returns:
+        The records that failed to send
+    """
+    from .transport import get_active_transport
+
+    for record in records:
+        # Records reloaded from disk carry operation_type as a plain string
+        record["operation_type"] = OperationType(record["operation_type"])
+
+    transport = get_active_transport()
+    group_path = transport.config.group_path if transport is not None else None
+    if group_path and len(records) > 1 and group_path not in _rejected_group_paths:
+        failed = _send_grouped(records, group_path)
+        if failed is not None:
+            return failed
+
+    failed = []
+    for record in records:
+        try:
+            send_completion(build_completion_args(**record))
+        except Exception as e:
+            failed.append(record)
+            logger.debug("Metering record in batch failed: %s", e)
+    return failed
+
+
+# Group paths the API answered 404/405/415 to; batches go per record instead
+# until configure_batching installs a new transport
+_rejected_group_paths: set = set()
+
+
+# create_completion parameter -> JSON key, read from the SDK's params type
+_body_keys: Optional[Dict[str, str]] = None
+
+# Deprecated create_completion parameters it posts under the newer field
+_DEPRECATED_PARAMS = (
+    ("organization_id", "organization_name"),
+    ("product_id", "product_name"),
+)
+
+
+def _completion_body_keys() -> Dict[str, str]:
+    """
+    Map create_completion parameters to their JSON keys.
+
+    The public AICreateCompletionParams type annotates camelCase fields with
+    an ``alias``; parameters without one are posted under their own name.
+    """
+    global _body_keys
+    if _body_keys is None:
+        import typing
+
+        from revenium_metering.types import AICreateCompletionParams
+
+        keys = {}
+        hints = typing.get_type_hints(AICreateCompletionParams, include_extras=True)
+        for name, hint in hints.items():
+            # Required[Annotated[...]] keeps the alias one level down
+            for annotated in (hint, *typing.get_args(hint)):
+                aliases = [
+                    getattr(meta, "alias", None)
+                    for meta in getattr(annotated, "__metadata__", ())
+                ]
+                alias = next((a for a in aliases if a), None)
+                if alias:
+                    keys[name] = alias
+                    break
+        _body_keys = keys
+    return _body_keys
+
+
+def _completion_body(completion_args: Dict[str, Any]) -> Dict[str, Any]:
+    """The JSON body the SDK's create_completion would post for these args."""
+    keys = _completion_body_keys()
+    params = {k: v for k, v in completion_args.items() if not k.startswith("extra_")}
+    for deprecated, name in _DEPRECATED_PARAMS:
+        if deprecated in params:
+            value = params.pop(deprecated)
+            params.setdefault(name, value)
+    body = {keys.get(name, name): value for name, value in params.items()}
+    body.update(completion_args.get("extra_body") or {})
+    return body
+
+
+def _send_grouped(
+    records: List[Dict[str, Any]], group_path: str
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Post a batch as one JSON array to ``group_path``.
+
+    Returns:
+        The records that failed (all or none), or None if the API does not
+        support the path and the batch should be sent per record
+    """
+    import httpx
+    from revenium_metering import APIStatusError
+
+    from .circuit_breaker import get_circuit_breaker
+    from .retry import get_retry_policy
+
+    breaker = get_circuit_breaker()
+    if not breaker.allow_request():
+        return list(records)
+    bodies = [_completion_body(build_completion_args(**record)) for record in records]
+
+    def attempt():
+        try:
+            get_metering_client().post(group_path, body=bodies, cast_to=httpx.Response)
+        except Exception as e:
+            breaker.record_result(e)
+            raise
+        breaker.record_success()
 
     try:
-        # The client.ai.create_completion method is not async, so don't use await
-        result = client.ai.create_completion(**completion_args)
-        logger.debug("Metering call result: %s", result)
-        logger.info(" REVENIUM SUCCESS: Metering call successful: %s", result.id)
+        get_retry_policy().call(attempt, shutdown_event)
     except Exception as e:
-        if not shutdown_event.is_set():
-            # Create a structured error for better handling
-            error_details = {
-                "transaction_id": transaction_id,
-                "model": model,
-                "error_type": type(e).__name__,
-                "completion_args_keys": list(completion_args.keys()),
-            }
-
-            # Log error with structured information
-            logger.error(" REVENIUM FAILURE: Error in metering call: %s", str(e))
-            logger.error(" REVENIUM FAILURE: Error details: %s", error_details)
-
-            # Log traceback at debug level to avoid spam
-            logger.debug("Metering call traceback:", exc_info=True)
-
-            # Raise a specific MeteringError for better error handling upstream
-            raise MeteringError(
-                f"Failed to send metering data: {str(e)}",
-                transaction_id=transaction_id,
-                api_response=None,
-                error_details=error_details,
-            ) from e
-        else:
-            logger.debug("Metering call failed during shutdown - this is expected")
+        if isinstance(e, APIStatusError) and e.status_code in (404, 405, 415):
+            _rejected_group_paths.add(group_path)
+            logger.warning(
+                "Revenium API rejected grouped metering path %s (HTTP %d); "
+                "sending records one at a time",
+                group_path,
+                e.status_code,
+            )
+            return None
+        log = logger.warning if breaker.is_closed else logger.debug
+        log("Grouped metering send of %d records failed: %s", len(records), e)
+        return list(records)
+    logger.debug("Sent %d metering records in one grouped request", len(records))
+    return []
+
+
+def configure_batching(enabled: bool = True, **config) -> "BatchingTransport":
+    """
+    Configure how metering records are queued and sent for this process.
+
+    Args:
+        enabled: Whether metering records should be batched. When False,
+                 records still go through the bounded queue but are sent
+                 one at a time.
+        **config: BatchingConfig overrides (batch_size, flush_interval,
+                  max_in_flight, queue_size, overflow_policy, block_timeout,
+                  spill_path, spool_dir, spool_fsync, spool_fsync_interval,
+                  spool_segment_bytes, group_path); unset values come from the
+                  REVENIUM_METERING_* environment variables
+
+    Returns:
+        The installed BatchingTransport
+    """
+    from .transport import BatchingConfig, install_transport
+
+    batching_config = BatchingConfig.from_env()
+    for key, value in config.items():
+        if not hasattr(batching_config, key):
+            raise ConfigurationError(f"Unknown batching option: {key}")
+        setattr(batching_config, key, value)
+    if not enabled:
+        batching_config.batch_size = 1
+    batching_config.__post_init__()
+
+    # A reconfigured group path (or server) gets a fresh chance
+    _rejected_group_paths.clear()
+    return install_transport(send_metering_batch, batching_config)
+
+
+def get_metering_transport() -> "BatchingTransport":
+    """Return the process-wide metering transport, installing it on first use."""
+    from .transport import get_active_transport, is_batching_enabled_in_env
+
+    transport = get_active_transport()
+    if transport is None:
+        transport = configure_batching(enabled=is_batching_enabled_in_env())
+    return transport
+
+
+# Whether REVENIUM_METERING_AGGREGATE_ENABLED has been consulted yet
+_aggregation_env_checked = False
+
+
+def configure_aggregation(
+    enabled: bool = True, **config
+) -> Optional[MeteringAggregator]:
+    """
+    Configure client-side pre-aggregation of metering records.
+
+    With aggregation on, records for the configured operation types (EMBED by
+    default) are rolled up in memory by key and sent as one aggregate record
+    per key per interval instead of one record per call.
+
+    Args:
+        enabled: Whether to aggregate. When False, any open aggregates are
+                 emitted and records are sent per call again.
+        **config: AggregationConfig overrides (interval, key, operations,
+                  max_keys); unset values come from the
+                  REVENIUM_METERING_AGGREGATE_* environment variables
+
+    Returns:
+        The installed MeteringAggregator, or None when disabled
+    """
+    global _aggregation_env_checked
+    _aggregation_env_checked = True
+    if not enabled:
+        uninstall_aggregator()
+        return None
+
+    aggregation_config = AggregationConfig.from_env()
+    for key, value in config.items():
+        if not hasattr(aggregation_config, key) or key == "metadata_fields":
+            raise ConfigurationError(f"Unknown aggregation option: {key}")
+        setattr(aggregation_config, key, value)
+    aggregation_config.__post_init__()
+
+    return install_aggregator(_dispatch_record, aggregation_config)
+
+
+def configure_circuit_breaker(enabled: bool = True, **config) -> "CircuitBreaker":
+    """
+    Configure the circuit breaker around metering sends.
+
+    After failure_threshold consecutive connection errors, timeouts, 429s or
+    5xx responses, sends stop and records are held in the metering queue;
+    every reset_timeout seconds one probe send is tried, and the first
+    success resumes sending.
+
+    Args:
+        enabled: Whether the breaker may open. When False every send is
+                 attempted, as before.
+        **config: CircuitBreakerConfig overrides (failure_threshold,
+                  reset_timeout); unset values come from the
+                  REVENIUM_METERING_BREAKER_* environment variables
+
+    Returns:
+        The installed CircuitBreaker, starting closed
+    """
+    from .circuit_breaker import CircuitBreakerConfig, install_circuit_breaker
+    from .transport import get_active_transport
+
+    breaker_config = CircuitBreakerConfig.from_env()
+    for key, value in config.items():
+        if not hasattr(breaker_config, key) or key == "enabled":
+            raise ConfigurationError(f"Unknown circuit breaker option: {key}")
+        setattr(breaker_config, key, value)
+    breaker_config.enabled = enabled
+    breaker_config.__post_init__()
+
+    breaker = install_circuit_breaker(breaker_config)
+    transport = get_active_transport()
+    if transport is not None:
+        # Workers holding for the previous breaker re-check the new one
+        transport.wake()
+    return breaker
+
+
+def configure_retries(**config) -> "RetryPolicy":
+    """
+    Configure retries of failed metering sends.
+
+    Connection errors, timeouts, 429s and 5xx responses are retried with the
+    same record (so the same transaction_id) after an exponential backoff
+    with full jitter. Retries draw on a shared budget: each send adds
+    budget_ratio tokens up to budget_reserve and each retry spends one.
+
+    Args:
+        **config: RetryConfig overrides (max_retries, base_delay, max_delay,
+                  budget_ratio, budget_reserve); unset values come from the
+                  REVENIUM_METERING_*RETR* environment variables. Pass
+                  max_retries=0 to send each record once.
+
+    Returns:
+        The installed RetryPolicy, with a full budget
+    """
+    from .retry import RetryConfig, install_retry_policy
+
+    retry_config = RetryConfig.from_env()
+    for key, value in config.items():
+        if not hasattr(retry_config, key):
+            raise ConfigurationError(f"Unknown retry option: {key}")
+        setattr(retry_config, key, value)
+    retry_config.__post_init__()
+    return install_retry_policy(retry_config)
+
+
+def _get_aggregator() -> Optional[MeteringAggregator]:
+    """Return the aggregator, installing it from the environment on first use."""
+    global _aggregation_env_checked
+    if not _aggregation_env_checked:
+        _aggregation_env_checked = True
+        if is_aggregation_enabled_in_env():
+            configure_aggregation()
+    return get_active_aggregator()
+
+
+def get_metering_stats() -> Dict[str, Any]:
+    """
+    Return queue and sender counters for the metering transport.
+
+    Includes the queue depth, overflow policy, and per-reason drop counts
+    (dropped_oldest, dropped_newest, dropped_timeout, spilled, ...), the
+    async_* counters of the native asyncio path, the compression_* counters
+    of request bodies, the circuit breaker state and breaker_* counters, the
+    retry counters and budget left, the aggregation_* counters when aggregation is on, and per-model streaming
+    latency under "stream_latency".
+    """
+    from .circuit_breaker import get_circuit_breaker
+    from .compression import get_compression_stats
+    from .retry import get_retry_policy
+
+    stats = get_metering_transport().stats()
+    stats.update(async_metering.get_async_stats())
+    stats.update(get_metadata_cache_stats())
+    stats.update(get_compression_stats())
+    stats.update(get_circuit_breaker().stats())
+    stats.update(get_retry_policy().stats())
+    aggregator = get_active_aggregator()
+    if aggregator is not None:
+        stats.update(aggregator.stats())
+    stats["stream_latency"] = get_stream_latency_stats()
+    return stats
+
+
+def flush_metering(timeout: Optional[float] = 5.0) -> bool:
+    """
+    Flush queued metering records.
+
+    Open aggregates are emitted first, so they are part of the flush.
+
+    Returns:
+        True if everything queued was sent before the timeout
+    """
+    from .transport import get_active_transport
+
+    aggregator = get_active_aggregator()
+    if aggregator is not None:
+        aggregator.flush()
+    transport = get_active_transport()
+    if transport is None:
+        return True
+    return transport.flush(timeout)
 
 
 def create_metering_call(
@@ -380,29 +908,98 @@ def create_metering_call(
     usage_data.is_streamed = is_streamed
     usage_data.time_to_first_token = time_to_first_token
 
-    # Create async metering call
-    async def metering_call():
-        await log_token_usage(
-            transaction_id=usage_data.transaction_id,
-            model=usage_data.model,
-            prompt_tokens=usage_data.input_token_count,  # These are positional parameters
-            completion_tokens=usage_data.output_token_count,  # These are positional parameters
-            total_tokens=usage_data.total_token_count,  # These are positional parameters
-            cached_tokens=usage_data.cache_creation_token_count,
-            stop_reason=usage_data.stop_reason,
-            request_time=usage_data.request_time,
-            response_time=usage_data.response_time,
-            request_duration=usage_data.request_duration,
-            usage_metadata=usage_metadata,
-            provider=usage_data.provider,
-            model_source=usage_data.model_source,
-            is_streamed=usage_data.is_streamed,
-            time_to_first_token=usage_data.time_to_first_token,
-            operation_type=OperationType(usage_data.operation_type),
+    metadata = normalize_usage_metadata(usage_metadata)
+    record = {
+        "transaction_id": usage_data.transaction_id,
+        "model": usage_data.model,
+        "prompt_tokens": usage_data.input_token_count,
+        "completion_tokens": usage_data.output_token_count,
+        "total_tokens": usage_data.total_token_count,
+        "cached_tokens": usage_data.cache_creation_token_count,
+        "stop_reason": usage_data.stop_reason,
+        "request_time": usage_data.request_time,
+        "response_time": usage_data.response_time,
+        "request_duration": usage_data.request_duration,
+        # Compiled now, so later changes to the caller's dict don't reach the record
+        "usage_metadata": metadata,
+        "provider": usage_data.provider,
+        "model_source": usage_data.model_source,
+        "is_streamed": usage_data.is_streamed,
+        "time_to_first_token": usage_data.time_to_first_token,
+        "operation_type": OperationType(usage_data.operation_type),
+    }
+    if metadata.env_overrides:
+        # The spool and the queue's spill file store usage_metadata as a plain
+        # dict, so the overrides travel as a record key of their own
+        record["usage_metadata_overrides"] = sorted(metadata.env_overrides)
+
+    if shutdown_event.is_set():
+        # Keep the record in the spool (if enabled) so it is replayed on restart
+        loop = async_metering.get_running_loop()
+        if loop is not None:
+            # Spool writes never run on an event loop thread
+            loop.run_in_executor(None, _persist_record, record)
+        else:
+            _persist_record(record)
+        return
+
+    aggregator = _get_aggregator()
+    if aggregator is not None and aggregator.add(record):
+        return
+
+    _dispatch_record(record)
+
+
+def _persist_record(record: Dict[str, Any]) -> None:
+    if get_metering_transport().persist(record):
+        logger.debug("Metering record spooled during shutdown")
+    else:
+        logger.warning("Skipping metering call during shutdown")
+
+
+def _dispatch_record(record: Dict[str, Any]) -> None:
+    """Send a record on the running event loop or hand it to the transport."""
+    from .circuit_breaker import get_circuit_breaker
+
+    transport = get_metering_transport()
+
+    # Inside a running event loop, send as a task on that loop. Batched and
+    # spooled configurations keep going through the transport.
+    loop = async_metering.get_running_loop()
+    if (
+        loop is not None
+        and transport.config.batch_size == 1
+        and transport.spool is None
+        and async_metering.is_async_metering_enabled()
+        # While the endpoint is unhealthy the transport holds records
+        and get_circuit_breaker().is_closed
+        and async_metering.schedule_metering_task(
+            loop,
+            _send_record_async(record),
+            record,
+            max_pending=transport.config.queue_size,
         )
+    ):
+        return
 
-    # Execute in background thread
-    run_async_in_thread(metering_call())
+    # Hand off to the bounded metering queue; the transport sends in the background.
+    # An event loop thread must never wait for queue space, nor for the disk:
+    # spool appends and spill writes run on the loop's default executor.
+    if loop is None:
+        transport.submit(record)
+    elif transport.may_write_to_disk():
+        loop.run_in_executor(None, transport.submit, record, False)
+    else:
+        transport.submit(record, block=False)
+
+
+# Candidate attribute names, in priority order
+_MODEL_ATTRS = ("model", "model_name", "_model_name", "model_version")
+_USAGE_ATTRS = ("usage",)
+_NESTED_MODEL_ATTRS = ("model",)
+_USAGE_METADATA_ATTRS = ("usage_metadata", "usage")
+# Marks an attribute the response doesn't have
+_MISSING = object()
 
 
 @safe_extract
@@ -427,16 +1024,14 @@ def extract_model_name(response: Any, fallback: Optional[str] = None) -> str:
         raise APIResponseError("Response is None and no fallback model name provided")
 
     # Try common model name attributes using safe access
-    model_attrs = ["model", "model_name", "_model_name", "model_version"]
-    for attr in model_attrs:
-        model_name = safe_getattr(response, attr)
-        if model_name:
-            return str(model_name)
+    model_name = first_attr(response, _MODEL_ATTRS)
+    if model_name:
+        return str(model_name)
 
     # Try nested model attributes
-    usage = safe_getattr(response, "usage")
+    usage = first_attr(response, _USAGE_ATTRS)
     if usage:
-        model_name = safe_getattr(usage, "model")
+        model_name = first_attr(usage, _NESTED_MODEL_ATTRS)
         if model_name:
             return str(model_name)
 
@@ -487,20 +1082,14 @@ def extract_token_counts(response: Any, operation_type: OperationType) -> TokenC
     cached_tokens = 0
 
     # Try to extract from usage_metadata first (Google AI SDK pattern)
-    usage = safe_getattr(response, "usage_metadata") or safe_getattr(response, "usage")
+    usage = first_attr(response, _USAGE_METADATA_ATTRS)
 
     if usage and has_token_counts(usage):
         # Use the utility function for safe token extraction
-        input_tokens = get_token_count(
-            usage, ["prompt_token_count", "prompt_tokens", "input_tokens"]
-        )
-        output_tokens = get_token_count(
-            usage, ["candidates_token_count", "completion_tokens", "output_tokens"]
-        )
-        total_tokens = get_token_count(usage, ["total_token_count", "total_tokens"])
-        cached_tokens = get_token_count(
-            usage, ["cached_content_token_count", "cached_tokens"]
-        )
+        input_tokens = get_token_count(usage, INPUT_TOKEN_ATTRS)
+        output_tokens = get_token_count(usage, OUTPUT_TOKEN_ATTRS)
+        total_tokens = get_token_count(usage, TOTAL_TOKEN_ATTRS)
+        cached_tokens = get_token_count(usage, CACHED_TOKEN_ATTRS)
 
         logger.debug(
             "Extracted token counts from usage: input=%d, output=%d, total=%d, cached=%d",
@@ -557,13 +1146,10 @@ def create_usage_data(
     model_name = extract_model_name(response, model_name_fallback)
 
     # Extract stop reason (SDK-specific logic should be handled by caller)
-    stop_reason = stop_reason_fallback
-    if hasattr(response, "finish_reason"):
-        stop_reason = response.finish_reason or stop_reason_fallback
-    elif hasattr(response, "candidates") and response.candidates:
-        candidate = response.candidates[0]
-        if hasattr(candidate, "finish_reason"):
-            stop_reason = candidate.finish_reason or stop_reason_fallback
+    finish_reason = read_attr(response, "finish_reason", _MISSING)
+    if finish_reason is _MISSING:
+        finish_reason = get_finish_reason(response)
+    stop_reason = finish_reason or stop_reason_fallback
 
     # Create UsageData
     return UsageData.create(
@@ -18,6 +18,9 @@ from .middleware import (
     extract_google_ai_usage_data,
     create_google_ai_metering_call,
     handle_streaming_response,
+    handle_async_streaming_response,
+    StreamWrapper,
+    AsyncStreamWrapper,
 )
 
 from .provider import (
@@ -34,6 +37,9 @@ __all__ = [
     "extract_google_ai_usage_data",
     "create_google_ai_metering_call",
     "handle_streaming_response",
+    "handle_async_streaming_response",
+    "StreamWrapper",
+    "AsyncStreamWrapper",
     # Provider functions
     "detect_provider",
     "get_provider_metadata",
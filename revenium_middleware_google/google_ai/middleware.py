@@ -8,11 +8,9 @@ unified google-genai interface.
 
 import datetime
 import logging
+import time
 from typing import Dict, Any, Optional
 
-import wrapt
-from revenium_middleware import run_async_in_thread
-
 # Import common utilities and types
 from ..common import (
     OperationType,
@@ -23,9 +21,17 @@ from ..common import (
     create_metering_call,
     extract_model_name,
     extract_token_counts,
-    StreamingError,
+    get_finish_reason,
     handle_metering_error,
-    safe_getattr,
+    response_time_from,
+    LogPreview,
+)
+from ..common.patching import patch_when_imported
+from ..common.streaming import (
+    AsyncMeteredStreamMixin,
+    MeteredStream,
+    StreamExtractors,
+    chunk_model_version,
 )
 
 # Google AI specific imports
@@ -88,21 +94,17 @@ def extract_google_ai_usage_data(
             )
 
             logger.debug(
-                f"Chat token usage: prompt={token_counts.input_tokens}, "
-                f"candidates={token_counts.output_tokens}, total={token_counts.total_tokens}"
+                "Chat token usage: prompt=%s, candidates=%s, total=%s",
+                token_counts.input_tokens,
+                token_counts.output_tokens,
+                token_counts.total_tokens,
             )
         else:
             logger.warning("No usage metadata found in Google AI chat response")
 
         # Determine finish reason from candidates
-        google_finish_reason = None
-        if hasattr(response, "candidates") and response.candidates:
-            candidate = response.candidates[0]
-            if hasattr(candidate, "finish_reason"):
-                google_finish_reason = candidate.finish_reason
-
         stop_reason = normalize_stop_reason(
-            google_finish_reason, Provider.GOOGLE_AI_SDK
+            get_finish_reason(response), Provider.GOOGLE_AI_SDK
         )
 
     # Create standardized UsageData
@@ -129,6 +131,7 @@ def create_google_ai_metering_call(
     time_to_first_token: int = 0,
     is_streamed: bool = False,
     model_name_fallback: Optional[str] = None,
+    request_start_ns: Optional[int] = None,
 ) -> None:
     """
     Create and execute a metering call for Google AI SDK responses.
@@ -137,8 +140,8 @@ def create_google_ai_metering_call(
     """
     logger.debug("create_google_ai_metering_call started")
 
-    # Record response timing
-    response_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    # Record response timing on the monotonic clock, anchored to the request time
+    response_time_dt = response_time_from(request_time_dt, request_start_ns)
 
     # Extract usage data using Google AI specific logic
     logger.debug("Extracting usage data...")
@@ -150,7 +153,7 @@ def create_google_ai_metering_call(
         client_instance=client_instance,
         model_name_fallback=model_name_fallback,
     )
-    logger.debug(f"Usage data extracted: {usage_data}")
+    logger.debug("Usage data extracted: %s", usage_data)
 
     # Create metering call using common utilities
     logger.debug("About to call create_metering_call from common utilities")
@@ -163,14 +166,14 @@ def create_google_ai_metering_call(
         )
         logger.debug("create_metering_call completed successfully")
     except Exception as e:
-        logger.error(f"Error in create_metering_call: {e}")
+        logger.error("Error in create_metering_call: %s", e)
         import traceback
 
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("Traceback: %s", traceback.format_exc())
 
 
 # Wrapper for Google AI generate_content method
-@wrapt.patch_function_wrapper("google.genai.models", "Models.generate_content")
+@patch_when_imported("google.genai.models", "Models.generate_content")
 @handle_metering_error
 def generate_content_wrapper(wrapped, instance, args, kwargs):
     """Wraps the google.genai.models.Models.generate_content method to log token usage."""
@@ -181,40 +184,45 @@ def generate_content_wrapper(wrapped, instance, args, kwargs):
 
     # Record request time
     request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
     logger.debug(
-        f"Calling wrapped generate_content function with args: {args}, kwargs: {kwargs}"
+        "Calling wrapped generate_content function with args: %s, kwargs: %s",
+        LogPreview(args),
+        LogPreview(kwargs),
     )
 
     # Call the original Google AI function
     response = wrapped(*args, **kwargs)
 
-    logger.debug("Handling generate_content response: %s", response)
+    logger.debug("Handling generate_content response: %s", LogPreview(response))
 
     # Create metering call using unified function
     logger.debug("About to call create_google_ai_metering_call")
     logger.debug(
-        f"create_google_ai_metering_call function exists: {create_google_ai_metering_call}"
+        "create_google_ai_metering_call function exists: %s",
+        create_google_ai_metering_call,
     )
     try:
         create_google_ai_metering_call(
             response=response,
             operation_type=OperationType.CHAT,
             request_time_dt=request_time_dt,
+            request_start_ns=request_start_ns,
             usage_metadata=usage_metadata,
             client_instance=getattr(instance, "_api_client", None),
         )
         logger.debug("create_google_ai_metering_call completed")
     except Exception as e:
-        logger.error(f"Error in create_google_ai_metering_call: {e}")
+        logger.error("Error in create_google_ai_metering_call: %s", e)
         import traceback
 
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("Traceback: %s", traceback.format_exc())
 
     return response
 
 
 # Wrapper for Google AI embed_content method
-@wrapt.patch_function_wrapper("google.genai.models", "Models.embed_content")
+@patch_when_imported("google.genai.models", "Models.embed_content")
 @handle_metering_error
 def embed_content_wrapper(wrapped, instance, args, kwargs):
     """Wraps the google.genai.models.Models.embed_content method to log token usage."""
@@ -232,25 +240,29 @@ def embed_content_wrapper(wrapped, instance, args, kwargs):
         model_name_from_call = kwargs["model"]
 
     logger.debug(
-        f"Captured model name from embeddings API call: {model_name_from_call}"
+        "Captured model name from embeddings API call: %s", model_name_from_call
     )
 
     # Record request time
     request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
     logger.debug(
-        f"Calling wrapped embed_content function with args: {args}, kwargs: {kwargs}"
+        "Calling wrapped embed_content function with args: %s, kwargs: %s",
+        LogPreview(args),
+        LogPreview(kwargs),
     )
 
     # Call the original Google AI function
     response = wrapped(*args, **kwargs)
 
-    logger.debug("Handling embed_content response: %s", response)
+    logger.debug("Handling embed_content response: %s", LogPreview(response))
 
     # For embeddings, we need to pass the model name since it's not in the response
     create_google_ai_metering_call(
         response=response,
         operation_type=OperationType.EMBED,
         request_time_dt=request_time_dt,
+        request_start_ns=request_start_ns,
         usage_metadata=usage_metadata,
         client_instance=getattr(instance, "_api_client", None),
         model_name_fallback=model_name_from_call,
@@ -260,7 +272,7 @@ def embed_content_wrapper(wrapped, instance, args, kwargs):
 
 
 # Wrapper for Google AI generate_content_stream method (streaming)
-@wrapt.patch_function_wrapper("google.genai.models", "Models.generate_content_stream")
+@patch_when_imported("google.genai.models", "Models.generate_content_stream")
 @handle_metering_error
 def generate_content_stream_wrapper(wrapped, instance, args, kwargs):
     """Wraps the google.genai.models.Models.generate_content_stream method to log token usage."""
@@ -271,8 +283,11 @@ def generate_content_stream_wrapper(wrapped, instance, args, kwargs):
 
     # Record request time
     request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
     logger.debug(
-        f"Calling wrapped generate_content_stream function with args: {args}, kwargs: {kwargs}"
+        "Calling wrapped generate_content_stream function with args: %s, kwargs: %s",
+        LogPreview(args),
+        LogPreview(kwargs),
     )
 
     # Call the original Google AI function
@@ -284,191 +299,189 @@ def generate_content_stream_wrapper(wrapped, instance, args, kwargs):
     return handle_streaming_response(
         stream=stream,
         request_time_dt=request_time_dt,
+        request_start_ns=request_start_ns,
+        usage_metadata=usage_metadata,
+        client_instance=getattr(instance, "_api_client", None),
+    )
+
+
+# Wrapper for Google AI async generate_content method (client.aio.models)
+@patch_when_imported("google.genai.models", "AsyncModels.generate_content")
+@handle_metering_error
+async def async_generate_content_wrapper(wrapped, instance, args, kwargs):
+    """Wraps the google.genai.models.AsyncModels.generate_content method to log token usage."""
+    logger.debug("Google AI async generate_content wrapper called")
+
+    # Extract usage metadata and store it for later use
+    usage_metadata = kwargs.pop("usage_metadata", {})
+
+    # Record request time
+    request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
+
+    # Call the original Google AI coroutine
+    response = await wrapped(*args, **kwargs)
+
+    logger.debug("Handling async generate_content response: %s", LogPreview(response))
+
+    # Metering is dispatched as a task on the running loop, so this never blocks it
+    try:
+        create_google_ai_metering_call(
+            response=response,
+            operation_type=OperationType.CHAT,
+            request_time_dt=request_time_dt,
+            request_start_ns=request_start_ns,
+            usage_metadata=usage_metadata,
+            client_instance=getattr(instance, "_api_client", None),
+        )
+    except Exception as e:
+        logger.error("Error in create_google_ai_metering_call: %s", e)
+        logger.debug("Metering traceback:", exc_info=True)
+
+    return response
+
+
+# Wrapper for Google AI async embed_content method (client.aio.models)
+@patch_when_imported("google.genai.models", "AsyncModels.embed_content")
+@handle_metering_error
+async def async_embed_content_wrapper(wrapped, instance, args, kwargs):
+    """Wraps the google.genai.models.AsyncModels.embed_content method to log token usage."""
+    logger.debug("Google AI async embed_content wrapper called")
+
+    # Extract usage metadata and store it for later use
+    usage_metadata = kwargs.pop("usage_metadata", {})
+
+    # Embeddings responses don't include the model name, so capture it from the call
+    model_name_from_call = args[0] if args else kwargs.get("model")
+
+    # Record request time
+    request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
+
+    # Call the original Google AI coroutine
+    response = await wrapped(*args, **kwargs)
+
+    logger.debug("Handling async embed_content response: %s", LogPreview(response))
+
+    create_google_ai_metering_call(
+        response=response,
+        operation_type=OperationType.EMBED,
+        request_time_dt=request_time_dt,
+        request_start_ns=request_start_ns,
+        usage_metadata=usage_metadata,
+        client_instance=getattr(instance, "_api_client", None),
+        model_name_fallback=model_name_from_call,
+    )
+
+    return response
+
+
+# Wrapper for Google AI async generate_content_stream method (client.aio.models)
+@patch_when_imported("google.genai.models", "AsyncModels.generate_content_stream")
+@handle_metering_error
+async def async_generate_content_stream_wrapper(wrapped, instance, args, kwargs):
+    """Wraps the google.genai.models.AsyncModels.generate_content_stream method to log token usage."""
+    logger.debug("Google AI async generate_content_stream wrapper called")
+
+    # Extract usage metadata and store it for later use
+    usage_metadata = kwargs.pop("usage_metadata", {})
+
+    # Record request time
+    request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
+
+    # The SDK coroutine resolves to an async iterator of chunks
+    stream = await wrapped(*args, **kwargs)
+
+    logger.debug("Handling async generate_content_stream response")
+
+    # Return wrapped stream that will meter usage when complete
+    return handle_async_streaming_response(
+        stream=stream,
+        request_time_dt=request_time_dt,
+        request_start_ns=request_start_ns,
         usage_metadata=usage_metadata,
         client_instance=getattr(instance, "_api_client", None),
     )
 
 
 def handle_streaming_response(
-    stream, request_time_dt, usage_metadata, client_instance=None
+    stream,
+    request_time_dt,
+    usage_metadata,
+    client_instance=None,
+    request_start_ns=None,
 ):
     """
     Handle streaming responses from Google AI.
     Wraps the stream to collect metrics and log them after completion.
     """
+    return StreamWrapper(
+        stream, request_time_dt, usage_metadata, client_instance, request_start_ns
+    )
+
+
+def handle_async_streaming_response(
+    stream,
+    request_time_dt,
+    usage_metadata,
+    client_instance=None,
+    request_start_ns=None,
+):
+    """
+    Handle async streaming responses from Google AI.
+    Wraps the async stream to collect metrics and log them after completion.
+    """
+    return AsyncStreamWrapper(
+        stream, request_time_dt, usage_metadata, client_instance, request_start_ns
+    )
+
+
+# Google AI chunks report the model as model_version
+GOOGLE_AI_STREAM_EXTRACTORS = StreamExtractors(model=chunk_model_version)
+
+
+class StreamWrapper(MeteredStream):
+    """Wraps a Google AI response stream and meters usage once it completes."""
+
+    __slots__ = ("client_instance",)
+
+    def __init__(
+        self,
+        stream,
+        request_time_dt,
+        usage_metadata,
+        client_instance=None,
+        request_start_ns=None,
+    ):
+        super().__init__(
+            stream,
+            GOOGLE_AI_STREAM_EXTRACTORS,
+            request_time_dt,
+            usage_metadata,
+            request_start_ns=request_start_ns,
+        )
+        self.client_instance = client_instance
+
+    def _meter(self, time_to_first_token):
+        create_google_ai_metering_call(
+            response=self.accumulator.to_response(),
+            operation_type=OperationType.CHAT,
+            request_time_dt=self.request_time_dt,
+            request_start_ns=self.accumulator.start_ns,
+            usage_metadata=self.metering_metadata,
+            client_instance=self.client_instance,
+            time_to_first_token=time_to_first_token,
+            is_streamed=True,
+        )
+
+
+class AsyncStreamWrapper(AsyncMeteredStreamMixin, StreamWrapper):
+    """
+    ``async for`` counterpart of StreamWrapper.
+
+    Chunk processing and metering dispatch are non-blocking: the metering
+    record is scheduled as a task on the running loop.
+    """
 
-    class StreamWrapper:
-        def __init__(self, stream):
-            self.stream = stream
-            self.chunks = []
-            self.model = None
-            self.finish_reason = None
-            self.usage_metadata = None
-            self.client_instance = client_instance
-            self.first_chunk_time = None
-            self._closed = False
-            self._usage_logged = False
-
-            # Limit chunk storage to prevent memory issues
-            self._max_chunks = 1000
-
-        def __iter__(self):
-            return self
-
-        def __next__(self):
-            if self._closed:
-                raise StopIteration("Stream has been closed")
-
-            try:
-                chunk = next(self.stream)
-                self._process_chunk(chunk)
-                return chunk
-            except StopIteration:
-                self._finalize()
-                raise
-            except Exception as e:
-                self._handle_error(e)
-                raise
-
-        def __enter__(self):
-            return self
-
-        def __exit__(self, exc_type, exc_val, exc_tb):
-            self.close()
-            return False  # Don't suppress exceptions
-
-        def close(self):
-            """Properly close the stream and clean up resources."""
-            if not self._closed:
-                self._closed = True
-                if not self._usage_logged:
-                    try:
-                        self._log_usage()
-                    except Exception as e:
-                        logger.error("Error logging usage during stream cleanup: %s", e)
-
-                # Clear chunks to free memory
-                self.chunks.clear()
-
-                # Close underlying stream if it has a close method
-                if hasattr(self.stream, "close"):
-                    try:
-                        self.stream.close()
-                    except Exception as e:
-                        logger.debug("Error closing underlying stream: %s", e)
-
-        def _finalize(self):
-            """Finalize the stream and log usage."""
-            if not self._usage_logged:
-                self._log_usage()
-                self._usage_logged = True
-
-        def _handle_error(self, error: Exception):
-            """Handle errors during streaming."""
-            logger.error("Error in streaming response: %s", error)
-            if not self._usage_logged:
-                # Try to log partial usage data
-                try:
-                    self._log_usage()
-                    self._usage_logged = True
-                except Exception as log_error:
-                    logger.error(
-                        "Failed to log usage after stream error: %s", log_error
-                    )
-
-        def _process_chunk(self, chunk):
-            """Process each chunk to extract metadata"""
-            # Limit chunk storage to prevent memory issues
-            if len(self.chunks) < self._max_chunks:
-                self.chunks.append(chunk)
-            elif len(self.chunks) == self._max_chunks:
-                logger.warning(
-                    "Reached maximum chunk limit (%d), not storing additional chunks",
-                    self._max_chunks,
-                )
-
-            # Record time of first chunk
-            if self.first_chunk_time is None:
-                self.first_chunk_time = datetime.datetime.now(datetime.timezone.utc)
-
-            # Extract model name from chunk using safe access
-            if self.model is None:
-                self.model = safe_getattr(chunk, "model_version")
-
-            # Check for finish reason and usage metadata in the chunk
-            candidates = safe_getattr(chunk, "candidates")
-            if candidates and len(candidates) > 0:
-                candidate = candidates[0]
-                finish_reason = safe_getattr(candidate, "finish_reason")
-                if finish_reason:
-                    self.finish_reason = finish_reason
-
-            # Check for usage metadata in the chunk (final chunk typically has this)
-            usage_metadata = safe_getattr(chunk, "usage_metadata")
-            if usage_metadata:
-                self.usage_metadata = usage_metadata
-
-        def _log_usage(self):
-            """Log usage after stream completion"""
-            try:
-                if not self.chunks:
-                    logger.warning("No chunks received in streaming response")
-                    return
-
-                # Calculate time to first token
-                time_to_first_token = 0
-                if self.first_chunk_time:
-                    time_to_first_token = int(
-                        (self.first_chunk_time - request_time_dt).total_seconds() * 1000
-                    )
-
-                # Create a synthetic response object for usage extraction
-                class SyntheticResponse:
-                    def __init__(self, model_version, usage_metadata, candidates):
-                        self.model_version = model_version
-                        self.usage_metadata = usage_metadata
-                        self.candidates = candidates
-
-                # Create synthetic response from collected data
-                synthetic_response = SyntheticResponse(
-                    model_version=self.model,
-                    usage_metadata=self.usage_metadata,
-                    candidates=(
-                        [
-                            type(
-                                "obj", (object,), {"finish_reason": self.finish_reason}
-                            )()
-                        ]
-                        if self.finish_reason
-                        else []
-                    ),
-                )
-
-                # Create metering call for streaming response
-                create_google_ai_metering_call(
-                    response=synthetic_response,
-                    operation_type=OperationType.CHAT,
-                    request_time_dt=request_time_dt,
-                    usage_metadata=usage_metadata,
-                    client_instance=self.client_instance,
-                    time_to_first_token=time_to_first_token,
-                    is_streamed=True,
-                )
-
-                logger.debug(
-                    "Streaming usage logged: model=%s, chunks=%d, time_to_first_token=%dms",
-                    self.model,
-                    len(self.chunks),
-                    time_to_first_token,
-                )
-
-            except Exception as e:
-                # Don't let logging errors break the stream
-                logger.error("Error logging streaming usage: %s", e)
-                raise StreamingError(
-                    f"Failed to log streaming usage: {str(e)}",
-                    chunk_count=len(self.chunks) if self.chunks else 0,
-                    stream_state="completed",
-                ) from e
-
-    return StreamWrapper(stream)
+    __slots__ = ()
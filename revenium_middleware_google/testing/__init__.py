@@ -0,0 +1,13 @@
+"""
+Test utilities for applications and benchmarks using the middleware.
+
+Nothing here is imported by the middleware itself.
+"""
+
+from .fake_revenium import FakeReveniumServer, FaultConfig, ReceivedRequest
+
+__all__ = [
+    "FakeReveniumServer",
+    "FaultConfig",
+    "ReceivedRequest",
+]
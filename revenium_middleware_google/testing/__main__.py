@@ -0,0 +1,5 @@
+"""Run the local stand-in Revenium server (see fake_revenium.main)."""
+
+from .fake_revenium import main
+
+main()
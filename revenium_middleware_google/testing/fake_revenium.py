@@ -0,0 +1,413 @@
+"""
+Local stand-in for the Revenium metering API.
+
+FakeReveniumServer implements the completions endpoint the middleware posts
+to (``/meter/v2/ai/completions``), plus a grouped variant taking a JSON array
+of records (``/meter/v2/ai/completions/batch``), records every payload it
+receives and can inject latency, server errors, 429 rate limiting and
+dropped connections. gzip and zstd request bodies are decoded.
+Point the middleware at it through REVENIUM_METERING_BASE_URL (or a client
+built with ``base_url=server.base_url``) to exercise the real HTTP path
+offline.
+
+In tests::
+
+    with FakeReveniumServer(latency=0.01, error_rate=0.1, seed=1) as server:
+        client = ReveniumMetering(api_key="hak_test", base_url=server.base_url)
+        ...
+        server.wait_for_records(100)
+
+From the command line, for load tests against a separate process::
+
+    python -m revenium_middleware_google.testing --latency 0.02
+    export REVENIUM_METERING_BASE_URL=http://127.0.0.1:8099
+
+``GET /_fake/stats`` returns the server's counters as JSON.
+"""
+
+import argparse
+import datetime
+import gzip
+import json
+import logging
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Union
+
+logger = logging.getLogger("revenium_middleware.extension")
+
+COMPLETIONS_PATH = "/v2/ai/completions"
+# Only the fake accepts arrays of records here; see BatchingConfig.group_path
+GROUP_PATH = COMPLETIONS_PATH + "/batch"
+STATS_PATH = "/_fake/stats"
+
+# Scripted outcomes accepted by FakeReveniumServer.enqueue
+OK = "ok"
+DROP = "drop"
+RATE_LIMIT = "429"
+
+Outcome = Union[str, int]
+
+
+@dataclass
+class FaultConfig:
+    """
+    Faults injected into completion requests.
+
+    Rates are probabilities per request and are checked in the order drop,
+    429, error; a request that draws none of them is accepted.
+    """
+
+    latency: float = 0.0  # seconds added before every response
+    latency_jitter: float = 0.0  # extra uniform random delay, seconds
+    error_rate: float = 0.0
+    error_status: int = 500
+    rate_limit_rate: float = 0.0
+    retry_after: Optional[float] = None  # Retry-After header on 429s, seconds
+    drop_rate: float = 0.0  # close the connection without a response
+
+
+@dataclass
+class ReceivedRequest:
+    """A completion request as the server received it."""
+
+    payload: Any  # one record, or a list of records on the grouped path
+    headers: Dict[str, str]
+    path: str
+    received_at: float  # time.monotonic()
+    outcome: str  # "ok", "drop", "429" or the error status
+    client_port: int = 0  # source port; one value per client connection
+    body_bytes: int = 0  # request body size on the wire, before decoding
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_HTTPServer"
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; don't let Nagle hold the body
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.fake._count("connections")
+
+    def log_message(self, format, *args):
+        logger.debug("Fake Revenium: " + format, *args)
+
+    def do_GET(self):
+        if self.path != STATS_PATH:
+            self._reply(404, {"error": "not found"})
+            return
+        self._reply(200, self.server.fake.stats())
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.endswith((COMPLETIONS_PATH, GROUP_PATH)):
+            self._reply(404, {"error": "not found"})
+            return
+        self.server.fake._handle_completion(self, body)
+
+    def _reply(self, status: int, body: Any, headers=None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _drop(self) -> None:
+        self.close_connection = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default backlog of 5 drops SYNs under concurrent load
+    request_queue_size = 128
+    fake: "FakeReveniumServer"
+
+
+class FakeReveniumServer:
+    """
+    Threaded local HTTP server answering like the Revenium metering API.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        seed: Seed for the fault injection random generator
+        **faults: FaultConfig fields (latency, latency_jitter, error_rate,
+                  error_status, rate_limit_rate, retry_after, drop_rate)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+        **faults,
+    ):
+        self.faults = FaultConfig()
+        self.configure(**faults)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._received = threading.Condition(self._lock)
+        self._script: Deque[Outcome] = deque()
+        self._requests: List[ReceivedRequest] = []
+        self._counts = dict.fromkeys(
+            ("requests", "accepted", "errors", "rate_limited", "dropped", "connections"),
+            0,
+        )
+        self._httpd = _HTTPServer((host, port), _Handler)
+        self._httpd.fake = self
+        self._thread: Optional[threading.Thread] = None
+
+    # Lifecycle
+
+    def start(self) -> "FakeReveniumServer":
+        """Serve requests on a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._httpd.serve_forever,
+                args=(0.05,),
+                name="fake-revenium-server",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeReveniumServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        """Base URL for REVENIUM_METERING_BASE_URL or ReveniumMetering(base_url=...)."""
+        return f"http://{self._httpd.server_address[0]}:{self.port}/meter"
+
+    # Fault injection
+
+    def configure(self, **faults) -> None:
+        """Change FaultConfig fields; applies to requests received from now on."""
+        names = {f.name for f in fields(FaultConfig)}
+        for name, value in faults.items():
+            if name not in names:
+                raise TypeError(f"Unknown fault option: {name}")
+            setattr(self.faults, name, value)
+
+    def enqueue(self, *outcomes: Outcome) -> None:
+        """
+        Script the outcome of the next requests, ahead of the random faults.
+
+        Args:
+            *outcomes: "ok", "drop", "429" or an HTTP error status per request
+        """
+        with self._lock:
+            self._script.extend(outcomes)
+
+    # Inspection
+
+    @property
+    def requests(self) -> List[ReceivedRequest]:
+        """Every completion request received, in arrival order."""
+        with self._lock:
+            return list(self._requests)
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        """Accepted records, with grouped requests flattened, in arrival order."""
+        with self._lock:
+            records: List[Dict[str, Any]] = []
+            for r in self._requests:
+                if r.outcome != OK:
+                    continue
+                if isinstance(r.payload, list):
+                    records.extend(r.payload)
+                else:
+                    records.append(r.payload)
+            return records
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Request counters by outcome and TCP connections accepted.
+
+        "accepted" counts records, so a grouped request adds one per record.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def wait_for_records(self, count: int, timeout: float = 5.0) -> bool:
+        """
+        Wait until at least count records have been accepted.
+
+        Returns:
+            True if they arrived before the timeout
+        """
+        deadline = time.monotonic() + timeout
+        with self._received:
+            while self._counts["accepted"] < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._received.wait(remaining)
+        return True
+
+    def reset(self) -> None:
+        """Forget received requests, counters and scripted outcomes."""
+        with self._lock:
+            self._requests.clear()
+            self._script.clear()
+            for name in self._counts:
+                self._counts[name] = 0
+
+    # Request handling
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _next_outcome(self) -> str:
+        faults = self.faults
+        with self._lock:
+            scripted = str(self._script.popleft()) if self._script else None
+            draw = self._random.random()
+            delay = faults.latency + self._random.random() * faults.latency_jitter
+        if delay > 0:
+            time.sleep(delay)
+        if scripted is not None:
+            return scripted
+        if draw < faults.drop_rate:
+            return DROP
+        if draw < faults.drop_rate + faults.rate_limit_rate:
+            return RATE_LIMIT
+        if draw < faults.drop_rate + faults.rate_limit_rate + faults.error_rate:
+            return str(faults.error_status)
+        return OK
+
+    def _handle_completion(self, handler: _Handler, body: bytes) -> None:
+        outcome = self._next_outcome()
+        body_bytes = len(body)
+        encoding = handler.headers.get("Content-Encoding", "").lower()
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                handler._reply(415, {"error": "zstd needs the zstandard package"})
+                return
+            body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {"_raw": body.decode("utf-8", "replace")}
+        count = len(payload) if isinstance(payload, list) else 1
+
+        with self._lock:
+            self._counts["requests"] += 1
+            self._requests.append(
+                ReceivedRequest(
+                    payload=payload,
+                    headers=dict(handler.headers.items()),
+                    path=handler.path,
+                    received_at=time.monotonic(),
+                    outcome=outcome,
+                    client_port=handler.client_address[1],
+                    body_bytes=body_bytes,
+                )
+            )
+            if outcome == OK:
+                self._counts["accepted"] += count
+            else:
+                counter = {DROP: "dropped", RATE_LIMIT: "rate_limited"}
+                self._counts[counter.get(outcome, "errors")] += 1
+            if outcome == OK:
+                self._received.notify_all()
+
+        if outcome == DROP:
+            handler._drop()
+        elif outcome == RATE_LIMIT:
+            headers = {}
+            if self.faults.retry_after is not None:
+                headers["Retry-After"] = f"{self.faults.retry_after:g}"
+            handler._reply(429, {"error": "rate limited"}, headers)
+        elif outcome != OK:
+            handler._reply(int(outcome), {"error": "injected failure"})
+        elif isinstance(payload, list):
+            handler._reply(201, [_resource(record) for record in payload])
+        else:
+            handler._reply(201, _resource(payload))
+
+
+def _resource(record: Any) -> Dict[str, Any]:
+    """The metering resource the API returns for an accepted record."""
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    label = record.get("transactionId") if isinstance(record, dict) else None
+    return {
+        "id": str(uuid.uuid4()),
+        "label": label or "completion",
+        "resourceType": "metering",
+        "signature": "fake",
+        "created": now,
+        "updated": now,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in Revenium metering API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    faults = {
+        name: value
+        for name, value in vars(args).items()
+        if name not in ("host", "port", "seed")
+    }
+    server = FakeReveniumServer(args.host, args.port, seed=args.seed, **faults)
+    print(
+        f"Fake Revenium listening; REVENIUM_METERING_BASE_URL={server.base_url}",
+        flush=True,
+    )
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats()))
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
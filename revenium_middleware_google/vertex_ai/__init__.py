@@ -22,6 +22,9 @@ from .middleware import (
     extract_vertex_ai_embedding_tokens,
     create_vertex_ai_metering_call,
     handle_vertex_ai_streaming_response,
+    handle_vertex_ai_async_streaming_response,
+    VertexAIStreamWrapper,
+    AsyncVertexAIStreamWrapper,
 )
 
 from .provider import (
@@ -39,6 +42,9 @@ __all__ = [
     "extract_vertex_ai_embedding_tokens",
     "create_vertex_ai_metering_call",
     "handle_vertex_ai_streaming_response",
+    "handle_vertex_ai_async_streaming_response",
+    "VertexAIStreamWrapper",
+    "AsyncVertexAIStreamWrapper",
     # Provider functions
     "detect_provider",
     "get_provider_metadata",
@@ -13,11 +13,9 @@ Key advantages over Google AI SDK:
 
 import datetime
 import logging
+import time
 from typing import Dict, Any, Optional, List
 
-import wrapt
-from revenium_middleware import run_async_in_thread
-
 # Import common utilities and types
 from ..common import (
     OperationType,
@@ -30,9 +28,18 @@ from ..common import (
     create_usage_data,
     extract_model_name,
     extract_token_counts,
-    StreamingError,
+    get_finish_reason,
     handle_metering_error,
-    safe_getattr,
+    response_time_from,
+    LogPreview,
+    normalize_model_name,
+    resolve_instance_model_name,
+)
+from ..common.patching import patch_when_imported, when_imported, wrap_function
+from ..common.streaming import (
+    AsyncMeteredStreamMixin,
+    MeteredStream,
+    StreamExtractors,
 )
 
 # Vertex AI specific imports
@@ -66,7 +73,8 @@ def extract_vertex_ai_usage_data(
         if hasattr(raw_response, "model_version") and raw_response.model_version:
             model_name = raw_response.model_version
             logger.debug(
-                f"Extracted model name from Vertex AI _raw_response.model_version: {model_name}"
+                "Extracted model name from Vertex AI _raw_response.model_version: %s",
+                model_name,
             )
 
     # Fallback to common extraction if not found
@@ -77,22 +85,9 @@ def extract_vertex_ai_usage_data(
     if not model_name:
         model_name = model_name_fallback or "unknown-model"
 
-    # Clean up model name - remove Google's path prefixes
+    # Clean up model name - reduce Google resource paths to the model id
     if model_name and isinstance(model_name, str):
-        # Remove common Google path prefixes
-        prefixes_to_remove = [
-            "publishers/google/models/",
-            "models/",
-            "google/models/",
-            "projects/",
-        ]
-        for prefix in prefixes_to_remove:
-            if model_name.startswith(prefix):
-                model_name = model_name[len(prefix) :]
-                logger.debug(
-                    f"Cleaned model name, removed prefix '{prefix}': {model_name}"
-                )
-                break
+        model_name = normalize_model_name(model_name)
 
     # Extract token counts with Vertex AI specific handling
     if operation_type == OperationType.EMBED:
@@ -100,37 +95,38 @@ def extract_vertex_ai_usage_data(
         token_counts = extract_vertex_ai_embedding_tokens(response)
         stop_reason = "END"  # Embeddings always complete successfully
         logger.debug(
-            f"Vertex AI embeddings token usage: {token_counts.total_tokens} tokens"
+            "Vertex AI embeddings token usage: %s tokens", token_counts.total_tokens
         )
     else:  # CHAT
         # Extract usage metadata from Vertex AI response
         token_counts = extract_vertex_ai_generation_tokens(response)
 
         # Determine finish reason from candidates
-        vertex_finish_reason = None
-        if hasattr(response, "candidates") and response.candidates:
-            candidate = response.candidates[0]
-            if hasattr(candidate, "finish_reason"):
-                vertex_finish_reason = candidate.finish_reason
-                logger.debug(
-                    f" Raw vertex_finish_reason: {vertex_finish_reason} (type: {type(vertex_finish_reason)})"
-                )
+        vertex_finish_reason = get_finish_reason(response)
+        if vertex_finish_reason is not None:
+            logger.debug(
+                " Raw vertex_finish_reason: %s (type: %s)",
+                vertex_finish_reason,
+                type(vertex_finish_reason),
+            )
 
-                # Convert enum to string if needed
-                if hasattr(vertex_finish_reason, "name"):
-                    vertex_finish_reason = vertex_finish_reason.name
-                    logger.debug(f" Converted enum to string: {vertex_finish_reason}")
-                elif not isinstance(vertex_finish_reason, str):
-                    vertex_finish_reason = str(vertex_finish_reason)
-                    logger.debug(f" Converted to string: {vertex_finish_reason}")
+            # Convert enum to string if needed
+            if hasattr(vertex_finish_reason, "name"):
+                vertex_finish_reason = vertex_finish_reason.name
+                logger.debug(" Converted enum to string: %s", vertex_finish_reason)
+            elif not isinstance(vertex_finish_reason, str):
+                vertex_finish_reason = str(vertex_finish_reason)
+                logger.debug(" Converted to string: %s", vertex_finish_reason)
 
         stop_reason = normalize_stop_reason(
             vertex_finish_reason, Provider.VERTEX_AI_SDK
         )
-        logger.debug(f" Final stop_reason after normalization: {stop_reason}")
+        logger.debug(" Final stop_reason after normalization: %s", stop_reason)
         logger.debug(
-            f"Vertex AI chat token usage: prompt={token_counts.input_tokens}, "
-            f"candidates={token_counts.output_tokens}, total={token_counts.total_tokens}"
+            "Vertex AI chat token usage: prompt=%s, candidates=%s, total=%s",
+            token_counts.input_tokens,
+            token_counts.output_tokens,
+            token_counts.total_tokens,
         )
 
     # Create standardized UsageData
@@ -212,7 +208,8 @@ def extract_vertex_ai_embedding_tokens(response: Any) -> TokenCounts:
                 # Embeddings don't generate output tokens
                 token_counts.output_tokens = 0
                 logger.debug(
-                    f"Extracted token count from Vertex AI embedding statistics: {token_count}"
+                    "Extracted token count from Vertex AI embedding statistics: %s",
+                    token_count,
                 )
                 return token_counts
 
@@ -234,7 +231,9 @@ def extract_vertex_ai_embedding_tokens(response: Any) -> TokenCounts:
                     token_counts.total_tokens = estimated_tokens
                     token_counts.output_tokens = 0
                     logger.debug(
-                        f"Estimated token count from billable characters: {char_count} chars -> {estimated_tokens} tokens"
+                        "Estimated token count from billable characters: %s chars -> %s tokens",
+                        char_count,
+                        estimated_tokens,
                     )
                     return token_counts
 
@@ -270,14 +269,15 @@ def create_vertex_ai_metering_call(
     time_to_first_token: int = 0,
     is_streamed: bool = False,
     model_name_fallback: Optional[str] = None,
+    request_start_ns: Optional[int] = None,
 ) -> None:
     """
     Create and execute a metering call for Vertex AI SDK responses.
 
     This is the main function used by the wrapper functions.
     """
-    # Record response timing
-    response_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    # Record response timing on the monotonic clock, anchored to the request time
+    response_time_dt = response_time_from(request_time_dt, request_start_ns)
 
     # Extract usage data using Vertex AI specific logic
     usage_data = extract_vertex_ai_usage_data(
@@ -297,172 +297,119 @@ def create_vertex_ai_metering_call(
     )
 
 
-# Dynamic wrapper discovery and application for Vertex AI GenerativeModel.generate_content
-def _apply_generate_content_wrappers():
+# GenerativeModel module variants, wrapped when (and if) the application imports them
+GENERATIVE_MODEL_MODULES = (
+    "vertexai.generative_models",
+    "vertexai.preview.generative_models",
+    "vertexai.v1.generative_models",
+    "vertexai.v1beta1.generative_models",
+    "vertexai.v2.generative_models",
+    "vertexai.beta.generative_models",
+    "vertexai.alpha.generative_models",
+)
+
+# GenerativeModel classes already wrapped (a module variant may re-export another's class)
+_wrapped_generative_models = set()
+
+
+def _wrap_generative_model(module):
+    """Wrap GenerativeModel.generate_content(_async) in a newly imported module."""
+    module_path = module.__name__
+    generative_model_class = getattr(module, "GenerativeModel", None)
+    if generative_model_class is None:
+        logger.debug("  %s exists but no GenerativeModel class", module_path)
+        return
+    if not hasattr(generative_model_class, "generate_content"):
+        logger.debug(
+            "  %s.GenerativeModel exists but no generate_content method", module_path
+        )
+        return
+    if generative_model_class in _wrapped_generative_models:
+        logger.debug("  %s.GenerativeModel is already wrapped", module_path)
+        return
+    _wrapped_generative_models.add(generative_model_class)
+
+    wrap_function(
+        module, "GenerativeModel.generate_content", generate_content_wrapper_impl
+    )
+    logger.debug(" Applied wrapper to %s.GenerativeModel.generate_content", module_path)
+
+    if hasattr(generative_model_class, "generate_content_async"):
+        wrap_function(
+            module,
+            "GenerativeModel.generate_content_async",
+            generate_content_async_wrapper_impl,
+        )
+        logger.debug(
+            " Applied wrapper to %s.GenerativeModel.generate_content_async",
+            module_path,
+        )
+
+    logger.info(" Vertex AI GenerativeModel wrappers applied to: %s", module_path)
+
+
+def _register_generate_content_wrappers():
     """
-    Dynamically discover and wrap all Vertex AI GenerativeModel.generate_content methods.
-    This handles current and future module path variations like:
-    - vertexai.generative_models.GenerativeModel
-    - vertexai.preview.generative_models.GenerativeModel
-    - vertexai.v1.generative_models.GenerativeModel
-    - etc.
+    Wrap every Vertex AI GenerativeModel variant the application imports.
+
+    Handles current and future module path variations like
+    vertexai.generative_models and vertexai.preview.generative_models. The
+    modules are never imported here; each is wrapped by a post-import hook.
     """
-    import sys
-    import importlib
-
-    # Known module patterns to try
-    module_patterns = [
-        "vertexai.generative_models",
-        "vertexai.preview.generative_models",
-        "vertexai.v1.generative_models",
-        "vertexai.v1beta1.generative_models",
-        "vertexai.v2.generative_models",
-        "vertexai.beta.generative_models",
-        "vertexai.alpha.generative_models",
-    ]
-
-    wrapped_modules = []
-
-    for module_path in module_patterns:
-        try:
-            # Try to import the module
-            module = importlib.import_module(module_path)
-
-            # Check if GenerativeModel class exists
-            if hasattr(module, "GenerativeModel"):
-                generative_model_class = getattr(module, "GenerativeModel")
-
-                # Check if generate_content method exists
-                if hasattr(generative_model_class, "generate_content"):
-                    logger.debug(
-                        f"Found GenerativeModel.generate_content in {module_path}"
-                    )
+    for module_path in GENERATIVE_MODEL_MODULES:
+        when_imported(module_path, _wrap_generative_model)
 
-                    # Apply wrapper using wrapt
-                    @wrapt.patch_function_wrapper(
-                        module_path, "GenerativeModel.generate_content"
-                    )
-                    def generate_content_wrapper_dynamic(
-                        wrapped, instance, args, kwargs
-                    ):
-                        return generate_content_wrapper_impl(
-                            wrapped, instance, args, kwargs
-                        )
-
-                    wrapped_modules.append(module_path)
-                    logger.debug(
-                        f" Applied wrapper to {module_path}.GenerativeModel.generate_content"
-                    )
-                else:
-                    logger.debug(
-                        f"  {module_path}.GenerativeModel exists but no generate_content method"
-                    )
-            else:
-                logger.debug(f"  {module_path} exists but no GenerativeModel class")
 
-        except ImportError:
-            logger.debug(f"  Module {module_path} not available")
-        except Exception as e:
-            logger.debug(f"  Error checking {module_path}: {e}")
+def _get_model_name_from_instance(
+    instance: Any, strip_prefix: bool = True
+) -> Optional[str]:
+    """
+    Find the model name on a Vertex AI model instance.
+
+    Args:
+        instance: GenerativeModel or TextEmbeddingModel instance
+        strip_prefix: Remove Google path prefixes such as "publishers/google/models/"
+
+    Returns:
+        The model name, or None if it could not be found
+    """
+    return resolve_instance_model_name(instance, strip_prefix)
 
-    if wrapped_modules:
-        logger.info(
-            f" Vertex AI GenerativeModel wrappers applied to: {', '.join(wrapped_modules)}"
-        )
-    else:
-        logger.warning("  No Vertex AI GenerativeModel modules found to wrap")
 
-    return wrapped_modules
+def _get_usage_metadata(instance: Any, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract usage metadata from instance or kwargs."""
+    return getattr(instance, "_revenium_usage_metadata", {}) or kwargs.pop(
+        "usage_metadata", {}
+    )
 
 
 def generate_content_wrapper_impl(wrapped, instance, args, kwargs):
     """Enhanced wrapper that handles both streaming and non-streaming Vertex AI calls."""
     logger.debug("Enhanced Vertex AI generate_content wrapper called!")
-    logger.debug(f"Wrapper args: {args}")
-    logger.debug(f"Wrapper kwargs: {kwargs}")
-    logger.debug(f"Instance type: {type(instance)}")
+    logger.debug("Wrapper args: %s", LogPreview(args))
+    logger.debug("Wrapper kwargs: %s", LogPreview(kwargs))
+    logger.debug("Instance type: %s", type(instance))
 
     # Extract usage metadata from instance or kwargs
-    usage_metadata = getattr(instance, "_revenium_usage_metadata", {}) or kwargs.pop(
-        "usage_metadata", {}
-    )
-    logger.debug(f"Captured usage metadata for generate_content: {usage_metadata}")
+    usage_metadata = _get_usage_metadata(instance, kwargs)
     logger.debug(
-        f"Instance has _revenium_usage_metadata: {hasattr(instance, '_revenium_usage_metadata')}"
+        "Captured usage metadata for generate_content: %s", LogPreview(usage_metadata)
     )
-    if hasattr(instance, "_revenium_usage_metadata"):
-        logger.debug(
-            f"Instance._revenium_usage_metadata value: {getattr(instance, '_revenium_usage_metadata')}"
-        )
 
     # Try to extract model name from the instance
-    model_name_from_instance = None
-    for attr in [
-        "_model_name",
-        "model_name",
-        "_model_id",
-        "model_id",
-        "_model",
-        "model",
-    ]:
-        if hasattr(instance, attr):
-            model_name_from_instance = getattr(instance, attr)
-            logger.debug(
-                f"Found model name in instance.{attr}: {model_name_from_instance}"
-            )
-            break
-
-    # Clean up the instance model name too
-    if model_name_from_instance and isinstance(model_name_from_instance, str):
-        # Remove common Google path prefixes
-        prefixes_to_remove = [
-            "publishers/google/models/",
-            "models/",
-            "google/models/",
-            "projects/",
-        ]
-        for prefix in prefixes_to_remove:
-            if model_name_from_instance.startswith(prefix):
-                model_name_from_instance = model_name_from_instance[len(prefix) :]
-                logger.debug(
-                    f"Cleaned instance model name, removed prefix '{prefix}': {model_name_from_instance}"
-                )
-                break
-
-    if not model_name_from_instance:
-        logger.debug(
-            f"Could not find model name in instance. Available attributes: {dir(instance)}"
-        )
-        # Try to get it from the instance string representation
-        instance_str = str(instance)
-        if "model_name=" in instance_str:
-            # Extract from string like "GenerativeModel(model_name='gemini-2.0-flash-lite-001')"
-            import re
-
-            match = re.search(r"model_name='([^']+)'", instance_str)
-            if match:
-                model_name_from_instance = match.group(1)
-                logger.debug(
-                    f"Extracted model name from instance string: {model_name_from_instance}"
-                )
-        elif "models/" in instance_str:
-            # Extract from string like "models/gemini-2.0-flash-lite-001"
-            import re
-
-            match = re.search(r"models/([^'\s)]+)", instance_str)
-            if match:
-                model_name_from_instance = match.group(1)
-                logger.debug(
-                    f"Extracted model name from instance string (models/): {model_name_from_instance}"
-                )
+    model_name_from_instance = _get_model_name_from_instance(instance)
 
     # Check if this is a streaming call
     is_streaming = kwargs.get("stream", False)
 
     # Record request time
     request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
     logger.debug(
-        f"Calling wrapped Vertex AI generate_content function (streaming={is_streaming}) with args: {args}, kwargs: {kwargs}"
+        "Calling wrapped Vertex AI generate_content function (streaming=%s) with args: %s, kwargs: %s",
+        is_streaming,
+        LogPreview(args),
+        LogPreview(kwargs),
     )
 
     # Call the original Vertex AI function
@@ -474,99 +421,142 @@ def generate_content_wrapper_impl(wrapped, instance, args, kwargs):
         return handle_vertex_ai_streaming_response(
             stream=response,
             request_time_dt=request_time_dt,
+            request_start_ns=request_start_ns,
             usage_metadata=usage_metadata,
             model_name_fallback=model_name_from_instance,
         )
     else:
-        logger.debug("Handling Vertex AI non-streaming response: %s", response)
+        logger.debug(
+            "Handling Vertex AI non-streaming response: %s", LogPreview(response)
+        )
         # Handle non-streaming response immediately
         create_vertex_ai_metering_call(
             response=response,
             operation_type=OperationType.CHAT,
             request_time_dt=request_time_dt,
+            request_start_ns=request_start_ns,
             usage_metadata=usage_metadata,
             model_name_fallback=model_name_from_instance,
         )
         return response
 
 
+async def generate_content_async_wrapper_impl(wrapped, instance, args, kwargs):
+    """Async counterpart of generate_content_wrapper_impl for generate_content_async."""
+    logger.debug("Vertex AI generate_content_async wrapper called")
+
+    usage_metadata = _get_usage_metadata(instance, kwargs)
+    model_name_from_instance = _get_model_name_from_instance(instance)
+
+    # Check if this is a streaming call
+    is_streaming = kwargs.get("stream", False)
+
+    # Record request time
+    request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
+
+    # Call the original Vertex AI coroutine; with stream=True it resolves to
+    # an async iterable of chunks
+    response = await wrapped(*args, **kwargs)
+
+    if is_streaming:
+        logger.debug("Handling Vertex AI async streaming response")
+        return handle_vertex_ai_async_streaming_response(
+            stream=response,
+            request_time_dt=request_time_dt,
+            request_start_ns=request_start_ns,
+            usage_metadata=usage_metadata,
+            model_name_fallback=model_name_from_instance,
+        )
+
+    logger.debug(
+        "Handling Vertex AI async non-streaming response: %s", LogPreview(response)
+    )
+    # Metering is dispatched as a task on the running loop, so this never blocks it
+    create_vertex_ai_metering_call(
+        response=response,
+        operation_type=OperationType.CHAT,
+        request_time_dt=request_time_dt,
+        request_start_ns=request_start_ns,
+        usage_metadata=usage_metadata,
+        model_name_fallback=model_name_from_instance,
+    )
+    return response
+
+
 # Wrapper for Vertex AI TextEmbeddingModel.get_embeddings method
-@wrapt.patch_function_wrapper(
-    "vertexai.language_models", "TextEmbeddingModel.get_embeddings"
-)
+@patch_when_imported("vertexai.language_models", "TextEmbeddingModel.get_embeddings")
 def get_embeddings_wrapper(wrapped, instance, args, kwargs):
     """Wraps the vertexai.language_models.TextEmbeddingModel.get_embeddings method to log token usage."""
     logger.debug("Vertex AI get_embeddings wrapper called")
 
     # Extract usage metadata from instance or kwargs
-    usage_metadata = getattr(instance, "_revenium_usage_metadata", {}) or kwargs.pop(
-        "usage_metadata", {}
-    )
+    usage_metadata = _get_usage_metadata(instance, kwargs)
 
     # Try to extract model name from the instance using the same logic as generate_content
-    model_name_from_instance = None
-    for attr in [
-        "_model_name",
-        "model_name",
-        "_model_id",
-        "model_id",
-        "_model",
-        "model",
-    ]:
-        if hasattr(instance, attr):
-            model_name_from_instance = getattr(instance, attr)
-            logger.debug(
-                f"Found model name in embeddings instance.{attr}: {model_name_from_instance}"
-            )
-            break
-
-    if not model_name_from_instance:
-        logger.debug(
-            f"Could not find model name in embeddings instance. Available attributes: {dir(instance)}"
-        )
-        # Try to get it from the instance string representation
-        instance_str = str(instance)
-        if "model_name=" in instance_str:
-            # Extract from string like "TextEmbeddingModel(model_name='text-embedding-004')"
-            import re
-
-            match = re.search(r"model_name='([^']+)'", instance_str)
-            if match:
-                model_name_from_instance = match.group(1)
-                logger.debug(
-                    f"Extracted model name from embeddings instance string: {model_name_from_instance}"
-                )
-        elif "models/" in instance_str:
-            # Extract from string like "models/text-embedding-004"
-            import re
-
-            match = re.search(r"models/([^'\s)]+)", instance_str)
-            if match:
-                model_name_from_instance = match.group(1)
-                logger.debug(
-                    f"Extracted model name from embeddings instance string (models/): {model_name_from_instance}"
-                )
+    model_name_from_instance = _get_model_name_from_instance(
+        instance, strip_prefix=False
+    )
 
     logger.debug(
-        f"Final captured model name from Vertex AI embeddings instance: {model_name_from_instance}"
+        "Final captured model name from Vertex AI embeddings instance: %s",
+        model_name_from_instance,
     )
 
     # Record request time
     request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
     logger.debug(
-        f"Calling wrapped Vertex AI get_embeddings function with args: {args}, kwargs: {kwargs}"
+        "Calling wrapped Vertex AI get_embeddings function with args: %s, kwargs: %s",
+        LogPreview(args),
+        LogPreview(kwargs),
     )
 
     # Call the original Vertex AI function
     response = wrapped(*args, **kwargs)
 
-    logger.debug("Handling Vertex AI get_embeddings response: %s", response)
+    logger.debug("Handling Vertex AI get_embeddings response: %s", LogPreview(response))
 
     # Create metering call for embeddings
     create_vertex_ai_metering_call(
         response=response,
         operation_type=OperationType.EMBED,
         request_time_dt=request_time_dt,
+        request_start_ns=request_start_ns,
+        usage_metadata=usage_metadata,
+        model_name_fallback=model_name_from_instance,
+    )
+
+    return response
+
+
+# Wrapper for Vertex AI TextEmbeddingModel.get_embeddings_async method
+# (applied below, only if the installed SDK has it)
+async def get_embeddings_async_wrapper(wrapped, instance, args, kwargs):
+    """Wraps the vertexai.language_models.TextEmbeddingModel.get_embeddings_async method to log token usage."""
+    logger.debug("Vertex AI get_embeddings_async wrapper called")
+
+    usage_metadata = _get_usage_metadata(instance, kwargs)
+    model_name_from_instance = _get_model_name_from_instance(
+        instance, strip_prefix=False
+    )
+
+    # Record request time
+    request_time_dt = datetime.datetime.now(datetime.timezone.utc)
+    request_start_ns = time.perf_counter_ns()
+
+    # Call the original Vertex AI coroutine
+    response = await wrapped(*args, **kwargs)
+
+    logger.debug(
+        "Handling Vertex AI get_embeddings_async response: %s", LogPreview(response)
+    )
+
+    create_vertex_ai_metering_call(
+        response=response,
+        operation_type=OperationType.EMBED,
+        request_time_dt=request_time_dt,
+        request_start_ns=request_start_ns,
         usage_metadata=usage_metadata,
         model_name_fallback=model_name_from_instance,
     )
@@ -574,195 +564,101 @@ def get_embeddings_wrapper(wrapped, instance, args, kwargs):
     return response
 
 
+patch_when_imported(
+    "vertexai.language_models",
+    "TextEmbeddingModel.get_embeddings_async",
+    optional=True,
+)(get_embeddings_async_wrapper)
+
+
 def handle_vertex_ai_streaming_response(
-    stream, request_time_dt, usage_metadata, model_name_fallback=None
+    stream,
+    request_time_dt,
+    usage_metadata,
+    model_name_fallback=None,
+    request_start_ns=None,
 ):
     """
     Handle streaming responses from Vertex AI.
     Wraps the stream to collect metrics and log them after completion.
     """
+    return VertexAIStreamWrapper(
+        stream, request_time_dt, usage_metadata, model_name_fallback, request_start_ns
+    )
 
-    class VertexAIStreamWrapper:
-        def __init__(self, stream):
-            self.stream = stream
-            self.chunks = []
-            self.model = model_name_fallback
-            self.finish_reason = None
-            self.usage_metadata = None
-            self.first_chunk_time = None
-            self._closed = False
-            self._usage_logged = False
-
-            # Limit chunk storage to prevent memory issues
-            self._max_chunks = 1000
-
-        def __iter__(self):
-            return self
-
-        def __next__(self):
-            if self._closed:
-                raise StopIteration("Stream has been closed")
-
-            try:
-                chunk = next(self.stream)
-                self._process_chunk(chunk)
-                return chunk
-            except StopIteration:
-                self._finalize()
-                raise
-            except Exception as e:
-                self._handle_error(e)
-                raise
-
-        def __enter__(self):
-            return self
-
-        def __exit__(self, exc_type, exc_val, exc_tb):
-            self.close()
-            return False  # Don't suppress exceptions
-
-        def close(self):
-            """Properly close the stream and clean up resources."""
-            if not self._closed:
-                self._closed = True
-                if not self._usage_logged:
-                    try:
-                        self._log_usage()
-                    except Exception as e:
-                        logger.error(
-                            "Error logging usage during Vertex AI stream cleanup: %s", e
-                        )
-
-                # Clear chunks to free memory
-                self.chunks.clear()
-
-                # Close underlying stream if it has a close method
-                if hasattr(self.stream, "close"):
-                    try:
-                        self.stream.close()
-                    except Exception as e:
-                        logger.debug("Error closing underlying Vertex AI stream: %s", e)
-
-        def _finalize(self):
-            """Finalize the stream and log usage."""
-            if not self._usage_logged:
-                self._log_usage()
-                self._usage_logged = True
-
-        def _handle_error(self, error: Exception):
-            """Handle errors during streaming."""
-            logger.error("Error in Vertex AI streaming response: %s", error)
-            if not self._usage_logged:
-                # Try to log partial usage data
-                try:
-                    self._log_usage()
-                    self._usage_logged = True
-                except Exception as log_error:
-                    logger.error(
-                        "Failed to log Vertex AI usage after stream error: %s",
-                        log_error,
-                    )
 
-        def _process_chunk(self, chunk):
-            """Process each chunk to extract metadata"""
-            # Limit chunk storage to prevent memory issues
-            if len(self.chunks) < self._max_chunks:
-                self.chunks.append(chunk)
-            elif len(self.chunks) == self._max_chunks:
-                logger.warning(
-                    "Reached maximum chunk limit (%d) for Vertex AI stream, not storing additional chunks",
-                    self._max_chunks,
-                )
+def handle_vertex_ai_async_streaming_response(
+    stream,
+    request_time_dt,
+    usage_metadata,
+    model_name_fallback=None,
+    request_start_ns=None,
+):
+    """
+    Handle async streaming responses from Vertex AI.
+    Wraps the async stream to collect metrics and log them after completion.
+    """
+    return AsyncVertexAIStreamWrapper(
+        stream, request_time_dt, usage_metadata, model_name_fallback, request_start_ns
+    )
 
-            # Record time of first chunk
-            if self.first_chunk_time is None:
-                self.first_chunk_time = datetime.datetime.now(datetime.timezone.utc)
-
-            # Extract model name from chunk if available using safe access
-            if self.model is None:
-                self.model = extract_model_name(chunk, self.model)
-
-            # Check for finish reason and usage metadata in the chunk using safe access
-            candidates = safe_getattr(chunk, "candidates")
-            if candidates and len(candidates) > 0:
-                candidate = candidates[0]
-                finish_reason = safe_getattr(candidate, "finish_reason")
-                if finish_reason:
-                    self.finish_reason = finish_reason
-
-            # Check for usage metadata in the chunk (final chunk typically has this)
-            usage_metadata = safe_getattr(chunk, "usage_metadata")
-            if usage_metadata:
-                self.usage_metadata = usage_metadata
-
-        def _log_usage(self):
-            """Log usage after stream completion"""
-            try:
-                if not self.chunks:
-                    logger.warning("No chunks received in Vertex AI streaming response")
-                    return
-
-                # Calculate time to first token
-                time_to_first_token = 0
-                if self.first_chunk_time:
-                    time_to_first_token = int(
-                        (self.first_chunk_time - request_time_dt).total_seconds() * 1000
-                    )
 
-                # Create a synthetic response object for usage extraction
-                class SyntheticResponse:
-                    def __init__(self, model_name, usage_metadata, candidates):
-                        self.model_name = model_name
-                        self.usage_metadata = usage_metadata
-                        self.candidates = candidates
-
-                # Create synthetic response from collected data
-                synthetic_response = SyntheticResponse(
-                    model_name=self.model,
-                    usage_metadata=self.usage_metadata,
-                    candidates=(
-                        [
-                            type(
-                                "obj", (object,), {"finish_reason": self.finish_reason}
-                            )()
-                        ]
-                        if self.finish_reason
-                        else []
-                    ),
-                )
+def _vertex_chunk_model(chunk):
+    """Model name reported on a Vertex AI chunk, if any."""
+    try:
+        return extract_model_name(chunk, None)
+    except Exception:
+        return None
 
-                # Create metering call for streaming response
-                create_vertex_ai_metering_call(
-                    response=synthetic_response,
-                    operation_type=OperationType.CHAT,
-                    request_time_dt=request_time_dt,
-                    usage_metadata=usage_metadata,
-                    time_to_first_token=time_to_first_token,
-                    is_streamed=True,
-                    model_name_fallback=self.model,
-                )
 
-                logger.debug(
-                    "Vertex AI streaming usage logged: model=%s, chunks=%d, time_to_first_token=%dms",
-                    self.model,
-                    len(self.chunks),
-                    time_to_first_token,
-                )
+VERTEX_AI_STREAM_EXTRACTORS = StreamExtractors(model=_vertex_chunk_model)
+
+
+class VertexAIStreamWrapper(MeteredStream):
+    """Wraps a Vertex AI response stream and meters usage once it completes."""
+
+    __slots__ = ()
+
+    sdk_label = "Vertex AI"
+
+    def __init__(
+        self,
+        stream,
+        request_time_dt,
+        usage_metadata,
+        model_name_fallback=None,
+        request_start_ns=None,
+    ):
+        super().__init__(
+            stream,
+            VERTEX_AI_STREAM_EXTRACTORS,
+            request_time_dt,
+            usage_metadata,
+            model=model_name_fallback,
+            request_start_ns=request_start_ns,
+        )
+
+    def _meter(self, time_to_first_token):
+        create_vertex_ai_metering_call(
+            response=self.accumulator.to_response(),
+            operation_type=OperationType.CHAT,
+            request_time_dt=self.request_time_dt,
+            request_start_ns=self.accumulator.start_ns,
+            usage_metadata=self.metering_metadata,
+            time_to_first_token=time_to_first_token,
+            is_streamed=True,
+            model_name_fallback=self.accumulator.model,
+        )
+
 
-            except Exception as e:
-                # Don't let logging errors break the stream
-                logger.error("Error logging Vertex AI streaming usage: %s", e)
-                raise StreamingError(
-                    f"Failed to log Vertex AI streaming usage: {str(e)}",
-                    chunk_count=len(self.chunks) if self.chunks else 0,
-                    stream_state="completed",
-                ) from e
+class AsyncVertexAIStreamWrapper(AsyncMeteredStreamMixin, VertexAIStreamWrapper):
+    """``async for`` counterpart of VertexAIStreamWrapper for generate_content_async(stream=True)."""
 
-    return VertexAIStreamWrapper(stream)
+    __slots__ = ()
 
 
-# Apply the dynamic wrappers when this module is imported
+# Register the dynamic wrappers when this module is imported
 try:
-    _apply_generate_content_wrappers()
+    _register_generate_content_wrappers()
 except Exception as e:
-    logger.error(f"Failed to apply dynamic Vertex AI wrappers: {e}")
+    logger.error("Failed to register dynamic Vertex AI wrappers: %s", e)
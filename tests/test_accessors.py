@@ -0,0 +1,179 @@
+"""
+Tests for the per-class attribute accessor cache.
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from revenium_middleware_google.common import accessors
+from revenium_middleware_google.common.accessors import (
+    clear_accessor_cache,
+    compile_accessor,
+    read_attrs,
+)
+from revenium_middleware_google.common.protocols import (
+    first_attr,
+    get_finish_reason,
+    get_token_count,
+    has_token_counts,
+    read_attr,
+)
+from revenium_middleware_google.common.types import OperationType
+from revenium_middleware_google.common.utils import (
+    extract_model_name,
+    extract_token_counts,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    clear_accessor_cache()
+    yield
+    clear_accessor_cache()
+
+
+class SlottedUsage:
+    __slots__ = ("prompt_tokens", "completion_tokens")
+
+    def __init__(self, prompt_tokens=0, completion_tokens=0):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class SlottedCandidate:
+    __slots__ = ("finish_reason",)
+
+    def __init__(self, finish_reason=None):
+        self.finish_reason = finish_reason
+
+
+class SlottedResponse:
+    __slots__ = ("model_version", "usage_metadata")
+
+    def __init__(self, model_version=None, usage_metadata=None):
+        self.model_version = model_version
+        self.usage_metadata = usage_metadata
+
+
+class TestCompile:
+    """Test which classes get a compiled accessor."""
+
+    def test_slotted_class_keeps_declared_names_in_order(self):
+        getter, returns_tuple = compile_accessor(
+            SlottedUsage, ("total_tokens", "completion_tokens", "prompt_tokens")
+        )
+        assert returns_tuple is True
+        assert getter(SlottedUsage(3, 4)) == (4, 3)
+
+    def test_dynamic_classes_are_not_compiled(self):
+        assert compile_accessor(SimpleNamespace, ("model",)) is None
+        assert compile_accessor(Mock, ("model",)) is None
+
+    def test_pydantic_model_uses_declared_fields(self):
+        types = pytest.importorskip("google.genai.types")
+        getter, returns_tuple = compile_accessor(
+            types.GenerateContentResponse, ("model", "model_name", "model_version")
+        )
+        response = types.GenerateContentResponse(model_version="gemini-2.0-flash")
+        assert returns_tuple is False
+        assert getter(response) == "gemini-2.0-flash"
+
+
+class TestReadAttrs:
+    """Test cached reads and the unknown-shape fallback."""
+
+    def test_compiles_once_per_class(self, monkeypatch):
+        calls = []
+        original = accessors.compile_accessor
+
+        def counting(cls, names):
+            calls.append(cls)
+            return original(cls, names)
+
+        monkeypatch.setattr(accessors, "compile_accessor", counting)
+        for value in (1, 2, 3):
+            assert read_attrs(SlottedUsage(value), ("prompt_tokens",)) == (value,)
+        assert calls == [SlottedUsage]
+
+    def test_unknown_shape_returns_none(self):
+        assert read_attrs(SimpleNamespace(model="m"), ("model",)) is None
+
+    def test_unset_slot_returns_none(self):
+        usage = SlottedUsage.__new__(SlottedUsage)
+        assert read_attrs(usage, ("prompt_tokens",)) is None
+        assert get_token_count(usage, ("prompt_tokens",)) == 0
+
+    def test_cache_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(accessors, "ACCESSOR_CACHE_SIZE", 2)
+        for names in (("a",), ("b",), ("c",)):
+            read_attrs(SlottedUsage(), names)
+        assert len(accessors._accessors) <= 2
+
+
+class TestExtraction:
+    """Test extraction gives the same results through either path."""
+
+    @pytest.mark.parametrize(
+        "usage",
+        [SlottedUsage(7, 5), SimpleNamespace(prompt_tokens=7, completion_tokens=5)],
+    )
+    def test_token_counts(self, usage):
+        assert has_token_counts(usage) is True
+        assert get_token_count(usage, ["prompt_token_count", "prompt_tokens"]) == 7
+        assert get_token_count(usage, ("completion_tokens",)) == 5
+
+    def test_zero_and_none_counts(self):
+        assert has_token_counts(SlottedUsage(0, None)) is False
+
+    @pytest.mark.parametrize(
+        "response",
+        [
+            SlottedResponse("gemini-2.0-flash", SlottedUsage(2, 3)),
+            SimpleNamespace(
+                model_version="gemini-2.0-flash",
+                usage_metadata=SimpleNamespace(prompt_tokens=2, completion_tokens=3),
+            ),
+        ],
+    )
+    def test_model_and_tokens(self, response):
+        assert extract_model_name(response) == "gemini-2.0-flash"
+        counts = extract_token_counts(response, OperationType.CHAT)
+        assert (counts.input_tokens, counts.output_tokens, counts.total_tokens) == (
+            2,
+            3,
+            5,
+        )
+
+    def test_first_attr_priority(self):
+        response = SimpleNamespace(model="", model_name="b", model_version="c")
+        assert first_attr(response, ("model", "model_name", "model_version")) == "b"
+        assert first_attr(SlottedResponse(), ("model_version",), "fallback") == "fallback"
+
+    def test_finish_reason(self):
+        response = SimpleNamespace(candidates=[SlottedCandidate("STOP")])
+        assert get_finish_reason(response) == "STOP"
+        assert get_finish_reason(SimpleNamespace(candidates=[])) is None
+        assert get_finish_reason(SlottedResponse()) is None
+        # Unset slot falls back to probing
+        unset = SlottedCandidate.__new__(SlottedCandidate)
+        assert read_attr(unset, "finish_reason") is None
+        assert (SlottedCandidate, ("finish_reason",)) in accessors._accessors
+
+    def test_genai_response(self):
+        types = pytest.importorskip("google.genai.types")
+        response = types.GenerateContentResponse(
+            model_version="gemini-2.0-flash",
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=10,
+                candidates_token_count=5,
+                total_token_count=15,
+            ),
+        )
+        assert extract_model_name(response) == "gemini-2.0-flash"
+        counts = extract_token_counts(response, OperationType.CHAT)
+        assert (counts.input_tokens, counts.output_tokens, counts.total_tokens) == (
+            10,
+            5,
+            15,
+        )
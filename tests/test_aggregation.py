@@ -0,0 +1,229 @@
+"""
+Tests for client-side pre-aggregation of metering records.
+"""
+
+import datetime
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+from revenium_middleware_google.common import utils
+from revenium_middleware_google.common.aggregation import (
+    AggregationConfig,
+    MeteringAggregator,
+    get_active_aggregator,
+)
+from revenium_middleware_google.common.exceptions import ConfigurationError
+from revenium_middleware_google.common.metadata import normalize_usage_metadata
+from revenium_middleware_google.common.types import (
+    OperationType,
+    ProviderMetadata,
+    UsageData,
+)
+
+
+def _make_usage_data(operation_type=OperationType.EMBED, tokens=10, duration_ms=20):
+    start = datetime.datetime.now(datetime.timezone.utc)
+    return UsageData.create(
+        operation_type=operation_type,
+        input_tokens=tokens,
+        output_tokens=0,
+        total_tokens=tokens,
+        model="text-embedding-004",
+        provider_metadata=ProviderMetadata.for_google_ai_sdk(),
+        stop_reason="END",
+        request_time=start,
+        response_time=start + datetime.timedelta(milliseconds=duration_ms),
+    )
+
+
+def _record(usage_metadata=None, model="text-embedding-004", **kwargs):
+    usage_data = _make_usage_data(**kwargs)
+    return {
+        "transaction_id": usage_data.transaction_id,
+        "model": model,
+        "prompt_tokens": usage_data.input_token_count,
+        "completion_tokens": usage_data.output_token_count,
+        "total_tokens": usage_data.total_token_count,
+        "cached_tokens": usage_data.cache_creation_token_count,
+        "stop_reason": usage_data.stop_reason,
+        "request_time": usage_data.request_time,
+        "response_time": usage_data.response_time,
+        "request_duration": usage_data.request_duration,
+        "usage_metadata": normalize_usage_metadata(usage_metadata or {}),
+        "provider": usage_data.provider,
+        "model_source": usage_data.model_source,
+        "is_streamed": False,
+        "time_to_first_token": 0,
+        "operation_type": OperationType(usage_data.operation_type),
+    }
+
+
+class TestAggregationConfig:
+    """Test aggregation configuration."""
+
+    def test_defaults(self):
+        config = AggregationConfig()
+        assert config.interval == 60.0
+        assert config.key == ("model", "subscriber", "trace_type", "operation_type")
+        assert config.operations == (OperationType.EMBED,)
+        assert config.metadata_fields == ("subscriber", "trace_type")
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_METERING_AGGREGATE_INTERVAL", "5")
+        monkeypatch.setenv("REVENIUM_METERING_AGGREGATE_KEY", "model, organization_id")
+        monkeypatch.setenv("REVENIUM_METERING_AGGREGATE_OPERATIONS", "EMBED,CHAT")
+        monkeypatch.setenv("REVENIUM_METERING_AGGREGATE_MAX_KEYS", "3")
+        config = AggregationConfig.from_env()
+        assert config.interval == 5.0
+        assert config.key == ("model", "organization_id")
+        assert config.operations == (OperationType.EMBED, OperationType.CHAT)
+        assert config.max_keys == 3
+
+    def test_invalid_env_falls_back(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_METERING_AGGREGATE_INTERVAL", "soon")
+        assert AggregationConfig.from_env().interval == 60.0
+
+
+class TestMeteringAggregator:
+    """Test rolling records up by key."""
+
+    def test_same_key_emits_one_record(self):
+        emitted = []
+        aggregator = MeteringAggregator(emitted.append, AggregationConfig(interval=60))
+        metadata = {"subscriber": {"id": "u1"}, "trace_type": "batch", "trace_id": "t1"}
+        for tokens, duration in ((10, 10), (20, 30), (30, 50)):
+            record = _record(metadata, tokens=tokens, duration_ms=duration)
+            assert aggregator.add(record)
+
+        assert aggregator.flush() == 1
+        record = emitted[0]
+        assert record["prompt_tokens"] == 60
+        assert record["total_tokens"] == 60
+        assert record["request_duration"] == 30
+        assert record["aggregate"]["count"] == 3
+        assert record["aggregate"]["request_duration_ms"] == {
+            "min": 10,
+            "max": 50,
+            "mean": 30.0,
+            "sum": 90,
+        }
+        # Only key fields are attributed to the aggregate
+        assert dict(record["usage_metadata"]) == {
+            "subscriber": {"id": "u1"},
+            "trace_type": "batch",
+        }
+        aggregator.shutdown()
+
+    def test_distinct_keys_emit_separately(self):
+        emitted = []
+        aggregator = MeteringAggregator(emitted.append)
+        aggregator.add(_record({"subscriber": {"id": "u1"}}))
+        aggregator.add(_record({"subscriber": {"id": "u2"}}))
+        aggregator.add(
+            _record({"subscriber": {"id": "u1"}}, model="gemini-embedding-001")
+        )
+
+        assert aggregator.flush() == 3
+        assert sorted(r["aggregate"]["count"] for r in emitted) == [1, 1, 1]
+        aggregator.shutdown()
+
+    def test_other_operations_pass_through(self):
+        aggregator = MeteringAggregator(Mock())
+        assert not aggregator.add(_record(operation_type=OperationType.CHAT))
+        assert aggregator.stats()["aggregation_records_aggregated"] == 0
+        aggregator.shutdown()
+
+    def test_max_keys_flushes_early(self):
+        emitted = []
+        aggregator = MeteringAggregator(
+            emitted.append, AggregationConfig(interval=60, max_keys=2)
+        )
+        aggregator.add(_record({"subscriber": {"id": "u1"}}))
+        assert emitted == []
+        aggregator.add(_record({"subscriber": {"id": "u2"}}))
+        assert len(emitted) == 2
+        assert aggregator.stats()["aggregation_early_flushes"] == 1
+        aggregator.shutdown()
+
+    def test_interval_flushes_in_background(self):
+        emitted = []
+        config = AggregationConfig(interval=0.05)
+        aggregator = MeteringAggregator(emitted.append, config)
+        aggregator.add(_record())
+        deadline = time.monotonic() + 5
+        while not emitted and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(emitted) == 1
+        aggregator.shutdown()
+
+    def test_shutdown_emits_open_keys_and_stops_aggregating(self):
+        emitted = []
+        aggregator = MeteringAggregator(emitted.append)
+        aggregator.add(_record())
+        aggregator.shutdown()
+        assert len(emitted) == 1
+        assert not aggregator.add(_record())
+
+
+class TestBuildCompletionArgsAggregate:
+    """Test aggregate statistics are sent in the request body."""
+
+    def test_aggregate_in_extra_body(self):
+        record = _record()
+        record["aggregate"] = {"count": 2}
+        args = utils.build_completion_args(**record)
+        assert args["extra_body"] == {"aggregate": {"count": 2}}
+
+    def test_no_extra_body_for_single_records(self):
+        assert "extra_body" not in utils.build_completion_args(**_record())
+
+
+class TestCreateMeteringCallAggregation:
+    """Test create_metering_call routes records through the aggregator."""
+
+    def setup_method(self):
+        utils.configure_batching(enabled=False)
+
+    def teardown_method(self):
+        utils.configure_aggregation(enabled=False)
+        utils.configure_batching(enabled=False)
+
+    def test_embeddings_reach_client_as_one_record(self):
+        utils.configure_aggregation(interval=60)
+        with patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+            for _ in range(5):
+                utils.create_metering_call(_make_usage_data(), {"trace_type": "batch"})
+            assert utils.flush_metering(timeout=5)
+
+        assert mock_client.ai.create_completion.call_count == 1
+        kwargs = mock_client.ai.create_completion.call_args.kwargs
+        assert kwargs["input_token_count"] == 50
+        assert kwargs["operation_type"] == "EMBED"
+        assert kwargs["trace_type"] == "batch"
+        assert kwargs["extra_body"]["aggregate"]["count"] == 5
+        stats = utils.get_metering_stats()
+        assert stats["aggregation_records_aggregated"] == 5
+        assert stats["aggregation_records_emitted"] == 1
+
+    def test_chat_is_sent_per_call(self):
+        utils.configure_aggregation(interval=60)
+        with patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+            for _ in range(2):
+                utils.create_metering_call(_make_usage_data(OperationType.CHAT), {})
+            assert utils.flush_metering(timeout=5)
+
+        assert mock_client.ai.create_completion.call_count == 2
+        assert "extra_body" not in mock_client.ai.create_completion.call_args.kwargs
+
+    def test_disable_removes_aggregator(self):
+        utils.configure_aggregation()
+        assert get_active_aggregator() is not None
+        assert utils.configure_aggregation(enabled=False) is None
+        assert get_active_aggregator() is None
+
+    def test_unknown_option_rejected(self):
+        with pytest.raises(ConfigurationError):
+            utils.configure_aggregation(intervall=5)
@@ -0,0 +1,311 @@
+"""
+Tests for the native asyncio metering path.
+"""
+
+import asyncio
+import datetime
+import gc
+import threading
+import warnings
+import httpx
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from revenium_metering import APIConnectionError, ReveniumMetering
+
+from revenium_middleware_google.common import async_metering, transport, utils
+from revenium_middleware_google.common.types import (
+    OperationType,
+    ProviderMetadata,
+    UsageData,
+)
+
+
+def _make_usage_data():
+    ts = datetime.datetime.now(datetime.timezone.utc)
+    return UsageData.create(
+        operation_type=OperationType.CHAT,
+        input_tokens=10,
+        output_tokens=5,
+        total_tokens=15,
+        model="gemini-2.0-flash",
+        provider_metadata=ProviderMetadata.for_google_ai_sdk(),
+        stop_reason="END",
+        request_time=ts,
+        response_time=ts,
+    )
+
+
+@pytest.fixture
+def async_client():
+    mock_client = Mock()
+    mock_client.ai.create_completion = AsyncMock(return_value=Mock(id="ok"))
+    with patch.object(async_metering, "get_async_client", return_value=mock_client):
+        yield mock_client
+
+
+@pytest.fixture(autouse=True)
+def unbatched_transport():
+    transport = utils.configure_batching(enabled=False)
+    async_metering.set_async_metering_enabled(True)
+    yield transport
+    async_metering.set_async_metering_enabled(True)
+    utils.configure_batching(enabled=False)
+
+
+class TestAsyncRouting:
+    """Test create_metering_call picks the event loop when one is running."""
+
+    def test_running_loop_schedules_task(self, async_client, unbatched_transport):
+        async def main():
+            utils.create_metering_call(_make_usage_data(), {"trace_id": "t"})
+            assert async_metering.pending_task_count() == 1
+            assert await async_metering.drain_metering_tasks(timeout=5)
+
+        asyncio.run(main())
+
+        async_client.ai.create_completion.assert_awaited_once()
+        kwargs = async_client.ai.create_completion.call_args.kwargs
+        assert kwargs["trace_id"] == "t"
+        assert kwargs["operation_type"] == "CHAT"
+        assert unbatched_transport.stats()["records_sent"] == 0
+        assert async_metering.pending_task_count() == 0
+
+    def test_no_loop_uses_transport(self, async_client, unbatched_transport):
+        with patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+            utils.create_metering_call(_make_usage_data(), {})
+            assert utils.flush_metering(timeout=5)
+
+        mock_client.ai.create_completion.assert_called_once()
+        async_client.ai.create_completion.assert_not_called()
+
+    def test_batched_mode_keeps_transport(self, async_client):
+        transport = utils.configure_batching(batch_size=100, flush_interval=60)
+
+        async def main():
+            utils.create_metering_call(_make_usage_data(), {})
+            assert async_metering.pending_task_count() == 0
+
+        asyncio.run(main())
+        assert transport.stats()["queued"] == 1
+
+    def test_disabled_uses_transport(self, async_client, unbatched_transport):
+        async_metering.set_async_metering_enabled(False)
+        with patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+
+            async def main():
+                utils.create_metering_call(_make_usage_data(), {})
+
+            asyncio.run(main())
+            assert utils.flush_metering(timeout=5)
+
+        mock_client.ai.create_completion.assert_called_once()
+        async_client.ai.create_completion.assert_not_called()
+
+    def test_pending_limit_falls_back_to_transport(self, async_client):
+        transport = utils.configure_batching(enabled=False, queue_size=2)
+        with patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+
+            async def main():
+                for _ in range(3):
+                    utils.create_metering_call(_make_usage_data(), {})
+                assert async_metering.pending_task_count() == 2
+                await async_metering.drain_metering_tasks(timeout=5)
+
+            asyncio.run(main())
+            assert utils.flush_metering(timeout=5)
+
+        assert async_client.ai.create_completion.await_count == 2
+        assert transport.stats()["records_sent"] == 1
+
+    def test_spool_append_runs_off_the_loop(self, async_client, tmp_path):
+        transport = utils.configure_batching(enabled=False, spool_dir=str(tmp_path))
+        append = transport.spool.append
+        append_threads = []
+
+        def recording_append(record):
+            append_threads.append(threading.get_ident())
+            return append(record)
+
+        async def main():
+            utils.create_metering_call(_make_usage_data(), {})
+            return threading.get_ident()
+
+        with patch.object(transport.spool, "append", side_effect=recording_append), \
+                patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+            loop_thread = asyncio.run(main())
+            assert utils.flush_metering(timeout=5)
+
+        assert len(append_threads) == 1
+        assert append_threads[0] != loop_thread
+        mock_client.ai.create_completion.assert_called_once()
+
+
+class TestAsyncTasks:
+    """Test task tracking, failures and exit hand-off."""
+
+    def test_failed_send_is_counted(self, async_client):
+        async_client.ai.create_completion.side_effect = RuntimeError("boom")
+        before = async_metering.get_async_stats()["async_failed"]
+
+        async def main():
+            utils.create_metering_call(_make_usage_data(), {})
+            await async_metering.drain_metering_tasks(timeout=5)
+
+        asyncio.run(main())
+        assert async_metering.get_async_stats()["async_failed"] == before + 1
+
+    def test_breaker_opening_mid_send_hands_record_to_transport(
+        self, async_client, unbatched_transport
+    ):
+        utils.configure_circuit_breaker(failure_threshold=1, reset_timeout=60)
+        async_client.ai.create_completion.side_effect = APIConnectionError(
+            request=httpx.Request("POST", "http://metering.test")
+        )
+
+        before = async_metering.get_async_stats()
+
+        async def main():
+            utils.create_metering_call(_make_usage_data(), {"trace_id": "held"})
+            await async_metering.drain_metering_tasks(timeout=5)
+
+        try:
+            asyncio.run(main())
+            with unbatched_transport.queue.cond:
+                held = unbatched_transport.queue.take_locked(10)
+        finally:
+            utils.configure_circuit_breaker()
+
+        async_client.ai.create_completion.assert_awaited_once()
+        assert [r["usage_metadata"]["trace_id"] for r in held] == ["held"]
+        stats = async_metering.get_async_stats()
+        assert stats["async_handed_off"] == before["async_handed_off"] + 1
+        assert stats["async_sent"] == before["async_sent"]
+
+    def test_tasks_cancelled_by_asyncio_run_handed_to_transport(
+        self, async_client, unbatched_transport
+    ):
+        async def slow_send(**kwargs):
+            await asyncio.sleep(60)
+
+        async_client.ai.create_completion.side_effect = slow_send
+        before = async_metering.get_async_stats()
+
+        async def main():
+            utils.create_metering_call(_make_usage_data(), {"trace_id": "short"})
+            await asyncio.sleep(0)
+            # Returns without draining; asyncio.run cancels the send in flight
+
+        with patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+            asyncio.run(main())
+            assert utils.flush_metering(timeout=5)
+
+        kwargs = mock_client.ai.create_completion.call_args.kwargs
+        assert kwargs["trace_id"] == "short"
+        stats = async_metering.get_async_stats()
+        assert stats["async_handed_off"] == before["async_handed_off"] + 1
+        assert stats["async_failed"] == before["async_failed"]
+        assert stats["async_pending"] == 0
+
+    def test_stranded_tasks_handed_to_transport_at_exit(
+        self, async_client, unbatched_transport
+    ):
+        loop = asyncio.new_event_loop()
+
+        # Schedule the task but close the loop before it runs
+        with patch.object(async_metering, "get_running_loop", return_value=loop):
+            utils.create_metering_call(_make_usage_data(), {"trace_id": "late"})
+        assert async_metering.pending_task_count() == 1
+        loop.close()
+
+        with patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+            async_metering._hand_off_pending_at_exit()
+            assert utils.flush_metering(timeout=5)
+
+        assert async_metering.pending_task_count() == 0
+        kwargs = mock_client.ai.create_completion.call_args.kwargs
+        assert kwargs["trace_id"] == "late"
+
+    def test_stranded_coroutines_closed_and_drops_counted(self, async_client):
+        loop = asyncio.new_event_loop()
+        with patch.object(async_metering, "get_running_loop", return_value=loop):
+            utils.create_metering_call(_make_usage_data(), {})
+        loop.close()
+        before = async_metering.get_async_stats()["async_dropped_at_exit"]
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            with patch.object(transport, "_active_transport", None):
+                async_metering._hand_off_pending_at_exit()
+            gc.collect()
+
+        assert not [w for w in caught if "never awaited" in str(w.message)]
+        stats = async_metering.get_async_stats()
+        assert stats["async_dropped_at_exit"] == before + 1
+
+    def test_async_client_follows_assigned_sync_client(self):
+        loop = asyncio.new_event_loop()
+        try:
+            first = ReveniumMetering(api_key="hak_app", base_url="http://app.test/meter")
+            with patch.object(utils, "client", first):
+                async_client = async_metering.get_async_client(loop)
+                assert async_client.api_key == "hak_app"
+                assert str(async_client.base_url).startswith("http://app.test/meter")
+                assert async_metering.get_async_client(loop) is async_client
+
+            second = ReveniumMetering(api_key="hak_other", base_url="http://app.test/meter")
+            with patch.object(utils, "client", second):
+                assert async_metering.get_async_client(loop).api_key == "hak_other"
+        finally:
+            loop.close()
+
+    @pytest.mark.parametrize("value,expected", [(None, True), ("false", False), ("1", True)])
+    def test_enabled_from_env(self, monkeypatch, value, expected):
+        if value is None:
+            monkeypatch.delenv(async_metering.ENV_ASYNC_ENABLED, raising=False)
+        else:
+            monkeypatch.setenv(async_metering.ENV_ASYNC_ENABLED, value)
+        monkeypatch.setattr(async_metering, "_enabled", None)
+        assert async_metering.is_async_metering_enabled() is expected
+
+    def test_stats_include_async_counters(self):
+        stats = utils.get_metering_stats()
+        assert "async_scheduled" in stats
+        assert "async_pending" in stats
+
+
+class TestLogTokenUsage:
+    """Test log_token_usage awaits the async client."""
+
+    def test_uses_async_client(self, async_client):
+        asyncio.run(
+            utils.log_token_usage(
+                transaction_id="tx",
+                model="gemini-2.0-flash",
+                prompt_tokens=1,
+                completion_tokens=2,
+                total_tokens=3,
+                cached_tokens=0,
+                stop_reason="END",
+                request_time="2025-01-01T00:00:00Z",
+                response_time="2025-01-01T00:00:01Z",
+                request_duration=1000,
+                usage_metadata={},
+            )
+        )
+        async_client.ai.create_completion.assert_awaited_once()
+
+    def test_failure_raises_metering_error(self, async_client):
+        from revenium_middleware_google.common.exceptions import MeteringError
+
+        async_client.ai.create_completion.side_effect = RuntimeError("boom")
+        with pytest.raises(MeteringError):
+            asyncio.run(
+                utils.send_completion_async({"transaction_id": "tx", "model": "m"})
+            )
@@ -0,0 +1,284 @@
+"""
+Tests for the batching metering transport.
+"""
+
+import datetime
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+from revenium_middleware_google.common.transport import (
+    BatchingConfig,
+    BatchingTransport,
+    get_active_transport,
+    install_transport,
+    uninstall_transport,
+)
+from revenium_middleware_google.common.types import (
+    OperationType,
+    ProviderMetadata,
+    UsageData,
+)
+from revenium_middleware_google.common import utils
+
+
+def _make_usage_data():
+    ts = datetime.datetime.now(datetime.timezone.utc)
+    return UsageData.create(
+        operation_type=OperationType.CHAT,
+        input_tokens=10,
+        output_tokens=5,
+        total_tokens=15,
+        model="gemini-2.0-flash",
+        provider_metadata=ProviderMetadata.for_google_ai_sdk(),
+        stop_reason="END",
+        request_time=ts,
+        response_time=ts,
+    )
+
+
+class RecordingSender:
+    """Batch sender that records every batch it receives."""
+
+    def __init__(self, fail=0):
+        self.batches = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self.lock:
+            self.batches.append(list(batch))
+        return batch[: self.fail]
+
+    @property
+    def records(self):
+        return [r for b in self.batches for r in b]
+
+
+class TestBatchingConfig:
+    """Test batching configuration."""
+
+    def test_defaults(self):
+        config = BatchingConfig()
+        assert config.batch_size == 50
+        assert config.flush_interval == 1.0
+        assert config.max_in_flight == 8
+        assert config.queue_size >= config.batch_size
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_METERING_BATCH_SIZE", "7")
+        monkeypatch.setenv("REVENIUM_METERING_BATCH_INTERVAL", "0.25")
+        monkeypatch.setenv("REVENIUM_METERING_MAX_IN_FLIGHT", "2")
+        config = BatchingConfig.from_env()
+        assert config.batch_size == 7
+        assert config.flush_interval == 0.25
+        assert config.max_in_flight == 2
+
+    def test_invalid_env_falls_back(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_METERING_BATCH_SIZE", "not-a-number")
+        assert BatchingConfig.from_env().batch_size == 50
+
+
+class TestBatchingTransport:
+    """Test buffering and flushing behaviour."""
+
+    def test_flushes_when_batch_size_reached(self):
+        sender = RecordingSender()
+        transport = BatchingTransport(
+            sender, BatchingConfig(batch_size=5, flush_interval=60)
+        )
+        for i in range(5):
+            assert transport.submit({"i": i})
+
+        deadline = time.time() + 2
+        while not sender.batches and time.time() < deadline:
+            time.sleep(0.01)
+        transport.shutdown()
+
+        assert sender.batches[0] == [{"i": i} for i in range(5)]
+
+    def test_flushes_when_interval_elapses(self):
+        sender = RecordingSender()
+        transport = BatchingTransport(
+            sender, BatchingConfig(batch_size=100, flush_interval=0.05)
+        )
+        transport.submit({"i": 1})
+
+        deadline = time.time() + 2
+        while not sender.batches and time.time() < deadline:
+            time.sleep(0.01)
+        transport.shutdown()
+
+        assert sender.records == [{"i": 1}]
+
+    def test_flush_drains_buffer(self):
+        sender = RecordingSender()
+        transport = BatchingTransport(
+            sender, BatchingConfig(batch_size=10, flush_interval=60)
+        )
+        for i in range(23):
+            transport.submit({"i": i})
+
+        assert transport.flush(timeout=5)
+        stats = transport.stats()
+        transport.shutdown()
+
+        assert len(sender.records) == 23
+        assert all(len(b) <= 10 for b in sender.batches)
+        assert stats["records_sent"] == 23
+        assert stats["queued"] == 0
+
+    def test_queue_limit_drops_records(self):
+        sender = RecordingSender()
+        transport = BatchingTransport(
+            sender, BatchingConfig(batch_size=5, flush_interval=60, queue_size=5)
+        )
+        # Hold the flusher back so the buffer fills up
+        with transport._cond:
+            results = [transport.submit({"i": i}) for i in range(8)]
+
+        transport.shutdown()
+        assert results.count(False) == 3
+        assert transport.stats()["dropped_newest"] == 3
+
+    def test_failed_records_are_counted(self):
+        sender = RecordingSender(fail=1)
+        transport = BatchingTransport(
+            sender, BatchingConfig(batch_size=2, flush_interval=60)
+        )
+        transport.submit({"i": 1})
+        transport.submit({"i": 2})
+        transport.flush(timeout=5)
+        stats = transport.stats()
+        transport.shutdown()
+
+        assert stats["records_failed"] == 1
+        assert stats["records_sent"] == 1
+
+    def test_max_in_flight_bounds_concurrency(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_sender(batch):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+        transport = BatchingTransport(
+            slow_sender,
+            BatchingConfig(batch_size=1, flush_interval=60, max_in_flight=2),
+        )
+        for i in range(8):
+            transport.submit({"i": i})
+        transport.flush(timeout=5)
+        transport.shutdown()
+
+        assert max(peak) <= 2
+
+    def test_fixed_pool_of_named_workers(self):
+        sender = RecordingSender()
+        transport = BatchingTransport(
+            sender, BatchingConfig(batch_size=1, flush_interval=60, max_in_flight=3)
+        )
+        assert transport.stats()["workers"] == 0  # started lazily
+
+        threads_before = threading.active_count()
+        for i in range(200):
+            transport.submit({"i": i})
+        assert transport.flush(timeout=5)
+
+        names = sorted(
+            t.name
+            for t in threading.enumerate()
+            if t.name.startswith("revenium-metering-worker-")
+            and t in transport._workers
+        )
+        assert names == [f"revenium-metering-worker-{i}" for i in range(3)]
+        assert threading.active_count() == threads_before + 3
+        assert len(sender.records) == 200
+
+        transport.shutdown()
+        assert not any(t.is_alive() for t in transport._workers)
+
+    def test_submit_after_shutdown_is_rejected(self):
+        transport = BatchingTransport(RecordingSender())
+        transport.shutdown()
+        assert transport.submit({"i": 1}) is False
+
+    def test_reinstall_keeps_records_submitted_during_swap(self):
+        sender = RecordingSender()
+        release = threading.Event()
+
+        def slow_sender(batch):
+            # Keeps the old transport flushing while records keep arriving
+            release.wait(5)
+            return sender(batch)
+
+        config = BatchingConfig(batch_size=1, flush_interval=60)
+        old = install_transport(slow_sender, config)
+        old.submit({"i": 0})
+        installer = threading.Thread(
+            target=install_transport, args=(slow_sender, config)
+        )
+        installer.start()
+        try:
+            deadline = time.monotonic() + 5
+            while old._held is None and time.monotonic() < deadline:
+                time.sleep(0.001)
+            for i in range(1, 5):
+                assert old.submit({"i": i})
+            release.set()
+            installer.join(5)
+
+            replacement = get_active_transport()
+            assert replacement is not old
+            # Callers still holding the old transport reach the new one
+            assert old.submit({"i": 5})
+            assert replacement.flush(timeout=5)
+        finally:
+            release.set()
+            uninstall_transport()
+
+        assert sorted(r["i"] for r in sender.records) == list(range(6))
+        assert old.stats()["dropped"] == 0
+
+
+class TestCreateMeteringCallBatching:
+    """Test routing of create_metering_call through the transport."""
+
+    def teardown_method(self):
+        utils.configure_batching(enabled=False)
+
+    def test_unbatched_sends_one_record_per_batch(self):
+        transport = utils.configure_batching(enabled=False)
+        assert transport.config.batch_size == 1
+        assert get_active_transport() is transport
+
+    def test_batched_submits_to_transport(self):
+        transport = utils.configure_batching(batch_size=100, flush_interval=60)
+        utils.create_metering_call(_make_usage_data(), {"trace_id": "t"})
+        assert transport.stats()["queued"] == 1
+
+    def test_batched_records_reach_client(self):
+        utils.configure_batching(batch_size=100, flush_interval=60)
+        with patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+            for _ in range(3):
+                utils.create_metering_call(_make_usage_data(), {"trace_id": "t"})
+            assert utils.flush_metering(timeout=5)
+
+        assert mock_client.ai.create_completion.call_count == 3
+        kwargs = mock_client.ai.create_completion.call_args.kwargs
+        assert kwargs["trace_id"] == "t"
+        assert kwargs["operation_type"] == "CHAT"
+
+    def test_unknown_option_rejected(self):
+        from revenium_middleware_google.common.exceptions import ConfigurationError
+
+        with pytest.raises(ConfigurationError):
+            utils.configure_batching(batch_sz=10)
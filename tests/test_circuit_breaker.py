@@ -0,0 +1,206 @@
+"""
+Tests for the metering circuit breaker and degraded mode.
+"""
+
+import datetime
+import logging
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+
+from revenium_metering import APIConnectionError, ReveniumMetering
+
+from revenium_middleware_google.common import utils
+from revenium_middleware_google.common.circuit_breaker import (
+    BreakerState,
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    get_circuit_breaker,
+)
+from revenium_middleware_google.common.exceptions import (
+    CircuitOpenError,
+    ConfigurationError,
+)
+from revenium_middleware_google.common.transport import (
+    BatchingConfig,
+    BatchingTransport,
+)
+from revenium_middleware_google.common.types import (
+    OperationType,
+    ProviderMetadata,
+    UsageData,
+)
+from revenium_middleware_google.testing import FakeReveniumServer
+
+OUTAGE = APIConnectionError(request=httpx.Request("POST", "http://metering.test"))
+
+
+def _make_usage_data():
+    ts = datetime.datetime.now(datetime.timezone.utc)
+    return UsageData.create(
+        operation_type=OperationType.CHAT,
+        input_tokens=10,
+        output_tokens=5,
+        total_tokens=15,
+        model="gemini-2.0-flash",
+        provider_metadata=ProviderMetadata.for_google_ai_sdk(),
+        stop_reason="END",
+        request_time=ts,
+        response_time=ts,
+    )
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions."""
+
+    def test_opens_after_consecutive_outage_failures(self):
+        breaker = CircuitBreaker(CircuitBreakerConfig(failure_threshold=3))
+        for _ in range(2):
+            breaker.record_result(OUTAGE)
+        assert breaker.is_closed
+        breaker.record_result(OUTAGE)
+        assert breaker.state is BreakerState.OPEN
+        assert not breaker.allow_request()
+        assert breaker.hold_for() > 0
+        assert breaker.stats()["breaker_opens"] == 1
+
+    def test_non_outage_errors_reset_the_count(self):
+        breaker = CircuitBreaker(CircuitBreakerConfig(failure_threshold=2))
+        breaker.record_result(OUTAGE)
+        breaker.record_result(ValueError("bad record"))
+        breaker.record_result(OUTAGE)
+        assert breaker.is_closed
+
+    def test_probe_after_reset_timeout(self):
+        breaker = CircuitBreaker(
+            CircuitBreakerConfig(failure_threshold=1, reset_timeout=0.05)
+        )
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.hold_for() is None
+        assert breaker.allow_request()
+        assert breaker.state is BreakerState.HALF_OPEN
+        # Only one probe at a time
+        assert not breaker.allow_request()
+
+        breaker.record_failure()
+        assert breaker.state is BreakerState.OPEN
+        time.sleep(0.06)
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.is_closed
+        assert breaker.stats()["breaker_probes"] == 2
+
+    def test_disabled_never_opens(self):
+        breaker = CircuitBreaker(
+            CircuitBreakerConfig(enabled=False, failure_threshold=1)
+        )
+        breaker.record_failure()
+        assert breaker.allow_request()
+        assert breaker.hold_for() is None
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_METERING_BREAKER_ENABLED", "false")
+        monkeypatch.setenv("REVENIUM_METERING_BREAKER_FAILURE_THRESHOLD", "9")
+        monkeypatch.setenv("REVENIUM_METERING_BREAKER_RESET_TIMEOUT", "2.5")
+        assert CircuitBreakerConfig.from_env() == CircuitBreakerConfig(False, 9, 2.5)
+
+
+class TestDegradedMode:
+    """Test sends stop while the endpoint is down and resume after."""
+
+    def setup_method(self):
+        utils.configure_batching(enabled=False)
+        utils.configure_retries(max_retries=0)
+
+    def teardown_method(self):
+        utils.configure_circuit_breaker()
+        utils.configure_retries()
+        utils.configure_batching(enabled=False)
+
+    def test_open_breaker_short_circuits_send_completion(self):
+        utils.configure_circuit_breaker(failure_threshold=1, reset_timeout=60)
+        get_circuit_breaker().record_failure()
+        with patch.object(utils, "client") as mock_client:
+            with pytest.raises(CircuitOpenError):
+                utils.send_completion({"transaction_id": "t1"})
+        mock_client.ai.create_completion.assert_not_called()
+
+    def test_outage_holds_records_until_recovery(self, caplog):
+        utils.configure_circuit_breaker(failure_threshold=2, reset_timeout=0.5)
+        with FakeReveniumServer(error_rate=1.0, error_status=503) as server:
+            client = ReveniumMetering(
+                api_key="hak_test", base_url=server.base_url, max_retries=0
+            )
+            with patch.object(utils, "client", client):
+                utils.configure_batching(enabled=False, max_in_flight=1)
+                with caplog.at_level(logging.DEBUG, "revenium_middleware.extension"):
+                    for _ in range(10):
+                        utils.create_metering_call(_make_usage_data(), {})
+                    assert _wait_for(lambda: not get_circuit_breaker().is_closed)
+                    # Held: no further sends until the probe is due
+                    sent = server.stats()["requests"]
+                    assert utils.flush_metering(timeout=5) is False
+                    assert server.stats()["requests"] == sent
+
+                    server.configure(error_rate=0.0)
+                    assert server.wait_for_records(9, timeout=10)
+                    assert utils.flush_metering(timeout=5)
+
+            client.close()
+
+        stats = utils.get_metering_stats()
+        assert stats["breaker_state"] == "closed"
+        assert stats["breaker_opens"] == 1
+        assert stats["records_requeued"] >= 1
+        # Only the failure before the breaker opened was not held
+        assert stats["records_failed"] == 1
+        assert len({r["transactionId"] for r in server.records}) == 9
+        # One failure logged as two errors, then one warning; no flood
+        levels = [r.levelname for r in caplog.records]
+        assert levels.count("ERROR") == 2
+        assert levels.count("WARNING") == 1
+
+    def test_held_records_requeued_ahead_of_newer_ones(self):
+        utils.configure_circuit_breaker(failure_threshold=1, reset_timeout=60)
+        breaker = get_circuit_breaker()
+
+        def sender(batch):
+            # Newer records arrive while the failing batch is in flight
+            transport.submit({"i": 2})
+            transport.submit({"i": 3})
+            breaker.record_failure()
+            return batch
+
+        transport = BatchingTransport(
+            sender,
+            BatchingConfig(
+                batch_size=2, flush_interval=60, max_in_flight=1, queue_size=3
+            ),
+        )
+        transport.submit({"i": 0})
+        transport.submit({"i": 1})
+        assert _wait_for(lambda: transport.stats()["batches_sent"] == 1)
+
+        with transport.queue.cond:
+            held = transport.queue.take_locked(10)
+        transport.shutdown(timeout=1)
+
+        # Only one failed record fits back in; it keeps its place in line
+        assert [r["i"] for r in held] == [0, 2, 3]
+        stats = transport.stats()
+        assert stats["records_requeued"] == 1
+        assert stats["records_requeue_rejected"] == 1
+        assert stats["records_failed"] == 0
+
+    def test_configure_unknown_option_rejected(self):
+        with pytest.raises(ConfigurationError):
+            utils.configure_circuit_breaker(threshold=3)
@@ -0,0 +1,245 @@
+"""
+Tests for compressed, grouped metering request bodies.
+"""
+
+import asyncio
+import datetime
+import gzip
+import json
+import logging
+import httpx
+import pytest
+from unittest.mock import patch
+
+from revenium_middleware import client as library_client
+
+from revenium_middleware_google.common import compression, http_client, utils
+from revenium_middleware_google.common.compression import (
+    AsyncCompressingTransport,
+    Codec,
+    CompressingTransport,
+)
+from revenium_middleware_google.common.http_client import (
+    HttpClientConfig,
+    create_metering_client,
+)
+from revenium_middleware_google.common.types import (
+    OperationType,
+    ProviderMetadata,
+    UsageData,
+)
+from revenium_middleware_google.testing import FakeReveniumServer
+
+GROUP_PATH = "/v2/ai/completions/batch"
+
+USAGE_METADATA = {
+    "trace_id": "trace-1",
+    "environment": "production",
+    "region": "us-east1",
+    "subscriber": {"id": "user-1", "email": "user@example.com"},
+    "organization_id": "acme",
+    "product_id": "search",
+}
+
+
+def _make_usage_data(tokens=10):
+    start = datetime.datetime.now(datetime.timezone.utc)
+    return UsageData.create(
+        operation_type=OperationType.CHAT,
+        input_tokens=tokens,
+        output_tokens=tokens // 2,
+        total_tokens=tokens + tokens // 2,
+        model="gemini-2.0-flash",
+        provider_metadata=ProviderMetadata.for_google_ai_sdk(),
+        stop_reason="END",
+        request_time=start,
+        response_time=start + datetime.timedelta(milliseconds=40 + tokens),
+    )
+
+
+def _recording_transport(seen):
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(201, json={})
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def server():
+    with FakeReveniumServer(seed=1) as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def restore_client():
+    with patch.object(utils, "client", library_client), patch.object(
+        http_client, "_config", None
+    ):
+        yield
+    utils.configure_batching(enabled=False)
+
+
+class TestCodec:
+    """Test codec parsing."""
+
+    def test_parse(self):
+        assert Codec.parse("GZIP") is Codec.GZIP
+        assert Codec.parse("") is Codec.NONE
+        assert Codec.parse(None) is Codec.NONE
+        assert Codec.parse("brotli") is Codec.NONE
+
+    def test_config_from_env(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_METERING_COMPRESSION", "gzip")
+        monkeypatch.setenv("REVENIUM_METERING_COMPRESSION_MIN_BYTES", "256")
+        config = HttpClientConfig.from_env()
+        assert config.compression is Codec.GZIP
+        assert config.compression_min_bytes == 256
+
+
+class TestCompressingTransport:
+    """Test request bodies are compressed above the threshold."""
+
+    def test_compresses_large_bodies(self):
+        seen = []
+        transport = CompressingTransport(_recording_transport(seen), Codec.GZIP, 100)
+        body = {"records": ["x" * 50] * 20}
+        with httpx.Client(transport=transport) as client:
+            client.post("http://metering.test/v2", json=body)
+
+        request = seen[0]
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert int(request.headers["Content-Length"]) == len(request.content)
+        assert json.loads(gzip.decompress(request.content)) == body
+
+    def test_small_bodies_sent_as_is(self):
+        seen = []
+        transport = CompressingTransport(_recording_transport(seen), Codec.GZIP, 1024)
+        with httpx.Client(transport=transport) as client:
+            client.post("http://metering.test/v2", json={"a": 1})
+        assert "Content-Encoding" not in seen[0].headers
+        assert json.loads(seen[0].content) == {"a": 1}
+
+    def test_async_transport(self):
+        seen = []
+
+        async def handler(request):
+            seen.append(request)
+            return httpx.Response(201, json={})
+
+        transport = AsyncCompressingTransport(
+            httpx.MockTransport(handler), Codec.GZIP, 0
+        )
+
+        async def post():
+            async with httpx.AsyncClient(transport=transport) as client:
+                await client.post("http://metering.test/v2", json={"a": 1})
+
+        asyncio.run(post())
+        assert json.loads(gzip.decompress(seen[0].content)) == {"a": 1}
+
+    def test_zstd_without_zstandard_falls_back_to_gzip(self, caplog):
+        with patch.object(http_client, "is_zstd_available", return_value=False):
+            with patch.object(http_client, "_zstd_warned", False):
+                with caplog.at_level(logging.WARNING, "revenium_middleware.extension"):
+                    client = http_client.create_http_client(
+                        HttpClientConfig(compression="zstd")
+                    )
+        assert client._transport.codec is Codec.GZIP
+        assert "zstandard package is not installed" in caplog.text
+        client.close()
+
+
+class TestGroupedSends:
+    """Test batches are posted as one compressed JSON array."""
+
+    def _configure(self, server, group_path=GROUP_PATH, **http_config):
+        utils.client = create_metering_client(
+            "hak_test", server.base_url, HttpClientConfig()
+        )
+        utils.configure_http_client(**http_config)
+        utils.configure_batching(
+            batch_size=50, flush_interval=60, group_path=group_path
+        )
+
+    def test_batch_is_one_compressed_request(self, server):
+        self._configure(server, compression="gzip")
+        before = compression.get_compression_stats()
+        for i in range(50):
+            utils.create_metering_call(_make_usage_data(10 + i), USAGE_METADATA)
+        assert utils.flush_metering(timeout=10)
+
+        assert server.wait_for_records(50)
+        (request,) = server.requests
+        assert request.path == "/meter" + GROUP_PATH
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert len(server.records) == 50
+        assert server.records[0]["environment"] == "production"
+        assert len({r["transactionId"] for r in server.records}) == 50
+
+        raw = len(json.dumps(request.payload).encode())
+        assert raw / request.body_bytes >= 10
+        stats = compression.get_compression_stats()
+        assert stats["compression_requests"] == before["compression_requests"] + 1
+
+    def test_rejected_group_path_falls_back_per_record(self, server):
+        self._configure(server, group_path="/v2/ai/unknown")
+        with patch.object(utils, "_rejected_group_paths", set()):
+            for _ in range(2):
+                for _ in range(3):
+                    utils.create_metering_call(_make_usage_data(), USAGE_METADATA)
+                assert utils.flush_metering(timeout=10)
+            assert utils._rejected_group_paths == {"/v2/ai/unknown"}
+
+            # The grouped path is tried once, then every record goes on its own
+            assert server.wait_for_records(6)
+            assert [r.path for r in server.requests] == (
+                ["/meter/v2/ai/completions"] * 6
+            )
+
+            # Reconfiguring batching gives the path another try
+            utils.configure_batching(group_path="/v2/ai/unknown")
+            assert utils._rejected_group_paths == set()
+
+    def test_failed_group_is_returned_for_retry(self, server):
+        self._configure(server)
+        server.configure(error_rate=1.0)
+        records = [
+            {
+                "transaction_id": f"t{i}",
+                "model": "gemini-2.0-flash",
+                "prompt_tokens": 1,
+                "completion_tokens": 1,
+                "total_tokens": 2,
+                "cached_tokens": 0,
+                "stop_reason": "END",
+                "request_time": "2025-01-01T00:00:00.000Z",
+                "response_time": "2025-01-01T00:00:00.100Z",
+                "request_duration": 100,
+                "usage_metadata": {},
+                "operation_type": "CHAT",
+            }
+            for i in range(3)
+        ]
+        with patch.object(utils.client, "max_retries", 0):
+            assert utils.send_metering_batch(records) == records
+
+    def test_grouped_body_matches_single_send(self, server):
+        self._configure(server)
+        args = utils.build_completion_args(
+            transaction_id="t1",
+            model="gemini-2.0-flash",
+            prompt_tokens=1,
+            completion_tokens=1,
+            total_tokens=2,
+            cached_tokens=0,
+            stop_reason="END",
+            request_time="2025-01-01T00:00:00.000Z",
+            response_time="2025-01-01T00:00:00.100Z",
+            request_duration=100,
+            usage_metadata=USAGE_METADATA,
+        )
+        utils.send_completion(args)
+
+        assert server.wait_for_records(1)
+        assert utils._completion_body(args) == server.records[0]
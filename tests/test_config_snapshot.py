@@ -0,0 +1,140 @@
+"""
+Tests for the immutable configuration snapshot.
+"""
+
+import dataclasses
+import os
+import signal
+import pytest
+from unittest.mock import patch
+
+from revenium_middleware_google.common import config, utils
+from revenium_middleware_google.common.config import (
+    ReveniumConfig,
+    get_config,
+    reload_config,
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    yield
+    reload_config()
+
+
+def _completion_args(usage_metadata=None):
+    return utils.build_completion_args(
+        transaction_id="tx",
+        model="gemini-2.0-flash",
+        prompt_tokens=1,
+        completion_tokens=1,
+        total_tokens=2,
+        cached_tokens=0,
+        stop_reason="END",
+        request_time="2025-01-01T00:00:00.000Z",
+        response_time="2025-01-01T00:00:00.100Z",
+        request_duration=100,
+        usage_metadata=usage_metadata or {},
+    )
+
+
+class TestReveniumConfig:
+    """Test snapshot resolution and validation."""
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_ENVIRONMENT", "production")
+        monkeypatch.setenv("AWS_REGION", "us-east-1")
+        monkeypatch.setenv("REVENIUM_TRACE_TYPE", "invalid type")
+        monkeypatch.setenv("REVENIUM_TRACE_NAME", "n" * 300)
+        monkeypatch.setenv("REVENIUM_RETRY_NUMBER", "2")
+        monkeypatch.setenv("REVENIUM_LOG_LEVEL", "debug")
+
+        snapshot = ReveniumConfig.from_env()
+
+        assert snapshot.environment == "production"
+        assert snapshot.region == "us-east-1"
+        assert snapshot.trace_type is None
+        assert len(snapshot.trace_name) == 256
+        assert snapshot.retry_number == 2
+        assert snapshot.log_level == "DEBUG"
+
+    def test_snapshot_is_immutable(self):
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            get_config().environment = "changed"
+
+
+class TestReload:
+    """Test environment changes apply only on reload."""
+
+    def test_hot_path_uses_snapshot_until_reload(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_ENVIRONMENT", "staging")
+        reload_config()
+        assert _completion_args()["environment"] == "staging"
+
+        monkeypatch.setenv("REVENIUM_ENVIRONMENT", "production")
+        with patch.object(os, "getenv", side_effect=AssertionError("env read")):
+            assert _completion_args()["environment"] == "staging"
+
+        reload_config()
+        assert _completion_args()["environment"] == "production"
+
+    def test_usage_metadata_still_takes_priority(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_REGION", "env-region")
+        reload_config()
+        args = _completion_args({"region": "meta-region"})
+        assert args["region"] == "meta-region"
+
+    def test_transaction_name_env_then_metadata(self, monkeypatch):
+        monkeypatch.delenv("REVENIUM_TRANSACTION_NAME", raising=False)
+        reload_config()
+        assert _completion_args({"task_type": "classify"})["transaction_name"] == "classify"
+
+        monkeypatch.setenv("REVENIUM_TRANSACTION_NAME", "env-name")
+        reload_config()
+        assert _completion_args({"task_type": "classify"})["transaction_name"] == "env-name"
+
+    def test_debug_logging_uses_snapshot(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_LOG_LEVEL", "DEBUG")
+        reload_config()
+        assert utils.is_debug_logging_enabled() is True
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="SIGHUP not available")
+class TestSighup:
+    """Test the optional SIGHUP reload hook."""
+
+    def test_sighup_reloads_and_chains(self, monkeypatch):
+        calls = []
+        original = signal.signal(signal.SIGHUP, lambda signum, frame: calls.append(signum))
+        monkeypatch.setattr(config, "_sighup_installed", False)
+        try:
+            assert config.install_sighup_handler() is True
+            monkeypatch.setenv("REVENIUM_ENVIRONMENT", "after-hup")
+            os.kill(os.getpid(), signal.SIGHUP)
+
+            assert get_config().environment == "after-hup"
+            assert calls == [signal.SIGHUP]
+        finally:
+            signal.signal(signal.SIGHUP, original)
+
+    def test_sighup_during_reload_does_not_deadlock(self, monkeypatch):
+        original = signal.getsignal(signal.SIGHUP)
+        monkeypatch.setattr(config, "_sighup_installed", False)
+        from_env = config.ReveniumConfig.from_env
+        hups = []
+
+        def from_env_with_hup():
+            if not hups:
+                # The handler runs on this thread, inside reload_config
+                hups.append(1)
+                os.kill(os.getpid(), signal.SIGHUP)
+            return from_env()
+
+        try:
+            assert config.install_sighup_handler() is True
+            monkeypatch.setattr(config.ReveniumConfig, "from_env", from_env_with_hup)
+            monkeypatch.setenv("REVENIUM_ENVIRONMENT", "nested")
+            reload_config()
+            assert get_config().environment == "nested"
+        finally:
+            signal.signal(signal.SIGHUP, original)
@@ -0,0 +1,180 @@
+"""
+Tests for the local stand-in Revenium server, driven through the real
+metering client and HTTP path.
+"""
+
+import datetime
+import gzip
+import json
+import urllib.error
+import urllib.request
+import pytest
+from unittest.mock import patch
+
+from revenium_metering import ReveniumMetering
+
+from revenium_middleware_google.common import utils
+from revenium_middleware_google.common.exceptions import MeteringError
+from revenium_middleware_google.common.types import (
+    OperationType,
+    ProviderMetadata,
+    UsageData,
+)
+from revenium_middleware_google.testing import FakeReveniumServer
+
+
+def _completion_args(transaction_id="txn-1"):
+    return utils.build_completion_args(
+        transaction_id=transaction_id,
+        model="gemini-2.0-flash",
+        prompt_tokens=10,
+        completion_tokens=5,
+        total_tokens=15,
+        cached_tokens=0,
+        stop_reason="END",
+        request_time="2025-01-01T00:00:00.000Z",
+        response_time="2025-01-01T00:00:00.100Z",
+        request_duration=100,
+        usage_metadata={"trace_id": "trace-1"},
+        operation_type=OperationType.CHAT,
+    )
+
+
+def _make_usage_data():
+    ts = datetime.datetime.now(datetime.timezone.utc)
+    return UsageData.create(
+        operation_type=OperationType.CHAT,
+        input_tokens=10,
+        output_tokens=5,
+        total_tokens=15,
+        model="gemini-2.0-flash",
+        provider_metadata=ProviderMetadata.for_google_ai_sdk(),
+        stop_reason="END",
+        request_time=ts,
+        response_time=ts,
+    )
+
+
+def _client(server):
+    return ReveniumMetering(api_key="hak_test", base_url=server.base_url, max_retries=0)
+
+
+@pytest.fixture(autouse=True)
+def single_attempt_sends():
+    # Injected failure runs would otherwise open the breaker mid-test, and
+    # retries would change which requests the server sees
+    utils.configure_circuit_breaker(enabled=False)
+    utils.configure_retries(max_retries=0)
+    yield
+    utils.configure_circuit_breaker()
+    utils.configure_retries()
+
+
+@pytest.fixture
+def server():
+    with FakeReveniumServer(seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def metering_client(server):
+    client = _client(server)
+    with patch.object(utils, "client", client):
+        yield client
+    client.close()
+
+
+class TestFakeReveniumServer:
+    """Test the server records payloads and injects faults."""
+
+    def test_records_payload(self, server, metering_client):
+        utils.send_completion(_completion_args())
+
+        assert server.wait_for_records(1)
+        request = server.requests[0]
+        assert request.path == "/meter/v2/ai/completions"
+        assert request.headers["x-api-key"] == "hak_test"
+        # The client sends the API's camelCase field names
+        assert request.payload["transactionId"] == "txn-1"
+        assert request.payload["traceId"] == "trace-1"
+        assert request.payload["inputTokenCount"] == 10
+        assert server.stats()["accepted"] == 1
+
+    def test_scripted_failures(self, server, metering_client):
+        server.enqueue(500, "429", "drop")
+        for _ in range(3):
+            with pytest.raises(MeteringError):
+                utils.send_completion(_completion_args())
+        utils.send_completion(_completion_args())
+
+        assert [r.outcome for r in server.requests] == ["500", "429", "drop", "ok"]
+        stats = server.stats()
+        assert stats.pop("connections") >= 2  # the dropped one is not reused
+        assert stats == {
+            "requests": 4,
+            "accepted": 1,
+            "errors": 1,
+            "rate_limited": 1,
+            "dropped": 1,
+        }
+
+    def test_rate_limit_sends_retry_after(self, server):
+        server.configure(rate_limit_rate=1.0, retry_after=2)
+        request = urllib.request.Request(
+            server.base_url + "/v2/ai/completions", data=b"{}", method="POST"
+        )
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(request)
+        assert excinfo.value.code == 429
+        assert excinfo.value.headers["Retry-After"] == "2"
+
+    def test_error_rate_is_seeded(self):
+        def outcomes(seed):
+            with FakeReveniumServer(seed=seed, error_rate=0.5) as server:
+                with patch.object(utils, "client", _client(server)):
+                    for _ in range(20):
+                        try:
+                            utils.send_completion(_completion_args())
+                        except MeteringError:
+                            pass
+                return [r.outcome for r in server.requests]
+
+        first = outcomes(7)
+        assert first == outcomes(7)
+        assert {"ok", "500"} == set(first)
+
+    def test_gzip_body_is_decoded(self, server):
+        request = urllib.request.Request(
+            server.base_url + "/v2/ai/completions",
+            data=gzip.compress(json.dumps({"transactionId": "gz"}).encode()),
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 201
+        assert server.records == [{"transactionId": "gz"}]
+
+    def test_stats_endpoint(self, server):
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/_fake/stats") as r:
+            assert json.loads(r.read())["requests"] == 0
+
+    def test_unknown_fault_option_rejected(self, server):
+        with pytest.raises(TypeError):
+            server.configure(error_chance=0.5)
+
+
+class TestMeteringPipelineAgainstServer:
+    """Test batched records travel the full pipeline over HTTP."""
+
+    def teardown_method(self):
+        utils.configure_batching(enabled=False)
+
+    def test_batched_records_arrive(self, server, metering_client):
+        utils.configure_batching(batch_size=10, flush_interval=60)
+        for _ in range(25):
+            utils.create_metering_call(_make_usage_data(), {"trace_id": "load"})
+        assert utils.flush_metering(timeout=10)
+
+        assert server.wait_for_records(25)
+        assert {r["traceId"] for r in server.records} == {"load"}
+        assert len({r["transactionId"] for r in server.records}) == 25
@@ -0,0 +1,158 @@
+"""
+Tests for the google.genai async surface (client.aio.models).
+"""
+
+import asyncio
+import datetime
+import pytest
+from unittest.mock import Mock, patch
+
+from revenium_middleware_google.common import MeteringError, OperationType
+from revenium_middleware_google.common.metering_queue import (
+    MeteringQueue,
+    OverflowPolicy,
+)
+from revenium_middleware_google.google_ai import middleware
+
+
+def _chunk(model=None, finish_reason=None, usage=None):
+    candidates = [Mock(finish_reason=finish_reason)] if finish_reason else []
+    return Mock(model_version=model, candidates=candidates, usage_metadata=usage)
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+async def _agen(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.fixture
+def metering_call():
+    with patch.object(middleware, "create_google_ai_metering_call") as mock_call:
+        yield mock_call
+
+
+class TestAsyncWrappers:
+    """Test the AsyncModels wrappers meter and pass results through."""
+
+    def test_generate_content(self, metering_call):
+        response = Mock()
+
+        async def wrapped(*args, **kwargs):
+            assert "usage_metadata" not in kwargs
+            return response
+
+        result = asyncio.run(
+            middleware.async_generate_content_wrapper(
+                wrapped, Mock(_api_client="api"), (), {"usage_metadata": {"trace_id": "t"}}
+            )
+        )
+
+        assert result is response
+        kwargs = metering_call.call_args.kwargs
+        assert kwargs["operation_type"] == OperationType.CHAT
+        assert kwargs["usage_metadata"] == {"trace_id": "t"}
+        assert kwargs["client_instance"] == "api"
+
+    def test_embed_content_uses_model_from_call(self, metering_call):
+        async def wrapped(*args, **kwargs):
+            return Mock()
+
+        asyncio.run(
+            middleware.async_embed_content_wrapper(
+                wrapped, None, (), {"model": "text-embedding-004", "contents": "hi"}
+            )
+        )
+
+        kwargs = metering_call.call_args.kwargs
+        assert kwargs["operation_type"] == OperationType.EMBED
+        assert kwargs["model_name_fallback"] == "text-embedding-004"
+
+    def test_api_errors_are_wrapped(self, metering_call):
+        async def wrapped(*args, **kwargs):
+            raise RuntimeError("api down")
+
+        with pytest.raises(MeteringError):
+            asyncio.run(middleware.async_generate_content_wrapper(wrapped, None, (), {}))
+        metering_call.assert_not_called()
+
+    def test_metering_failure_does_not_break_call(self, metering_call):
+        metering_call.side_effect = RuntimeError("metering down")
+        response = Mock()
+
+        async def wrapped(*args, **kwargs):
+            return response
+
+        result = asyncio.run(
+            middleware.async_generate_content_wrapper(wrapped, None, (), {})
+        )
+        assert result is response
+
+
+class TestAsyncStreamWrapper:
+    """Test the async stream wrapper meters once the stream ends."""
+
+    def test_stream_meters_on_completion(self, metering_call):
+        chunks = [
+            _chunk(model="gemini-2.0-flash"),
+            _chunk(finish_reason="STOP", usage=Mock(prompt_token_count=3)),
+        ]
+
+        async def wrapped(*args, **kwargs):
+            return _agen(chunks)
+
+        async def main():
+            stream = await middleware.async_generate_content_stream_wrapper(
+                wrapped, None, (), {"usage_metadata": {"trace_id": "s"}}
+            )
+            return [chunk async for chunk in stream]
+
+        received = asyncio.run(main())
+
+        assert received == chunks
+        metering_call.assert_called_once()
+        kwargs = metering_call.call_args.kwargs
+        assert kwargs["is_streamed"] is True
+        assert kwargs["usage_metadata"] == {"trace_id": "s"}
+        synthetic = kwargs["response"]
+        assert synthetic.model_version == "gemini-2.0-flash"
+        assert synthetic.candidates[0].finish_reason == "STOP"
+
+    def test_early_close_meters_partial_stream(self, metering_call):
+        async def main():
+            stream = middleware.handle_async_streaming_response(
+                _agen([_chunk(model="m"), _chunk(), _chunk()]), _now(), {}
+            )
+            async with stream:
+                async for _ in stream:
+                    break
+
+        asyncio.run(main())
+        metering_call.assert_called_once()
+
+    def test_stream_error_meters_and_reraises(self, metering_call):
+        async def failing():
+            yield _chunk(model="m")
+            raise RuntimeError("stream broke")
+
+        async def main():
+            stream = middleware.handle_async_streaming_response(failing(), _now(), {})
+            async for _ in stream:
+                pass
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(main())
+        metering_call.assert_called_once()
+
+
+class TestNonBlockingSubmit:
+    """Test the block policy never waits when called from an event loop."""
+
+    def test_put_without_block_does_not_wait(self):
+        queue = MeteringQueue(capacity=1, policy=OverflowPolicy.BLOCK, block_timeout=5)
+        queue.put({"i": 1})
+        assert queue.put({"i": 2}, block=False) is False
+        assert queue.stats()["dropped_timeout"] == 1
@@ -0,0 +1,155 @@
+"""
+Tests for the tuned metering HTTP client, against the local fake server.
+"""
+
+import asyncio
+import logging
+import pytest
+from unittest.mock import patch
+
+from revenium_middleware import client as library_client
+
+from revenium_middleware_google.common import async_metering, http_client, utils
+from revenium_middleware_google.common.exceptions import ConfigurationError
+from revenium_middleware_google.common.http_client import (
+    HttpClientConfig,
+    create_async_metering_client,
+    create_metering_client,
+)
+from revenium_middleware_google.common.types import OperationType
+from revenium_middleware_google.testing import FakeReveniumServer
+
+
+def _completion_args(transaction_id="txn-1"):
+    return utils.build_completion_args(
+        transaction_id=transaction_id,
+        model="gemini-2.0-flash",
+        prompt_tokens=10,
+        completion_tokens=5,
+        total_tokens=15,
+        cached_tokens=0,
+        stop_reason="END",
+        request_time="2025-01-01T00:00:00.000Z",
+        response_time="2025-01-01T00:00:00.100Z",
+        request_duration=100,
+        usage_metadata={},
+        operation_type=OperationType.CHAT,
+    )
+
+
+@pytest.fixture
+def server():
+    with FakeReveniumServer(seed=1) as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def restore_client():
+    with patch.object(utils, "client", library_client), patch.object(
+        http_client, "_config", None
+    ):
+        yield
+
+
+class TestHttpClientConfig:
+    """Test connection pool settings."""
+
+    def test_defaults(self):
+        config = HttpClientConfig()
+        assert config.pool_size == 16
+        assert config.keepalive_expiry == 30.0
+        assert config.http2 is False
+        assert config.limits.max_keepalive_connections == 16
+        assert config.timeouts.connect == 5.0
+        assert config.timeouts.read == 10.0
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_METERING_POOL_SIZE", "4")
+        monkeypatch.setenv("REVENIUM_METERING_KEEPALIVE_EXPIRY", "90")
+        monkeypatch.setenv("REVENIUM_METERING_HTTP2", "true")
+        monkeypatch.setenv("REVENIUM_METERING_CONNECT_TIMEOUT", "1.5")
+        monkeypatch.setenv("REVENIUM_METERING_TIMEOUT", "3")
+        config = HttpClientConfig.from_env()
+        assert config == HttpClientConfig(4, 90.0, True, 1.5, 3.0)
+
+    def test_invalid_env_falls_back(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_METERING_TIMEOUT", "slow")
+        assert HttpClientConfig.from_env().timeout == 10.0
+
+
+class TestMeteringClient:
+    """Test sends reuse pooled keep-alive connections."""
+
+    def test_sequential_sends_share_one_connection(self, server):
+        metering = create_metering_client(
+            "hak_test", server.base_url, HttpClientConfig()
+        )
+        for i in range(5):
+            metering.ai.create_completion(**_completion_args(f"txn-{i}"))
+        metering.close()
+
+        assert server.stats()["accepted"] == 5
+        assert len({r.client_port for r in server.requests}) == 1
+
+    def test_async_client_uses_pool(self, server):
+        async def send():
+            metering = create_async_metering_client(
+                "hak_test", server.base_url, HttpClientConfig(pool_size=2)
+            )
+            for i in range(3):
+                await metering.ai.create_completion(**_completion_args(f"a-{i}"))
+            await metering.close()
+
+        asyncio.run(send())
+        assert len({r.client_port for r in server.requests}) == 1
+
+    def test_http2_without_h2_falls_back(self, server, caplog):
+        with patch.object(http_client, "is_http2_available", return_value=False):
+            with patch.object(http_client, "_http2_warned", False):
+                with caplog.at_level(logging.WARNING, "revenium_middleware.extension"):
+                    metering = create_metering_client(
+                        "hak_test", server.base_url, HttpClientConfig(http2=True)
+                    )
+        metering.ai.create_completion(**_completion_args())
+        metering.close()
+        assert server.stats()["accepted"] == 1
+        assert "h2 package is not installed" in caplog.text
+
+
+class TestUtilsWiring:
+    """Test the middleware swaps in its tuned client."""
+
+    def test_library_client_replaced_on_first_use(self):
+        tuned = utils.get_metering_client()
+        assert tuned is not library_client
+        assert utils.get_metering_client() is tuned
+        assert str(tuned.base_url) == str(library_client.base_url)
+        assert tuned.timeout.connect == 5.0
+
+    def test_application_client_is_kept(self):
+        with patch.object(utils, "client") as mock_client:
+            assert utils.get_metering_client() is mock_client
+
+    def test_configure_http_client(self, server):
+        utils.client = create_metering_client(
+            "hak_test", server.base_url, HttpClientConfig()
+        )
+        configured = utils.configure_http_client(pool_size=2, timeout=3)
+        assert utils.get_metering_client() is configured
+        assert configured.timeout.read == 3.0
+        assert http_client.get_http_client_config().pool_size == 2
+
+        utils.send_completion(_completion_args())
+        assert server.stats()["accepted"] == 1
+
+    def test_async_clients_use_configured_settings(self):
+        http_client.set_http_client_config(HttpClientConfig(timeout=2))
+
+        async def get():
+            return async_metering.get_async_client()
+
+        assert asyncio.run(get()).timeout.read == 2.0
+
+    def test_unknown_option_rejected(self):
+        with pytest.raises(ConfigurationError):
+            utils.configure_http_client(pool=4)
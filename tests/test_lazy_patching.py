@@ -0,0 +1,137 @@
+"""
+Tests for deferred, post-import SDK patching.
+"""
+
+import subprocess
+import sys
+import types
+import uuid
+import pytest
+
+from revenium_middleware_google.common.patching import (
+    get_applied_patches,
+    patch_when_imported,
+    when_imported,
+)
+
+
+def _write_module(tmp_path, monkeypatch, source):
+    name = f"fake_sdk_{uuid.uuid4().hex}"
+    (tmp_path / f"{name}.py").write_text(source)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return name
+
+
+def _wrapper(wrapped, instance, args, kwargs):
+    return ("wrapped", wrapped(*args, **kwargs))
+
+
+class TestPatchWhenImported:
+    """Test wrappers are applied only when the application imports the module."""
+
+    def test_module_is_not_imported_until_application_does(self, tmp_path, monkeypatch):
+        name = _write_module(
+            tmp_path,
+            monkeypatch,
+            "class Models:\n    def generate_content(self):\n        return 'response'\n",
+        )
+
+        returned = patch_when_imported(name, "Models.generate_content")(_wrapper)
+
+        assert returned is _wrapper
+        assert name not in sys.modules
+
+        module = __import__(name)
+        assert module.Models().generate_content() == ("wrapped", "response")
+        assert f"{name}.Models.generate_content" in get_applied_patches()
+
+    def test_already_imported_module_is_wrapped_immediately(self, monkeypatch):
+        name = f"fake_sdk_{uuid.uuid4().hex}"
+        module = types.ModuleType(name)
+        module.embed = lambda: "embedding"
+        monkeypatch.setitem(sys.modules, name, module)
+
+        patch_when_imported(name, "embed")(_wrapper)
+
+        assert module.embed() == ("wrapped", "embedding")
+
+    def test_missing_attribute_is_logged_not_raised(self, monkeypatch, caplog):
+        name = f"fake_sdk_{uuid.uuid4().hex}"
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+
+        patch_when_imported(name, "Models.missing", optional=True)(_wrapper)
+        patch_when_imported(name, "Models.required")(_wrapper)
+
+        assert "Models.required not available to wrap" in caplog.text
+
+    def test_failing_hook_is_logged_not_raised(self, monkeypatch, caplog):
+        name = f"fake_sdk_{uuid.uuid4().hex}"
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+
+        def hook(module):
+            raise RuntimeError("boom")
+
+        when_imported(name, hook)
+        assert "Post-import hook for" in caplog.text
+
+
+class TestVertexGenerativeModelHook:
+    """Test GenerativeModel variants are wrapped once per class."""
+
+    def test_reexported_class_is_wrapped_once(self, monkeypatch):
+        from revenium_middleware_google.vertex_ai import middleware
+
+        class GenerativeModel:
+            def generate_content(self, contents):
+                return contents
+
+        monkeypatch.setattr(middleware, "_wrapped_generative_models", set())
+        stable = types.ModuleType("vertexai.generative_models")
+        preview = types.ModuleType("vertexai.preview.generative_models")
+        stable.GenerativeModel = preview.GenerativeModel = GenerativeModel
+
+        before = len(get_applied_patches())
+        middleware._wrap_generative_model(stable)
+        middleware._wrap_generative_model(preview)
+
+        applied = get_applied_patches()[before:]
+        assert applied == ["vertexai.generative_models.GenerativeModel.generate_content"]
+
+    def test_module_without_generative_model_is_skipped(self):
+        from revenium_middleware_google.vertex_ai import middleware
+
+        before = len(get_applied_patches())
+        middleware._wrap_generative_model(types.ModuleType("vertexai.v2.generative_models"))
+        assert len(get_applied_patches()) == before
+
+
+class TestPackageImport:
+    """Test importing the package does not import either SDK."""
+
+    def test_sdks_not_imported(self):
+        code = (
+            "import sys, revenium_middleware_google as m; "
+            "print('google.genai' in sys.modules, 'vertexai' in sys.modules, m.active_sdks)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.strip() == "False False []"
+
+    def test_sdk_import_activates_middleware(self):
+        pytest.importorskip("google.genai")
+        code = (
+            "import revenium_middleware_google as m; "
+            "from google.genai import models; "
+            "print(hasattr(models.Models.generate_content, '__wrapped__'), m.active_sdks)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.strip() == "True ['google_ai']"
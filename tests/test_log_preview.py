@@ -0,0 +1,145 @@
+"""
+Tests for lazy, truncated and redacted payload previews in logs.
+"""
+
+import datetime
+import logging
+import pytest
+from unittest.mock import Mock, patch
+
+from revenium_middleware_google.common import log_preview
+from revenium_middleware_google.common.log_preview import (
+    REDACTED,
+    LogPreview,
+    format_preview,
+    get_log_preview_chars,
+    set_log_preview_chars,
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_limit():
+    original = get_log_preview_chars()
+    yield
+    set_log_preview_chars(original)
+
+
+class TestFormatPreview:
+    """Test preview formatting."""
+
+    def test_long_string_is_truncated(self):
+        preview = format_preview({"contents": "x" * 10_000}, limit=50)
+        assert len(preview) < 100
+        assert "more chars]" in preview
+
+    def test_bytes_are_summarized(self):
+        preview = format_preview({"data": b"\x89PNG" * 50_000}, limit=500)
+        assert preview == "{'data': <bytes len=200000>}"
+
+    def test_credentials_are_redacted(self):
+        preview = format_preview(
+            {
+                "api_key": "AIza-secret",
+                "subscriber": {"id": "u1", "credential": {"value": "sk-secret"}},
+                "headers": {"Authorization": "Bearer abc"},
+            },
+            limit=0,
+        )
+        assert "secret" not in preview
+        assert "Bearer" not in preview
+        assert preview.count(REDACTED) == 3
+        assert "'u1'" in preview
+
+    def test_containers_are_bounded(self):
+        preview = format_preview(list(range(1000)), limit=0)
+        assert preview.endswith("...980 more]")
+
+        nested = {"a": {"b": {"c": {"d": {"e": 1}}}}}
+        assert "{...}" in format_preview(nested, limit=0)
+
+    def test_tuple_formatting(self):
+        assert format_preview(("prompt",), limit=0) == "('prompt',)"
+
+    def test_failing_repr(self):
+        class Broken:
+            def __repr__(self):
+                raise RuntimeError("boom")
+
+        assert "repr failed: boom" in format_preview(Broken())
+
+    def test_configured_limit(self):
+        set_log_preview_chars(20)
+        assert "more chars]" in format_preview("y" * 100)
+
+
+class TestLaziness:
+    """Test previews cost nothing unless the record is emitted."""
+
+    def test_not_formatted_when_level_disabled(self, caplog):
+        with patch.object(log_preview, "format_preview") as format_mock:
+            with caplog.at_level(logging.INFO, logger="revenium_middleware.extension"):
+                logging.getLogger("revenium_middleware.extension").debug(
+                    "kwargs: %s", LogPreview({"contents": "x"})
+                )
+        format_mock.assert_not_called()
+
+    def test_formatted_when_emitted(self, caplog):
+        with caplog.at_level(logging.DEBUG, logger="revenium_middleware.extension"):
+            logging.getLogger("revenium_middleware.extension").debug(
+                "kwargs: %s", LogPreview({"api_key": "k", "contents": "hello"})
+            )
+        assert f"'api_key': {REDACTED}" in caplog.text
+        assert "'hello'" in caplog.text
+
+
+class TestEnvironment:
+    """Test REVENIUM_LOG_PREVIEW_CHARS parsing."""
+
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv("REVENIUM_LOG_PREVIEW_CHARS", raising=False)
+        assert log_preview._preview_chars_from_env() == 500
+
+    def test_override_and_invalid(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_LOG_PREVIEW_CHARS", "0")
+        assert log_preview._preview_chars_from_env() == 0
+        monkeypatch.setenv("REVENIUM_LOG_PREVIEW_CHARS", "lots")
+        assert log_preview._preview_chars_from_env() == 500
+
+
+class TestWrapperLogging:
+    """Test wrappers log payload previews instead of raw payloads."""
+
+    def test_generate_content_kwargs_preview(self, caplog):
+        from revenium_middleware_google.google_ai import middleware
+
+        image = b"\x00" * 100_000
+        wrapped = Mock(return_value=Mock())
+        with patch.object(middleware, "create_google_ai_metering_call"):
+            with caplog.at_level(logging.DEBUG, logger="revenium_middleware.extension"):
+                middleware.generate_content_wrapper(
+                    wrapped,
+                    Mock(),
+                    (),
+                    {"model": "gemini-2.0-flash", "contents": ["describe", image]},
+                )
+
+        assert "<bytes len=100000>" in caplog.text
+        assert "\\x00\\x00" not in caplog.text
+
+
+class TestCompletionArgsLogging:
+    """Test the metering payload log redacts subscriber credentials."""
+
+    def test_subscriber_credential_redacted(self, caplog):
+        from revenium_middleware_google.common import utils
+
+        args = {
+            "transaction_id": "tx",
+            "subscriber": {"id": "u1", "credential": {"name": "k", "value": "sk-1"}},
+            "request_time": datetime.datetime(2025, 1, 1).isoformat(),
+        }
+        with caplog.at_level(logging.DEBUG, logger="revenium_middleware.extension"):
+            utils._log_completion_args(args)
+
+        assert "sk-1" not in caplog.text
+        assert REDACTED in caplog.text
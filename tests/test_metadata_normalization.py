@@ -0,0 +1,226 @@
+"""
+Tests for usage_metadata normalization and its cache.
+"""
+
+import datetime
+import json
+import threading
+import pytest
+from unittest.mock import patch
+
+from revenium_middleware_google.common import metadata, utils
+from revenium_middleware_google.common.config import reload_config
+from revenium_middleware_google.common.metadata import (
+    NormalizedMetadata,
+    clear_metadata_cache,
+    compile_usage_metadata,
+    get_metadata_cache_stats,
+    normalize_usage_metadata,
+)
+from revenium_middleware_google.common.spool import MeteringSpool
+from revenium_middleware_google.common.transport import (
+    BatchingConfig,
+    BatchingTransport,
+)
+from revenium_middleware_google.common.types import (
+    OperationType,
+    ProviderMetadata,
+    UsageData,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    clear_metadata_cache()
+    yield
+    clear_metadata_cache()
+    reload_config()
+
+
+def _completion_args(usage_metadata):
+    return utils.build_completion_args(
+        transaction_id="tx",
+        model="gemini-2.0-flash",
+        prompt_tokens=1,
+        completion_tokens=1,
+        total_tokens=2,
+        cached_tokens=0,
+        stop_reason="END",
+        request_time="2025-01-01T00:00:00.000Z",
+        response_time="2025-01-01T00:00:00.100Z",
+        request_duration=100,
+        usage_metadata=usage_metadata,
+    )
+
+
+class TestCompile:
+    """Test the compiled payload fragment."""
+
+    def test_fields_and_aliases(self):
+        fragment = compile_usage_metadata(
+            {
+                "trace_id": "t",
+                "organizationId": "org",
+                "credentialAlias": "key",
+                "parentTransactionId": "parent",
+                "traceType": "support",
+                "traceName": "Support chat",
+                "task_type": "classify",
+                "ignored": "x",
+            }
+        )
+
+        assert dict(fragment) == {
+            "trace_id": "t",
+            "task_type": "classify",
+            "organization_id": "org",
+            "credential_alias": "key",
+            "parent_transaction_id": "parent",
+            "trace_type": "support",
+            "trace_name": "Support chat",
+            "transaction_name": "classify",
+        }
+
+    def test_flat_subscriber_keys(self):
+        fragment = compile_usage_metadata(
+            {"subscriber_id": "u1", "subscriber_credential_name": "k"}
+        )
+        assert fragment["subscriber"] == {"id": "u1", "credential": {"name": "k"}}
+
+    def test_invalid_trace_type_is_dropped_but_overrides_env(self):
+        fragment = compile_usage_metadata({"trace_type": "not valid"})
+        assert "trace_type" not in fragment
+        assert fragment.env_overrides == {"trace_type"}
+
+    def test_read_only_and_json_serializable(self):
+        fragment = compile_usage_metadata({"trace_id": "t"})
+        with pytest.raises(TypeError):
+            fragment["trace_id"] = "other"
+        with pytest.raises(TypeError):
+            fragment.update(agent="a")
+        assert json.loads(json.dumps(fragment)) == {"trace_id": "t"}
+
+
+class TestBuildCompletionArgs:
+    """Test the fragment merges with environment defaults."""
+
+    def test_metadata_overrides_env(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_REGION", "env-region")
+        monkeypatch.setenv("REVENIUM_TRACE_TYPE", "env-type")
+        reload_config()
+
+        args = _completion_args({"region": "meta-region", "traceType": "bad type"})
+
+        assert args["region"] == "meta-region"
+        assert "trace_type" not in args
+
+    def test_env_transaction_name_wins(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_TRANSACTION_NAME", "env-name")
+        reload_config()
+        args = _completion_args({"transaction_name": "meta-name"})
+        assert args["transaction_name"] == "env-name"
+
+    def test_nested_subscriber(self):
+        subscriber = {"id": "u1", "credential": {"name": "k", "value": "v"}}
+        args = _completion_args({"subscriber": subscriber})
+        assert args["subscriber"] == subscriber
+        assert args["subscriber"] is not subscriber
+
+
+class TestCache:
+    """Test identity-keyed caching with content validation."""
+
+    def test_same_dict_is_compiled_once(self):
+        usage_metadata = {"trace_id": "t"}
+        with patch.object(
+            metadata, "compile_usage_metadata", wraps=compile_usage_metadata
+        ) as compile_mock:
+            first = normalize_usage_metadata(usage_metadata)
+            second = normalize_usage_metadata(usage_metadata)
+
+        assert first is second
+        assert compile_mock.call_count == 1
+        assert get_metadata_cache_stats()["metadata_cache_hits"] == 1
+
+    def test_mutation_recompiles(self):
+        usage_metadata = {"subscriber": {"id": "u1"}}
+        first = normalize_usage_metadata(usage_metadata)
+
+        usage_metadata["subscriber"]["id"] = "u2"
+        second = normalize_usage_metadata(usage_metadata)
+
+        assert first["subscriber"] == {"id": "u1"}
+        assert second["subscriber"] == {"id": "u2"}
+
+    def test_normalized_input_passes_through(self):
+        fragment = normalize_usage_metadata({"trace_id": "t"})
+        assert normalize_usage_metadata(fragment) is fragment
+        assert isinstance(normalize_usage_metadata(None), NormalizedMetadata)
+
+    def test_lru_eviction(self, monkeypatch):
+        monkeypatch.setattr(metadata, "METADATA_CACHE_SIZE", 2)
+        dicts = [{"trace_id": str(i)} for i in range(3)]
+        for usage_metadata in dicts:
+            normalize_usage_metadata(usage_metadata)
+        assert get_metadata_cache_stats()["metadata_cache_size"] == 2
+
+
+def _usage_data():
+    ts = datetime.datetime.now(datetime.timezone.utc)
+    return UsageData.create(
+        operation_type=OperationType.CHAT,
+        input_tokens=1,
+        output_tokens=1,
+        total_tokens=2,
+        model="gemini-2.0-flash",
+        provider_metadata=ProviderMetadata.for_google_ai_sdk(),
+        stop_reason="END",
+        request_time=ts,
+        response_time=ts,
+    )
+
+
+class TestMutationRace:
+    """Test records are isolated from later changes to the caller's dict."""
+
+    def test_record_keeps_metadata_at_call_time(self):
+        usage_data = _usage_data()
+        usage_metadata = {"trace_id": "before"}
+
+        with patch.object(utils, "get_metering_transport") as transport:
+            utils.create_metering_call(usage_data, usage_metadata)
+            usage_metadata["trace_id"] = "after"
+
+        record = transport.return_value.submit.call_args.args[0]
+        assert _completion_args(record["usage_metadata"])["trace_id"] == "before"
+
+
+class TestSpoolRoundTrip:
+    """Test env overrides survive records reloaded from the spool."""
+
+    def test_overrides_kept_through_spool(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("REVENIUM_TRACE_TYPE", "env-type")
+        monkeypatch.setenv("REVENIUM_TRACE_NAME", "env-name")
+        reload_config()
+        transport = BatchingTransport(
+            lambda batch: None, BatchingConfig(spool_dir=str(tmp_path))
+        )
+        shutting_down = threading.Event()
+        shutting_down.set()
+
+        with patch.object(utils, "get_metering_transport", return_value=transport):
+            with patch.object(utils, "shutdown_event", shutting_down):
+                utils.create_metering_call(
+                    _usage_data(),
+                    {"trace_type": "not valid", "trace_name": "meta-name"},
+                )
+        transport.shutdown()
+
+        replayed = MeteringSpool(str(tmp_path)).replay()
+        assert len(replayed) == 1
+        record = replayed[0][0]
+        assert type(record["usage_metadata"]) is dict
+
+        args = utils.build_completion_args(**record)
+        assert "trace_type" not in args
+        assert args["trace_name"] == "meta-name"
@@ -0,0 +1,205 @@
+"""
+Tests for the bounded metering queue and its overflow policies.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import pytest
+
+from revenium_middleware_google.common.metering_queue import (
+    MeteringQueue,
+    OverflowPolicy,
+)
+
+
+def _take_all(queue, max_items=1000):
+    with queue.cond:
+        batch = queue.take_locked(max_items)
+    if not batch:
+        queue.reload_spill()
+        with queue.cond:
+            batch = queue.take_locked(max_items)
+    return batch
+
+
+class TestOverflowPolicyParsing:
+    """Test parsing of overflow policy names."""
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            ("drop_oldest", OverflowPolicy.DROP_OLDEST),
+            ("drop-newest", OverflowPolicy.DROP_NEWEST),
+            ("BLOCK", OverflowPolicy.BLOCK),
+            ("spill", OverflowPolicy.SPILL),
+            (OverflowPolicy.SPILL, OverflowPolicy.SPILL),
+        ],
+    )
+    def test_parse(self, value, expected):
+        assert OverflowPolicy.parse(value) == expected
+
+    def test_invalid_defaults_to_drop_newest(self):
+        assert OverflowPolicy.parse("bogus") == OverflowPolicy.DROP_NEWEST
+
+
+class TestOverflowPolicies:
+    """Test behaviour of each policy when the queue is full."""
+
+    def test_drop_newest(self):
+        queue = MeteringQueue(capacity=2, policy=OverflowPolicy.DROP_NEWEST)
+        assert queue.put({"i": 1})
+        assert queue.put({"i": 2})
+        assert queue.put({"i": 3}) is False
+
+        assert _take_all(queue) == [{"i": 1}, {"i": 2}]
+        assert queue.stats()["dropped_newest"] == 1
+        assert queue.dropped == 1
+
+    def test_drop_oldest(self):
+        queue = MeteringQueue(capacity=2, policy=OverflowPolicy.DROP_OLDEST)
+        for i in range(1, 4):
+            assert queue.put({"i": i})
+
+        assert _take_all(queue) == [{"i": 2}, {"i": 3}]
+        assert queue.stats()["dropped_oldest"] == 1
+
+    def test_block_times_out(self):
+        queue = MeteringQueue(
+            capacity=1, policy=OverflowPolicy.BLOCK, block_timeout=0.05
+        )
+        queue.put({"i": 1})
+
+        start = time.monotonic()
+        assert queue.put({"i": 2}) is False
+        assert time.monotonic() - start >= 0.04
+        assert queue.stats()["dropped_timeout"] == 1
+
+    def test_block_succeeds_when_space_frees(self):
+        queue = MeteringQueue(capacity=1, policy=OverflowPolicy.BLOCK, block_timeout=2)
+        queue.put({"i": 1})
+
+        def consumer():
+            time.sleep(0.05)
+            _take_all(queue)
+
+        thread = threading.Thread(target=consumer)
+        thread.start()
+        assert queue.put({"i": 2}) is True
+        thread.join()
+
+        assert _take_all(queue) == [{"i": 2}]
+        assert queue.dropped == 0
+
+    def test_spill_and_reload(self, tmp_path):
+        spill_path = str(tmp_path / "spill.jsonl")
+        queue = MeteringQueue(
+            capacity=2, policy=OverflowPolicy.SPILL, spill_path=spill_path
+        )
+        for i in range(5):
+            assert queue.put({"i": i})
+
+        stats = queue.stats()
+        assert stats["spilled"] == 3
+        assert stats["spill_pending"] == 3
+        assert queue.dropped == 0
+
+        assert _take_all(queue) == [{"i": 0}, {"i": 1}]
+        # Spilled records come back, at most `capacity` at a time
+        assert _take_all(queue) == [{"i": 2}, {"i": 3}]
+        assert _take_all(queue) == [{"i": 4}]
+        assert queue.stats()["spill_pending"] == 0
+        # Fully read, so the file starts over instead of growing
+        assert os.path.getsize(spill_path) == 0
+
+        queue.close_spill()
+        assert not os.path.exists(spill_path)
+
+    def test_spill_appends_and_reads_from_offset(self, tmp_path):
+        spill_path = str(tmp_path / "spill.jsonl")
+        queue = MeteringQueue(
+            capacity=2, policy=OverflowPolicy.SPILL, spill_path=spill_path
+        )
+        for i in range(5):
+            queue.put({"i": i})
+        assert _take_all(queue) == [{"i": 0}, {"i": 1}]
+        size = os.path.getsize(spill_path)
+
+        # Reading part of the file leaves it as it is
+        queue.reload_spill()
+        assert os.path.getsize(spill_path) == size
+        # Spilling more appends behind the unread record
+        queue.put({"i": 5})
+        assert os.path.getsize(spill_path) > size
+
+        assert _take_all(queue) == [{"i": 2}, {"i": 3}]
+        assert _take_all(queue) == [{"i": 4}, {"i": 5}]
+        assert queue.dropped == 0
+
+    def test_spill_written_without_holding_queue_lock(self):
+        queue = MeteringQueue(capacity=1, policy=OverflowPolicy.SPILL)
+        queue.put({"i": 0})
+        taken = []
+
+        def consumer():
+            with queue.cond:
+                taken.extend(queue.take_locked(1))
+
+        # A producer stuck on the disk must not stall consumers
+        with queue._spill_lock:
+            producer = threading.Thread(target=queue.put, args=({"i": 1},))
+            producer.start()
+            thread = threading.Thread(target=consumer)
+            thread.start()
+            thread.join(timeout=5)
+            assert taken == [{"i": 0}]
+        producer.join(timeout=5)
+        assert _take_all(queue) == [{"i": 1}]
+
+    def test_default_spill_file_leaves_nothing_on_disk(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        queue = MeteringQueue(capacity=1, policy=OverflowPolicy.SPILL)
+        queue.put({"i": 0})
+        queue.put({"i": 1})
+        assert queue.stats()["spill_pending"] == 1
+        if os.name == "posix":
+            assert os.listdir(tmp_path) == []
+        queue.close_spill()
+        assert os.listdir(tmp_path) == []
+
+    def test_closed_queue_rejects(self):
+        queue = MeteringQueue(capacity=2)
+        queue.close()
+        assert queue.put({"i": 1}) is False
+        assert queue.stats()["dropped_closed"] == 1
+
+
+class TestRequeue:
+    """Test failed records go back ahead of newer ones."""
+
+    def test_requeue_at_head_in_order(self):
+        queue = MeteringQueue(capacity=5)
+        for i in range(4):
+            queue.put({"i": i})
+        with queue.cond:
+            failed = queue.take_locked(2)
+        queue.put({"i": 4})
+
+        with queue.cond:
+            assert queue.requeue_locked(failed) == 2
+        assert _take_all(queue) == [{"i": i} for i in range(5)]
+
+    def test_requeue_uses_free_capacity_only(self):
+        queue = MeteringQueue(capacity=3, policy=OverflowPolicy.DROP_OLDEST)
+        for i in range(3):
+            queue.put({"i": i})
+        with queue.cond:
+            failed = queue.take_locked(3)
+        queue.put({"i": 3})
+        queue.put({"i": 4})
+
+        with queue.cond:
+            assert queue.requeue_locked(failed) == 1
+        assert _take_all(queue) == [{"i": 0}, {"i": 3}, {"i": 4}]
+        assert queue.dropped == 0
@@ -7,8 +7,9 @@ SPDX-License-Identifier: MIT
 Tests for Google model name extraction and normalization.
 """
 
+import datetime
 import pytest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 
 class TestModelNameNormalization:
@@ -182,3 +183,119 @@ class TestModelVersionHandling:
             # Should not have version suffixes
             assert not model.endswith("-001")
             assert not model.endswith("-002")
+
+
+class TestNormalizeModelName:
+    """Test the resource-path parser."""
+
+    @pytest.mark.parametrize("model_name,expected", [
+        ("gemini-1.5-pro", "gemini-1.5-pro"),
+        ("models/gemini-2.0-flash-001", "gemini-2.0-flash-001"),
+        ("google/models/text-embedding-004", "text-embedding-004"),
+        ("publishers/google/models/gemini-1.5-pro", "gemini-1.5-pro"),
+        ("projects/my-project/locations/us-central1/models/gemini-1.5-pro", "gemini-1.5-pro"),
+        (
+            "projects/p/locations/us-central1/publishers/google/models/gemini-1.5-flash",
+            "gemini-1.5-flash",
+        ),
+        ("projects/p/locations/us-central1/endpoints/1234", "endpoints/1234"),
+        ("tunedModels/my-model", "tunedModels/my-model"),
+    ])
+    def test_paths(self, model_name, expected):
+        from revenium_middleware_google.common.model_names import normalize_model_name
+
+        assert normalize_model_name(model_name) == expected
+
+    def test_extract_usage_data_parses_resource_name(self):
+        """Test Vertex AI usage extraction strips full resource paths."""
+        pytest.importorskip("vertexai")
+        from revenium_middleware_google.common.types import OperationType
+        from revenium_middleware_google.vertex_ai.middleware import (
+            extract_vertex_ai_usage_data,
+        )
+
+        response = Mock(spec=["model_version", "usage_metadata", "candidates"])
+        response.model_version = "projects/p/locations/l/models/gemini-1.5-pro"
+        response.usage_metadata = None
+        response.candidates = []
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        usage_data = extract_vertex_ai_usage_data(
+            response, OperationType.CHAT, now, now
+        )
+        assert usage_data.model == "gemini-1.5-pro"
+
+
+class TestInstanceModelNameCache:
+    """Test model names are resolved once per instance."""
+
+    @pytest.fixture(autouse=True)
+    def clean_cache(self):
+        from revenium_middleware_google.common.model_names import clear_model_name_cache
+
+        clear_model_name_cache()
+        yield
+        clear_model_name_cache()
+
+    def test_repeated_calls_do_no_string_work(self):
+        from revenium_middleware_google.common import model_names
+
+        class GenerativeModel:
+            _model_name = "publishers/google/models/gemini-1.5-pro"
+
+        model = GenerativeModel()
+        assert model_names.resolve_instance_model_name(model) == "gemini-1.5-pro"
+
+        with patch.object(model_names, "normalize_model_name") as normalize:
+            assert model_names.resolve_instance_model_name(model) == "gemini-1.5-pro"
+            assert (
+                model_names.resolve_instance_model_name(model, strip_prefix=False)
+                == "publishers/google/models/gemini-1.5-pro"
+            )
+        normalize.assert_not_called()
+
+    def test_changed_attribute_is_resolved_again(self):
+        from revenium_middleware_google.common.model_names import (
+            resolve_instance_model_name,
+        )
+
+        class TextEmbeddingModel:
+            pass
+
+        model = TextEmbeddingModel()
+        model._model_id = "text-embedding-004"
+        assert resolve_instance_model_name(model) == "text-embedding-004"
+        model._model_id = "models/text-embedding-005"
+        assert resolve_instance_model_name(model) == "text-embedding-005"
+
+    def test_repr_fallback_is_cached(self):
+        from revenium_middleware_google.common.model_names import (
+            resolve_instance_model_name,
+        )
+
+        calls = []
+
+        class GenerativeModel:
+            def __str__(self):
+                calls.append(1)
+                return "GenerativeModel(model_name='gemini-1.5-flash')"
+
+        model = GenerativeModel()
+        assert resolve_instance_model_name(model) == "gemini-1.5-flash"
+        assert resolve_instance_model_name(model) == "gemini-1.5-flash"
+        assert len(calls) == 1
+
+    def test_entry_dropped_with_instance(self):
+        import gc
+        from revenium_middleware_google.common import model_names
+
+        class GenerativeModel:
+            _model_name = "gemini-pro"
+
+        model = GenerativeModel()
+        model_names.resolve_instance_model_name(model)
+        assert len(model_names._instances) == 1
+
+        del model
+        gc.collect()
+        assert len(model_names._instances) == 0
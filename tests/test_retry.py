@@ -0,0 +1,231 @@
+"""
+Tests for retries of failed metering sends.
+"""
+
+import asyncio
+import random
+import threading
+import time
+import httpx
+import pytest
+from unittest.mock import MagicMock, patch
+
+from revenium_metering import APIConnectionError, APIStatusError, ReveniumMetering
+
+from revenium_middleware_google.common import utils
+from revenium_middleware_google.common.circuit_breaker import get_circuit_breaker
+from revenium_middleware_google.common.exceptions import (
+    ConfigurationError,
+    MeteringError,
+)
+from revenium_middleware_google.common.http_client import (
+    HttpClientConfig,
+    create_metering_client,
+)
+from revenium_middleware_google.common.retry import RetryConfig, RetryPolicy
+from revenium_middleware_google.testing import FakeReveniumServer
+from revenium_middleware_google.testing.fake_revenium import DROP
+
+REQUEST = httpx.Request("POST", "http://metering.test/v2/ai/completions")
+OUTAGE = APIConnectionError(request=REQUEST)
+
+
+def _status_error(status, headers=None):
+    response = httpx.Response(status, headers=headers, request=REQUEST)
+    return APIStatusError("error", response=response, body=None)
+
+
+def _completion_args(transaction_id="txn-1"):
+    return utils.build_completion_args(
+        transaction_id=transaction_id,
+        model="gemini-2.0-flash",
+        prompt_tokens=10,
+        completion_tokens=5,
+        total_tokens=15,
+        cached_tokens=0,
+        stop_reason="END",
+        request_time="2025-01-01T00:00:00.000Z",
+        response_time="2025-01-01T00:00:00.100Z",
+        request_duration=100,
+        usage_metadata={},
+    )
+
+
+def _failing(*errors):
+    """An attempt raising ``errors`` in turn, then returning "ok"."""
+    calls = []
+
+    def attempt():
+        calls.append(time.monotonic())
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return attempt, calls
+
+
+def _policy(**config):
+    config.setdefault("base_delay", 0.001)
+    return RetryPolicy(RetryConfig(**config), rng=random.Random(1))
+
+
+@pytest.fixture(autouse=True)
+def restore_policies():
+    yield
+    utils.configure_retries()
+    utils.configure_circuit_breaker()
+
+
+class TestBackoff:
+    """Test delays between attempts."""
+
+    def test_full_jitter_within_exponential_ceiling(self):
+        policy = _policy(base_delay=0.1, max_delay=0.5)
+        for retry, ceiling in enumerate((0.1, 0.2, 0.4, 0.5, 0.5)):
+            delays = [policy.backoff(retry) for _ in range(200)]
+            assert all(0 <= d <= ceiling for d in delays)
+            # Spread across the whole range, not clustered at the ceiling
+            assert min(delays) < ceiling * 0.2 and max(delays) > ceiling * 0.8
+
+    def test_retry_after_raises_delay_up_to_max(self):
+        policy = _policy(base_delay=0.01, max_delay=2.0)
+        assert policy.backoff(0, _status_error(429, {"retry-after": "1"})) == 1.0
+        assert policy.backoff(0, _status_error(429, {"retry-after": "60"})) == 2.0
+
+
+class TestRetryPolicy:
+    """Test which failures are retried and the retry budget."""
+
+    def test_outage_errors_retried_until_success(self):
+        policy = _policy()
+        attempt, calls = _failing(OUTAGE, _status_error(503))
+        assert policy.call(attempt) == "ok"
+        assert len(calls) == 3
+        assert policy.stats()["retries"] == 2
+        assert policy.stats()["retries_recovered"] == 1
+
+    def test_client_errors_not_retried(self):
+        policy = _policy()
+        attempt, calls = _failing(_status_error(400))
+        with pytest.raises(APIStatusError):
+            policy.call(attempt)
+        assert len(calls) == 1
+
+    def test_gives_up_after_max_retries(self):
+        policy = _policy(max_retries=2)
+        attempt, calls = _failing(*[OUTAGE] * 5)
+        with pytest.raises(APIConnectionError):
+            policy.call(attempt)
+        assert len(calls) == 3
+        assert policy.stats()["retries_gave_up"] == 1
+
+    def test_budget_limits_retries_to_a_fraction_of_sends(self):
+        policy = _policy(max_retries=1, budget_ratio=0.1, budget_reserve=2)
+        attempts = 0
+        for _ in range(100):
+            attempt, calls = _failing(*[OUTAGE] * 2)
+            with pytest.raises(APIConnectionError):
+                policy.call(attempt)
+            attempts += len(calls)
+
+        stats = policy.stats()
+        # The reserve, then about one retry per ten sends
+        assert 10 <= stats["retries"] <= 13
+        assert attempts == 100 + stats["retries"]
+        assert stats["retry_budget_exhausted"] == 100 - stats["retries"]
+
+    def test_no_retry_once_breaker_opens(self):
+        utils.configure_circuit_breaker(failure_threshold=1, reset_timeout=60)
+        policy = _policy()
+        attempts = []
+
+        def attempt():
+            attempts.append(1)
+            get_circuit_breaker().record_result(OUTAGE)
+            raise OUTAGE
+
+        with pytest.raises(APIConnectionError):
+            policy.call(attempt)
+        assert len(attempts) == 1
+
+    def test_interrupt_cuts_backoff_short(self):
+        policy = _policy(base_delay=30, max_delay=30)
+        policy._rng = MagicMock(uniform=MagicMock(return_value=30))
+        interrupt = threading.Event()
+        interrupt.set()
+        attempt, calls = _failing(OUTAGE)
+        start = time.monotonic()
+        with pytest.raises(APIConnectionError):
+            policy.call(attempt, interrupt)
+        assert time.monotonic() - start < 1
+        assert len(calls) == 1
+
+    def test_async_retries(self):
+        policy = _policy()
+        calls = []
+
+        async def attempt():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OUTAGE
+            return "ok"
+
+        assert asyncio.run(policy.call_async(attempt)) == "ok"
+        assert len(calls) == 3
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("REVENIUM_METERING_MAX_RETRIES", "5")
+        monkeypatch.setenv("REVENIUM_METERING_RETRY_BASE_DELAY", "0.5")
+        monkeypatch.setenv("REVENIUM_METERING_RETRY_MAX_DELAY", "4")
+        monkeypatch.setenv("REVENIUM_METERING_RETRY_BUDGET_RATIO", "0.2")
+        monkeypatch.setenv("REVENIUM_METERING_RETRY_BUDGET_RESERVE", "oops")
+        assert RetryConfig.from_env() == RetryConfig(5, 0.5, 4.0, 0.2, 10.0)
+
+
+class TestSendCompletionRetries:
+    """Test retried sends against the fake Revenium server."""
+
+    def test_transient_failures_delivered_with_same_transaction_id(self):
+        utils.configure_retries(base_delay=0.001)
+        with FakeReveniumServer() as server:
+            server.enqueue(503, DROP)
+            client = create_metering_client(
+                "hak_test", server.base_url, HttpClientConfig()
+            )
+            with patch.object(utils, "client", client):
+                utils.send_completion(_completion_args("txn-retried"))
+            client.close()
+
+        assert [r.outcome for r in server.requests] == ["503", "drop", "ok"]
+        assert {r.payload["transactionId"] for r in server.requests} == {
+            "txn-retried"
+        }
+        assert len(server.records) == 1
+
+    def test_failure_raised_after_retries(self):
+        utils.configure_retries(max_retries=2, base_delay=0.001)
+        utils.configure_circuit_breaker(enabled=False)
+        with FakeReveniumServer(error_rate=1.0, error_status=502) as server:
+            client = ReveniumMetering(
+                api_key="hak_test", base_url=server.base_url, max_retries=0
+            )
+            with patch.object(utils, "client", client):
+                with pytest.raises(MeteringError) as excinfo:
+                    utils.send_completion(_completion_args("txn-lost"))
+            client.close()
+
+        assert excinfo.value.transaction_id == "txn-lost"
+        assert len(server.requests) == 3
+
+    def test_metering_clients_leave_retries_to_the_policy(self):
+        client = create_metering_client(
+            "hak_test", "http://metering.test/meter", HttpClientConfig()
+        )
+        assert client.max_retries == 0
+        client.close()
+
+    def test_stats_and_configure(self):
+        utils.configure_retries(max_retries=1)
+        assert utils.get_metering_stats()["retry_budget_tokens"] == 10.0
+        with pytest.raises(ConfigurationError):
+            utils.configure_retries(retries=3)
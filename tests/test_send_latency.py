@@ -0,0 +1,56 @@
+"""
+Smoke test for the metering send-latency benchmark.
+
+Runs benchmarks/send_latency.py with a few sends against its fake server
+subprocess and checks every client configuration completed without errors
+and that the tuned client reused its warmed-up connections. Latencies are
+not checked.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+BENCHMARK = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "benchmarks",
+    "send_latency.py",
+)
+
+
+@pytest.fixture(scope="module")
+def results():
+    proc = subprocess.run(
+        [
+            sys.executable,
+            BENCHMARK,
+            "--concurrency", "1", "4",
+            "--sends", "20",
+            "--server-latency", "0",
+            "--json",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=120,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+class TestSendLatencyBenchmark:
+    """Test the benchmark sends through each client configuration."""
+
+    def test_all_clients_and_levels(self, results):
+        assert set(results["clients"]) == {"sdk_default", "no_keepalive", "tuned"}
+        for levels in results["clients"].values():
+            assert set(levels) == {"1", "4"}
+            for entry in levels.values():
+                assert entry["errors"] == 0
+                assert entry["p99_ms"] >= entry["p50_ms"]
+
+    def test_tuned_client_reuses_connections(self, results):
+        for entry in results["clients"]["tuned"].values():
+            assert entry["connections"] == 0
+        assert results["clients"]["no_keepalive"]["1"]["connections"] == 20
@@ -0,0 +1,170 @@
+"""
+Tests for the durable metering spool.
+"""
+
+import os
+import threading
+import pytest
+
+from revenium_middleware_google.common.spool import FsyncPolicy, MeteringSpool
+from revenium_middleware_google.common.transport import (
+    BatchingConfig,
+    BatchingTransport,
+    install_transport,
+    uninstall_transport,
+)
+
+
+def _segment_files(directory):
+    return sorted(f for f in os.listdir(directory) if f.endswith(".seg"))
+
+
+class TestMeteringSpool:
+    """Test append, ack and replay."""
+
+    def test_append_and_ack_truncates_active_segment(self, tmp_path):
+        spool = MeteringSpool(str(tmp_path))
+        refs = [spool.append({"i": i}) for i in range(3)]
+        assert all(refs)
+
+        segment = _segment_files(tmp_path)[0]
+        assert os.path.getsize(tmp_path / segment) > 0
+
+        spool.ack(refs)
+        assert os.path.getsize(tmp_path / segment) == 0
+        assert spool.stats()["spool_acked"] == 3
+        spool.close()
+
+    def test_unacked_records_are_replayed(self, tmp_path):
+        spool = MeteringSpool(str(tmp_path))
+        refs = [spool.append({"i": i}) for i in range(4)]
+        spool.ack([refs[0], refs[2]])
+        spool.close()
+
+        # Simulate the next process start
+        restarted = MeteringSpool(str(tmp_path))
+        replayed = restarted.replay()
+        assert [record for record, _ in replayed] == [{"i": 1}, {"i": 3}]
+
+        restarted.ack(ref for _, ref in replayed)
+        assert _segment_files(tmp_path) == []
+        restarted.close()
+
+    def test_torn_final_line_is_skipped(self, tmp_path):
+        spool = MeteringSpool(str(tmp_path))
+        spool.append({"i": 1})
+        spool.close()
+        segment = _segment_files(tmp_path)[0]
+        with open(tmp_path / segment, "a") as f:
+            f.write('{"i": ')
+
+        replayed = MeteringSpool(str(tmp_path)).replay()
+        assert [record for record, _ in replayed] == [{"i": 1}]
+
+    def test_segments_rotate_by_size(self, tmp_path):
+        spool = MeteringSpool(str(tmp_path), segment_bytes=1024)
+        refs = [spool.append({"payload": "x" * 200}) for _ in range(20)]
+        assert len({ref[0] for ref in refs}) > 1
+
+        spool.ack(refs)
+        # Closed segments are deleted, only the active one remains
+        assert len(_segment_files(tmp_path)) == 1
+        spool.close()
+
+    @pytest.mark.parametrize("policy", ["never", "interval", "always"])
+    def test_fsync_policies(self, tmp_path, policy):
+        spool = MeteringSpool(str(tmp_path), fsync_policy=policy, fsync_interval=0)
+        assert spool.fsync_policy == FsyncPolicy(policy)
+        assert spool.append({"i": 1}) is not None
+        spool.close()
+
+    def test_concurrent_appends(self, tmp_path):
+        spool = MeteringSpool(str(tmp_path))
+        refs = []
+        lock = threading.Lock()
+
+        def writer():
+            for i in range(100):
+                ref = spool.append({"i": i})
+                with lock:
+                    refs.append(ref)
+
+        threads = [threading.Thread(target=writer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(refs)) == 400
+        spool.close()
+
+
+class TestTransportWithSpool:
+    """Test the transport acks delivered records and replays the rest."""
+
+    def test_delivered_records_are_acked(self, tmp_path):
+        sent = []
+        transport = BatchingTransport(
+            lambda batch: sent.extend(batch),
+            BatchingConfig(batch_size=10, flush_interval=60, spool_dir=str(tmp_path)),
+        )
+        for i in range(5):
+            transport.submit({"i": i})
+        transport.shutdown()
+
+        assert sent == [{"i": i} for i in range(5)]
+        assert transport.stats()["spool_acked"] == 5
+        assert MeteringSpool(str(tmp_path)).replay() == []
+
+    def test_failed_records_replayed_on_next_start(self, tmp_path):
+        transport = BatchingTransport(
+            lambda batch: [r for r in batch if r["i"] % 2],
+            BatchingConfig(batch_size=10, flush_interval=60, spool_dir=str(tmp_path)),
+        )
+        for i in range(4):
+            transport.submit({"i": i})
+        transport.shutdown()
+
+        sent = []
+        restarted = BatchingTransport(
+            lambda batch: sent.extend(batch),
+            BatchingConfig(batch_size=10, flush_interval=60, spool_dir=str(tmp_path)),
+        )
+        restarted.flush(timeout=5)
+        restarted.shutdown()
+
+        assert sorted(r["i"] for r in sent) == [1, 3]
+
+    def test_persist_without_sending(self, tmp_path):
+        transport = BatchingTransport(
+            lambda batch: None,
+            BatchingConfig(spool_dir=str(tmp_path)),
+        )
+        assert transport.persist({"i": 1})
+        transport.shutdown()
+
+        replayed = MeteringSpool(str(tmp_path)).replay()
+        assert [record for record, _ in replayed] == [{"i": 1}]
+
+    def test_reinstall_over_same_spool_sends_each_record_once(self, tmp_path):
+        sent = []
+        lock = threading.Lock()
+
+        def sender(batch):
+            with lock:
+                sent.extend(r["i"] for r in batch)
+
+        config = BatchingConfig(
+            batch_size=10, flush_interval=60, spool_dir=str(tmp_path)
+        )
+        transport = install_transport(sender, config)
+        for i in range(5):
+            transport.submit({"i": i})
+        try:
+            replacement = install_transport(sender, config)
+            replacement.flush(timeout=5)
+        finally:
+            uninstall_transport()
+
+        assert sorted(sent) == list(range(5))
+        assert MeteringSpool(str(tmp_path)).replay() == []
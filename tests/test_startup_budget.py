@@ -0,0 +1,83 @@
+"""
+Startup regression test against the recorded import/cold-start baseline.
+
+Runs benchmarks/startup.py in fresh interpreters with the fake SDK packages
+and fails if importing the package pulls in an SDK. Timings depend on
+machine load, so they are only compared with their budgets in
+benchmarks/startup_baseline.json when REVENIUM_STARTUP_BUDGET=1 is set.
+Re-record the baseline with ``python benchmarks/startup.py
+--update-baseline`` after an intentional change.
+"""
+
+import importlib.util
+import os
+import pytest
+
+ENV_STARTUP_BUDGET = "REVENIUM_STARTUP_BUDGET"
+
+STARTUP_BENCHMARK = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "benchmarks",
+    "startup.py",
+)
+
+
+@pytest.fixture(scope="module")
+def startup():
+    spec = importlib.util.spec_from_file_location("startup_benchmark", STARTUP_BENCHMARK)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestBudgetCheck:
+    """Test the budget comparison itself."""
+
+    def _baseline(self):
+        return {
+            "budget": {"factor": 2.0, "slack_ms": 30.0},
+            "metrics": {
+                "package_import_ms": 200.0,
+                "own_modules_self_ms": 10.0,
+                "hook_overhead_ms": 0.1,
+                "google_ai_first_call_ms": 0.5,
+                "vertex_ai_first_call_ms": 0.1,
+            },
+        }
+
+    def _results(self, **overrides):
+        metrics = dict(self._baseline()["metrics"])
+        metrics.update(overrides)
+        return {"metrics": metrics, "sdk_modules_imported_by_package": []}
+
+    def test_within_budget(self, startup):
+        results = self._results(package_import_ms=390.0, own_modules_self_ms=39.0)
+        assert startup.check(results, self._baseline()) == []
+
+    def test_regression_reported(self, startup):
+        failures = startup.check(self._results(package_import_ms=450.0), self._baseline())
+        assert len(failures) == 1
+        assert failures[0].startswith("package_import_ms")
+
+    def test_sdk_import_reported(self, startup):
+        results = self._results()
+        results["sdk_modules_imported_by_package"] = ["vertexai"]
+        assert "imported SDK modules: vertexai" in startup.check(
+            results, self._baseline()
+        )[0]
+
+
+class TestStartupBudget:
+    """Test the package's real startup cost stays within budget."""
+
+    def test_package_imports_no_sdk(self, startup):
+        results = startup.measure(runs=1)
+        assert results["sdk_modules_imported_by_package"] == []
+
+    @pytest.mark.skipif(
+        os.getenv(ENV_STARTUP_BUDGET) != "1",
+        reason=f"timing budget checked only with {ENV_STARTUP_BUDGET}=1",
+    )
+    def test_startup_within_budget(self, startup):
+        results = startup.measure(runs=3)
+        assert startup.check(results, startup.load_baseline()) == []
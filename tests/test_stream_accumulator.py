@@ -0,0 +1,98 @@
+"""
+Tests for the shared streaming accumulator.
+"""
+
+import datetime
+import pytest
+from unittest.mock import Mock, patch
+
+from revenium_middleware_google.common.streaming import (
+    MeteredStream,
+    StreamAccumulator,
+    StreamExtractors,
+    StreamedResponse,
+    chunk_finish_reason,
+)
+from revenium_middleware_google.common.utils import extract_model_name
+from revenium_middleware_google.google_ai import middleware
+
+
+def _chunk(model="gemini-2.0-flash", finish_reason=None, usage=None):
+    candidates = [Mock(finish_reason=finish_reason)]
+    return Mock(model_version=model, candidates=candidates, usage_metadata=usage)
+
+
+class TestStreamAccumulator:
+    """Test chunk folding and the response stand-in."""
+
+    def test_accumulates_latest_fields(self):
+        usage = Mock(prompt_token_count=3)
+        acc = StreamAccumulator(StreamExtractors())
+        acc.add(_chunk())
+        acc.add(_chunk(model="other", finish_reason="STOP", usage=usage))
+
+        assert acc.chunk_count == 2
+        assert acc.model == "gemini-2.0-flash"
+        assert acc.finish_reason == "STOP"
+        assert acc.usage_metadata is usage
+        assert acc.latency.first_ns is not None
+
+    def test_initial_model_is_kept(self):
+        acc = StreamAccumulator(StreamExtractors(), model="from-instance")
+        acc.add(_chunk())
+        assert acc.model == "from-instance"
+
+    def test_custom_extractors(self):
+        acc = StreamAccumulator(StreamExtractors(model=lambda chunk: "custom"))
+        acc.add(object())
+        assert acc.model == "custom"
+        assert acc.finish_reason is None
+
+    def test_finish_reason_tolerates_missing_candidates(self):
+        assert chunk_finish_reason(object()) is None
+        assert chunk_finish_reason(Mock(candidates=[])) is None
+
+    def test_to_response(self):
+        acc = StreamAccumulator(StreamExtractors())
+        acc.add(_chunk(finish_reason="STOP"))
+        response = acc.to_response()
+
+        assert isinstance(response, StreamedResponse)
+        assert extract_model_name(response) == "gemini-2.0-flash"
+        assert response.candidates[0].finish_reason == "STOP"
+
+    def test_time_to_first_token(self):
+        acc = StreamAccumulator(StreamExtractors(), start_ns=1_000_000_000)
+        assert acc.time_to_first_token() == 0
+        with patch("time.perf_counter_ns", return_value=1_250_400_000):
+            acc.add(_chunk())
+        assert acc.time_to_first_token() == 250
+
+    def test_slots_only(self):
+        acc = StreamAccumulator(StreamExtractors())
+        with pytest.raises(AttributeError):
+            acc.extra = 1
+
+
+class TestStreamWrapperSetup:
+    """Test wrapping a stream creates no new classes."""
+
+    def test_same_classes_across_streams(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with patch.object(middleware, "create_google_ai_metering_call") as metering:
+            first = middleware.handle_streaming_response(iter([_chunk()]), now, {})
+            second = middleware.handle_streaming_response(iter([_chunk()]), now, {})
+            list(first)
+            list(second)
+
+        assert type(first) is type(second) is middleware.StreamWrapper
+        responses = [c.kwargs["response"] for c in metering.call_args_list]
+        assert type(responses[0]) is type(responses[1]) is StreamedResponse
+
+    def test_subclass_without_meter_fails_at_construction(self):
+        class Unmetered(MeteredStream):
+            __slots__ = ()
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with pytest.raises(TypeError, match="_meter"):
+            Unmetered(iter([]), StreamExtractors(), now, {})
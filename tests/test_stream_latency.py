@@ -0,0 +1,145 @@
+"""
+Tests for per-stream latency profiling.
+"""
+
+import datetime
+import pytest
+from unittest.mock import Mock, patch
+
+from revenium_middleware_google.common import latency, utils
+from revenium_middleware_google.common.latency import (
+    NUM_BUCKETS,
+    StreamLatencyProfile,
+    bucket_bounds,
+    gap_bucket,
+    get_stream_latency_stats,
+    histogram_percentile,
+    record_stream_latency,
+    reset_stream_latency_stats,
+)
+from revenium_middleware_google.google_ai import middleware
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    reset_stream_latency_stats()
+    yield
+    reset_stream_latency_stats()
+
+
+def _profile(arrivals_ms, start_ms=0):
+    profile = StreamLatencyProfile(start_ns=start_ms * 1_000_000)
+    for ms in arrivals_ms:
+        profile.record(int(ms * 1_000_000))
+    return profile
+
+
+class TestHistogram:
+    """Test bucket math and percentile estimation."""
+
+    @pytest.mark.parametrize("gap_us", [0, 1, 3, 4, 5, 7, 8, 100, 12_345, 10**6, 10**8])
+    def test_gap_falls_inside_its_bucket(self, gap_us):
+        lower, upper = bucket_bounds(gap_bucket(gap_us))
+        assert lower <= gap_us < upper
+
+    def test_huge_gaps_land_in_last_bucket(self):
+        assert gap_bucket(10**15) == NUM_BUCKETS - 1
+
+    def test_inlined_bucketing_matches_gap_bucket(self):
+        for gap_us in (0, 2, 4, 9, 250, 70_000, 3 * 10**7):
+            profile = _profile([0, gap_us / 1000])
+            assert profile.gaps.index(1) == gap_bucket(gap_us)
+
+    def test_percentile_is_within_bucket_precision(self):
+        counts = [0] * NUM_BUCKETS
+        for gap_us in range(1000, 101_000, 1000):
+            counts[gap_bucket(gap_us)] += 1
+        p50 = histogram_percentile(counts, 100, 0.50)
+        assert p50 == pytest.approx(50.0, rel=0.15)
+
+    def test_empty_histogram(self):
+        assert histogram_percentile([0] * NUM_BUCKETS, 0, 0.95) == 0.0
+
+
+class TestStreamLatencyProfile:
+    """Test the per-stream summary."""
+
+    def test_summary(self):
+        profile = _profile([100, 110, 120, 130, 330])
+        summary = profile.summary(chunk_count=5, output_tokens=46)
+
+        assert summary["chunk_count"] == 5
+        assert summary["gap_p50_ms"] == pytest.approx(10.0, rel=0.15)
+        assert summary["gap_max_ms"] == pytest.approx(200.0)
+        assert summary["stream_time_ms"] == pytest.approx(330.0)
+        assert summary["generation_time_ms"] == pytest.approx(230.0)
+        assert summary["tokens_per_second"] == pytest.approx(200.0)
+
+    def test_single_chunk_stream_has_no_histogram(self):
+        profile = _profile([50])
+        assert profile.gaps is None
+
+        summary = profile.summary(chunk_count=1, output_tokens=5)
+        assert summary["gap_p95_ms"] == 0.0
+        assert summary["tokens_per_second"] == pytest.approx(100.0)
+
+    def test_empty_stream(self):
+        summary = StreamLatencyProfile(start_ns=0).summary(chunk_count=0)
+        assert summary["stream_time_ms"] == 0.0
+        assert summary["tokens_per_second"] == 0.0
+
+
+class TestAggregates:
+    """Test per-model aggregation."""
+
+    def test_streams_aggregate_per_model(self):
+        record_stream_latency("gemini", _profile([10, 20, 30]), 3, output_tokens=20)
+        record_stream_latency("gemini", _profile([10, 20, 530]), 3, output_tokens=20)
+        record_stream_latency(None, _profile([5]), 1)
+
+        stats = get_stream_latency_stats()
+        gemini = stats["gemini"]
+        assert gemini["streams"] == 2
+        assert gemini["chunks"] == 6
+        assert gemini["gap_max_ms"] == pytest.approx(510.0)
+        assert gemini["stream_time_max_ms"] == pytest.approx(530.0)
+        assert gemini["tokens_per_second"] == pytest.approx(40 / 0.54)
+        assert stats["unknown-model"]["streams"] == 1
+
+    def test_tracked_models_are_bounded(self, monkeypatch):
+        monkeypatch.setattr(latency, "MAX_TRACKED_MODELS", 2)
+        for model in ("a", "b", "c"):
+            record_stream_latency(model, _profile([1, 2]), 2)
+        assert sorted(get_stream_latency_stats()) == ["a", "b"]
+
+    def test_included_in_metering_stats(self):
+        record_stream_latency("gemini", _profile([1, 2]), 2)
+        assert utils.get_metering_stats()["stream_latency"]["gemini"]["streams"] == 1
+
+
+class TestStreamWrapperIntegration:
+    """Test stream wrappers record their latency profile."""
+
+    def test_completed_stream_is_recorded(self):
+        usage = Mock(candidates_token_count=12)
+        chunks = [
+            Mock(model_version="gemini-2.0-flash", candidates=[], usage_metadata=None),
+            Mock(
+                model_version="gemini-2.0-flash",
+                candidates=[Mock(finish_reason="STOP")],
+                usage_metadata=usage,
+            ),
+        ]
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        with patch.object(middleware, "create_google_ai_metering_call"):
+            stream = middleware.handle_streaming_response(iter(chunks), now, {})
+            assert list(stream) == chunks
+
+        profile = stream.latency_profile()
+        assert profile["chunk_count"] == 2
+        assert profile["tokens_per_second"] > 0
+
+        stats = get_stream_latency_stats()["gemini-2.0-flash"]
+        assert stats["streams"] == 1
+        assert stats["chunks"] == 2
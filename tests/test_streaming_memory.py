@@ -0,0 +1,73 @@
+"""
+Tests that stream wrappers use constant memory per stream.
+"""
+
+import datetime
+import gc
+import tracemalloc
+import pytest
+from unittest.mock import Mock, patch
+
+from revenium_middleware_google.google_ai import middleware
+
+
+class _Chunk:
+    def __init__(self, last):
+        self.model_version = "gemini-2.0-flash"
+        self.text = "x" * 1024
+        self.candidates = [Mock(finish_reason="STOP")] if last else []
+        self.usage_metadata = Mock(prompt_token_count=1) if last else None
+
+
+def _stream(n):
+    for i in range(n):
+        yield _Chunk(i == n - 1)
+
+
+def _retained_bytes(chunk_count, streams=20):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    wrappers = []
+    for _ in range(streams):
+        wrapper = middleware.StreamWrapper(_stream(chunk_count + 1), now, {})
+        for _ in range(chunk_count):
+            next(wrapper)
+        wrappers.append(wrapper)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(s.size_diff for s in after.compare_to(before, "filename")) / streams
+
+
+class TestStreamMemory:
+    """Test per-stream overhead does not grow with chunk count."""
+
+    def test_wrapper_keeps_no_chunks(self):
+        with patch.object(middleware, "create_google_ai_metering_call") as metering:
+            wrapper = middleware.StreamWrapper(
+                _stream(3), datetime.datetime.now(datetime.timezone.utc), {}
+            )
+            assert len(list(wrapper)) == 3
+
+        assert wrapper.chunk_count == 3
+        assert not hasattr(wrapper, "chunks")
+        metering.assert_called_once()
+
+    def test_overhead_constant_in_chunk_count(self):
+        with patch.object(middleware, "create_google_ai_metering_call"):
+            small = _retained_bytes(10)
+            large = _retained_bytes(2000)
+
+        # Retaining even one 1KB chunk per stream would exceed this bound
+        assert large - small < 512
+        assert large < 4096
+
+    def test_empty_stream_not_metered(self):
+        with patch.object(middleware, "create_google_ai_metering_call") as metering:
+            wrapper = middleware.StreamWrapper(
+                _stream(0), datetime.datetime.now(datetime.timezone.utc), {}
+            )
+            assert list(wrapper) == []
+        metering.assert_not_called()
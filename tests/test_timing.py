@@ -0,0 +1,106 @@
+"""
+Tests for monotonic request timing and timestamp formatting.
+"""
+
+import datetime
+from unittest.mock import Mock, patch
+
+from revenium_middleware_google.common import (
+    OperationType,
+    ProviderMetadata,
+    UsageData,
+    elapsed_ms,
+    format_timestamp,
+    response_time_from,
+)
+from revenium_middleware_google.google_ai import middleware
+
+ANCHOR = datetime.datetime(2025, 1, 1, 12, 0, 0, 123456, tzinfo=datetime.timezone.utc)
+
+
+class TestTimingHelpers:
+    """Test the monotonic helpers."""
+
+    def test_elapsed_ms(self):
+        assert elapsed_ms(1_000_000, 43_900_000) == 42
+        assert elapsed_ms(5_000_000, 1_000_000) == 0
+
+    def test_response_time_is_anchor_plus_monotonic_elapsed(self):
+        response = response_time_from(ANCHOR, 1_000_000_000, 1_087_654_000)
+        assert response - ANCHOR == datetime.timedelta(microseconds=87_654)
+
+    def test_without_monotonic_start_uses_wall_clock(self):
+        before = datetime.datetime.now(datetime.timezone.utc)
+        assert response_time_from(ANCHOR, None) >= before
+
+    def test_format_timestamp_has_milliseconds(self):
+        assert format_timestamp(ANCHOR) == "2025-01-01T12:00:00.123Z"
+
+    def test_format_timestamp_converts_to_utc(self):
+        tz = datetime.timezone(datetime.timedelta(hours=2))
+        local = datetime.datetime(2025, 1, 1, 14, 0, 0, 5000, tzinfo=tz)
+        assert format_timestamp(local) == "2025-01-01T12:00:00.005Z"
+
+
+class TestUsageDataTiming:
+    """Test UsageData.create timestamps and duration."""
+
+    def _create(self, response_time):
+        return UsageData.create(
+            operation_type=OperationType.CHAT,
+            input_tokens=1,
+            output_tokens=1,
+            total_tokens=2,
+            model="gemini-2.0-flash",
+            provider_metadata=ProviderMetadata.for_google_ai_sdk(),
+            stop_reason="END",
+            request_time=ANCHOR,
+            response_time=response_time,
+        )
+
+    def test_sub_second_duration(self):
+        usage = self._create(ANCHOR + datetime.timedelta(milliseconds=87))
+        assert usage.request_duration == 87
+        assert usage.request_time == "2025-01-01T12:00:00.123Z"
+        assert usage.response_time == "2025-01-01T12:00:00.210Z"
+
+    def test_duration_never_negative(self):
+        usage = self._create(ANCHOR - datetime.timedelta(seconds=2))
+        assert usage.request_duration == 0
+
+
+class TestWrapperTiming:
+    """Test wrappers take the duration from the monotonic clock."""
+
+    def test_wall_clock_step_does_not_skew_duration(self):
+        # perf_counter advances 120ms while the wall clock is stepped back an hour
+        readings = [5_000_000_000]
+        wall = Mock()
+        wall.datetime.now.side_effect = [ANCHOR, ANCHOR - datetime.timedelta(hours=1)]
+
+        usage = Mock(
+            prompt_token_count=3,
+            candidates_token_count=4,
+            total_token_count=7,
+            cached_content_token_count=0,
+        )
+        response = Mock(
+            usage_metadata=usage,
+            candidates=[Mock(finish_reason="STOP")],
+            model_version="gemini-2.0-flash",
+        )
+
+        def perf_counter_ns():
+            return readings.pop(0) if readings else 5_120_000_000
+
+        with patch("time.perf_counter_ns", side_effect=perf_counter_ns), patch.object(
+            middleware, "datetime", wall
+        ), patch.object(middleware, "create_metering_call") as metering_call:
+            middleware.generate_content_wrapper(
+                lambda *args, **kwargs: response, Mock(_api_client=None), (), {}
+            )
+
+        usage_data = metering_call.call_args.kwargs["usage_data"]
+        assert usage_data.request_duration == 120
+        assert usage_data.request_time == "2025-01-01T12:00:00.123Z"
+        assert usage_data.response_time == "2025-01-01T12:00:00.243Z"
@@ -0,0 +1,194 @@
+"""
+Tests for the Vertex AI async methods (generate_content_async, get_embeddings_async).
+"""
+
+import asyncio
+import datetime
+import threading
+import pytest
+from unittest.mock import Mock, patch
+
+pytest.importorskip("vertexai")
+
+from revenium_middleware_google.common import OperationType, utils  # noqa: E402
+from revenium_middleware_google.vertex_ai import middleware  # noqa: E402
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _response(finish_reason="STOP"):
+    usage = Mock(
+        prompt_token_count=3,
+        candidates_token_count=4,
+        total_token_count=7,
+        cached_content_token_count=0,
+    )
+    return Mock(
+        usage_metadata=usage,
+        candidates=[Mock(finish_reason=finish_reason)],
+        _raw_response=None,
+    )
+
+
+async def _agen(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.fixture
+def metering_call():
+    with patch.object(middleware, "create_vertex_ai_metering_call") as mock_call:
+        yield mock_call
+
+
+class TestGenerateContentAsync:
+    """Test the generate_content_async wrapper."""
+
+    def test_non_streaming(self, metering_call):
+        response = _response()
+
+        async def wrapped(*args, **kwargs):
+            assert "usage_metadata" not in kwargs
+            return response
+
+        instance = Mock(_model_name="publishers/google/models/gemini-2.0-flash")
+        instance._revenium_usage_metadata = None
+        result = asyncio.run(
+            middleware.generate_content_async_wrapper_impl(
+                wrapped, instance, ("hi",), {"usage_metadata": {"trace_id": "t"}}
+            )
+        )
+
+        assert result is response
+        kwargs = metering_call.call_args.kwargs
+        assert kwargs["operation_type"] == OperationType.CHAT
+        assert kwargs["usage_metadata"] == {"trace_id": "t"}
+        assert kwargs["model_name_fallback"] == "gemini-2.0-flash"
+
+    def test_streaming(self, metering_call):
+        chunks = [_response(finish_reason=None), _response()]
+
+        async def wrapped(*args, **kwargs):
+            return _agen(chunks)
+
+        async def main():
+            stream = await middleware.generate_content_async_wrapper_impl(
+                wrapped, Mock(_model_name="gemini-2.0-flash"), ("hi",), {"stream": True}
+            )
+            assert isinstance(stream, middleware.AsyncVertexAIStreamWrapper)
+            return [chunk async for chunk in stream]
+
+        assert asyncio.run(main()) == chunks
+        metering_call.assert_called_once()
+        kwargs = metering_call.call_args.kwargs
+        assert kwargs["is_streamed"] is True
+        assert kwargs["model_name_fallback"] == "gemini-2.0-flash"
+        assert kwargs["response"].candidates[0].finish_reason == "STOP"
+
+
+class TestGetEmbeddingsAsync:
+    """Test the get_embeddings_async wrapper."""
+
+    def test_embeddings_metered(self, metering_call):
+        embeddings = [Mock(statistics=Mock(token_count=5))]
+
+        async def wrapped(*args, **kwargs):
+            return embeddings
+
+        result = asyncio.run(
+            middleware.get_embeddings_async_wrapper(
+                wrapped, Mock(_model_name="text-embedding-004"), (["a"],), {}
+            )
+        )
+
+        assert result is embeddings
+        kwargs = metering_call.call_args.kwargs
+        assert kwargs["operation_type"] == OperationType.EMBED
+        assert kwargs["model_name_fallback"] == "text-embedding-004"
+
+
+class TestAsyncVertexAIStreamWrapper:
+    """Test close and error handling of the async stream wrapper."""
+
+    def test_early_close_meters_partial_stream(self, metering_call):
+        async def main():
+            stream = middleware.handle_vertex_ai_async_streaming_response(
+                _agen([_response(None), _response(None)]), _now(), {}, "gemini"
+            )
+            async with stream:
+                async for _ in stream:
+                    break
+
+        asyncio.run(main())
+        metering_call.assert_called_once()
+
+    def test_stream_error_meters_and_reraises(self, metering_call):
+        async def failing():
+            yield _response(None)
+            raise RuntimeError("stream broke")
+
+        async def main():
+            stream = middleware.handle_vertex_ai_async_streaming_response(
+                failing(), _now(), {}, "gemini"
+            )
+            async for _ in stream:
+                pass
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(main())
+        metering_call.assert_called_once()
+
+
+class TestAsyncSpooling:
+    """Test spool writes from the async wrappers stay off the event loop."""
+
+    @pytest.fixture
+    def spooled_transport(self, tmp_path):
+        transport = utils.configure_batching(enabled=False, spool_dir=str(tmp_path))
+        append = transport.spool.append
+        append_threads = []
+
+        def recording_append(record):
+            append_threads.append(threading.get_ident())
+            return append(record)
+
+        with patch.object(transport.spool, "append", side_effect=recording_append), \
+                patch.object(utils, "client") as mock_client:
+            mock_client.ai.create_completion.return_value = Mock(id="ok")
+            yield append_threads
+            assert utils.flush_metering(timeout=5)
+        utils.configure_batching(enabled=False)
+
+    def test_generate_content_async(self, spooled_transport):
+        async def wrapped(*args, **kwargs):
+            return _response()
+
+        async def main():
+            await middleware.generate_content_async_wrapper_impl(
+                wrapped, Mock(_model_name="gemini-2.0-flash", _revenium_usage_metadata=None),
+                ("hi",),
+                {},
+            )
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(main())
+        assert len(spooled_transport) == 1
+        assert spooled_transport[0] != loop_thread
+
+    def test_get_embeddings_async(self, spooled_transport):
+        async def wrapped(*args, **kwargs):
+            return [Mock(statistics=Mock(token_count=5))]
+
+        async def main():
+            await middleware.get_embeddings_async_wrapper(
+                wrapped, Mock(_model_name="text-embedding-004", _revenium_usage_metadata=None),
+                (["a"],),
+                {},
+            )
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(main())
+        assert len(spooled_transport) == 1
+        assert spooled_transport[0] != loop_thread
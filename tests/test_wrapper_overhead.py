@@ -0,0 +1,65 @@
+"""
+Smoke test for the wrapper-overhead benchmark.
+
+Runs benchmarks/wrapper_overhead.py with a handful of calls in a fresh
+interpreter (it puts the fake SDKs first on the path) and checks that every
+scenario ran and that each wrapped call produced exactly one metering record.
+Timings are not checked here; use ``--check`` against the recorded baseline.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+BENCHMARK = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "benchmarks",
+    "wrapper_overhead.py",
+)
+
+SCENARIOS = {
+    "google_ai.chat",
+    "google_ai.embed",
+    "google_ai.stream",
+    "vertex_ai.chat",
+    "vertex_ai.embed",
+    "vertex_ai.stream",
+}
+
+
+@pytest.fixture(scope="module")
+def results():
+    proc = subprocess.run(
+        [
+            sys.executable,
+            BENCHMARK,
+            "--calls", "40",
+            "--threads", "1", "4",
+            "--chunks", "3",
+            "--repeat", "1",
+            "--alloc-calls", "20",
+            "--json",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=120,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+class TestWrapperOverheadBenchmark:
+    """Test the benchmark exercises the real wrappers."""
+
+    def test_all_scenarios_and_thread_counts(self, results):
+        assert set(results["scenarios"]) == SCENARIOS
+        for entry in results["scenarios"].values():
+            assert set(entry["threads"]) == {"1", "4"}
+            assert set(entry["allocations"]) == {"baseline", "wrapped"}
+        assert results["scenarios"]["google_ai.stream"]["chunks_per_call"] == 3
+
+    def test_every_wrapped_call_is_metered(self, results):
+        assert results["metering_records_sent"] == results["wrapped_calls"]
+        assert results["metering_records_dropped"] == 0